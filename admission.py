@@ -0,0 +1,363 @@
+"""
+Contrôle d'admission : limitation du débit par client et plafond global des
+requêtes en cours vers le modèle.
+
+- Chaque client (session ou adresse IP) dispose d'un seau de jetons : `rate`
+  jetons par seconde, au plus `burst` accumulés. Une requête sans jeton est
+  refusée (429) avec le délai avant le prochain jeton.
+- Au plus `max_in_flight` requêtes interrogent le modèle en même temps, tous
+  workers confondus. Au-delà, une petite file d'attente bornée absorbe les
+  pics ; si elle est pleine ou si l'attente dépasse `queue_timeout`, la
+  requête est refusée immédiatement (503).
+
+L'état est partagé entre les workers gunicorn : les seaux dans une base
+SQLite, les places en cours sous forme de verrous fcntl sur les octets d'un
+fichier, libérés par le système si un worker meurt.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from logging import getLogger
+from typing import Deque, Dict, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : plafond par processus uniquement
+    fcntl = None
+
+from metrics import ADMISSION
+
+logger = getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Seaux de jetons par clé.
+
+    Attributes:
+        rate (float): Jetons ajoutés par seconde
+        burst (float): Capacité du seau
+        stats (Dict[str, int]): Requêtes acceptées et refusées
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 10.0):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"allowed": 0, "limited": 0}
+
+    def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Consomme `cost` jetons du seau de key.
+
+        Returns:
+            Tuple (accepté, secondes avant que la requête puisse être acceptée)
+        """
+        allowed, tokens = self._take(key, cost, time.time())
+        with self._lock:
+            self.stats["allowed" if allowed else "limited"] += 1
+        if not allowed:
+            ADMISSION.inc("rate_limited")
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def _refill(self, tokens: Optional[float], updated: float, now: float) -> float:
+        if tokens is None:
+            return self.burst
+        return min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+    def _take(self, key: str, cost: float, now: float) -> Tuple[bool, float]:
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Seaux en mémoire, propres au processus."""
+
+    def __init__(self, rate: float = 1.0, burst: float = 10.0, max_keys: int = 100000):
+        super().__init__(rate, burst)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def _take(self, key: str, cost: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            tokens = self._refill(tokens, updated, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                # Un seau plein équivaut à un seau absent
+                full_since = now - self.burst / self.rate
+                self._buckets = {k: v for k, v in self._buckets.items() if v[1] > full_since}
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Seaux partagés par tous les workers dans une base SQLite.
+
+    La lecture et la mise à jour d'un seau forment une transaction exclusive.
+    En cas d'erreur de la base, la requête est acceptée : la limitation ne
+    doit pas rendre le service indisponible.
+    """
+
+    _SCHEMA = """CREATE TABLE IF NOT EXISTS buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    )"""
+
+    def __init__(self, path: str, rate: float = 1.0, burst: float = 10.0, cleanup_every: int = 1000):
+        super().__init__(rate, burst)
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._calls = 0
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # État reconstructible : inutile de le synchroniser sur disque
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(self._SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, key: str, cost: float, now: float) -> Tuple[bool, float]:
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = self._refill(row[0], row[1], now) if row else self.burst
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                             (key, tokens, now))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Rate limiter unavailable, allowing request: {str(e)}")
+            return True, self.burst
+
+        with self._lock:
+            self._calls += 1
+            cleanup = self._calls % self.cleanup_every == 0
+        if cleanup:
+            self.cleanup(now)
+        return allowed, tokens
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """Supprime les seaux redevenus pleins (équivalents à des seaux absents)."""
+        now = time.time() if now is None else now
+        try:
+            self._connection().execute("DELETE FROM buckets WHERE updated < ?",
+                                       (now - self.burst / self.rate,))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to clean up rate limiter buckets: {str(e)}")
+
+
+def rate_limiter_from_env() -> Optional[RateLimiter]:
+    """Crée le limiteur configuré par RATE_LIMIT_* (None si désactivé)."""
+    kind = os.getenv("RATE_LIMIT_BACKEND", "sqlite").lower()
+    rate = float(os.getenv("RATE_LIMIT_PER_SECOND", "1"))
+    burst = float(os.getenv("RATE_LIMIT_BURST", "10"))
+    if kind in ("none", "") or rate <= 0:
+        return None
+    if kind == "memory":
+        return MemoryRateLimiter(rate, burst)
+    if kind == "sqlite":
+        path = os.getenv(
+            "RATE_LIMIT_DB_PATH",
+            os.path.join(tempfile.gettempdir(), "assistant-biblique", "ratelimit.sqlite3"),
+        )
+        return SQLiteRateLimiter(path, rate, burst)
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+class Saturated(RuntimeError):
+    """Plus aucune place n'est disponible, même après attente."""
+
+
+class ConcurrencyLimiter:
+    """
+    Plafond des requêtes en cours, partagé entre les processus.
+
+    Chaque place est un octet du fichier `lock_path`, verrouillé par fcntl
+    tant qu'une requête l'occupe. Les verrous fcntl appartenant au processus
+    et non au thread, les places tenues par ce processus sont suivies à part.
+    Sans fcntl (Windows), le plafond s'applique par processus.
+
+    Attributes:
+        max_in_flight (int): Nombre de places
+        queue_size (int): Requêtes pouvant attendre une place, par processus
+        queue_timeout (float): Attente maximale d'une place, en secondes
+        stats (Dict[str, int]): Compteurs de décisions
+    """
+
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, max_in_flight: int, lock_path: Optional[str] = None,
+                 queue_size: int = 4, queue_timeout: float = 1.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.lock_path = lock_path
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._held: Set[int] = set()
+        self._queue: Deque[object] = deque()
+        self._last_rejection = 0.0
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+        self.stats: Dict[str, int] = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    @classmethod
+    def from_env(cls, prefix: str = "ADMISSION", max_in_flight: int = 16,
+                 lock_name: str = "inflight.lock") -> Optional["ConcurrencyLimiter"]:
+        """
+        Crée le limiteur configuré par {prefix}_MAX_IN_FLIGHT, {prefix}_QUEUE_SIZE,
+        {prefix}_QUEUE_TIMEOUT_SECONDS et {prefix}_LOCK_PATH (None si désactivé).
+        """
+        max_in_flight = int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight)))
+        if max_in_flight <= 0:
+            return None
+        return cls(
+            max_in_flight,
+            lock_path=os.getenv(
+                f"{prefix}_LOCK_PATH",
+                os.path.join(tempfile.gettempdir(), "assistant-biblique", lock_name),
+            ),
+            queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", "4")),
+            queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT_SECONDS", "1")),
+        )
+
+    def _file(self) -> Optional[int]:
+        # Appelé avec self._lock ; les verrous fcntl ne sont pas hérités au fork
+        if fcntl is None or self.lock_path is None:
+            return None
+        if self._fd is None or self._fd_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._fd_pid = os.getpid()
+            self._held = set()
+        return self._fd
+
+    def _try_slot(self) -> Optional[int]:
+        """Prend une place libre sans attendre (appelé avec self._lock)."""
+        fd = self._file()
+        for slot in range(self.max_in_flight):
+            if slot in self._held:
+                continue
+            if fd is not None:
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    continue
+            self._held.add(slot)
+            return slot
+        return None
+
+    def acquire(self) -> int:
+        """
+        Prend une place, en attendant au plus queue_timeout si la file le permet.
+
+        Returns:
+            Le numéro de la place, à rendre avec release()
+
+        Raises:
+            Saturated: Si aucune place ne s'est libérée à temps
+        """
+        with self._lock:
+            # Pas de dépassement : une place libérée revient d'abord à la file
+            slot = None if self._queue else self._try_slot()
+            if slot is not None:
+                return self._admit(slot)
+            if len(self._queue) >= self.queue_size or self.queue_timeout <= 0:
+                return self._reject()
+            ticket = object()
+            self._queue.append(ticket)
+            self.stats["queued"] += 1
+            ADMISSION.inc("queued")
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while True:
+                    if self._queue[0] is ticket:
+                        slot = self._try_slot()
+                        if slot is not None:
+                            return self._admit(slot)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return self._reject()
+                    # Réveil par une libération locale, ou sondage des autres workers
+                    self._released.wait(min(remaining, self.POLL_INTERVAL))
+            finally:
+                self._queue.remove(ticket)
+                self._released.notify_all()
+
+    def try_acquire(self) -> Optional[int]:
+        """
+        Prend une place libre sans attendre ni passer devant la file, pour un
+        travail facultatif (réponse anticipée) : None si aucune n'est libre.
+        """
+        with self._lock:
+            slot = None if self._queue else self._try_slot()
+            return self._admit(slot) if slot is not None else None
+
+    def _admit(self, slot: int) -> int:
+        self.stats["admitted"] += 1
+        ADMISSION.inc("admitted")
+        return slot
+
+    def _reject(self) -> int:
+        self.stats["rejected"] += 1
+        self._last_rejection = time.monotonic()
+        ADMISSION.inc("rejected_capacity")
+        raise Saturated("Trop de requêtes en cours")
+
+    def release(self, slot: int) -> None:
+        with self._lock:
+            if slot not in self._held:
+                return
+            fd = self._file()
+            if fd is not None:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, slot)
+            self._held.discard(slot)
+            self._released.notify_all()
+
+    def in_flight(self) -> int:
+        """Places occupées, tous processus confondus (sondage non bloquant)."""
+        with self._lock:
+            fd = self._file()
+            busy = len(self._held)
+            if fd is None:
+                return busy
+            for slot in range(self.max_in_flight):
+                if slot in self._held:
+                    continue
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    busy += 1
+                else:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, slot)
+            return busy
+
+    def saturated(self, window: float = 5.0) -> bool:
+        """Vrai si toutes les places sont prises, ou si une requête a été refusée récemment."""
+        with self._lock:
+            recent = self._last_rejection and time.monotonic() - self._last_rejection < window
+        return bool(recent) or self.in_flight() >= self.max_in_flight
@@ -0,0 +1,308 @@
+"""
+Cache des réponses bibliques.
+
+Les questions récurrentes (le pardon, le fils prodigue, la prière...) sont
+servies depuis un cache à deux niveaux au lieu d'un aller-retour vers Gemini :
+
+- un LRU en mémoire, propre à chaque processus ;
+- un niveau persistant sur disque (SQLite en mode WAL), qui survit aux
+  redémarrages et est partagé par les workers gunicorn.
+
+Les clés sont dérivées de la question normalisée (casse, accents, ponctuation
+et hésitations de la reconnaissance vocale retirés) et d'une empreinte de la
+fenêtre de contexte récente.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from logging import getLogger
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = getLogger(__name__)
+
+# Hésitations des transcriptions vocales. Seulement des sons sans contenu :
+# « bon », « quoi » ou « well » changent le sens d'une question
+FILLER_WORDS = frozenset({"euh", "heu", "hum", "hmm", "uh", "um", "umm", "erm"})
+
+# Version de la normalisation, à changer quand elle change : les réponses
+# enregistrées sous les anciennes clés ne sont plus servies
+KEY_VERSION = "2"
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalise une question pour en faire une clé de cache stable.
+
+    Args:
+        text: Question brute, telle que transcrite
+
+    Returns:
+        Question en minuscules, sans accents, ponctuation ni hésitations
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _PUNCTUATION.sub(" ", text.replace("'", " ").replace("’", " "))
+    return " ".join(word for word in _WHITESPACE.split(text) if word and word not in FILLER_WORDS)
+
+
+def context_fingerprint(messages: Iterable[Dict[str, str]]) -> str:
+    """
+    Calcule l'empreinte des échanges précédents.
+
+    Le contexte système est ignoré : une première question a la même
+    empreinte (vide) dans toutes les conversations et reste donc partageable.
+
+    Args:
+        messages: Messages de la fenêtre de contexte, sans la question courante
+
+    Returns:
+        Empreinte hexadécimale, ou chaîne vide s'il n'y a pas d'échange
+    """
+    digest = hashlib.sha1()
+    empty = True
+    for msg in messages:
+        if msg["role"] == "system":
+            continue
+        empty = False
+        digest.update(msg["role"].encode())
+        digest.update(b"\0")
+        digest.update(normalize_question(msg["content"]).encode())
+        digest.update(b"\0")
+    return "" if empty else digest.hexdigest()[:16]
+
+
+def make_cache_key(question: str, context: Iterable[Dict[str, str]] = ()) -> Optional[str]:
+    """
+    Construit la clé de cache d'une question dans son contexte.
+
+    Args:
+        question: Question de l'utilisateur
+        context: Messages précédant la question
+
+    Returns:
+        Clé de cache, ou None si la question normalisée est vide
+    """
+    normalized = normalize_question(question)
+    if not normalized:
+        return None
+    return f"{KEY_VERSION}|{context_fingerprint(context)}|{normalized}"
+
+
+class MemoryCache:
+    """Cache LRU en mémoire avec expiration."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Cache persistant sur SQLite, partagé entre processus.
+
+    Chaque thread utilise sa propre connexion ; le mode WAL permet des
+    lectures concurrentes pendant les écritures des autres workers.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS answers (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 86400.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_accessed ON answers(accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT stored_at, response FROM answers WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[0] > self.ttl_seconds:
+            conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def put(self, key: str, value: str, stored_at: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO answers (key, response, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, stored_at, stored_at),
+        )
+        self._writes += 1
+        # L'éviction est amortie : elle n'est vérifiée qu'une écriture sur 64
+        if self._writes % 64 == 0:
+            self.evict(stored_at)
+
+    def evict(self, now: float) -> None:
+        """Supprime les entrées expirées puis les moins récemment lues au-delà du plafond."""
+        conn = self._connection()
+        conn.execute("DELETE FROM answers WHERE stored_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM answers WHERE key IN ("
+            "SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM answers")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+class AnswerCache:
+    """
+    Cache de réponses à deux niveaux (mémoire puis disque).
+
+    Attributes:
+        enabled (bool): Interrupteur global ; désactivé, le cache est contourné
+        stats (Dict[str, int]): Compteurs de succès et d'échecs
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[DiskCache] = None,
+                 enabled: bool = True):
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        """Crée un cache configuré depuis les variables d'environnement."""
+        ttl = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+        disk_path = os.getenv(
+            "ANSWER_CACHE_PATH",
+            os.path.join(tempfile.gettempdir(), "assistant-biblique", "answers.sqlite3"),
+        )
+        disk = DiskCache(
+            disk_path,
+            max_entries=int(os.getenv("ANSWER_CACHE_DISK_ENTRIES", "10000")),
+            ttl_seconds=ttl,
+        ) if disk_path else None
+        return cls(
+            MemoryCache(int(os.getenv("ANSWER_CACHE_MEMORY_ENTRIES", "512")), ttl),
+            disk,
+            enabled=os.getenv("ANSWER_CACHE_ENABLED", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cherche une réponse en mémoire puis sur disque.
+
+        Args:
+            key: Clé construite par make_cache_key
+
+        Returns:
+            La réponse en cache, ou None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        value = self.memory.get(key, now)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(key, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Answer cache disk read failed: {str(e)}")
+                self.stats["errors"] += 1
+                entry = None
+            if entry is not None:
+                stored_at, value = entry
+                self.memory.put(key, value, stored_at)
+                self.stats["disk_hits"] += 1
+                return value
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, value: str) -> None:
+        """Enregistre une réponse dans les deux niveaux."""
+        if not self.enabled:
+            return
+        now = time.time()
+        self.memory.put(key, value, now)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value, now)
+            except sqlite3.Error as e:
+                logger.warning(f"Answer cache disk write failed: {str(e)}")
+                self.stats["errors"] += 1
+        self.stats["stores"] += 1
+
+    def clear(self) -> None:
+        """Vide les deux niveaux du cache."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -1,4 +1,3 @@
-from flask import Flask, request, Response, send_from_directory
 import sys
 import os
 from pathlib import Path
@@ -7,8 +6,13 @@ from pathlib import Path
 root_path = str(Path(__file__).parent.parent.absolute())
 sys.path.append(root_path)
 
+# Pas de WebSocket en serverless : /api/voice n'est pas enregistrée et
+# flask-sock n'est pas importé au démarrage à froid
+os.environ.setdefault("VOICE_WEBSOCKET", "false")
+
 # Import the Flask app
 from app import app
+from serverless import WSGIAdapter
 
 # Configure static and template folders
 app.static_folder = os.path.join(root_path, "static")
@@ -22,41 +26,6 @@ def create_app():
     return app
 
 
-def handler(event, context):
-    """
-    Fonction handler pour Vercel serverless
-    Cette fonction adapte les requêtes Vercel pour Flask
-    """
-    if not event:
-        return {"statusCode": 500, "body": "No event data received"}
-
-    try:
-        # Create a Flask request context
-        with app.test_request_context(
-            path=event.get("path", "/"),
-            method=event.get("httpMethod", "GET"),
-            headers=event.get("headers", {}),
-            data=event.get("body", ""),
-            environ_base={"SERVER_NAME": "vercel"},
-        ):
-            try:
-                response = app.full_dispatch_request()
-                return {
-                    "statusCode": response.status_code,
-                    "body": response.get_data(as_text=True),
-                    "headers": dict(response.headers),
-                }
-            except Exception as e:
-                app.logger.error(f"Error processing request: {str(e)}")
-                return {
-                    "statusCode": 500,
-                    "body": str(e),
-                    "headers": {"Content-Type": "application/json"},
-                }
-    except Exception as e:
-        app.logger.error(f"Error setting up request context: {str(e)}")
-        return {
-            "statusCode": 500,
-            "body": str(e),
-            "headers": {"Content-Type": "application/json"},
-        }
+# Créé une fois par instance : l'application et ses états (caches, sessions,
+# index) sont réutilisés d'une invocation à l'autre
+handler = WSGIAdapter(app, server_name="vercel")
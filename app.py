@@ -3,14 +3,45 @@ Module principal de l'Assistant Vocal Biblique.
 Gère les routes Flask et l'intégration avec le chat biblique.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import (
+    Flask, render_template, request, jsonify, Response, stream_with_context, g, send_file, url_for
+)
 import os
+import mimetypes
+import json
+import time
 from dotenv import load_dotenv
-from bible_chat import initialize_chat, get_bible_response
+from bible_chat import (
+    initialize_chat, get_bible_response, stream_bible_response, new_conversation,
+    answer_cache, single_flight, session_backend, upstream, router
+)
+from assets import (
+    ENCODINGS, RESPONSE_LEVELS, AssetManifest, compress, fingerprint, is_fingerprinted, negotiate_encoding
+)
+from admission import ConcurrencyLimiter, Saturated, rate_limiter_from_env
+from voice_session import VoiceRejected, VoiceSession
+from batch import BatchRunner
+from citations import extract_citations
+from verse_store import get_default_store
+from tts import TTSError, synthesizer_from_env
+from metrics import REGISTRY, REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, ERRORS, AUDIO_SECONDS
+from tracing import annotate, profiler, tracer
+from traffic import recorder_from_env
+from session_store import (
+    SessionStore, SESSION_COOKIE_NAME, SESSION_HEADER_NAME, resolve_session_id
+)
+import hmac
 import logging
-from typing import Tuple, Dict, Union, Any
+import math
+import threading
+from contextlib import contextmanager
+from typing import Tuple, Dict, Union, Any, Optional
 from functools import wraps
+from itertools import chain
 from http import HTTPStatus
+from werkzeug.exceptions import HTTPException, NotFound, RequestEntityTooLarge
+from werkzeug.utils import safe_join
+from werkzeug.wsgi import ClosingIterator
 
 # Configuration du logging
 logging.basicConfig(
@@ -75,26 +106,358 @@ def validate_json_input(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Initialiser le chat
-try:
-    chat = initialize_chat()
-    logger.info("Chat system initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize chat: {str(e)}")
-    chat = None
+# Le chat (et le SDK Gemini) n'est initialisé qu'à la première question :
+# au démarrage à froid, / et /api/health répondent sans le charger
+chat = None
+chat_error: Optional[str] = None
+_chat_lock = threading.Lock()
+
+def get_chat() -> Any:
+    """
+    Retourne le chat global, en l'initialisant à la première utilisation.
+
+    Returns:
+        L'objet chat, ou None si l'initialisation a échoué (elle sera retentée)
+    """
+    global chat, chat_error
+    if chat is None:
+        with _chat_lock:
+            if chat is None:
+                try:
+                    chat = initialize_chat()
+                except Exception as e:
+                    logger.error(f"Failed to initialize chat: {str(e)}")
+                if chat is None:
+                    chat_error = "initialization failed"
+                else:
+                    chat_error = None
+                    logger.info("Chat system initialized successfully")
+    return chat
+
+# Stockage des conversations par session
+session_store = SessionStore.from_env(new_conversation)
+
+# Lots de questions : concurrence bornée pour l'ensemble des lots du processus
+batch_runner = BatchRunner.from_env()
+
+# Reconnaissance vocale des enregistrements téléversés (NumPy chargé à la première requête)
+asr = None
+_asr_lock = threading.Lock()
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+def get_asr() -> Any:
+    """Retourne le moteur de reconnaissance vocale, créé à la première utilisation."""
+    global asr
+    if asr is None:
+        with _asr_lock:
+            if asr is None:
+                from audio_input import asr_from_env
+                asr = asr_from_env()
+    return asr
+
+# Contrôle d'admission : débit par client et plafond des appels au modèle,
+# partagés entre les workers
+rate_limiter = rate_limiter_from_env()
+inflight = ConcurrencyLimiter.from_env()
+RATE_LIMIT_KEY = os.getenv("RATE_LIMIT_KEY", "ip").lower()
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+# Fichiers statiques avec empreinte (python assets.py build) et compression de l'API
+asset_manifest = AssetManifest(app.static_folder)
+ASSET_MAX_AGE = 365 * 24 * 3600
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# Synthèse vocale serveur (le moteur n'est lancé qu'à la première lecture)
+speech = synthesizer_from_env()
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "5000"))
+# Plafond des lectures en cours, partagé entre les workers comme celui des appels au modèle
+tts_inflight = ConcurrencyLimiter.from_env("TTS", max_in_flight=8, lock_name="tts.lock")
+
+# Routes d'administration (traces, profileur) : désactivées sans jeton
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Enregistrement anonymisé des questions, pour les rejouer (benchmarks/replay.py)
+traffic = recorder_from_env()
+
+def current_session_id(data: Optional[Dict[str, Any]] = None) -> Tuple[str, bool]:
+    """
+    Détermine l'identifiant de session de la requête courante.
+
+    Args:
+        data: Corps JSON de la requête, s'il y en a un
+
+    Returns:
+        Tuple (identifiant, True si un cookie doit être posé)
+    """
+    body_value = data.get("session_id") if isinstance(data, dict) else None
+    session_id, created = resolve_session_id(
+        request.headers.get(SESSION_HEADER_NAME),
+        body_value,
+        request.cookies.get(SESSION_COOKIE_NAME),
+    )
+    return session_id, created or request.cookies.get(SESSION_COOKIE_NAME) != session_id
+
+def attach_session_cookie(response, session_id: str):
+    """Pose le cookie de session sur la réponse."""
+    response.set_cookie(
+        SESSION_COOKIE_NAME,
+        session_id,
+        max_age=int(session_store.ttl_seconds),
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+def client_key() -> str:
+    """
+    Identifie le client pour la limitation du débit : sa session si
+    RATE_LIMIT_KEY=session et qu'il en présente une, sinon son adresse IP.
+
+    Derrière RATE_LIMIT_TRUSTED_PROXIES proxys, l'adresse est celle ajoutée à
+    X-Forwarded-For par le premier d'entre eux (les précédentes sont déclarées
+    par le client et ne sont pas fiables).
+    """
+    if RATE_LIMIT_KEY == "session":
+        session_id = request.headers.get(SESSION_HEADER_NAME) or request.cookies.get(SESSION_COOKIE_NAME)
+        if session_id:
+            return f"session:{session_id[:128]}"
+    route = request.access_route
+    if RATE_LIMIT_TRUSTED_PROXIES and len(route) > RATE_LIMIT_TRUSTED_PROXIES:
+        return f"ip:{route[-RATE_LIMIT_TRUSTED_PROXIES - 1]}"
+    return f"ip:{request.remote_addr}"
+
+def rejection(status: HTTPStatus, message: str, retry_after: float) -> Response:
+    """Réponse immédiate de refus, avec le délai conseillé avant de réessayer."""
+    response = jsonify({"error": status.phrase, "message": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def saturated_response() -> Response:
+    """503 quand toutes les places vers le modèle sont prises."""
+    # Une place se libère en général en moins d'une réponse médiane
+    median = upstream.latencies.percentile(50)
+    return rejection(HTTPStatus.SERVICE_UNAVAILABLE,
+                     "Le service est momentanément saturé, veuillez réessayer",
+                     median if median is not None else 1)
+
+@contextmanager
+def upstream_slot():
+    """
+    Occupe une des places d'appel au modèle pendant le bloc.
+
+    Raises:
+        Saturated: Si aucune place ne s'est libérée dans le délai d'attente
+    """
+    if inflight is None:
+        yield
+        return
+    slot = inflight.acquire()
+    try:
+        yield
+    finally:
+        inflight.release(slot)
+
+def admission_control(upstream_call: bool = True, synthesis: bool = False):
+    """
+    Décorateur de contrôle d'admission des routes qui interrogent le modèle
+    ou occupent le serveur.
+
+    Refuse la requête en 429 si le client a épuisé son débit. Avec
+    upstream_call, occupe aussi une place d'appel au modèle jusqu'à la fin de
+    la réponse (flux compris), ou refuse en 503 si aucune n'est libre ; avec
+    synthesis, de même une place de synthèse vocale.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if rate_limiter is not None:
+                allowed, retry_after = rate_limiter.acquire(client_key())
+                if not allowed:
+                    return rejection(HTTPStatus.TOO_MANY_REQUESTS,
+                                     "Trop de requêtes, veuillez patienter", retry_after)
+            limiter = inflight if upstream_call else tts_inflight if synthesis else None
+            if limiter is None:
+                return f(*args, **kwargs)
+
+            try:
+                slot = limiter.acquire()
+            except Saturated:
+                if upstream_call:
+                    return saturated_response()
+                return rejection(HTTPStatus.SERVICE_UNAVAILABLE,
+                                 "La synthèse vocale est momentanément saturée, veuillez réessayer", 1)
+            release = lambda: limiter.release(slot)  # noqa: E731 (idempotent)
+            try:
+                response = app.make_response(f(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            if response.is_streamed:
+                # La place est rendue à la fermeture du flux, même interrompu
+                response.response = ClosingIterator(response.response, release)
+            else:
+                release()
+            return response
+        return decorated_function
+    return decorator
 
 @app.errorhandler(Exception)
 def handle_error_response(error: Exception) -> Tuple[Dict[str, str], int]:
     """Gestionnaire global des erreurs."""
+    if isinstance(error, HTTPException):
+        # 404, 405… : réponse HTTP prévue, pas une erreur du serveur
+        return error
+    ERRORS.inc("request", type(error).__name__)
     response, status_code = handle_error(error)
     return jsonify(response), status_code
 
+def request_endpoint() -> str:
+    """Règle de routage de la requête, et non son chemin, pour borner le nombre de séries."""
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+@app.before_request
+def start_request_timer() -> None:
+    """Démarre la mesure de la requête, sa trace et son profilage s'ils sont tirés au sort."""
+    REGISTRY.ensure_flusher()
+    g.request_start = time.perf_counter()
+    g.trace = tracer.start(f"{request.method} {request_endpoint()}")
+    g.profiled = profiler.enter_request()
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Compte la requête et enregistre sa durée."""
+    endpoint = request_endpoint()
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    start = g.get("request_start")
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    annotate(status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_trace(error: Optional[BaseException] = None) -> None:
+    """Termine la trace et le profilage de la requête (à la fin du flux, pour les réponses en flux)."""
+    if g.pop("profiled", False):
+        profiler.leave_request()
+    tracer.finish(g.pop("trace", None))
+
+@app.after_request
+def compress_json_response(response: Response) -> Response:
+    """Compresse les réponses JSON de l'API selon Accept-Encoding."""
+    if (response.mimetype != "application/json" or response.is_streamed
+            or response.direct_passthrough or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is not None:
+        response.set_data(compress(data, encoding, RESPONSE_LEVELS[encoding]))
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+@app.template_global()
+def asset_url(filename: str) -> str:
+    """URL d'un fichier statique, avec empreinte une fois les fichiers construits."""
+    return url_for("static", filename=asset_manifest.resolve(filename))
+
+def serve_static(filename: str) -> Response:
+    """
+    Sert les fichiers statiques. Un fichier avec empreinte est servi dans sa
+    variante précompressée acceptée par le client, avec un cache immutable.
+    """
+    if not is_fingerprinted(filename):
+        return app.send_static_file(filename)
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    variants = dict(ENCODINGS)
+    encoding = negotiate_encoding(
+        request.accept_encodings,
+        [name for name, suffix in ENCODINGS if os.path.isfile(path + suffix)],
+    )
+    response = send_file(
+        path + variants[encoding] if encoding else path,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=ASSET_MAX_AGE,
+        # ETag fort dérivé du contenu : le même sur tous les serveurs
+        etag=f"{fingerprint(filename)}-{encoding or 'identity'}",
+    )
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    # Nom de la variante (.gz, .br) : sans intérêt pour le client
+    del response.headers["Content-Disposition"]
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+app.view_functions["static"] = serve_static
+
 @app.route("/")
 def index() -> str:
     """Route principale servant l'interface utilisateur."""
     return render_template("index.html")
 
+def extract_question(data: Dict[str, Any]) -> str:
+    """
+    Valide et extrait la question du corps JSON.
+
+    Raises:
+        ValueError: Si le champ 'text' est absent, vide ou invalide
+        RuntimeError: Si le système de chat n'est pas initialisé
+    """
+    text = data.get("text")
+
+    if not isinstance(text, str):
+        raise ValueError("Le champ 'text' doit être une chaîne de caractères")
+
+    if not text.strip():
+        raise ValueError("Le champ 'text' ne peut pas être vide")
+
+    if not get_chat():
+        raise RuntimeError("Le système de chat n'est pas initialisé")
+
+    return text
+
+def sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Formate un événement Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def conversation_turn(history: Any) -> int:
+    """Nombre de questions déjà posées dans la fenêtre de contexte de la session."""
+    return sum(1 for message in history.messages if message["role"] == "user")
+
+def capture_question(text: str, session_id: str, turn: int, response: str, use_cache: bool) -> None:
+    """Ajoute la question répondue au journal de trafic, s'il est activé."""
+    start = g.get("request_start")
+    duration = time.perf_counter() - start if start is not None else 0.0
+    traffic.record(text, session_id, turn, started=time.time() - duration, duration=duration,
+                   response_bytes=len(response.encode("utf-8")), cache=use_cache, endpoint=request.path)
+
+def answer_question(text: str, session_id: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Répond à une question dans le contexte de la session et relève les citations."""
+    # Obtenir une réponse du chat biblique dans le contexte de la session
+    with session_store.session(session_id) as session:
+        turn = conversation_turn(session.history)
+        response = get_bible_response(text, session.chat, session.history, use_cache=use_cache)
+    logger.info(f"Successfully processed request for text: {text[:50]}...")
+
+    with STAGE_SECONDS.time("citations"):
+        citations = extract_citations(response, get_default_store())
+    if traffic is not None:
+        capture_question(text, session_id, turn, response, use_cache)
+    return {
+        "response": response,
+        "citations": citations,
+        "session_id": session_id,
+        "success": True
+    }
+
 @app.route("/api/process_audio", methods=["POST"])
+@admission_control()
 @validate_json_input
 def process_audio() -> Tuple[Dict[str, Any], int]:
     """
@@ -105,25 +468,178 @@ def process_audio() -> Tuple[Dict[str, Any], int]:
     """
     try:
         data = request.get_json()
-        text = data.get("text")
+        with STAGE_SECONDS.time("validation"):
+            text = extract_question(data)
+
+        session_id, set_cookie = current_session_id(data)
+        result = answer_question(text, session_id, use_cache=data.get("cache", True) is not False)
+        with STAGE_SECONDS.time("serialization"):
+            result = jsonify(result)
+        if set_cookie:
+            attach_session_cookie(result, session_id)
+        return result, HTTPStatus.OK
+
+    except ValueError as ve:
+        logger.warning(f"Validation error: {str(ve)}")
+        return jsonify({
+            "error": "Invalid input",
+            "message": str(ve)
+        }), HTTPStatus.BAD_REQUEST
+        
+    except Exception as e:
+        logger.error(f"Processing error: {str(e)}", exc_info=True)
+        ERRORS.inc("request", type(e).__name__)
+        return jsonify({
+            "error": "Internal Server Error",
+            "message": "Une erreur est survenue lors du traitement de votre demande"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+def answer_batch_item(item: Any, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Répond à une question d'un lot, dans une conversation qui lui est propre.
+
+    Args:
+        item: Texte de la question, ou objet {"text", "context", "id"} ;
+            context est un texte ou une liste de messages {"role", "content"}
+            placés avant la question
+
+    Raises:
+        ValueError: Si la question ou son contexte sont invalides
+    """
+    if isinstance(item, str):
+        item = {"text": item}
+    if not isinstance(item, dict):
+        raise ValueError("Chaque question doit être un texte ou un objet avec un champ 'text'")
+    text = extract_question(item)
+
+    history, chat = new_conversation()
+    context = item.get("context")
+    if isinstance(context, str):
+        history.add_message("user", context)
+    elif isinstance(context, list):
+        for message in context:
+            if not isinstance(message, dict) or message.get("role") not in ("user", "assistant") \
+                    or not isinstance(message.get("content"), str):
+                raise ValueError("Le contexte doit être une liste de messages {role, content}")
+            history.add_message(message["role"], message["content"])
+    elif context is not None:
+        raise ValueError("Le champ 'context' doit être un texte ou une liste de messages")
+
+    response = get_bible_response(text, chat, history, use_cache=use_cache, raise_errors=True)
+    with STAGE_SECONDS.time("citations"):
+        citations = extract_citations(response, get_default_store())
+    return {"question": text, "response": response, "citations": citations}
+
+@app.route("/api/process_batch", methods=["POST"])
+@admission_control(upstream_call=False)
+@validate_json_input
+def process_batch() -> Response:
+    """
+    Traite un lot de questions en parallèle, chacune dans sa propre conversation.
+
+    Corps : {"questions": [...], "concurrency": n, "cache": bool}. La réponse
+    est en NDJSON : une ligne par question dans l'ordre où elles se terminent
+    (index, id éventuel, réponse ou erreur, durée), puis une ligne de bilan.
+    """
+    data = request.get_json()
+    questions = data.get("questions")
+    try:
+        batch_runner.validate(questions, data.get("concurrency"))
+    except ValueError as ve:
+        logger.warning(f"Validation error: {str(ve)}")
+        return jsonify({
+            "error": "Invalid input",
+            "message": str(ve)
+        }), HTTPStatus.BAD_REQUEST
+    if not get_chat():
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "Le système de chat n'est pas initialisé"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
 
-        if not isinstance(text, str):
-            raise ValueError("Le champ 'text' doit être une chaîne de caractères")
+    use_cache = data.get("cache", True) is not False
 
-        if not text.strip():
-            raise ValueError("Le champ 'text' ne peut pas être vide")
+    def answer(item):
+        # Chaque question occupe une place vers le modèle, comme une requête isolée
+        with upstream_slot():
+            return answer_batch_item(item, use_cache)
 
-        if not chat:
-            raise RuntimeError("Le système de chat n'est pas initialisé")
+    def generate():
+        start = time.perf_counter()
+        failed = 0
+        for result in batch_runner.run(questions, answer, data.get("concurrency")):
+            item = questions[result["index"]]
+            if isinstance(item, dict) and "id" in item:
+                result = {"index": result["index"], "id": item["id"], **result}
+            failed += not result["success"]
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": {
+            "total": len(questions),
+            "succeeded": len(questions) - failed,
+            "failed": failed,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }}) + "\n"
 
-        # Obtenir une réponse du chat biblique
-        response = get_bible_response(text, chat)
-        logger.info(f"Successfully processed request for text: {text[:50]}...")
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
+@app.route("/api/process_audio/upload", methods=["POST"])
+@admission_control(upstream_call=False)
+def process_audio_upload() -> Tuple[Dict[str, Any], int]:
+    """
+    Variante de process_audio pour les clients sans reconnaissance vocale :
+    le corps de la requête est l'enregistrement de la question.
+
+    Le Content-Type indique le format (audio/wav, audio/pcm;rate=…;channels=…,
+    audio/ogg ou audio/webm). L'audio est décodé et transcrit pendant la
+    réception ; la session et le cache se passent dans la chaîne de requête.
+    """
+    from audio_input import AudioError, UnsupportedAudioError, transcribe_upload
+
+    backend = get_asr()
+    if not backend.available:
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "La reconnaissance vocale n'est pas disponible sur ce serveur"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
+
+    chunks = iter(lambda: request.stream.read(UPLOAD_CHUNK_BYTES), b"")
+    try:
+        with STAGE_SECONDS.time("asr"):
+            transcription = transcribe_upload(chunks, request.content_type, backend)
+    except UnsupportedAudioError as e:
+        return jsonify({"error": "Unsupported Media Type", "message": str(e)}), \
+            HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    except AudioError as e:
+        logger.warning(f"Audio decoding error: {str(e)}")
+        return jsonify({"error": "Invalid input", "message": str(e)}), HTTPStatus.BAD_REQUEST
+    except RequestEntityTooLarge:
         return jsonify({
-            "response": response,
-            "success": True
-        }), HTTPStatus.OK
+            "error": "Payload Too Large",
+            "message": f"L'enregistrement dépasse {app.config['MAX_CONTENT_LENGTH']} octets"
+        }), HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    AUDIO_SECONDS.observe(transcription.received_seconds, "received")
+    AUDIO_SECONDS.observe(transcription.voiced_seconds, "voiced")
+
+    data = request.args.to_dict()
+    try:
+        if not transcription.text:
+            raise ValueError("Aucune parole détectée dans l'enregistrement")
+        with STAGE_SECONDS.time("validation"):
+            text = extract_question({"text": transcription.text})
+        session_id, set_cookie = current_session_id(data)
+        # La place vers le modèle n'est prise qu'une fois l'enregistrement reçu
+        with upstream_slot():
+            result = answer_question(text, session_id, use_cache=data.get("cache", "1") != "0")
+        with STAGE_SECONDS.time("serialization"):
+            result = jsonify({"transcript": text, **result})
+        if set_cookie:
+            attach_session_cookie(result, session_id)
+        return result, HTTPStatus.OK
+
+    except Saturated:
+        return saturated_response()
 
     except ValueError as ve:
         logger.warning(f"Validation error: {str(ve)}")
@@ -131,14 +647,237 @@ def process_audio() -> Tuple[Dict[str, Any], int]:
             "error": "Invalid input",
             "message": str(ve)
         }), HTTPStatus.BAD_REQUEST
-        
+
     except Exception as e:
         logger.error(f"Processing error: {str(e)}", exc_info=True)
+        ERRORS.inc("request", type(e).__name__)
         return jsonify({
             "error": "Internal Server Error",
             "message": "Une erreur est survenue lors du traitement de votre demande"
         }), HTTPStatus.INTERNAL_SERVER_ERROR
 
+@app.route("/api/process_audio/stream", methods=["POST"])
+@admission_control()
+@validate_json_input
+def process_audio_stream() -> Response:
+    """
+    Variante en flux de process_audio (Server-Sent Events).
+
+    Émet un événement `delta` par fragment de réponse, puis un événement
+    `done` contenant la réponse complète.
+    """
+    data = request.get_json()
+    try:
+        with STAGE_SECONDS.time("validation"):
+            text = extract_question(data)
+    except ValueError as ve:
+        logger.warning(f"Validation error: {str(ve)}")
+        return jsonify({
+            "error": "Invalid input",
+            "message": str(ve)
+        }), HTTPStatus.BAD_REQUEST
+
+    session_id, set_cookie = current_session_id(data)
+
+    def generate():
+        parts = []
+        try:
+            with session_store.session(session_id) as session:
+                for chunk in stream_bible_response(text, session.chat, session.history,
+                                                   use_cache=data.get("cache", True) is not False):
+                    parts.append(chunk)
+                    yield sse_event("delta", {"text": chunk})
+            logger.info(f"Successfully streamed response for text: {text[:50]}...")
+            response_text = "".join(parts)
+            with STAGE_SECONDS.time("citations"):
+                citations = extract_citations(response_text, get_default_store())
+            yield sse_event("done", {
+                "response": response_text,
+                "citations": citations,
+                "session_id": session_id,
+                "success": True
+            })
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}", exc_info=True)
+            ERRORS.inc("stream", type(e).__name__)
+            yield sse_event("error", {
+                "error": "Internal Server Error",
+                "message": "Une erreur est survenue lors du traitement de votre demande"
+            })
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    if set_cookie:
+        attach_session_cookie(response, session_id)
+    return response
+
+# Session vocale en duplex intégral : transcriptions provisoires et réponse
+# sur la même connexion (chaque connexion occupe un thread du worker)
+def voice_socket(ws) -> None:
+    """
+    Session vocale WebSocket (voir voice_session) : la réponse est préparée
+    pendant que l'utilisateur parle, puis envoyée sur la même connexion.
+    """
+    from simple_websocket import ConnectionClosed
+
+    session_id, _ = current_session_id(request.args.to_dict())
+    use_cache = request.args.get("cache", "true").lower() != "false"
+    key = client_key()
+
+    def send(message: Dict[str, Any]) -> None:
+        try:
+            ws.send(json.dumps(message, ensure_ascii=False))
+        except ConnectionClosed:
+            raise EOFError
+
+    def receive(timeout: Optional[float]) -> Optional[str]:
+        try:
+            return ws.receive(timeout)
+        except ConnectionClosed:
+            raise EOFError
+
+    def admit() -> None:
+        if not get_chat():
+            raise VoiceRejected("Le système de chat n'est pas initialisé", 1)
+        if rate_limiter is not None:
+            allowed, retry_after = rate_limiter.acquire(key)
+            if not allowed:
+                raise VoiceRejected("Trop de requêtes, veuillez patienter", retry_after)
+
+    def speculate(text: str):
+        # Facultatif : jamais d'attente ni de place prise à une vraie question
+        slot = inflight.try_acquire() if inflight is not None else None
+        if inflight is not None and slot is None:
+            return None
+        session = session_store.get(session_id)
+        if not session.lock.acquire(timeout=0.05):
+            # Une réponse de la session est encore en cours
+            if slot is not None:
+                inflight.release(slot)
+            return None
+        try:
+            session.history.sync()
+            history = session.history.fork()
+        finally:
+            session.lock.release()
+
+        def generate():
+            try:
+                yield from stream_bible_response(text, new_conversation()[1], history, use_cache=use_cache)
+            finally:
+                if slot is not None:
+                    inflight.release(slot)
+        return generate()
+
+    def answer(text: str):
+        try:
+            with upstream_slot(), session_store.session(session_id) as session:
+                yield from stream_bible_response(text, session.chat, session.history, use_cache=use_cache)
+        except Saturated:
+            median = upstream.latencies.percentile(50)
+            raise VoiceRejected("Le service est momentanément saturé, veuillez réessayer",
+                                median if median is not None else 1)
+
+    def commit(text: str, response: str) -> None:
+        with session_store.session(session_id) as session:
+            session.history.sync()
+            session.history.add_message("user", text)
+            session.history.add_message("assistant", response)
+
+    def describe(response: str) -> Dict[str, Any]:
+        with STAGE_SECONDS.time("citations"):
+            citations = extract_citations(response, get_default_store())
+        return {"citations": citations, "session_id": session_id}
+
+    session = VoiceSession.from_env(send, speculate=speculate, answer=answer, commit=commit,
+                                    describe=describe, admit=admit)
+    try:
+        send({"type": "ready", "session_id": session_id})
+    except EOFError:
+        return
+    session.run(receive)
+    logger.info(f"Voice session closed: {session.stats}")
+
+def register_voice_socket() -> bool:
+    """
+    Enregistre /api/voice si flask-sock est installé.
+
+    flask-sock est importé ici et non en tête du module : le point d'entrée
+    serverless (api/index.py), qui ne sert pas de WebSocket, désactive la
+    route avec VOICE_WEBSOCKET=false et n'en paie pas l'import.
+    """
+    try:
+        from flask_sock import Sock
+    except ImportError:  # pas de session vocale WebSocket, seulement les routes HTTP
+        return False
+    Sock(app).route("/api/voice")(voice_socket)
+    return True
+
+if os.getenv("VOICE_WEBSOCKET", "true").lower() in ("1", "true", "yes"):
+    register_voice_socket()
+
+@app.route("/api/tts", methods=["GET", "POST"])
+@admission_control(upstream_call=False, synthesis=True)
+def text_to_speech() -> Response:
+    """
+    Lit un texte à voix haute (flux WAV).
+
+    Le texte, la voix et le débit sont pris dans la chaîne de requête (GET,
+    utilisable directement comme source d'un élément <audio>) ou dans le corps
+    JSON (POST). L'audio de la première phrase est envoyé dès qu'il est prêt.
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+    else:
+        data = request.args
+    try:
+        with STAGE_SECONDS.time("validation"):
+            text = data.get("text")
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("Le champ 'text' ne peut pas être vide")
+            if len(text) > TTS_MAX_CHARS:
+                raise ValueError(f"Le texte dépasse {TTS_MAX_CHARS} caractères")
+            rate = data.get("rate")
+            voice, rate = speech.validate(data.get("voice"), None if rate in (None, "") else int(rate))
+    except (TypeError, ValueError) as ve:
+        logger.warning(f"Validation error: {str(ve)}")
+        return jsonify({
+            "error": "Invalid input",
+            "message": str(ve)
+        }), HTTPStatus.BAD_REQUEST
+
+    if not speech.available:
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "La synthèse vocale n'est pas disponible sur ce serveur"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
+
+    audio = speech.stream(text, voice, rate)
+    try:
+        # Première phrase avant les en-têtes : une erreur reste une réponse 503
+        with STAGE_SECONDS.time("tts_first_audio"):
+            first = next(audio)
+    except TTSError as e:
+        logger.error(f"Speech synthesis error: {str(e)}")
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "La synthèse vocale a échoué"
+        }), HTTPStatus.SERVICE_UNAVAILABLE
+
+    def generate():
+        try:
+            yield from chain((first,), audio)
+        except TTSError as e:
+            # Les en-têtes sont partis : le flux s'arrête à la dernière phrase lue
+            logger.error(f"Speech synthesis error mid-stream: {str(e)}")
+
+    response = Response(stream_with_context(generate()), mimetype="audio/wav")
+    # Même texte, même voix, même débit : même audio
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 @app.route("/api/health")
 def health_check() -> Tuple[Dict[str, str], int]:
     """
@@ -147,13 +886,143 @@ def health_check() -> Tuple[Dict[str, str], int]:
     Returns:
         Tuple contenant la réponse JSON et le code HTTP
     """
-    status = "healthy" if chat is not None else "degraded"
+    # Ne déclenche pas l'initialisation du chat : la sonde doit rester légère
+    fake = os.getenv("GEMINI_FAKE", "0").lower() in ("1", "true", "yes")
+    configured = (fake or bool(os.getenv("GEMINI_API_KEY"))) and chat_error is None
+    status = "healthy" if chat is not None or configured else "degraded"
+    circuit = upstream.breaker.state
+    saturated = inflight is not None and inflight.saturated()
+    if circuit == "open" or saturated:
+        status = "degraded"
     return jsonify({
         "status": status,
         "service": "assistant-biblique",
+        "model_initialized": chat is not None,
+        "sessions": len(session_store),
+        "session_backend": session_backend.stats() if session_backend is not None else None,
+        "answer_cache": answer_cache.stats,
+        "single_flight": single_flight.stats,
+        "batch": batch_runner.stats,
+        "upstream": {"circuit": circuit, **upstream.stats},
+        "router": router.summary(),
+        "admission": {
+            "saturated": saturated,
+            "in_flight": inflight.in_flight() if inflight is not None else None,
+            "max_in_flight": inflight.max_in_flight if inflight is not None else None,
+            **(inflight.stats if inflight is not None else {}),
+            "rate_limit": rate_limiter.stats if rate_limiter is not None else None,
+        },
+        "asr": os.getenv("ASR_BACKEND", "none"),
+        "tts": {"available": speech.available, **speech.stats},
         "version": os.getenv("APP_VERSION", "1.0.0")
     }), HTTPStatus.OK
 
+def admin_required(f):
+    """
+    Réserve une route d'administration aux requêtes portant ADMIN_TOKEN dans
+    l'en-tête X-Admin-Token ; sans jeton configuré, la route n'existe pas.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            raise NotFound()
+        supplied = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+            return jsonify({
+                "error": "Forbidden",
+                "message": "Jeton d'administration invalide"
+            }), HTTPStatus.FORBIDDEN
+        return f(*args, **kwargs)
+    return decorated_function
+
+def optional_float(value: Any, name: str) -> Optional[float]:
+    """
+    Nombre facultatif d'un corps JSON.
+
+    Raises:
+        ValueError: Si la valeur n'est pas un nombre
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Le champ '{name}' doit être un nombre")
+    return float(value)
+
+@app.route("/api/admin/traces", methods=["GET", "POST"])
+@admin_required
+def admin_traces() -> Response:
+    """
+    Traces des dernières requêtes échantillonnées du worker (GET, paramètres
+    limit et min_ms), ou réglage à chaud de l'échantillonnage (POST,
+    sample_rate et min_duration_ms ; clear vide le tampon).
+    """
+    try:
+        if request.method == "POST":
+            data = request.get_json(silent=True) or {}
+            min_duration_ms = optional_float(data.get("min_duration_ms"), "min_duration_ms")
+            tracer.configure(
+                sample_rate=optional_float(data.get("sample_rate"), "sample_rate"),
+                min_duration=min_duration_ms / 1000 if min_duration_ms is not None else None,
+            )
+            if data.get("clear"):
+                tracer.clear()
+            limit, min_ms = 0, 0.0
+        else:
+            limit = int(request.args.get("limit", "50"))
+            min_ms = float(request.args.get("min_ms", "0"))
+    except ValueError as e:
+        return jsonify({"error": "Invalid input", "message": str(e)}), HTTPStatus.BAD_REQUEST
+    return jsonify({
+        "sample_rate": tracer.sample_rate,
+        "min_duration_ms": tracer.min_duration * 1000,
+        "capacity": tracer.capacity,
+        **tracer.stats,
+        "traces": tracer.recent(limit, min_ms / 1000) if limit > 0 else [],
+    })
+
+@app.route("/api/admin/profile", methods=["GET", "POST", "DELETE"])
+@admin_required
+def admin_profile() -> Response:
+    """
+    Profileur par échantillonnage du worker : POST ouvre une fenêtre
+    (seconds, interval_ms, fraction des requêtes, all_threads), DELETE
+    l'arrête, GET rend les piles repliées de la dernière fenêtre (text/plain,
+    pour flamegraph.pl ou speedscope).
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = optional_float(data.get("seconds"), "seconds")
+            interval_ms = optional_float(data.get("interval_ms"), "interval_ms")
+            fraction = optional_float(data.get("fraction"), "fraction")
+            started = profiler.start(
+                duration=seconds if seconds is not None else 30.0,
+                interval=interval_ms / 1000 if interval_ms is not None else 0.01,
+                fraction=fraction if fraction is not None else 1.0,
+                all_threads=data.get("all_threads") is True,
+            )
+        except ValueError as e:
+            return jsonify({"error": "Invalid input", "message": str(e)}), HTTPStatus.BAD_REQUEST
+        if not started:
+            return jsonify({
+                "error": "Conflict",
+                "message": "Une fenêtre de profilage est déjà en cours",
+                **profiler.stats,
+            }), HTTPStatus.CONFLICT
+        return jsonify({"status": "started", **profiler.stats}), HTTPStatus.ACCEPTED
+    if request.method == "DELETE":
+        profiler.stop()
+        return jsonify({"status": "stopped", **profiler.stats})
+    response = Response(profiler.collapsed(), mimetype="text/plain")
+    response.headers["X-Profile-Running"] = "1" if profiler.running else "0"
+    response.headers["X-Profile-Samples"] = str(profiler.stats["samples"])
+    return response
+
+@app.route("/api/metrics")
+def metrics() -> Response:
+    """Expose les métriques au format texte Prometheus, agrégées sur tous les workers."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,252 @@
+"""
+Point d'entrée ASGI de l'application (mode de service asynchrone).
+
+/api/process_audio et /api/health sont servis par des vues asynchrones :
+pendant l'appel au modèle (API asynchrone du SDK), une requête n'occupe aucun
+thread, et un seul processus tient des centaines d'appels en cours. Les autres
+routes (page, fichiers statiques, flux SSE, lots, TTS…) restent les vues
+Flask, exécutées dans un groupe de threads borné (a2wsgi). La session vocale
+WebSocket n'est servie que par le déploiement WSGI (gunicorn).
+
+Les vues asynchrones s'exécutent dans le contexte de requête Flask :
+validation, session, contrôle d'admission, métriques et compression sont ceux
+des vues synchrones ; seule l'attente du modèle change.
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 2
+"""
+
+import asyncio
+import os
+import sys
+from http import HTTPStatus
+from io import BytesIO
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask, Response, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import app as app_module
+from app import (
+    attach_session_cookie, current_session_id, client_key, extract_question, health_check,
+    rejection, saturated_response, session_store, validate_json_input
+)
+from admission import Saturated
+from bible_chat import get_bible_response_async
+from citations import extract_citations
+from metrics import ERRORS, STAGE_SECONDS
+from verse_store import get_default_store
+
+logger = getLogger(__name__)
+
+AsyncView = Callable[[], Awaitable[Any]]
+
+# Threads des routes Flask déléguées (les vues asynchrones n'en utilisent pas)
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "16"))
+
+
+async def admitted(view: AsyncView) -> Any:
+    """
+    Contrôle d'admission d'une vue asynchrone, comme app.admission_control :
+    429 si le client a épuisé son débit, 503 si aucune place d'appel au
+    modèle ne se libère.
+    """
+    rate_limiter, inflight = app_module.rate_limiter, app_module.inflight
+    if rate_limiter is not None:
+        # Transaction SQLite partagée avec les autres workers (jusqu'à 1 s
+        # d'attente du verrou) : hors de la boucle d'événements
+        allowed, retry_after = await asyncio.to_thread(rate_limiter.acquire, client_key())
+        if not allowed:
+            return rejection(HTTPStatus.TOO_MANY_REQUESTS,
+                             "Trop de requêtes, veuillez patienter", retry_after)
+    if inflight is None:
+        return await view()
+
+    slot = inflight.try_acquire()
+    if slot is None:
+        # Attente dans la file : rare, et bornée par ADMISSION_QUEUE_*
+        try:
+            slot = await asyncio.to_thread(inflight.acquire)
+        except Saturated:
+            return saturated_response()
+    try:
+        return await view()
+    finally:
+        inflight.release(slot)
+
+
+async def answer_question_async(text: str, session_id: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Équivalent asynchrone de app.answer_question."""
+    async with session_store.session_async(session_id) as session:
+        turn = app_module.conversation_turn(session.history)
+        response = await get_bible_response_async(text, session.chat, session.history, use_cache=use_cache)
+    logger.info(f"Successfully processed request for text: {text[:50]}...")
+
+    with STAGE_SECONDS.time("citations"):
+        citations = extract_citations(response, get_default_store())
+    if app_module.traffic is not None:
+        app_module.capture_question(text, session_id, turn, response, use_cache)
+    return {
+        "response": response,
+        "citations": citations,
+        "session_id": session_id,
+        "success": True
+    }
+
+
+async def process_audio() -> Any:
+    """Vue asynchrone de POST /api/process_audio (mêmes réponses que app.process_audio)."""
+    # Le décorateur de validation appliqué à une vue vide : None si le corps est valide
+    invalid = validate_json_input(lambda: None)()
+    if invalid is not None:
+        return invalid
+    try:
+        data = request.get_json()
+        with STAGE_SECONDS.time("validation"):
+            text = extract_question(data)
+
+        session_id, set_cookie = current_session_id(data)
+        result = await answer_question_async(text, session_id, use_cache=data.get("cache", True) is not False)
+        with STAGE_SECONDS.time("serialization"):
+            result = jsonify(result)
+        if set_cookie:
+            attach_session_cookie(result, session_id)
+        return result, HTTPStatus.OK
+
+    except ValueError as ve:
+        logger.warning(f"Validation error: {str(ve)}")
+        return jsonify({
+            "error": "Invalid input",
+            "message": str(ve)
+        }), HTTPStatus.BAD_REQUEST
+
+    except Exception as e:
+        logger.error(f"Processing error: {str(e)}", exc_info=True)
+        ERRORS.inc("request", type(e).__name__)
+        return jsonify({
+            "error": "Internal Server Error",
+            "message": "Une erreur est survenue lors du traitement de votre demande"
+        }), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+async def health() -> Any:
+    """Vue asynchrone de GET /api/health : la sonde ne fait aucune entrée-sortie."""
+    return health_check()
+
+
+def wsgi_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """Environ WSGI d'une requête HTTP ASGI dont le corps a été lu."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "127.0.0.1",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_LENGTH":
+            continue  # d'après le corps lu
+        if key != "CONTENT_TYPE":
+            key = f"HTTP_{key}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncApp:
+    """
+    Application ASGI : vues asynchrones pour quelques routes, application
+    Flask (dans un groupe de threads borné) pour toutes les autres.
+
+    Attributes:
+        flask_app (Flask): Application Flask
+        views (Dict[Tuple[str, str], AsyncView]): Vues asynchrones par (méthode, chemin)
+        wsgi (WSGIMiddleware): Adaptateur des routes Flask
+    """
+
+    def __init__(self, flask_app: Flask, views: Dict[Tuple[str, str], AsyncView], threads: int = WSGI_THREADS):
+        self.flask_app = flask_app
+        self.views = views
+        self.wsgi = WSGIMiddleware(flask_app, workers=threads)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "http":
+            view = self.views.get((scope["method"], scope["path"]))
+            if view is None:
+                await self.wsgi(scope, receive, send)
+            else:
+                await self.serve(view, scope, receive, send)
+        elif scope["type"] == "websocket":
+            # Pas de session vocale en mode ASGI : refus (403), l'interface repasse en HTTP
+            await receive()
+            await send({"type": "websocket.close", "code": 1000})
+        elif scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+    async def serve(self, view: AsyncView, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        """Exécute une vue asynchrone dans un contexte de requête Flask."""
+        body = await self.read_body(receive)
+        environ = wsgi_environ(scope, body or b"")
+        with self.flask_app.request_context(environ):
+            try:
+                rv = self.flask_app.preprocess_request()
+                if rv is None:
+                    if body is None:
+                        raise RequestEntityTooLarge()
+                    rv = await admitted(view)
+            except Exception as e:
+                rv = self.flask_app.handle_user_exception(e)
+            # after_request : métriques, compression, cookies
+            response: Response = self.flask_app.finalize_request(rv)
+            payload = b"" if scope["method"] == "HEAD" else response.get_data()
+            headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                       for name, value in response.headers.to_wsgi_list()]
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def read_body(self, receive: Callable) -> Optional[bytes]:
+        """Corps de la requête ; None s'il dépasse MAX_CONTENT_LENGTH."""
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if limit is not None and size > limit:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+
+app = AsyncApp(app_module.app, {
+    ("POST", "/api/process_audio"): process_audio,
+    ("GET", "/api/health"): health,
+    ("HEAD", "/api/health"): health,
+})
@@ -0,0 +1,324 @@
+"""
+Fichiers statiques avec empreinte, minifiés et précompressés.
+
+`python assets.py build` minifie les feuilles de style et les scripts de
+static/, nomme chaque fichier d'après l'empreinte de son contenu
+(css/styles.3f2a9c1b7e4d.css) et écrit à côté ses variantes .gz et .br.
+Le manifeste static/build/manifest.json associe les noms d'origine aux
+noms avec empreinte : un même nom désigne toujours le même contenu, il peut
+donc être mis en cache sans limite (« immutable »).
+
+Sans manifeste (pas de build), les fichiers d'origine sont servis tels quels.
+Le module fournit aussi la compression des réponses de l'API selon
+Accept-Encoding. Le module brotli est facultatif : sans lui, seul gzip est
+utilisé.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip seulement
+    brotli = None
+
+logger = getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BUILD_DIR = "build"
+MANIFEST_NAME = "manifest.json"
+SOURCE_PATTERNS = {".css": "css", ".js": "js"}
+HASH_LENGTH = 12
+# Suffixe des variantes précompressées, par ordre de préférence
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+# Niveaux rapides pour les réponses de l'API, compressées à chaque requête
+RESPONSE_LEVELS = {"gzip": 6, "br": 4}
+
+
+def available_encodings() -> List[str]:
+    """Encodages que ce serveur sait produire, par ordre de préférence."""
+    return [name for name, _ in ENCODINGS if name != "br" or brotli is not None]
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compresse data ('gzip' ou 'br').
+
+    Sans niveau, la compression est maximale (fichiers construits une fois) ;
+    les réponses de l'API passent un niveau plus rapide.
+    """
+    if encoding == "gzip":
+        # mtime=0 : même contenu, mêmes octets (et même ETag) à chaque build
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=11 if level is None else level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate_encoding(accept_encodings, encodings: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Choisit l'encodage à utiliser d'après l'en-tête Accept-Encoding.
+
+    Args:
+        accept_encodings: request.accept_encodings (qualités par encodage)
+        encodings: Encodages proposés, par ordre de préférence
+
+    Returns:
+        Le premier encodage accepté avec la meilleure qualité, ou None
+    """
+    best, best_quality = None, 0.0
+    for encoding in available_encodings() if encodings is None else encodings:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+_CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_CSS_COMMENTS = re.compile(rf"({_CSS_STRING})|/\*.*?\*/", re.S)
+
+
+def minify_css(text: str) -> str:
+    """Retire commentaires et espaces superflus d'une feuille de style (chaînes intactes)."""
+    # Un commentaire disparaît, une chaîne est gardée telle quelle
+    text = _CSS_COMMENTS.sub(lambda match: match.group(1) or "", text)
+    parts = re.split(f"({_CSS_STRING})", text)
+    # Les indices impairs sont les chaînes capturées par le split
+    parts[::2] = [_squeeze_css(code) for code in parts[::2]]
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def _squeeze_css(code: str) -> str:
+    code = re.sub(r"\s+", " ", code)
+    # Pas autour de ':' : « a :hover » et « a:hover » sont deux sélecteurs différents
+    code = re.sub(r" ?([{};,>]) ?", r"\1", code)
+    return code.replace(": ", ":")
+
+
+_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def minify_js(text: str) -> str:
+    """
+    Minification prudente d'un script : commentaires, indentation et lignes
+    vides sont retirés, les fins de ligne gardées (insertion automatique des
+    points-virgules). Chaînes, gabarits et expressions régulières sont copiés
+    tels quels.
+    """
+    out: List[str] = []
+    code: List[str] = []  # code en cours, hors chaînes
+    i, n = 0, len(text)
+    last = ""  # dernier caractère significatif hors chaînes et commentaires
+
+    def flush():
+        # Espaces et lignes vides retirés du code seulement, jamais des chaînes
+        chunk = re.sub(r"[ \t]+", " ", "".join(code))
+        out.append(re.sub(r" ?\n\s*", "\n", chunk))
+        code.clear()
+
+    while i < n:
+        char = text[i]
+        if char in "'\"`":
+            end = _skip_string(text, i, char)
+            flush()
+            out.append(text[i:end])
+            i, last = end, char
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            code.append(" ")
+        elif char == "/" and (last == "" or last in _REGEX_PREFIX or _ends_with_keyword(code)):
+            end = _skip_regex(text, i)
+            flush()
+            out.append(text[i:end])
+            i, last = end, "/"
+        else:
+            code.append(char)
+            if not char.isspace():
+                last = char
+            i += 1
+    flush()
+    return "".join(out).strip() + "\n"
+
+
+def _skip_string(text: str, start: int, quote: str) -> int:
+    i = start + 1
+    depth = 0  # accolades ${ } ouvertes dans un gabarit
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if quote == "`" and text.startswith("${", i):
+            depth += 1
+            i += 2
+            continue
+        if depth and char == "}":
+            depth -= 1
+        elif depth and char in "'\"`":
+            i = _skip_string(text, i, char)
+            continue
+        elif not depth and char == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(text: str, start: int) -> int:
+    i, in_class = start + 1, False
+    while i < len(text) and text[i] != "\n":
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(text) and text[i].isalpha():  # drapeaux
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _ends_with_keyword(code: List[str]) -> bool:
+    tail = "".join(code[-8:]).rstrip()
+    return re.search(r"\b(return|typeof|case|do|else|in|of|yield|await)$", tail) is not None
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_dir: str = STATIC_DIR) -> Dict[str, Dict[str, int]]:
+    """
+    Construit static/build : fichiers minifiés avec empreinte, variantes
+    compressées et manifeste. Le dossier est reconstruit entièrement.
+
+    Returns:
+        Tailles par fichier d'origine (source, minifié, gzip, br)
+    """
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    staging = f"{build_dir}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest: Dict[str, str] = {}
+    sizes: Dict[str, Dict[str, int]] = {}
+
+    for subdir in sorted(set(SOURCE_PATTERNS.values())):
+        source_dir = os.path.join(static_dir, subdir)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext not in MINIFIERS:
+                continue
+            with open(os.path.join(source_dir, name), encoding="utf-8") as f:
+                source = f.read()
+            data = MINIFIERS[ext](source).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            hashed = f"{subdir}/{stem}.{digest}{ext}"
+            _write(os.path.join(staging, hashed), data)
+            logical = f"{subdir}/{name}"
+            manifest[logical] = f"{BUILD_DIR}/{hashed}"
+            sizes[logical] = {"source": len(source.encode("utf-8")), "minified": len(data)}
+            for encoding in available_encodings():
+                compressed = compress(data, encoding)
+                # Une variante plus grosse que l'original n'apporte rien
+                if len(compressed) < len(data):
+                    _write(os.path.join(staging, hashed + dict(ENCODINGS)[encoding]), compressed)
+                    sizes[logical][encoding] = len(compressed)
+
+    _write(os.path.join(staging, MANIFEST_NAME),
+           json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(staging, build_dir)
+    return sizes
+
+
+class AssetManifest:
+    """
+    Noms avec empreinte des fichiers statiques, relus quand le manifeste change.
+
+    Attributes:
+        static_dir (str): Dossier des fichiers statiques
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR):
+        self.static_dir = static_dir
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, str] = {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.static_dir, BUILD_DIR, MANIFEST_NAME)
+
+    def entries(self) -> Dict[str, str]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self._mtime, self._entries = None, {}
+            return self._entries
+        if mtime != self._mtime:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load asset manifest: {str(e)}")
+                self._entries = {}
+            self._mtime = mtime
+        return self._entries
+
+    def resolve(self, filename: str) -> str:
+        """Nom avec empreinte de filename (relatif à static/), ou filename sans build."""
+        return self.entries().get(filename, filename)
+
+
+def is_fingerprinted(filename: str) -> bool:
+    """Vrai pour un fichier produit par build_assets (static/build/…)."""
+    return filename.startswith(f"{BUILD_DIR}/") and not filename.endswith(MANIFEST_NAME)
+
+
+def fingerprint(filename: str) -> str:
+    """Empreinte contenue dans le nom d'un fichier construit."""
+    return os.path.splitext(os.path.basename(filename))[0].rsplit(".", 1)[-1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fichiers statiques avec empreinte et précompressés")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Construit static/build et son manifeste")
+    build.add_argument("--static-dir", default=STATIC_DIR)
+
+    args = parser.parse_args(argv)
+    sizes = build_assets(args.static_dir)
+    if brotli is None:
+        print("brotli absent : variantes .br non générées", file=sys.stderr)
+    for name, size in sizes.items():
+        variants = ", ".join(f"{encoding} {size[encoding]}" for encoding in ("gzip", "br") if encoding in size)
+        print(f"{name} : {size['source']} -> {size['minified']} octets ({variants})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+"""
+Réception de questions enregistrées : décodage, rééchantillonnage, détection
+de parole et transcription.
+
+L'audio téléversé est traité au fil de l'eau, morceau par morceau : il est
+décodé (WAV, PCM brut, ou Opus/WebM via ffmpeg), ramené en mono à 16 kHz,
+débarrassé de ses silences, puis transmis au moteur de reconnaissance vocale
+(ASR). Aucune étape ne conserve l'enregistrement complet : la mémoire utilisée
+ne dépend pas de la durée de l'enregistrement.
+
+Ce module importe NumPy ; app.py ne le charge qu'à la première requête audio.
+"""
+
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from collections import deque
+from logging import getLogger
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+logger = getLogger(__name__)
+
+TARGET_RATE = 16000
+
+_EMPTY = np.zeros(0, dtype=np.float32)
+
+
+class AudioError(ValueError):
+    """Audio illisible ou invalide."""
+
+
+class UnsupportedAudioError(AudioError):
+    """Format audio non pris en charge par ce serveur."""
+
+
+class Transcription(NamedTuple):
+    text: str
+    received_seconds: float
+    voiced_seconds: float
+
+
+class PCMDecoder:
+    """
+    Décodeur d'échantillons PCM entrelacés.
+
+    Les octets qui ne forment pas une trame complète sont gardés pour le
+    morceau suivant.
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1, sample_width: int = 2,
+                 big_endian: bool = False, is_float: bool = False):
+        if sample_rate <= 0 or not 1 <= channels <= 8:
+            raise AudioError("Format PCM invalide")
+        if is_float and sample_width != 4 or sample_width not in (1, 2, 3, 4):
+            raise UnsupportedAudioError(f"Taille d'échantillon non prise en charge : {sample_width}")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.big_endian = big_endian
+        self.is_float = is_float
+        self._frame_bytes = channels * sample_width
+        self._remainder = b""
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Décode un morceau ; retourne les échantillons mono en float32 dans [-1, 1]."""
+        data = self._remainder + data
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return _EMPTY
+        samples = self._to_float(data[:usable])
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        return samples
+
+    def finish(self) -> np.ndarray:
+        self._remainder = b""
+        return _EMPTY
+
+    def abort(self) -> None:
+        self._remainder = b""
+
+    def _to_float(self, data: bytes) -> np.ndarray:
+        order = ">" if self.big_endian else "<"
+        if self.is_float:
+            return np.frombuffer(data, dtype=f"{order}f4").astype(np.float32)
+        if self.sample_width == 1:
+            # PCM 8 bits : non signé
+            return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        if self.sample_width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            if self.big_endian:
+                raw = raw[:, ::-1]
+            values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            values = np.where(values >= 1 << 23, values - (1 << 24), values)
+            return values.astype(np.float32) / float(1 << 23)
+        dtype = np.dtype(f"{order}i{self.sample_width}")
+        return np.frombuffer(data, dtype=dtype).astype(np.float32) / float(1 << (8 * self.sample_width - 1))
+
+
+class WavDecoder:
+    """
+    Décodeur WAV incrémental.
+
+    L'en-tête est lu dès qu'il est complet ; les blocs autres que `fmt ` et
+    `data` sont ignorés. Les tailles déclarées ne sont pas vérifiées, pour
+    accepter les WAV écrits en flux (taille inconnue à l'écriture).
+    """
+
+    MAX_HEADER_BYTES = 64 * 1024
+
+    def __init__(self):
+        self._header = b""
+        self._pcm: Optional[PCMDecoder] = None
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self._pcm.sample_rate if self._pcm is not None else None
+
+    def feed(self, data: bytes) -> np.ndarray:
+        if self._pcm is not None:
+            return self._pcm.feed(data)
+        self._header += data
+        offset = self._parse_header()
+        if offset is None:
+            if len(self._header) > self.MAX_HEADER_BYTES:
+                raise AudioError("En-tête WAV introuvable")
+            return _EMPTY
+        data, self._header = self._header[offset:], b""
+        return self._pcm.feed(data)
+
+    def finish(self) -> np.ndarray:
+        if self._pcm is None:
+            raise AudioError("Fichier WAV incomplet")
+        return self._pcm.finish()
+
+    def abort(self) -> None:
+        self._header = b""
+
+    def _parse_header(self) -> Optional[int]:
+        """Retourne la position des données, ou None si l'en-tête est incomplet."""
+        header = self._header
+        if len(header) < 12:
+            return None
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise AudioError("Le contenu n'est pas un fichier WAV")
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(header):
+            chunk_id, size = struct.unpack_from("<4sI", header, offset)
+            body = offset + 8
+            if chunk_id == b"data":
+                if fmt is None:
+                    raise AudioError("Bloc de données WAV avant le bloc de format")
+                self._pcm = PCMDecoder(*fmt)
+                return body
+            if body + size > len(header):
+                return None
+            if chunk_id == b"fmt ":
+                fmt = self._parse_format(header[body:body + size])
+            offset = body + size + (size & 1)
+        return None
+
+    @staticmethod
+    def _parse_format(chunk: bytes):
+        if len(chunk) < 16:
+            raise AudioError("Bloc de format WAV invalide")
+        tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", chunk)
+        if tag == 0xFFFE and len(chunk) >= 26:
+            # WAVE_FORMAT_EXTENSIBLE : le vrai format est en tête du sous-format
+            tag = struct.unpack_from("<H", chunk, 24)[0]
+        if tag not in (1, 3):
+            raise UnsupportedAudioError(f"Codage WAV non pris en charge : {tag}")
+        return sample_rate, channels, bits // 8, False, tag == 3
+
+
+class FFmpegDecoder:
+    """
+    Décodage des formats compressés (Opus dans Ogg ou WebM, etc.) par ffmpeg.
+
+    ffmpeg reçoit l'audio sur son entrée standard et rend du PCM 16 kHz mono ;
+    un thread lit sa sortie pour qu'aucun des deux tubes ne se bloque.
+    """
+
+    sample_rate = TARGET_RATE
+
+    def __init__(self, binary: Optional[str] = None):
+        binary = binary or shutil.which("ffmpeg")
+        if not binary:
+            raise UnsupportedAudioError("Le décodage Opus/WebM nécessite ffmpeg sur le serveur")
+        self._process = subprocess.Popen(
+            [binary, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._output: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._pcm = PCMDecoder(TARGET_RATE)
+        threading.Thread(target=self._read_output, daemon=True).start()
+
+    def _read_output(self) -> None:
+        stdout = self._process.stdout
+        for chunk in iter(lambda: stdout.read(65536), b""):
+            self._output.put(chunk)
+        self._output.put(None)
+
+    def _drain(self, block: bool) -> np.ndarray:
+        parts = []
+        while True:
+            try:
+                chunk = self._output.get(block=block)
+            except queue.Empty:
+                break
+            if chunk is None:
+                break
+            parts.append(self._pcm.feed(chunk))
+        return np.concatenate(parts) if parts else _EMPTY
+
+    def feed(self, data: bytes) -> np.ndarray:
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            raise AudioError("ffmpeg n'a pas pu décoder l'audio")
+        return self._drain(block=False)
+
+    def finish(self) -> np.ndarray:
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        tail = self._drain(block=True)
+        if self._process.wait() != 0:
+            raise AudioError("ffmpeg n'a pas pu décoder l'audio")
+        return tail
+
+    def abort(self) -> None:
+        self._process.kill()
+        self._process.wait()
+
+
+def decoder_for(content_type: str):
+    """
+    Choisit le décodeur d'après l'en-tête Content-Type.
+
+    Formats reconnus : audio/wav, audio/pcm (s16le) et audio/L16 (s16be) avec
+    les paramètres `rate` et `channels`, audio/ogg, audio/opus et audio/webm.
+
+    Raises:
+        UnsupportedAudioError: Pour tout autre type
+    """
+    mimetype, _, raw_params = (content_type or "").partition(";")
+    mimetype = mimetype.strip().lower()
+    params = {}
+    for param in raw_params.split(";"):
+        name, _, value = param.partition("=")
+        if value:
+            params[name.strip().lower()] = value.strip().strip('"')
+
+    if mimetype in ("audio/wav", "audio/wave", "audio/x-wav", "audio/vnd.wave"):
+        return WavDecoder()
+    if mimetype in ("audio/pcm", "audio/l16"):
+        try:
+            rate = int(params.get("rate", TARGET_RATE))
+            channels = int(params.get("channels", 1))
+        except ValueError:
+            raise AudioError("Paramètres PCM invalides")
+        return PCMDecoder(rate, channels, big_endian=mimetype == "audio/l16")
+    if mimetype in ("audio/ogg", "audio/opus", "audio/webm", "video/webm"):
+        return FFmpegDecoder()
+    raise UnsupportedAudioError(f"Type audio non pris en charge : {mimetype or 'inconnu'}")
+
+
+class Resampler:
+    """
+    Rééchantillonnage en flux vers 16 kHz.
+
+    Une moyenne glissante de la largeur du rapport de fréquences sert de
+    filtre anti-repliement, puis les échantillons sont interpolés
+    linéairement. L'état conservé entre deux morceaux (fin du filtre, dernier
+    échantillon, phase) rend le résultat indépendant du découpage du flux.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int = TARGET_RATE):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        self.width = max(1, int(self.step))
+        self._history = _EMPTY
+        self._last: Optional[np.ndarray] = None
+        self._position = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.source_rate == self.target_rate or not len(samples):
+            return samples
+        if self.width > 1:
+            padded = np.concatenate((self._history, samples))
+            if len(padded) < self.width:
+                self._history = padded
+                return _EMPTY
+            sums = np.concatenate(([0.0], np.cumsum(padded, dtype=np.float64)))
+            filtered = (sums[self.width:] - sums[:-self.width]) / self.width
+            self._history = padded[len(padded) - self.width + 1:]
+        else:
+            filtered = samples
+        buffer = filtered if self._last is None else np.concatenate((self._last, filtered))
+        last = len(buffer) - 1
+        count = int((last - self._position) // self.step) + 1 if self._position <= last else 0
+        positions = self._position + self.step * np.arange(count)
+        output = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        self._position += count * self.step - last
+        self._last = buffer[-1:]
+        return output
+
+
+class EnergyVAD:
+    """
+    Détection d'activité vocale par l'énergie des trames.
+
+    Une trame (30 ms par défaut) est parlée si son énergie dépasse
+    `threshold_db` (dBFS). Chaque passage parlé est gardé avec `padding_ms`
+    de marge avant et après ; le reste du silence est supprimé, y compris les
+    longues pauses au milieu de l'enregistrement.
+    """
+
+    def __init__(self, sample_rate: int = TARGET_RATE, frame_ms: int = 30,
+                 threshold_db: float = -40.0, padding_ms: int = 300):
+        self.frame = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.padding = max(1, padding_ms // frame_ms)
+        self._remainder = _EMPTY
+        self._preroll: deque = deque(maxlen=self.padding)
+        self._hangover = 0
+
+    @classmethod
+    def from_env(cls) -> "EnergyVAD":
+        return cls(
+            threshold_db=float(os.getenv("VAD_THRESHOLD_DB", "-40")),
+            padding_ms=int(os.getenv("VAD_PADDING_MS", "300")),
+        )
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Retourne les échantillons à garder parmi ceux reçus."""
+        buffer = np.concatenate((self._remainder, samples)) if len(self._remainder) else samples
+        count = len(buffer) // self.frame
+        self._remainder = buffer[count * self.frame:]
+        if not count:
+            return _EMPTY
+        frames = buffer[:count * self.frame].reshape(count, self.frame)
+        energy = 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-12)
+
+        kept = []
+        for frame, voiced in zip(frames, energy > self.threshold_db):
+            if voiced:
+                kept.extend(self._preroll)
+                self._preroll.clear()
+                kept.append(frame)
+                self._hangover = self.padding
+            elif self._hangover:
+                kept.append(frame)
+                self._hangover -= 1
+            else:
+                self._preroll.append(frame)
+        return np.concatenate(kept) if kept else _EMPTY
+
+
+class ASRBackend:
+    """
+    Moteur de reconnaissance vocale.
+
+    Reçoit l'audio parlé en morceaux (float32 mono, 16 kHz) au fur et à mesure
+    du téléversement et retourne la transcription.
+    """
+
+    name = "asr"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def transcribe(self, audio: Iterator[np.ndarray], sample_rate: int) -> str:
+        raise NotImplementedError
+
+
+class FakeASR(ASRBackend):
+    """
+    Moteur de substitution pour les tests et les tests de charge.
+
+    Consomme l'audio sans le garder et retourne une transcription fixe, ou
+    une chaîne vide si aucune parole n'a été reçue.
+    """
+
+    name = "fake"
+
+    def __init__(self, transcript: str = "Que dit la Bible sur la foi ?"):
+        self.transcript = transcript
+        self.calls = 0
+        self.last_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "FakeASR":
+        return cls(os.getenv("ASR_FAKE_TEXT", "Que dit la Bible sur la foi ?"))
+
+    def transcribe(self, audio: Iterator[np.ndarray], sample_rate: int) -> str:
+        samples = sum(len(chunk) for chunk in audio)
+        self.calls += 1
+        self.last_seconds = samples / sample_rate
+        return self.transcript if samples else ""
+
+
+class UnavailableASR(ASRBackend):
+    """Aucun moteur configuré : la route audio répond 503."""
+
+    name = "none"
+
+    @property
+    def available(self) -> bool:
+        return False
+
+    def transcribe(self, audio: Iterator[np.ndarray], sample_rate: int) -> str:
+        raise RuntimeError("Aucun moteur de reconnaissance vocale n'est configuré")
+
+
+_BACKENDS: Dict[str, Callable[[], ASRBackend]] = {"fake": FakeASR.from_env, "none": UnavailableASR}
+
+
+def register_backend(name: str, factory: Callable[[], ASRBackend]) -> None:
+    """Déclare un moteur utilisable via ASR_BACKEND."""
+    _BACKENDS[name] = factory
+
+
+def asr_from_env() -> ASRBackend:
+    """Crée le moteur configuré par ASR_BACKEND (none par défaut)."""
+    name = os.getenv("ASR_BACKEND", "none")
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown ASR backend: {name}")
+    return _BACKENDS[name]()
+
+
+def transcribe_upload(chunks: Iterable[bytes], content_type: str, asr: ASRBackend,
+                      vad: Optional[EnergyVAD] = None) -> Transcription:
+    """
+    Transcrit un enregistrement reçu en morceaux.
+
+    Args:
+        chunks: Morceaux du corps de la requête, dans l'ordre
+        content_type: En-tête Content-Type de la requête
+        asr: Moteur de reconnaissance vocale
+        vad: Détecteur de parole (celui de l'environnement par défaut)
+
+    Raises:
+        UnsupportedAudioError: Si le format n'est pas pris en charge
+        AudioError: Si l'audio est illisible
+    """
+    decoder = decoder_for(content_type)
+    vad = vad or EnergyVAD.from_env()
+    state = {"received": 0.0, "voiced": 0, "finished": False}
+    resampler: Optional[Resampler] = None
+
+    def keep_speech(samples: np.ndarray) -> np.ndarray:
+        nonlocal resampler
+        if resampler is None:
+            resampler = Resampler(decoder.sample_rate)
+        state["received"] += len(samples) / decoder.sample_rate
+        speech = vad.process(resampler.process(samples))
+        state["voiced"] += len(speech)
+        return speech
+
+    def voiced_audio() -> Iterator[np.ndarray]:
+        for chunk in chunks:
+            samples = decoder.feed(chunk)
+            speech = keep_speech(samples) if len(samples) else _EMPTY
+            if len(speech):
+                yield speech
+        tail = decoder.finish()
+        state["finished"] = True
+        speech = keep_speech(tail) if len(tail) else _EMPTY
+        if len(speech):
+            yield speech
+
+    audio = voiced_audio()
+    try:
+        text = asr.transcribe(audio, TARGET_RATE)
+    finally:
+        audio.close()
+        if not state["finished"]:
+            decoder.abort()
+    return Transcription(text.strip(), state["received"], state["voiced"] / TARGET_RATE)
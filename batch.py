@@ -0,0 +1,112 @@
+"""
+Traitement de lots de questions en parallèle.
+
+Chaque lot a son propre groupe de threads, dimensionné par la concurrence
+demandée ; un sémaphore commun à tout le processus borne en plus le nombre de
+questions traitées simultanément par l'ensemble des lots, pour rester dans le
+quota de l'API amont. Les résultats sont rendus dans l'ordre où ils se
+terminent, et l'échec d'une question n'interrompt pas les autres.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from metrics import BATCH_ITEMS, ERRORS
+from tracing import in_context
+
+logger = getLogger(__name__)
+
+
+class BatchRunner:
+    """
+    Exécute une fonction sur chaque élément d'un lot, en parallèle borné.
+
+    Attributes:
+        max_concurrency (int): Questions traitées simultanément, tous lots confondus
+        max_items (int): Taille maximale d'un lot
+        stats (Dict[str, int]): Compteurs des lots et des éléments
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_items: int = 500):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_items = max_items
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"batches": 0, "items": 0, "errors": 0, "active": 0}
+
+    @classmethod
+    def from_env(cls) -> "BatchRunner":
+        """Crée le gestionnaire configuré par BATCH_MAX_CONCURRENCY et BATCH_MAX_ITEMS."""
+        return cls(
+            max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "4")),
+            max_items=int(os.getenv("BATCH_MAX_ITEMS", "500")),
+        )
+
+    def validate(self, items: Any, concurrency: Any = None) -> int:
+        """
+        Vérifie la forme du lot et retourne la concurrence effective.
+
+        Raises:
+            ValueError: Si le lot n'est pas une liste non vide de taille
+                acceptable, ou si la concurrence n'est pas un entier positif
+        """
+        if not isinstance(items, list) or not items:
+            raise ValueError("Le champ 'questions' doit être une liste non vide")
+        if len(items) > self.max_items:
+            raise ValueError(f"Un lot est limité à {self.max_items} questions")
+        if concurrency is None:
+            return min(self.max_concurrency, len(items))
+        if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError("Le champ 'concurrency' doit être un entier positif")
+        return min(concurrency, self.max_concurrency, len(items))
+
+    def run(self, items: List[Any], fn: Callable[[Any], Dict[str, Any]],
+            concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Traite le lot et produit un résultat par élément, dans l'ordre de fin.
+
+        Chaque résultat contient `index` (position dans le lot), `duration_ms`
+        et `success`, plus le dictionnaire retourné par fn, ou `error` et
+        `message` si fn a levé une exception. Si le générateur est abandonné
+        (client déconnecté), les éléments non commencés sont annulés.
+        """
+        workers = self.validate(items, concurrency)
+        with self._lock:
+            self.stats["batches"] += 1
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        try:
+            pending = {executor.submit(in_context(self._run_item), index, item, fn)
+                       for index, item in enumerate(items)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_item(self, index: int, item: Any, fn: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._slots:
+            with self._lock:
+                self.stats["active"] += 1
+            start = time.perf_counter()
+            try:
+                result = {"index": index, **fn(item), "success": True}
+                BATCH_ITEMS.inc("ok")
+            except Exception as e:
+                logger.warning(f"Batch item {index} failed: {str(e)}")
+                ERRORS.inc("batch", type(e).__name__)
+                BATCH_ITEMS.inc("error")
+                with self._lock:
+                    self.stats["errors"] += 1
+                result = {"index": index, "error": type(e).__name__, "message": str(e), "success": False}
+            finally:
+                with self._lock:
+                    self.stats["active"] -= 1
+                    self.stats["items"] += 1
+            result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return result
+
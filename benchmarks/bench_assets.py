@@ -0,0 +1,67 @@
+"""
+Benchmark des fichiers statiques et de la compression de l'API.
+
+Construit les fichiers avec empreinte dans un dossier temporaire, puis
+compare les octets transférés pour une première visite (fichiers d'origine,
+minifiés, précompressés) et le coût de la compression d'une réponse JSON
+de taille typique (réponse avec citations).
+
+Usage:
+    python -m benchmarks.bench_assets [--json-size 8000] [--repeat 2000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assets import RESPONSE_LEVELS, STATIC_DIR, available_encodings, build_assets, compress  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Octets transférés et coût de la compression")
+    parser.add_argument("--json-size", type=int, default=8000, help="taille de la réponse JSON, en octets")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        static_dir = os.path.join(tmpdir, "static")
+        shutil.copytree(STATIC_DIR, static_dir, ignore=shutil.ignore_patterns("build"))
+        start = time.perf_counter()
+        sizes = build_assets(static_dir)
+        elapsed = time.perf_counter() - start
+
+    print(f"build : {len(sizes)} fichiers en {elapsed * 1000:.0f} ms")
+    columns = ["source", "minified"] + [e for e in ("gzip", "br") if e in available_encodings()]
+    totals = {column: sum(size.get(column, size["minified"]) for size in sizes.values()) for column in columns}
+    for column in columns:
+        print(f"première visite ({column:8}) : {totals[column]:7d} octets "
+              f"({100 * totals[column] / totals['source']:5.1f} %)")
+
+    words = "car Dieu a tant aimé le monde qu'il a donné son Fils unique afin que quiconque croit".split()
+    citations = []
+    while len(json.dumps(citations)) < args.json_size:
+        i = len(citations)
+        text = " ".join(words[(i * 7 + k * 3) % len(words)] for k in range(12))
+        citations.append({"reference": f"Psaumes {i + 1}:{i % 9 + 1}", "text": f"{text} ({i})."})
+    body = json.dumps({"response": " ".join(c["text"] for c in citations[:10]), "citations": citations},
+                      ensure_ascii=False).encode()
+    for encoding, level in RESPONSE_LEVELS.items():
+        if encoding not in available_encodings():
+            continue
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            compressed = compress(body, encoding, level)
+        per_call = (time.perf_counter() - start) / args.repeat
+        print(f"JSON {len(body)} octets, {encoding} : {len(compressed)} octets, "
+              f"{per_call * 1e6:.0f} µs par réponse")
+
+
+if __name__ == "__main__":
+    main()
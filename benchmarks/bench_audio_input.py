@@ -0,0 +1,68 @@
+"""
+Benchmark de la réception audio (/api/process_audio/upload).
+
+Transcrit des enregistrements WAV synthétiques (48 kHz stéréo, alternance de
+parole et de silence) de durées croissantes, générés et lus par morceaux de
+64 Ko comme le fait la route. Affiche la vitesse de traitement (multiple du
+temps réel), la part de l'audio retirée avant l'ASR et le pic de mémoire
+alloué, qui doit rester le même quelle que soit la durée.
+
+Usage:
+    python -m benchmarks.bench_audio_input [--minutes 1 5 20]
+"""
+
+import argparse
+import struct
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_input import FakeASR, transcribe_upload  # noqa: E402
+
+RATE = 48000
+CHANNELS = 2
+CHUNK_BYTES = 64 * 1024
+
+
+def recording(seconds):
+    """Flux WAV : 2 s de parole (un son) puis 3 s de silence, en boucle."""
+    data_size = int(seconds * RATE) * CHANNELS * 2
+    yield struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, 1,
+                      CHANNELS, RATE, RATE * CHANNELS * 2, CHANNELS * 2, 16, b"data", data_size)
+    t = np.arange(5 * RATE) / RATE
+    cycle = np.where(t < 2, 0.4 * np.sin(2 * np.pi * 220 * t), 0.001 * np.sin(2 * np.pi * 50 * t))
+    cycle = (np.repeat(cycle, CHANNELS) * 32767).astype("<i2").tobytes()
+    remaining, buffer = data_size, b""
+    while remaining:
+        while len(buffer) < CHUNK_BYTES:
+            buffer += cycle
+        size = min(CHUNK_BYTES, remaining)
+        yield buffer[:size]
+        buffer, remaining = buffer[size:], remaining - size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vitesse et mémoire de la réception audio")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+
+    for minutes in args.minutes:
+        seconds = minutes * 60
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = transcribe_upload(recording(seconds), "audio/wav", FakeASR())
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{minutes:5.1f} min : {seconds / elapsed:6.0f}x temps réel, "
+              f"{100 * (1 - result.voiced_seconds / result.received_seconds):4.1f} % retiré avant l'ASR, "
+              f"pic mémoire {peak / 1024:7.0f} Ko")
+
+
+if __name__ == "__main__":
+    main()
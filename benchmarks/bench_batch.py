@@ -0,0 +1,58 @@
+"""
+Benchmark de /api/process_batch.
+
+Compare, sur le modèle local (GEMINI_FAKE=1, latence fixe par appel), l'envoi
+des questions une à une à /api/process_audio et leur envoi en un lot avec
+différents niveaux de concurrence.
+
+Usage:
+    python -m benchmarks.bench_batch [--questions 40] [--latency 0.2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Questions une à une contre un lot parallèle")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="latence du modèle local, en s")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    os.environ.update({
+        "GEMINI_FAKE": "1",
+        "GEMINI_FAKE_LATENCY": f"const:{args.latency}",
+        "SESSION_BACKEND": "none",
+        "ANSWER_CACHE_ENABLED": "0",
+        "BATCH_MAX_CONCURRENCY": str(max(args.concurrency)),
+    })
+    from app import app  # noqa: E402
+
+    client = app.test_client()
+    questions = [f"Que dit la Bible sur le sujet numéro {i} ?" for i in range(args.questions)]
+
+    start = time.perf_counter()
+    for question in questions:
+        assert client.post("/api/process_audio", json={"text": question, "cache": False}).status_code == 200
+    sequential = time.perf_counter() - start
+    print(f"une à une      : {sequential:6.2f} s")
+
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        response = client.post("/api/process_batch", json={
+            "questions": questions, "concurrency": concurrency, "cache": False})
+        summary = json.loads(response.get_data(as_text=True).splitlines()[-1])["summary"]
+        elapsed = time.perf_counter() - start
+        print(f"lot (c={concurrency:<3})    : {elapsed:6.2f} s  "
+              f"({sequential / elapsed:4.1f}x, {summary['failed']} échecs)")
+
+
+if __name__ == "__main__":
+    main()
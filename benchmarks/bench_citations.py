@@ -0,0 +1,69 @@
+"""
+Benchmark de l'extraction des citations bibliques.
+
+Mesure le débit de extract_citations sur un corpus de réponses : soit des
+réponses enregistrées (un fichier JSONL avec un champ « response » par ligne),
+soit un corpus synthétique de réponses de longueur réaliste.
+
+Usage:
+    python -m benchmarks.bench_citations [--corpus answers.jsonl] [--answers 20000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bible_refs import BOOKS, Reference  # noqa: E402
+from citations import extract_citations  # noqa: E402
+
+PROSE = (
+    "La grâce de Dieu nous est offerte gratuitement, non à cause de nos œuvres "
+    "mais par la foi. Ce passage nous rappelle que le pardon reçu nous appelle "
+    "à pardonner à notre tour, dans la vie de tous les jours, en 2 ou 3 gestes simples. "
+)
+
+
+def synthetic_corpus(count: int) -> list:
+    """Réponses d'environ 1500 caractères citant 2 à 5 références."""
+    rng = random.Random(0)
+    answers = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(2, 5)):
+            book = rng.choice(BOOKS)
+            ref = Reference(book, rng.randint(1, book.chapters), rng.randint(1, 30))
+            parts.append(PROSE * 2 + f"({ref.label()}) ")
+        answers.append("".join(parts)[:1500])
+    return answers
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["response"] for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="Réponses enregistrées (JSONL, champ 'response')")
+    parser.add_argument("--answers", type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.answers)
+    total_chars = sum(len(answer) for answer in corpus)
+
+    start = time.perf_counter()
+    found = sum(len(extract_citations(answer)) for answer in corpus)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(corpus)} réponses, {total_chars / 1e6:.1f} M caractères, {found} citations")
+    print(f"{elapsed / len(corpus) * 1e6:.1f} µs par réponse, "
+          f"{len(corpus) / elapsed:.0f} réponses/s, {total_chars / elapsed / 1e6:.1f} M car./s")
+
+
+if __name__ == "__main__":
+    main()
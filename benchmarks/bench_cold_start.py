@@ -0,0 +1,89 @@
+"""
+Benchmark du démarrage à froid du point d'entrée Vercel (api/index.py).
+
+Importe le point d'entrée dans un interpréteur neuf avec `-X importtime`,
+puis affiche le temps d'import total et les modules les plus coûteux. Avec
+`--budget-ms`, le script échoue si le temps d'import dépasse le budget.
+
+Usage:
+    python -m benchmarks.bench_cold_start [--runs 5] [--budget-ms 600]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Modules lourds qui ne doivent pas être importés au démarrage
+HEAVY_MODULES = ("google.generativeai", "grpc", "google.protobuf", "numpy")
+
+
+def import_times(code: str = "import index", env: Dict[str, str] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    Importe dans un interpréteur neuf et relève les temps d'import.
+
+    Args:
+        code: Code Python exécuté (depuis le dossier api/)
+        env: Variables d'environnement ajoutées
+
+    Returns:
+        Dictionnaire module -> (temps propre, temps cumulé) en microsecondes
+    """
+    environment = {**os.environ, **(env or {})}
+    environment["PYTHONPATH"] = os.pathsep.join([str(ROOT / "api"), str(ROOT)])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(ROOT), env=environment, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def total_ms(times: Dict[str, Tuple[int, int]]) -> float:
+    """Temps d'import total (modules de premier niveau), en millisecondes."""
+    return sum(self_us for self_us, _ in times.values()) / 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Démarrage à froid de api/index.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # Sans clé d'API : le démarrage ne doit ni échouer ni charger le SDK
+    env = {"GEMINI_API_KEY": "", "SESSION_BACKEND": "none"}
+    runs = [import_times(env=env) for _ in range(args.runs)]
+    totals = [total_ms(times) for times in runs]
+    median = statistics.median(totals)
+    last = runs[-1]
+
+    print(f"import api/index.py : médiane {median:.1f} ms sur {args.runs} essais "
+          f"(min {min(totals):.1f}, max {max(totals):.1f})")
+    print("modules les plus coûteux (temps cumulé) :")
+    for name, (_, cumulative) in sorted(last.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    heavy = [name for name in last if name.startswith(HEAVY_MODULES)]
+    if heavy:
+        print(f"modules lourds importés au démarrage : {', '.join(sorted(heavy)[:5])}")
+        return 1
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"budget dépassé : {median:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
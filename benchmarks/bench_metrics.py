@@ -0,0 +1,63 @@
+"""
+Benchmark du coût d'enregistrement des métriques.
+
+Mesure le temps d'un incrément de compteur et d'une observation
+d'histogramme, avec 1 puis 8 threads enregistrant en parallèle, et le temps
+de rendu de /api/metrics.
+
+Usage:
+    python -m benchmarks.bench_metrics [--operations 200000]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import Registry  # noqa: E402
+
+STAGES = ("validation", "prompt", "upstream", "citations", "serialization")
+
+
+def record(registry_metrics, operations):
+    requests, latency = registry_metrics
+    for i in range(operations):
+        requests.inc("/api/process_audio", "POST", "200")
+        latency.observe(i % 1000 / 1000, STAGES[i % 5])
+
+
+def run(threads, operations):
+    registry = Registry()
+    metrics = (
+        registry.counter("b_requests_total", "Requêtes", ("endpoint", "method", "status")),
+        registry.histogram("b_stage_seconds", "Étapes", ("stage",)),
+    )
+    pool = [threading.Thread(target=record, args=(metrics, operations)) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    render_start = time.perf_counter()
+    registry.render()
+    render = time.perf_counter() - render_start
+    # Deux enregistrements (compteur + histogramme) par itération
+    return elapsed / (threads * operations * 2) * 1e9, render * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût d'enregistrement des métriques")
+    parser.add_argument("--operations", type=int, default=200000)
+    args = parser.parse_args()
+    for threads in (1, 8):
+        per_op, render = run(threads, args.operations)
+        print(f"{threads} thread(s) : {per_op:6.0f} ns par enregistrement, rendu {render:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Taille des prompts envoyés au modèle, avant et après le PromptBuilder.
+
+Rejoue une conversation de plusieurs tours contre le modèle de substitution
+local (fake_gemini) et compte les tokens de chaque requête :
+
+- avant : transcription recollée à chaque tour (contexte système compris)
+  et envoyée dans un chat qui conserve aussi sa propre copie de l'historique ;
+- après : get_bible_response, avec instruction système unique, échanges
+  récents et résumé glissant dans le budget configuré.
+
+Usage:
+    python -m benchmarks.bench_prompt_tokens [--turns 20] [--budget 3000]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+ANSWER = ("La Bible enseigne que la grâce de Dieu est offerte à tous (Éphésiens 2:8-9). "
+          "Elle n'est pas méritée mais reçue par la foi. ") * 8
+
+
+def legacy_turn(chat, messages, user_input):
+    """Reproduit l'ancienne construction du prompt (transcription complète)."""
+    messages.append({"role": "user", "content": user_input})
+    context_window = messages[-5:]
+    context_prompt = "\n".join([
+        f"{'Assistant' if msg['role'] == 'system' else msg['role'].capitalize()}: {msg['content']}"
+        for msg in context_window[:-1]
+    ])
+    response = chat.send_message(f"{context_prompt}\n\nUser: {user_input}")
+    messages.append({"role": "assistant", "content": response.text})
+    messages[:] = messages[-10:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=3000)
+    args = parser.parse_args()
+    os.environ["PROMPT_TOKEN_BUDGET"] = str(args.budget)
+
+    import bible_chat
+    from fake_gemini import FakeGenerativeModel
+
+    bible_chat.answer_cache.enabled = False
+    questions = [f"Question {i} : que dit la Bible sur la grâce et le pardon au quotidien ?"
+                 for i in range(args.turns)]
+
+    before = FakeGenerativeModel(answer=lambda q: ANSWER)
+    chat = before.start_chat()
+    messages = [{"role": "system", "content": bible_chat.SYSTEM_CONTEXT}]
+    for question in questions:
+        legacy_turn(chat, messages, question)
+
+    after = FakeGenerativeModel(answer=lambda q: ANSWER)
+    chat = after.start_chat()
+    history = bible_chat.ConversationHistory()
+    history.add_message("system", bible_chat.SYSTEM_CONTEXT)
+    for question in questions:
+        bible_chat.get_bible_response(question, chat, history)
+
+    print(f"{'tour':>4} {'avant':>8} {'après':>8}")
+    for turn, (old, new) in enumerate(zip(before.prompt_tokens, after.prompt_tokens), 1):
+        print(f"{turn:>4} {old:>8} {new:>8}")
+    total_before, total_after = sum(before.prompt_tokens), sum(after.prompt_tokens)
+    print(f"total {total_before:>7} {total_after:>8}  "
+          f"(-{100 * (1 - total_after / total_before):.0f} %)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de la recherche BM25 des passages.
+
+Construit un index des versets puis l'index BM25 à l'échelle d'une Bible
+complète (66 livres, ~31 000 versets ; vocabulaire synthétique de fréquence
+zipfienne, ou texte réel avec --source) et mesure la latence des recherches
+et de l'ajout des passages à la question.
+
+Usage:
+    python -m benchmarks.bench_retrieval [--source bible.tsv] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bible_refs import BOOKS  # noqa: E402
+from retrieval import PassageIndex, build_index, ground_question  # noqa: E402
+from verse_store import VerseStore  # noqa: E402
+from verse_store import build_index as build_store  # noqa: E402
+
+VERSES_PER_CHAPTER = 26
+VOCABULARY = 15000
+SYLLABLES = "ba be bi bo da de di do fa fe la le li lo ma me mi mo na ne ni pa pe po ra re ri ro sa se si so ta te ti to va ve".split()
+
+
+def synthetic_words(rng: random.Random):
+    """Vocabulaire synthétique et poids zipfiens (le rang r a le poids 1/r)."""
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words, [1 / rank for rank in range(1, len(words) + 1)]
+
+
+def write_synthetic_source(path: str, words, weights, rng: random.Random) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for book in BOOKS:
+            for chapter in range(1, book.chapters + 1):
+                for verse in range(1, VERSES_PER_CHAPTER + 1):
+                    text = " ".join(rng.choices(words, weights, k=22))
+                    f.write(f"{book.osis}\t{chapter}\t{verse}\t{text}.\n")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", help="Texte TSV réel (par défaut : texte synthétique)")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words, weights = synthetic_words(rng)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = args.source or os.path.join(tmpdir, "bible.tsv")
+        if not args.source:
+            write_synthetic_source(source, words, weights, rng)
+        build_store(source, os.path.join(tmpdir, "bible.idx"))
+        store = VerseStore(os.path.join(tmpdir, "bible.idx"))
+
+        start = time.perf_counter()
+        stats = build_index(store, os.path.join(tmpdir, "bm25"))
+        print(f"build: {stats['docs']} versets, {stats['terms']} termes, {stats['postings']} postings, "
+              f"{stats['bytes'] / 1e6:.1f} Mo, {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        index = PassageIndex(os.path.join(tmpdir, "bm25"), store)
+        print(f"open: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        if args.source:
+            with open(source, encoding="utf-8") as f:
+                words = [word for line in f for word in line.rstrip("\n").split("\t")[-1].split()]
+            weights = None
+        # Questions de 3 à 8 mots, mots fréquents compris (les plus coûteux)
+        questions = [" ".join(rng.choices(words, weights, k=rng.randint(3, 8))) for _ in range(args.queries)]
+        for label, fn in (("search", lambda q: index.search(q, args.k)),
+                          ("ground_question", lambda q: ground_question(q, index=index))):
+            latencies = []
+            for question in questions:
+                start = time.perf_counter()
+                fn(question)
+                latencies.append((time.perf_counter() - start) * 1000)
+            print(f"{label:<16} p50 {statistics.median(latencies):6.2f} ms, "
+                  f"p99 {percentile(latencies, 99):6.2f} ms, max {max(latencies):6.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark du routeur de modèles.
+
+Envoie un mélange de questions courtes et factuelles et de questions
+explicatives à get_bible_response, sur deux modèles locaux de latences
+différentes : modèle principal seul, routage par question, puis routage avec
+un modèle principal ralenti (repli sur le modèle rapide au-delà de
+--large-p95). Affiche les latences p50/p95 par type de question, la part des
+questions confiées au modèle rapide, et le coût du classifieur.
+
+Usage:
+    python -m benchmarks.bench_router [--questions 400] [--large lognormal:0.4,0.3] \\
+        [--fast lognormal:0.1,0.3]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SESSION_BACKEND", "none")
+
+import bible_chat  # noqa: E402
+from fake_gemini import FakeGenerativeModel, LatencyDistribution  # noqa: E402
+from model_router import ModelRouter  # noqa: E402
+
+FACTUAL = [
+    "Qui a écrit l'épître aux Romains ?",
+    "Combien de livres compte la Bible ?",
+    "Quand David est-il devenu roi ?",
+    "Où Jésus est-il né ?",
+    "Quel est le premier livre de la Bible ?",
+    "Qui était le père de Salomon ?",
+    "Dans quel livre trouve-t-on le bon Samaritain ?",
+    "Quelle est la ville natale de Paul ?",
+]
+COMPLEX = [
+    "Pourquoi Dieu permet-il la souffrance des innocents ?",
+    "Comment concilier la grâce et les œuvres dans la vie chrétienne ?",
+    "Que signifie être né de nouveau selon l'évangile de Jean ?",
+    "Quelle est la différence entre la loi et la grâce chez Paul ?",
+    "Comment prier quand on traverse le deuil ?",
+    "Explique le sens des paraboles du royaume dans Matthieu.",
+    "Pourquoi Jésus parlait-il en paraboles à la foule ?",
+    "Comment comprendre l'Apocalypse aujourd'hui ?",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def run(name, args, large_latency, routed):
+    large = FakeGenerativeModel(answer=lambda q: "Réponse développée (Jean 3:16).",
+                                first_chunk_latency=LatencyDistribution.parse(large_latency), seed=1)
+    fast = FakeGenerativeModel(answer=lambda q: "Réponse brève (Jean 3:16).",
+                               first_chunk_latency=LatencyDistribution.parse(args.fast), seed=2)
+    models = {"large": "principal", "fast": "rapide"} if routed else {"large": "principal"}
+    router = ModelRouter(models, factory=lambda name: fast, large_p95=args.large_p95, min_samples=20)
+    questions = [(kind, text) for kind, texts in (("factuelles", FACTUAL), ("explicatives", COMPLEX))
+                 for text in texts]
+
+    def ask(i):
+        kind, text = questions[i % len(questions)]
+        start = time.perf_counter()
+        bible_chat.get_bible_response(text, large.start_chat(), bible_chat.ConversationHistory())
+        return kind, time.perf_counter() - start
+
+    # Sans clé de prompt : ni cache ni regroupement des questions identiques
+    with patch.object(bible_chat, "router", router), patch.object(bible_chat, "_prompt_key", lambda h, q: None), \
+            patch.object(bible_chat.upstream, "hedge_percentile", 0):
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(ask, range(args.questions)))
+
+    by_kind = {}
+    for kind, seconds in results:
+        by_kind.setdefault(kind, []).append(seconds * 1000)
+    every = [ms for values in by_kind.values() for ms in values]
+    line = f"{name:26} : p50 {statistics.median(every):5.0f} ms, p95 {percentile(every, 95):5.0f} ms"
+    for kind, values in by_kind.items():
+        line += f" | {kind} p50 {statistics.median(values):5.0f} p95 {percentile(values, 95):5.0f}"
+    print(f"{line} | rapide {100 * len(fast.requests) / len(results):3.0f} %")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Routage entre modèle principal et modèle rapide")
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--large", default="lognormal:0.4,0.3", help="Latence du modèle principal")
+    parser.add_argument("--fast", default="lognormal:0.1,0.3", help="Latence du modèle rapide")
+    parser.add_argument("--slow-large", default="lognormal:1.5,0.3",
+                        help="Latence du modèle principal ralenti")
+    parser.add_argument("--large-p95", type=float, default=1.0, help="Seuil de repli, en secondes")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    run("modèle principal seul", args, args.large, routed=False)
+    run("routage", args, args.large, routed=True)
+    run("principal seul, ralenti", args, args.slow_large, routed=False)
+    run("routage, principal ralenti", args, args.slow_large, routed=True)
+
+    router = ModelRouter({"large": "principal", "fast": "rapide"})
+    texts = FACTUAL + COMPLEX
+    start = time.perf_counter()
+    for i in range(20000):
+        router.classify(texts[i % len(texts)])
+    print(f"classifieur : {(time.perf_counter() - start) / 20000 * 1e6:.1f} µs par question")
+
+
+if __name__ == "__main__":
+    main()
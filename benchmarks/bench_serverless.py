@@ -0,0 +1,93 @@
+"""
+Benchmark du coût par invocation du point d'entrée serverless.
+
+Compare l'ancien handler de api/index.py (contexte de requête de test complet
+à chaque événement) et l'adaptateur WSGI (serverless.WSGIAdapter), sur une
+route minimale puis sur /api/health et un fichier statique de l'application.
+
+Usage:
+    python -m benchmarks.bench_serverless [--invocations 5000]
+"""
+
+import argparse
+import base64
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SESSION_BACKEND", "none")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
+from flask import Flask  # noqa: E402
+
+from app import app  # noqa: E402
+from serverless import WSGIAdapter  # noqa: E402
+
+
+def legacy_handler(flask_app):
+    """Handler d'origine : test_request_context par événement, sans chaîne de requête."""
+    def handler(event, context):
+        with flask_app.test_request_context(
+            path=event.get("path", "/"),
+            method=event.get("httpMethod", "GET"),
+            headers=event.get("headers", {}),
+            data=event.get("body", ""),
+            environ_base={"SERVER_NAME": "vercel"},
+        ):
+            response = flask_app.full_dispatch_request()
+            if "Content-Encoding" in response.headers:
+                return {"statusCode": response.status_code,
+                        "body": base64.b64encode(response.get_data()).decode("ascii"),
+                        "headers": dict(response.headers), "isBase64Encoded": True}
+            return {"statusCode": response.status_code, "body": response.get_data(as_text=True),
+                    "headers": dict(response.headers)}
+    return handler
+
+
+def measure(handler, event, invocations):
+    for _ in range(100):
+        handler(event, None)
+    samples = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        handler(event, None)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût par invocation du point d'entrée serverless")
+    parser.add_argument("--invocations", type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    minimal = Flask("minimal")
+    minimal.add_url_rule("/ping", "ping", lambda: "pong")
+    headers = {"Accept": "application/json", "User-Agent": "bench", "X-Forwarded-For": "203.0.113.7"}
+    cases = [
+        ("route minimale", minimal, {"httpMethod": "GET", "path": "/ping", "headers": headers}),
+        ("/api/health", app, {"httpMethod": "GET", "path": "/api/health", "headers": headers}),
+        ("/api/health (gzip)", app, {"httpMethod": "GET", "path": "/api/health",
+                                     "headers": {**headers, "Accept-Encoding": "gzip"}}),
+        ("/static/css/styles.css", app, {"httpMethod": "GET", "path": "/static/css/styles.css",
+                                         "headers": headers}),
+    ]
+    for label, flask_app, event in cases:
+        parts = []
+        for name, handler in (("ancien", legacy_handler(flask_app)), ("adaptateur", WSGIAdapter(flask_app))):
+            try:
+                p50, p99 = measure(handler, event, args.invocations)
+                parts.append(f"{name} p50 {p50:6.0f} µs p99 {p99:6.0f} µs")
+            except Exception as e:
+                # L'ancien handler ne sait pas lire les réponses en passthrough (fichiers)
+                parts.append(f"{name} échec ({type(e).__name__})")
+        print(f"{label:<24} " + ", ".join(parts))
+
+
+if __name__ == "__main__":
+    main()
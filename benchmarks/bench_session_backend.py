@@ -0,0 +1,146 @@
+"""
+Benchmark de la persistance des sessions avec plusieurs workers.
+
+Simule `--workers` processus (comme des workers gunicorn) de `--threads`
+threads chacun, qui servent des tours de conversation sur une même base
+SQLite. Un tour = resynchronisation de la session, ajout de la question et
+de la réponse, puis attente de leur validation (tour durable). Le mode
+« async » mesure le chemin de l'application, qui n'attend pas la validation.
+
+Compare la validation par lots (group commit) à une transaction par message
+et mesure :
+
+- la latence par tour (p50, p95, p99) ;
+- l'amplification d'écriture : octets écrits par les processus (wchar de
+  /proc/self/io) rapportés aux octets de messages.
+
+Usage:
+    python -m benchmarks.bench_session_backend [--workers 8] [--threads 4] [--turns 200]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ["SESSION_BACKEND"] = "none"
+
+from bible_chat import ConversationHistory, SYSTEM_CONTEXT  # noqa: E402
+from session_backend import SQLiteSessionBackend  # noqa: E402
+
+QUESTION = "Que dit la Bible sur le pardon et comment le vivre au quotidien ?"
+ANSWER = "Le pardon est au cœur de l'Évangile (Matthieu 6:14). " * 12
+
+
+def written_bytes() -> int:
+    """Octets passés aux appels write() par le processus courant."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def worker(path, batch_size, flush_interval, durable, worker_id, threads, turns, results):
+    backend = SQLiteSessionBackend(path, batch_size=batch_size, flush_interval=flush_interval)
+    latencies = []
+    lock = threading.Lock()
+    start_bytes = written_bytes()
+
+    def serve(thread_id):
+        history = ConversationHistory()
+        history.add_message("system", SYSTEM_CONTEXT)
+        history.attach(backend, f"bench-{worker_id:02d}-{thread_id:02d}")
+        local = []
+        for _ in range(turns):
+            start = time.perf_counter()
+            history.sync()
+            history.add_message("user", QUESTION)
+            history.add_message("assistant", ANSWER)
+            if durable:
+                backend.flush()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=serve, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    backend.flush()
+    stats = backend.stats()
+    backend.close()
+    results.put((latencies, written_bytes() - start_bytes, stats["batches"], stats["rows_written"]))
+
+
+def run(label, batch_size, flush_interval, durable, workers, threads, turns):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "sessions.sqlite3")
+        SQLiteSessionBackend(path).load("init", 1)  # crée le schéma
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker,
+                                    args=(path, batch_size, flush_interval, durable, i, threads,
+                                          turns, results))
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(lat for result in collected for lat in result[0])
+    written = sum(result[1] for result in collected)
+    batches = sum(result[2] for result in collected)
+    rows = sum(result[3] for result in collected)
+    payload = rows // 2 * len((QUESTION + ANSWER).encode("utf-8"))
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "mode": label,
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "rows_per_commit": rows / max(1, batches),
+        "write_amplification": written / payload if written else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.threads} threads, {args.turns} tours par thread")
+    print(f"{'mode':<22}{'tours/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'lignes/commit':>15}{'ampl. écriture':>16}")
+    for label, batch_size, flush_interval, durable in (
+        ("commit par message", 1, 0.0, True),
+        ("group commit", 256, 0.0, True),
+        ("group commit, async", 256, 0.0, False),
+    ):
+        result = run(label, batch_size, flush_interval, durable,
+                     args.workers, args.threads, args.turns)
+        print(f"{result['mode']:<22}{result['turns_per_s']:>9.0f}{result['p50_ms']:>9.2f}"
+              f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['rows_per_commit']:>15.1f}{result['write_amplification']:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
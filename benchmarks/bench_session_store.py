@@ -0,0 +1,74 @@
+"""
+Benchmark du stockage des sessions.
+
+Mesure la mémoire par session et la latence de recherche pour 10k et 100k
+sessions vivantes.
+
+Usage:
+    python -m benchmarks.bench_session_store [--sessions 10000 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from bible_chat import ConversationHistory, SYSTEM_CONTEXT  # noqa: E402
+from session_store import SessionStore  # noqa: E402
+
+
+def factory(session_id):
+    """Session typique : contexte système et deux échanges."""
+    history = ConversationHistory()
+    history.add_message("system", SYSTEM_CONTEXT)
+    history.add_message("user", f"Que dit la Bible sur le pardon ? ({session_id})")
+    history.add_message("assistant", "Le pardon est au cœur de l'Évangile (Matthieu 6:14). " * 8)
+    return history, object()
+
+
+def run(count: int, lookups: int = 200000) -> dict:
+    store = SessionStore(factory, max_sessions=count * 2,
+                         max_memory_bytes=1 << 40, stripes=16)
+    ids = [f"bench-session-{i:08d}" for i in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for session_id in ids:
+        store.get(session_id)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sample = [random.choice(ids) for _ in range(lookups)]
+    start = time.perf_counter()
+    for session_id in sample:
+        store.get(session_id)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sessions": count,
+        "bytes_per_session": (after - before) / count,
+        "estimated_bytes_per_session": store.memory_usage() / count,
+        "lookup_us": elapsed / lookups * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'sessions':>10} {'mesuré (o)':>12} {'estimé (o)':>12} {'lookup (µs)':>12}")
+    for count in args.sessions:
+        result = run(count)
+        print(f"{result['sessions']:>10} {result['bytes_per_session']:>12.0f} "
+              f"{result['estimated_bytes_per_session']:>12.0f} {result['lookup_us']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
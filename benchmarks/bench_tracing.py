@@ -0,0 +1,101 @@
+"""
+Benchmark du coût des traces et du profileur.
+
+Mesure le coût par requête de /api/process_audio (modèle local sans latence,
+cache désactivé) : traces et profileur désactivés, toutes les requêtes
+tracées, puis profileur actif sur toutes les requêtes ; et le coût d'une
+mesure d'étape (STAGE_SECONDS) hors trace et dans une trace.
+
+Usage:
+    python -m benchmarks.bench_tracing [--requests 2000] [--rounds 5]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+os.environ.setdefault("SESSION_BACKEND", "none")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+
+import app as app_module  # noqa: E402
+from bible_chat import ConversationHistory  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from metrics import REGISTRY, STAGE_SECONDS  # noqa: E402
+from tracing import profiler, tracer  # noqa: E402
+
+
+def measure_requests(client, count):
+    body = {"text": "Que dit la Bible sur la foi ?", "session_id": "bench-tracing-0001", "cache": False}
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.post("/api/process_audio", json=body)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def measure_observe(histogram, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        histogram.observe(0.001, "bench")
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût des traces et du profileur")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    model = FakeGenerativeModel()
+    client = app_module.app.test_client()
+    with patch.object(app_module, "chat", model.start_chat()), \
+            patch.object(app_module.session_store, "factory",
+                         lambda sid: (ConversationHistory(max_history=4), model.start_chat())), \
+            patch.object(app_module, "inflight", None):
+        modes = {
+            "désactivés": (0.0, False),
+            "traces 100 %": (1.0, False),
+            "traces + profileur 10 ms": (1.0, True),
+        }
+        samples = {label: [] for label in modes}
+        measure_requests(client, 200)
+        # Modes alternés par tours : la dérive de la machine pèse sur chacun
+        for _ in range(args.rounds):
+            for label, (rate, profiled) in modes.items():
+                tracer.configure(sample_rate=rate)
+                if profiled:
+                    profiler.start(3600, 0.01)
+                samples[label] += measure_requests(client, args.requests // args.rounds)
+                profiler.stop()
+        tracer.configure(sample_rate=0.0)
+
+        baseline = statistics.median(samples["désactivés"])
+        for label, values in samples.items():
+            p50 = statistics.median(values)
+            p99 = sorted(values)[int(len(values) * 0.99)]
+            print(f"{label:<26} p50 {p50:7.0f} µs  p99 {p99:7.0f} µs  ({100 * (p50 - baseline) / baseline:+.1f} %)")
+
+    # Même histogramme sans report dans les traces : le coût d'avant les traces
+    plain = REGISTRY.histogram("bench_plain_seconds", "Référence sans intervalles", ("stage",))
+    print(f"observe sans intervalles      : {measure_observe(plain, 200000):6.0f} ns")
+    print(f"observe hors trace            : {measure_observe(STAGE_SECONDS, 200000):6.0f} ns")
+    tracer.configure(sample_rate=1.0)
+    handle = tracer.start("bench")
+    print(f"observe dans une trace        : {measure_observe(STAGE_SECONDS, 2000):6.0f} ns")
+    tracer.finish(handle)
+    tracer.configure(sample_rate=0.0)
+
+
+if __name__ == "__main__":
+    main()
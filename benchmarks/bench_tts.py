@@ -0,0 +1,99 @@
+"""
+Benchmark de la synthèse vocale serveur (/api/tts).
+
+Mesure le délai avant le premier octet audio et la durée totale d'une réponse
+de plusieurs phrases, à froid (cache vide) puis à chaud (phrases en cache).
+Utilise espeak s'il est installé, sinon un moteur simulé dont la latence par
+phrase est fixée par --simulated-ms.
+
+Usage:
+    python -m benchmarks.bench_tts [--runs 5] [--simulated-ms 120]
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import app  # noqa: E402
+from tts import AudioCache, EspeakEngine, SpeechSynthesizer, TTSEngine  # noqa: E402
+
+ANSWER = (
+    "Car Dieu a tant aimé le monde qu'il a donné son Fils unique (Jean 3:16). "
+    "Ce verset résume l'Évangile : l'amour de Dieu précède notre réponse. "
+    "Il ne s'agit pas d'un mérite, mais d'un don offert à tous. "
+    "La suite du passage précise que le Fils n'est pas venu pour juger le monde. "
+    "Il est venu pour que le monde soit sauvé par lui."
+)
+
+
+class SimulatedEngine(TTSEngine):
+    """Moteur simulé : une latence fixe par phrase, 80 ms d'audio par mot."""
+
+    name = "simulated"
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def synthesize(self, text, voice, rate):
+        time.sleep(self.latency)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(22050)
+            wav.writeframes(b"\x00\x00" * int(22050 * 0.08 * len(text.split())))
+        return buffer.getvalue()
+
+
+def measure(client, text):
+    """Retourne (premier octet, total) en secondes pour une lecture."""
+    start = time.perf_counter()
+    response = client.get("/api/tts", query_string={"text": text})
+    chunks = iter(response.response)
+    next(chunks)
+    first = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    total = time.perf_counter() - start
+    response.close()
+    assert response.status_code == 200, response.status_code
+    return first, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Premier octet audio de /api/tts, à froid et à chaud")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--simulated-ms", type=float, default=120.0)
+    args = parser.parse_args()
+
+    espeak = EspeakEngine()
+    engine = espeak if espeak.available else SimulatedEngine(args.simulated_ms / 1000)
+    print(f"Moteur : {engine.name}")
+
+    client = app.test_client()
+    cold, warm = [], []
+    for run in range(args.runs):
+        with tempfile.TemporaryDirectory() as directory:
+            speech = SpeechSynthesizer(engine, AudioCache(directory))
+            with patch("app.speech", speech):
+                # Texte unique par passe : le premier appel est réellement à froid
+                text = f"{ANSWER} Passe {run + 1}."
+                cold.append(measure(client, text))
+                warm.append(measure(client, text))
+
+    for label, samples in (("à froid", cold), ("à chaud", warm)):
+        first = statistics.median(s[0] for s in samples) * 1e3
+        total = statistics.median(s[1] for s in samples) * 1e3
+        print(f"{label:8} : premier octet {first:8.1f} ms, réponse complète {total:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
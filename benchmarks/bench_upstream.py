@@ -0,0 +1,86 @@
+"""
+Benchmark de la politique d'appel du modèle amont.
+
+Envoie des questions en parallèle à get_bible_response sur le modèle local,
+avec une latence à longue traîne et un taux d'erreurs transitoires, sous
+trois politiques : aucune protection, nouvelles tentatives seules, puis
+nouvelles tentatives et hedging au p95. Affiche le taux de réponses, les
+latences p50/p95/p99 et le nombre d'appels amont par question.
+
+Usage:
+    python -m benchmarks.bench_upstream [--questions 400] [--error-rate 0.05]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SESSION_BACKEND", "none")
+
+import bible_chat  # noqa: E402
+from fake_gemini import FakeGenerativeModel, LatencyDistribution  # noqa: E402
+from resilience import CircuitBreaker, UpstreamPolicy  # noqa: E402
+
+POLICIES = {
+    "aucune": dict(deadline=0, max_retries=0, hedge_percentile=0),
+    "retries": dict(deadline=5, max_retries=2, backoff_base=0.05, hedge_percentile=0),
+    "retries+hedging": dict(deadline=5, max_retries=2, backoff_base=0.05, hedge_percentile=95),
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def run(name, args):
+    model = FakeGenerativeModel(
+        answer=lambda q: "La foi (Hébreux 11:1).",
+        first_chunk_latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate, seed=1,
+    )
+    policy = UpstreamPolicy(breaker=CircuitBreaker(failure_threshold=10 ** 6), seed=1, **POLICIES[name])
+
+    def ask(i):
+        start = time.perf_counter()
+        answer = bible_chat.get_bible_response(f"Question {i} ?", model.start_chat(),
+                                               bible_chat.ConversationHistory())
+        return time.perf_counter() - start, answer.startswith("La foi")
+
+    with patch.object(bible_chat, "upstream", policy), patch.object(bible_chat.answer_cache, "enabled", False):
+        # Amorce de la fenêtre des latences (hors mesure)
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(ask, range(50)))
+        model.requests.clear()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(ask, range(args.questions)))
+
+    latencies = [seconds * 1000 for seconds, _ in results]
+    answered = sum(ok for _, ok in results)
+    print(f"{name:16} : {100 * answered / len(results):5.1f} % de réponses, "
+          f"p50 {statistics.median(latencies):6.0f} ms, p95 {percentile(latencies, 95):6.0f} ms, "
+          f"p99 {percentile(latencies, 99):6.0f} ms, {len(model.requests) / len(results):.2f} appels/question")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline, nouvelles tentatives et hedging")
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", default="lognormal:0.1,0.8")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    for name in POLICIES:
+        run(name, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de l'index local des versets.
+
+Construit un index à l'échelle d'une Bible complète (textes synthétiques,
+66 livres, ~31 000 versets) puis mesure la latence des recherches.
+
+Usage:
+    python -m benchmarks.bench_verse_store [--source bible.tsv] [--lookups 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bible_refs import BOOKS, Reference  # noqa: E402
+from verse_store import VerseStore, answer_reference, build_index  # noqa: E402
+
+VERSES_PER_CHAPTER = 26
+
+
+def write_synthetic_source(path: str) -> None:
+    """Écrit un texte biblique synthétique aux dimensions réelles."""
+    rng = random.Random(0)
+    words = "Dieu Seigneur peuple terre ciel amour grâce foi parole esprit vie lumière".split()
+    with open(path, "w", encoding="utf-8") as f:
+        for book in BOOKS:
+            for chapter in range(1, book.chapters + 1):
+                for verse in range(1, VERSES_PER_CHAPTER + 1):
+                    text = " ".join(rng.choice(words) for _ in range(22))
+                    f.write(f"{book.osis}\t{chapter}\t{verse}\t{text}.\n")
+
+
+def timed(label: str, count: int, fn) -> None:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / count * 1e6:>8.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", help="Texte TSV réel (par défaut : texte synthétique)")
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = args.source or os.path.join(tmpdir, "bible.tsv")
+        if not args.source:
+            write_synthetic_source(source)
+        index_path = os.path.join(tmpdir, "bible.idx")
+
+        start = time.perf_counter()
+        stats = build_index(source, index_path)
+        print(f"build: {stats['verses']} versets, {stats['bytes'] / 1e6:.1f} Mo, "
+              f"{time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        store = VerseStore(index_path)
+        print(f"open: {(time.perf_counter() - start) * 1e6:.0f} µs")
+
+        rng = random.Random(1)
+        refs = []
+        for _ in range(1000):
+            book = rng.choice(BOOKS)
+            chapter = rng.randint(1, store.chapter_count(book.index))
+            verse = rng.randint(1, store.verse_count(book.index, chapter))
+            refs.append(Reference(book, chapter, verse))
+        requests = [f"lis-moi {ref.label()}" for ref in refs]
+
+        n = args.lookups
+        timed("VerseStore.lookup (1 verset)", n, lambda: store.lookup(rng.choice(refs)))
+        timed("VerseStore.lookup (chapitre entier)", n // 10,
+              lambda: store.lookup(rng.choice(refs)._replace(verse_start=None)))
+        timed("answer_reference (analyse + lecture)", n,
+              lambda: answer_reference(rng.choice(requests), store))
+        timed("answer_reference (question non référence)", n,
+              lambda: answer_reference("Que dit la Bible sur le pardon ?", store))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de la session vocale (/api/voice).
+
+Simule une question dictée mot à mot (une transcription provisoire par mot),
+puis la transcription finale, qui n'arrive qu'un peu après la fin de la parole
+(délai de détection du silence de la reconnaissance vocale). Mesure le délai
+entre la fin de la parole et le premier fragment de réponse :
+
+- flux actuel : transcription finale, puis POST /api/process_audio/stream ;
+- session vocale : transcriptions provisoires et finale sur la WebSocket, la
+  réponse étant anticipée dès que la transcription est stable.
+
+Le modèle local (GEMINI_FAKE=1) répond après --latency secondes.
+
+Usage:
+    python -m benchmarks.bench_voice [--runs 10] [--latency 0.8] [--final-delay-ms 600]
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import simple_websocket
+from werkzeug.serving import make_server
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+QUESTION = "Que dit la Bible sur le pardon entre frères et sœurs numéro"
+
+
+def configure(args):
+    os.environ.update({
+        "GEMINI_FAKE": "1",
+        "GEMINI_FAKE_LATENCY": f"const:{args.latency}",
+        "GEMINI_FAKE_CHUNK_INTERVAL": "const:0.02",
+        "SESSION_BACKEND": "none",
+        "RATE_LIMIT_BACKEND": "none",
+        "ADMISSION_MAX_IN_FLIGHT": "0",
+        "VOICE_STABLE_MS": str(args.stable_ms),
+    })
+
+
+def words(i):
+    return f"{QUESTION} {i}".split()
+
+
+def http_flow(port, i, args):
+    """Fin de la parole -> premier fragment, transcription finale puis route en flux."""
+    time.sleep(len(words(i)) * args.word_ms / 1000)
+    end_of_speech = time.perf_counter()
+    time.sleep(args.final_delay_ms / 1000)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    body = json.dumps({"text": " ".join(words(i)), "cache": False, "session_id": f"http-{i}"})
+    connection.request("POST", "/api/process_audio/stream", body, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    while not response.readline().startswith(b"event: delta"):
+        pass
+    first = time.perf_counter() - end_of_speech
+    response.read()
+    connection.close()
+    return first
+
+
+def voice_flow(port, i, args):
+    """Fin de la parole -> premier fragment, sur la session vocale."""
+    ws = simple_websocket.Client.connect(f"ws://127.0.0.1:{port}/api/voice?cache=false&session_id=voice-{i}")
+    json.loads(ws.receive())  # ready
+    spoken = []
+    for word in words(i):
+        time.sleep(args.word_ms / 1000)
+        spoken.append(word)
+        ws.send(json.dumps({"type": "interim", "text": " ".join(spoken)}))
+    end_of_speech = time.perf_counter()
+    time.sleep(args.final_delay_ms / 1000)
+    ws.send(json.dumps({"type": "final", "text": " ".join(spoken) + " ?"}))
+    first, speculative = None, False
+    while True:
+        message = json.loads(ws.receive())
+        if message["type"] == "delta" and first is None:
+            first = time.perf_counter() - end_of_speech
+        elif message["type"] == "done":
+            speculative = message["speculative"]
+            break
+        elif message["type"] == "error":
+            raise RuntimeError(message["message"])
+    ws.close()
+    return first, speculative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Délai fin de la parole -> premier fragment")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.8, help="premier fragment du modèle, en secondes")
+    parser.add_argument("--word-ms", type=float, default=250, help="durée d'un mot dicté")
+    parser.add_argument("--final-delay-ms", type=float, default=600,
+                        help="délai de la transcription finale après la fin de la parole")
+    parser.add_argument("--stable-ms", type=float, default=350)
+    args = parser.parse_args()
+    configure(args)
+    logging.disable(logging.WARNING)
+
+    from app import app  # noqa: E402 (après la configuration)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        baseline = [http_flow(server.port, i, args) * 1000 for i in range(args.runs)]
+        results = [voice_flow(server.port, i, args) for i in range(args.runs)]
+    finally:
+        server.shutdown()
+
+    voice = [first * 1000 for first, _ in results]
+    hits = sum(speculative for _, speculative in results)
+    print(f"modèle {args.latency * 1000:.0f} ms, transcription finale +{args.final_delay_ms:.0f} ms")
+    print(f"flux HTTP      : p50 {statistics.median(baseline):6.0f} ms, max {max(baseline):6.0f} ms")
+    print(f"session vocale : p50 {statistics.median(voice):6.0f} ms, max {max(voice):6.0f} ms "
+          f"({hits}/{len(results)} réponses anticipées)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""
+Test de charge de /api/process_audio servi par gunicorn (ou uvicorn avec
+--server asgi).
+
+Démarre l'application sous gunicorn avec le modèle local de fake_gemini
+(GEMINI_FAKE=1) : aucun appel à l'API réelle, latence, débit des fragments et
+taux d'erreur du modèle configurables. Le script envoie ensuite les requêtes
+depuis `--concurrency` clients, chacun dans sa propre session, puis relève :
+
+- le débit (requêtes/s) ;
+- la latence p50/p95/p99 (et le délai avant le premier fragment en flux) ;
+- les codes HTTP et les réponses d'excuse dues aux erreurs du modèle ;
+- la mémoire résidente de chaque worker (pic et fin de test).
+
+Les résultats sont enregistrés en JSON pour comparer les exécutions.
+
+Usage:
+    python -m benchmarks.loadtest --workers 4 --threads 8 --concurrency 32 \\
+        --requests 2000 --latency lognormal:0.8,0.4 --chunk-interval const:0.03
+    python -m benchmarks.loadtest --stream --compare benchmarks/results/avant.json
+    python -m benchmarks.loadtest --server asgi --workers 1 --concurrency 400 \\
+        --requests 4000 --latency const:1.0 --chunk-interval const:0
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+QUESTIONS = [
+    "Que dit la Bible sur le pardon ?",
+    "Comment prier quand on doute ?",
+    "Qui était l'apôtre Paul ?",
+    "Que signifie la grâce ?",
+    "Pourquoi Jésus parlait-il en paraboles ?",
+    "Que dit la Bible sur l'espérance ?",
+    "Comment aimer son prochain au quotidien ?",
+    "Quel est le sens du sabbat ?",
+]
+
+# Début des réponses d'excuse renvoyées quand le modèle échoue
+FALLBACK_PREFIXES = ("Je suis désolé", "Le service n'est pas disponible", "Désolé")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentile (rang le plus proche) d'une liste triée."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99, moyenne et maximum, en millisecondes."""
+    values = sorted(values)
+    return {
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "mean_ms": _ms(sum(values) / len(values)) if values else None,
+        "max_ms": _ms(values[-1]) if values else None,
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """PID des workers gunicorn (enfants du maître), d'après /proc."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Le nom du processus peut contenir des espaces : on repart de la dernière parenthèse
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Mémoire résidente d'un processus."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Relève périodiquement la mémoire résidente de chaque worker."""
+
+    def __init__(self, master_pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak: Dict[int, int] = {}
+        self.last: Dict[int, int] = {}
+        self._done = threading.Event()
+
+    def sample(self) -> None:
+        # uvicorn avec un seul worker sert les requêtes dans le processus maître
+        for pid in worker_pids(self.master_pid) or [self.master_pid]:
+            rss = rss_bytes(pid)
+            if rss is not None:
+                self.last[pid] = rss
+                self.peak[pid] = max(rss, self.peak.get(pid, 0))
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+class Client(threading.Thread):
+    """Client HTTP persistant, avec sa propre session de conversation."""
+
+    def __init__(self, index: int, port: int, stream: bool, budget: "RequestBudget"):
+        super().__init__(daemon=True)
+        self.index = index
+        self.port = port
+        self.stream = stream
+        self.budget = budget
+        self.session_id = f"loadtest-{index:04d}-{os.getpid()}"
+        self.latencies: List[float] = []
+        self.rejected: List[float] = []
+        self.first_chunk: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def run(self) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        path = "/api/process_audio/stream" if self.stream else "/api/process_audio"
+        turn = 0
+        while self.budget.take():
+            question = QUESTIONS[(self.index + turn) % len(QUESTIONS)]
+            turn += 1
+            body = json.dumps({"text": question, "session_id": self.session_id})
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "application/json",
+                                                           "X-Session-Id": self.session_id})
+                response = conn.getresponse()
+                status = str(response.status)
+                retry_after = response.getheader("Retry-After")
+                text = self._read(response, start)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                text, retry_after = "", None
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            # Les refus du contrôle d'admission (429/503) sont mesurés à part
+            elapsed = time.perf_counter() - start
+            (self.rejected if status in ("429", "503") else self.latencies).append(elapsed)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if text.startswith(FALLBACK_PREFIXES):
+                self.fallbacks += 1
+            if retry_after is not None:
+                # Comme l'interface web, le client patiente avant de réessayer
+                time.sleep(float(retry_after))
+        conn.close()
+
+    def _read(self, response: http.client.HTTPResponse, start: float) -> str:
+        if not self.stream:
+            payload = json.loads(response.read() or b"{}")
+            return payload.get("response", "")
+        event, text, first = None, "", True
+        while True:
+            line = response.readline()
+            if not line:
+                break
+            line = line.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+                if event == "delta" and first:
+                    self.first_chunk.append(time.perf_counter() - start)
+                    first = False
+            elif line.startswith("data: ") and event == "done":
+                text = json.loads(line[6:]).get("response", "")
+            elif line.startswith("data: ") and event == "error":
+                text = FALLBACK_PREFIXES[0]
+        return text
+
+
+class RequestBudget:
+    """Nombre total de requêtes et durée maximale, partagés par les clients."""
+
+    def __init__(self, requests: int, duration: Optional[float]):
+        self.remaining = requests
+        self.deadline = time.monotonic() + duration if duration else None
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def start_server(args: argparse.Namespace, tmpdir: str,
+                 extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "GEMINI_FAKE": "1",
+        "GEMINI_FAKE_LATENCY": args.latency,
+        "GEMINI_FAKE_CHUNK_INTERVAL": args.chunk_interval,
+        "GEMINI_FAKE_CHUNK_SIZE": str(args.chunk_size),
+        "GEMINI_FAKE_ERROR_RATE": str(args.error_rate),
+        "ANSWER_CACHE_ENABLED": "1" if args.cache else "0",
+        "ANSWER_CACHE_PATH": os.path.join(tmpdir, "answers.sqlite3"),
+        "SESSION_DB_PATH": os.path.join(tmpdir, "sessions.sqlite3"),
+        # Tous les clients partagent l'adresse 127.0.0.1 : un débit par session
+        "RATE_LIMIT_BACKEND": "sqlite" if args.rate_limit else "none",
+        "RATE_LIMIT_PER_SECOND": str(args.rate_limit),
+        "RATE_LIMIT_KEY": "session",
+        "RATE_LIMIT_DB_PATH": os.path.join(tmpdir, "ratelimit.sqlite3"),
+        "ADMISSION_MAX_IN_FLIGHT": str(args.max_in_flight),
+        "ADMISSION_LOCK_PATH": os.path.join(tmpdir, "inflight.lock"),
+        "ASGI_WSGI_THREADS": str(args.threads),
+        **(extra_env or {}),
+    }
+    if args.server == "asgi":
+        command = [
+            sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(args.workers),
+            "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning",
+        ]
+        log = open(os.path.join(tmpdir, "uvicorn.log"), "wb")
+        return subprocess.Popen(command, cwd=str(ROOT), env=env, stdout=log, stderr=subprocess.STDOUT)
+    command = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--workers", str(args.workers), "--threads", str(args.threads),
+        "--bind", f"127.0.0.1:{args.port}", "--timeout", "120",
+        "--log-level", "warning",
+    ]
+    log = open(os.path.join(tmpdir, "gunicorn.log"), "wb")
+    return subprocess.Popen(command, cwd=str(ROOT), env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready in time")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = start_server(args, tmpdir)
+        try:
+            wait_ready(args.port, server)
+            # Échauffement : initialisation paresseuse du chat dans chaque worker
+            warmup = RequestBudget(args.workers * min(args.threads, 4), None)
+            warm = [Client(1000 + i, args.port, args.stream, warmup) for i in range(args.workers)]
+            for client in warm:
+                client.start()
+            for client in warm:
+                client.join()
+
+            sampler = MemorySampler(server.pid)
+            sampler.sample()
+            sampler.start()
+            budget = RequestBudget(args.requests, args.duration)
+            clients = [Client(i, args.port, args.stream, budget) for i in range(args.concurrency)]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies = [lat for client in clients for lat in client.latencies]
+    rejected = [lat for client in clients for lat in client.rejected]
+    statuses: Dict[str, int] = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {
+            "server": args.server,
+            "workers": args.workers,
+            "threads": args.threads,
+            "concurrency": args.concurrency,
+            "stream": args.stream,
+            "cache": args.cache,
+            "latency": args.latency,
+            "chunk_interval": args.chunk_interval,
+            "chunk_size": args.chunk_size,
+            "error_rate": args.error_rate,
+            "max_in_flight": args.max_in_flight,
+            "rate_limit": args.rate_limit,
+        },
+        "requests": len(latencies) + len(rejected),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency": summarize(latencies),
+        "rejected_latency": summarize(rejected),
+        "statuses": statuses,
+        "model_errors": sum(client.fallbacks for client in clients),
+        "memory": {
+            "workers": len(sampler.peak),
+            "peak_rss_mb": [round(v / 2**20, 1) for _, v in sorted(sampler.peak.items())],
+            "final_rss_mb": [round(v / 2**20, 1) for _, v in sorted(sampler.last.items())],
+        },
+    }
+    if args.stream:
+        result["first_chunk"] = summarize([t for client in clients for t in client.first_chunk])
+    return result
+
+
+def print_result(result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    config = result["config"]
+    print(f"{config.get('server', 'gunicorn')} : {config['workers']} workers x {config['threads']} threads, "
+          f"{config['concurrency']} clients, {result['requests']} requêtes "
+          f"en {result['duration_s']} s")
+    rows = [("débit (req/s)", "throughput_rps")]
+    rows += [(f"latence {key[:-3]} (ms)", ("latency", key)) for key in ("p50_ms", "p95_ms", "p99_ms")]
+    if (result.get("rejected_latency") or {}).get("p50_ms") is not None:
+        rows += [(f"refus {key[:-3]} (ms)", ("rejected_latency", key)) for key in ("p50_ms", "p99_ms")]
+    if "first_chunk" in result:
+        rows += [(f"1er fragment {key[:-3]} (ms)", ("first_chunk", key)) for key in ("p50_ms", "p95_ms")]
+    for label, key in rows:
+        value = _lookup(result, key)
+        line = f"  {label:<24}{value:>10}"
+        if previous is not None and _lookup(previous, key):
+            old = _lookup(previous, key)
+            line += f"   (avant {old}, {100 * (value - old) / old:+.1f} %)"
+        print(line)
+    print(f"  codes HTTP              {result['statuses']}")
+    print(f"  erreurs du modèle       {result['model_errors']}")
+    print(f"  mémoire par worker (Mo) pic {result['memory']['peak_rss_mb']}")
+
+
+def _lookup(result: Dict[str, Any], key: Any) -> Any:
+    if isinstance(key, tuple):
+        return (result.get(key[0]) or {}).get(key[1])
+    return result.get(key)
+
+
+def add_server_arguments(parser: argparse.ArgumentParser, latency: str = "lognormal:0.5,0.4") -> None:
+    """Options du serveur et du modèle local, communes aux tests de charge et au rejeu."""
+    parser.add_argument("--server", choices=("gunicorn", "asgi"), default="gunicorn",
+                        help="gunicorn (WSGI, un thread par requête) ou uvicorn asgi:app")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cache", action="store_true", help="Activer le cache des réponses")
+    parser.add_argument("--latency", default=latency,
+                        help="Délai avant le premier fragment (voir fake_gemini)")
+    parser.add_argument("--chunk-interval", default="const:0.02", help="Délai entre fragments")
+    parser.add_argument("--chunk-size", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Plafond des appels au modèle en cours (0 : désactivé)")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Requêtes par seconde et par session (0 : désactivé)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--compare", default=None, help="Résultats JSON d'une exécution précédente")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Test de charge de /api/process_audio")
+    add_server_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=None, help="Durée maximale, en secondes")
+    parser.add_argument("--stream", action="store_true", help="Utiliser /api/process_audio/stream")
+    args = parser.parse_args()
+
+    result = run(args)
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_result(result, previous)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = str(RESULTS_DIR / f"loadtest-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"résultats : {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Rejeu d'un journal de trafic réel (traffic.py, TRAFFIC_CAPTURE_PATH) contre
+l'application servie avec le modèle local de fake_gemini.
+
+Chaque question est envoyée à son heure d'arrivée d'origine, divisée par
+`--speed` (2 : deux fois plus vite ; 0 : sans attente), dans sa session
+d'origine : les questions d'une même conversation partent dans l'ordre, chacune
+après la réponse à la précédente. Par défaut, le modèle local reprend la
+distribution des durées et des tailles de réponse du journal (loi log-normale
+ajustée, `--latency capture`, `--answer-chars capture`) ; les tirages sont
+reproductibles (`--seed`).
+
+Le rapport reprend celui de loadtest (débit, latences, codes HTTP, mémoire),
+ajoute le retard des envois sur le calendrier d'origine (rejeu saturé si le
+serveur ou la machine ne suivent pas) et les durées d'origine pour comparaison.
+
+Usage:
+    python -m benchmarks.replay trafic.jsonl --speed 4 --workers 2 --threads 8
+    python -m benchmarks.replay trafic.jsonl --speed 10 --limit 5000 \\
+        --compare benchmarks/results/replay-avant.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.loadtest import (  # noqa: E402
+    FALLBACK_PREFIXES, QUESTIONS, RESULTS_DIR, MemorySampler, _lookup, add_server_arguments,
+    git_commit, start_server, summarize, wait_ready,
+)
+from traffic import read_capture  # noqa: E402
+
+
+def fit_lognormal(values: List[float]) -> Optional[str]:
+    """Spécification fake_gemini (lognormal:médiane,sigma) ajustée sur des valeurs positives."""
+    logs = [math.log(value) for value in values if value > 0]
+    if not logs:
+        return None
+    sigma = statistics.pstdev(logs) if len(logs) > 1 else 0.0
+    return f"lognormal:{math.exp(statistics.fmean(logs)):.4g},{sigma:.3g}"
+
+
+def question_text(entry: Dict[str, Any]) -> str:
+    """Texte expurgé du journal, ou question de même longueur s'il n'a pas été gardé."""
+    if entry.get("text"):
+        return entry["text"]
+    filler = " ".join(QUESTIONS)
+    chars = max(1, int(entry.get("chars", 30)))
+    return (filler * (chars // len(filler) + 1))[:chars]
+
+
+class SessionClient(threading.Thread):
+    """Rejoue les questions d'une session, dans l'ordre, sur une connexion persistante."""
+
+    def __init__(self, session: str, entries: List[Dict[str, Any]], port: int,
+                 schedule: "Schedule"):
+        super().__init__(daemon=True)
+        self.session_id = f"replay-{session}"
+        self.entries = entries
+        self.port = port
+        self.schedule = schedule
+        self.latencies: List[float] = []
+        self.lags: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def run(self) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        for entry in self.entries:
+            due = self.schedule.wait(entry["t"])
+            body = json.dumps({"text": question_text(entry), "session_id": self.session_id,
+                               "cache": bool(entry.get("cache", 1))})
+            start = time.perf_counter()
+            self.lags.append(max(0.0, start - due))
+            try:
+                conn.request("POST", "/api/process_audio", body=body,
+                             headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                status = str(response.status)
+                text = json.loads(response.read() or b"{}").get("response", "")
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                status, text = type(e).__name__, ""
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            self.latencies.append(time.perf_counter() - start)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if text.startswith(FALLBACK_PREFIXES):
+                self.fallbacks += 1
+        conn.close()
+
+
+class Schedule:
+    """Calendrier du rejeu : heure d'origine ramenée au début du rejeu et divisée par la vitesse."""
+
+    def __init__(self, first: float, speed: float):
+        self.first = first
+        self.speed = speed
+        self.origin = time.perf_counter()
+
+    def due(self, t: float) -> float:
+        if self.speed <= 0:
+            return self.origin
+        return self.origin + (t - self.first) / self.speed
+
+    def wait(self, t: float) -> float:
+        """Attend l'heure d'envoi (sans effet si elle est passée) et la retourne."""
+        due = self.due(t)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return due
+
+
+def group_sessions(entries: List[Dict[str, Any]]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """Questions par session, les sessions dans l'ordre de leur première question."""
+    sessions: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for entry in entries:
+        sessions.setdefault(entry["session"], []).append(entry)
+    return sessions
+
+
+def run(args: argparse.Namespace, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    recorded_ms = [entry["ms"] for entry in entries if "ms" in entry]
+    if args.latency == "capture":
+        args.latency = fit_lognormal([ms / 1000 for ms in recorded_ms]) or "0"
+    extra_env = {"GEMINI_FAKE_SEED": str(args.seed)}
+    if args.answer_chars == "capture":
+        args.answer_chars = fit_lognormal([entry["bytes"] for entry in entries if "bytes" in entry])
+    if args.answer_chars:
+        extra_env["GEMINI_FAKE_ANSWER_CHARS"] = args.answer_chars
+    sessions = group_sessions(entries)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = start_server(args, tmpdir, extra_env)
+        try:
+            wait_ready(args.port, server)
+            sampler = MemorySampler(server.pid)
+            sampler.sample()
+            sampler.start()
+            schedule = Schedule(entries[0]["t"], args.speed)
+            clients = []
+            # Une session n'occupe un thread qu'à partir de sa première question
+            for session, turns in sessions.items():
+                schedule.wait(turns[0]["t"])
+                client = SessionClient(session, turns, args.port, schedule)
+                client.start()
+                clients.append(client)
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - schedule.origin
+            sampler.stop()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies = [lat for client in clients for lat in client.latencies]
+    lags = [lag for client in clients for lag in client.lags]
+    statuses: Dict[str, int] = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    span = entries[-1]["t"] - entries[0]["t"]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {
+            "capture": os.path.abspath(args.capture),
+            "server": args.server,
+            "workers": args.workers,
+            "threads": args.threads,
+            "speed": args.speed,
+            "cache": args.cache,
+            "latency": args.latency,
+            "answer_chars": args.answer_chars,
+            "chunk_interval": args.chunk_interval,
+            "chunk_size": args.chunk_size,
+            "error_rate": args.error_rate,
+            "max_in_flight": args.max_in_flight,
+            "rate_limit": args.rate_limit,
+            "seed": args.seed,
+        },
+        "requests": len(latencies),
+        "sessions": len(sessions),
+        "capture_duration_s": round(span, 3),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency": summarize(latencies),
+        "lag": summarize(lags),
+        "captured_latency": summarize([ms / 1000 for ms in recorded_ms]),
+        "statuses": statuses,
+        "model_errors": sum(client.fallbacks for client in clients),
+        "memory": {
+            "workers": len(sampler.peak),
+            "peak_rss_mb": [round(v / 2**20, 1) for _, v in sorted(sampler.peak.items())],
+            "final_rss_mb": [round(v / 2**20, 1) for _, v in sorted(sampler.last.items())],
+        },
+    }
+
+
+def print_result(result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    config = result["config"]
+    pace = f"x{config['speed']:g}" if config["speed"] > 0 else "sans attente"
+    print(f"rejeu {pace} sur {config['server']} : {config['workers']} workers x "
+          f"{config['threads']} threads, {result['requests']} requêtes de {result['sessions']} sessions "
+          f"en {result['duration_s']} s (journal : {result['capture_duration_s']} s)")
+    print(f"  modèle local            latence {config['latency']}, réponses {config['answer_chars']}")
+    rows = [("débit (req/s)", "throughput_rps")]
+    rows += [(f"latence {key[:-3]} (ms)", ("latency", key)) for key in ("p50_ms", "p95_ms", "p99_ms")]
+    rows += [(f"retard {key[:-3]} (ms)", ("lag", key)) for key in ("p50_ms", "p99_ms")]
+    for label, key in rows:
+        value = _lookup(result, key)
+        line = f"  {label:<24}{value:>10}"
+        if previous is not None and _lookup(previous, key):
+            old = _lookup(previous, key)
+            line += f"   (avant {old}, {100 * (value - old) / old:+.1f} %)"
+        print(line)
+    captured = result["captured_latency"]
+    print(f"  durées d'origine (ms)   p50 {captured['p50_ms']}  p99 {captured['p99_ms']}")
+    print(f"  codes HTTP              {result['statuses']}")
+    print(f"  erreurs du modèle       {result['model_errors']}")
+    print(f"  mémoire par worker (Mo) pic {result['memory']['peak_rss_mb']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rejeu d'un journal de trafic contre /api/process_audio")
+    parser.add_argument("capture", help="Journal écrit par traffic.py (TRAFFIC_CAPTURE_PATH)")
+    add_server_arguments(parser, latency="capture")
+    parser.set_defaults(chunk_interval="const:0")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Accélération du calendrier d'origine (0 : sans attente)")
+    parser.add_argument("--answer-chars", default="capture",
+                        help="Longueur des réponses du modèle local (distribution, ou capture)")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de questions rejouées")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    entries = read_capture(args.capture)[:args.limit]
+    if not entries:
+        print(f"{args.capture} : aucune question à rejouer", file=sys.stderr)
+        return 1
+    result = run(args, entries)
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_result(result, previous)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = str(RESULTS_DIR / f"replay-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"résultats : {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,27 @@
-import google.generativeai as genai
+import asyncio
+import copy
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 import json
-from unittest.mock import MagicMock
+import atexit
+import itertools
+import threading
+import time
 from logging import getLogger
+from answer_cache import AnswerCache, make_cache_key
+from singleflight import SingleFlight
+from verse_store import answer_reference
+from prompt_builder import PromptBuilder
+from session_backend import SessionBackend, backend_from_env
+from resilience import UpstreamError, UpstreamPolicy, UpstreamTimeout, error_code, is_transient
+from model_router import PRIMARY, ModelRouter
+from tracing import in_context
+from metrics import (
+    ERRORS, HISTORY_MESSAGES, MOCK_FALLBACKS, PROMPT_TOKENS, RESPONSE_CHARS, STAGE_SECONDS,
+    UPSTREAM_EVENTS
+)
 
 # Configure logging
 logger = getLogger(__name__)
@@ -17,16 +34,32 @@ class GeminiAPI:
     
     Cette classe gère la communication avec l'API Gemini, y compris l'initialisation,
     la gestion des erreurs et le mode mock pour les tests.
+
+    Le SDK google.generativeai (et sa pile gRPC/protobuf) n'est importé qu'à la
+    création de l'instance, pas à l'import de ce module. Avec GEMINI_FAKE=1,
+    le modèle local de fake_gemini remplace le service (tests de charge).
     """
     
     def __init__(self):
         """Initialise l'API Gemini avec la clé d'API depuis les variables d'environnement."""
+        self.model_name = os.getenv("GEMINI_MODEL", "gemini-pro")
+        self.is_fake = os.getenv("GEMINI_FAKE", "0").lower() in ("1", "true", "yes")
+        if self.is_fake:
+            from fake_gemini import FakeGenerativeModel
+            self.api_key = None
+            self._model = FakeGenerativeModel.from_env()
+            self.is_mock = False
+            logger.warning("Using local fake Gemini model (GEMINI_FAKE=1)")
+            return
+
         self.api_key = os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             logger.error("API key not found")
             raise ValueError("API key not found. Please set GEMINI_API_KEY in .env file")
         
         try:
+            import google.generativeai as genai
+            self._genai = genai
             genai.configure(api_key=self.api_key)
             self._model = None
             self.is_mock = False
@@ -47,24 +80,67 @@ class GeminiAPI:
         """
         if self._model is None:
             try:
-                self._model = genai.GenerativeModel('gemini-pro')
+                self._model = self._genai.GenerativeModel(self.model_name)
             except Exception as e:
                 logger.warning(f"Using mock model due to initialization error: {str(e)}")
                 self._model = self._create_mock_model()
                 self.is_mock = True
+                MOCK_FALLBACKS.inc()
         return self._model
 
-    def _create_mock_model(self) -> MagicMock:
+    def create_model(self, name: str) -> Any:
+        """
+        Retourne le modèle `name` (routeur de modèles) ; le modèle principal
+        s'il s'agit de lui, ou si la création échoue.
+        """
+        if name == self.model_name:
+            return self.model
+        if self.is_fake:
+            from fake_gemini import FakeGenerativeModel
+            return FakeGenerativeModel.from_env(latency_env="GEMINI_FAKE_FAST_LATENCY")
+        try:
+            return self._genai.GenerativeModel(name)
+        except Exception as e:
+            logger.warning(f"Using {self.model_name} instead of {name}: {str(e)}")
+            return self.model
+
+    def _create_mock_model(self) -> Any:
         """Crée un mock du modèle pour les tests."""
+        from unittest.mock import MagicMock
         mock = MagicMock()
         mock.start_chat.return_value = MagicMock()
-        mock.start_chat.return_value.send_message.return_value = MagicMock(
+        response = MagicMock(
             text="[TEST] Voici une réponse biblique de test. (Jean 3:16)"
         )
+        # En mode flux, la réponse se produit elle-même comme unique fragment
+        response.__iter__.side_effect = lambda: iter([response])
+        mock.start_chat.return_value.send_message.return_value = response
         return mock
 
-# Instance globale de l'API
-gemini_api = GeminiAPI()
+# Instance globale de l'API, créée à la première utilisation
+_gemini_api: Optional[GeminiAPI] = None
+_gemini_api_lock = threading.Lock()
+
+def get_gemini_api() -> GeminiAPI:
+    """
+    Retourne l'instance globale de l'API, en la créant au premier appel.
+
+    Raises:
+        ValueError: Si la clé d'API n'est pas configurée
+        RuntimeError: Si la configuration du SDK échoue
+    """
+    global _gemini_api
+    if _gemini_api is None:
+        with _gemini_api_lock:
+            if _gemini_api is None:
+                _gemini_api = GeminiAPI()
+    return _gemini_api
+
+def __getattr__(name: str) -> Any:
+    # Compatibilité : `bible_chat.gemini_api` reste accessible, sans coût à l'import
+    if name == "gemini_api":
+        return get_gemini_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class ConversationHistory:
     """
@@ -73,6 +149,9 @@ class ConversationHistory:
     Attributes:
         max_history (int): Nombre maximum de messages à conserver
         messages (List[Dict[str, str]]): Liste des messages de l'historique
+        prompt (PromptBuilder): Historique envoyé au modèle, dans un budget de tokens
+        backend (SessionBackend): Stockage durable de la session (None si non persistée)
+        session_id (str): Identifiant de la session persistée
     """
     
     def __init__(self, max_history: int = 10):
@@ -84,6 +163,61 @@ class ConversationHistory:
         """
         self.messages: List[Dict[str, str]] = []
         self.max_history = max_history
+        self.prompt = PromptBuilder.from_env()
+        self.backend: Optional[SessionBackend] = None
+        self.session_id: Optional[str] = None
+        self._last_id = 0
+
+    def attach(self, backend: SessionBackend, session_id: str) -> None:
+        """
+        Associe l'historique à un stockage durable et recharge la fenêtre de
+        contexte déjà enregistrée pour cette session.
+
+        Args:
+            backend: Stockage des sessions
+            session_id: Identifiant de la session
+        """
+        messages, self._last_id, _ = backend.load(session_id, self.max_history)
+        self.backend = backend
+        self.session_id = session_id
+        for message in messages:
+            self._record(message["role"], message["content"])
+
+    def sync(self) -> None:
+        """
+        Récupère les messages ajoutés à la session par d'autres workers
+        depuis le dernier chargement.
+        """
+        if self.backend is None:
+            return
+        try:
+            messages, self._last_id, replace = self.backend.load(
+                self.session_id, self.max_history, after=self._last_id,
+                exclude_origin=self.backend.origin,
+            )
+        except Exception as e:
+            # Mieux vaut répondre avec un contexte incomplet que ne pas répondre
+            logger.error(f"Failed to sync session {self.session_id}: {str(e)}")
+            return
+        if replace:
+            system = [msg for msg in self.messages if msg["role"] == "system"]
+            self.messages = []
+            self.prompt.clear()
+            for message in system + messages:
+                self._record(message["role"], message["content"])
+        else:
+            for message in messages:
+                self._record(message["role"], message["content"])
+
+    def fork(self) -> "ConversationHistory":
+        """
+        Copie détachée de l'historique : les messages qui y sont ajoutés ne
+        sont ni enregistrés dans la session, ni visibles depuis l'original.
+        """
+        forked = ConversationHistory(self.max_history)
+        forked.messages = list(self.messages)
+        forked.prompt = copy.deepcopy(self.prompt)
+        return forked
 
     def add_message(self, role: str, content: str) -> None:
         """
@@ -100,9 +234,16 @@ class ConversationHistory:
             logger.warning("Attempted to add empty message")
             return
             
+        self._record(role, content)
+        # Le contexte système est reconstruit à chaque création de session
+        if self.backend is not None and role != "system":
+            self.backend.append(self.session_id, role, content)
+
+    def _record(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
         if len(self.messages) > self.max_history:
             self.messages = self.messages[-self.max_history:]
+        self.prompt.add_turn(role, content)
 
     def get_context_window(self, window_size: int = 5) -> List[Dict[str, str]]:
         """
@@ -119,6 +260,10 @@ class ConversationHistory:
     def clear(self) -> None:
         """Efface l'historique des conversations."""
         self.messages = []
+        self.prompt.clear()
+        self.prompt.set_system("")
+        if self.backend is not None:
+            self.backend.clear(self.session_id)
         logger.info("Conversation history cleared")
 
 # Contexte initial pour orienter le modèle vers la théologie
@@ -143,54 +288,405 @@ Utilise un langage respectueux et accessible, tout en restant fidèle aux enseig
 # Instance globale de l'historique des conversations
 conversation_history = ConversationHistory()
 
-def initialize_chat():
-    """Initialise une nouvelle conversation avec le contexte système"""
-    global conversation_history
-    conversation_history.clear()
+# Stockage durable des sessions, partagé entre les workers
+session_backend = backend_from_env()
+if session_backend is not None:
+    atexit.register(session_backend.close)
+
+# Cache des réponses aux questions récurrentes
+answer_cache = AnswerCache.from_env()
+
+# Regroupement des questions identiques posées simultanément
+single_flight = SingleFlight(timeout=float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "60")))
+
+# Passages pertinents ajoutés aux questions (python retrieval.py build)
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Deadline, hedging, nouvelles tentatives et disjoncteur des appels au modèle
+upstream = UpstreamPolicy.from_env()
+
+# Modèle rapide pour les questions courtes et factuelles (GEMINI_FAST_MODEL)
+router = ModelRouter.from_env(lambda name: get_gemini_api().create_model(name))
+
+def initialize_chat(history: Optional[ConversationHistory] = None):
+    """
+    Initialise une nouvelle conversation avec le contexte système
+
+    Args:
+        history: Historique à réinitialiser (par défaut l'historique global)
+    """
+    if history is None:
+        history = conversation_history
+    history.clear()
     try:
-        chat = gemini_api.model.start_chat(history=[])
-        conversation_history.add_message("system", SYSTEM_CONTEXT)
+        chat = get_gemini_api().model.start_chat(history=[])
+        history.add_message("system", SYSTEM_CONTEXT)
         return chat
     except Exception as e:
         print(f"Erreur lors de l'initialisation du chat: {str(e)}")
         return None
 
-def get_bible_response(user_input: str, chat: Optional[any] = None) -> str:
+def new_conversation(session_id: Optional[str] = None) -> Tuple[ConversationHistory, Any]:
+    """
+    Crée l'état d'une nouvelle session de conversation.
+
+    Si un stockage durable est configuré, la fenêtre de contexte déjà
+    enregistrée pour cette session est rechargée.
+
+    Args:
+        session_id: Identifiant de la session
+
+    Returns:
+        Tuple (historique, chat) propre à la session
+    """
+    history = ConversationHistory()
+    chat = initialize_chat(history)
+    if session_backend is not None and session_id is not None:
+        try:
+            history.attach(session_backend, session_id)
+        except Exception as e:
+            logger.error(f"Failed to load session {session_id}: {str(e)}")
+    logger.debug(f"New conversation created for session {session_id}")
+    return history, chat
+
+def _error_message(error: Exception) -> str:
+    """Retourne le message d'excuse correspondant à une erreur de génération."""
+    logger.error(f"Erreur lors de la génération de la réponse: {str(error)}")
+    if isinstance(error, UpstreamError) or is_transient(error) or error_code(error) == 404:
+        return "Le service n'est pas disponible pour le moment. Veuillez réessayer plus tard."
+    return "Je suis désolé, j'ai rencontré une erreur. Pouvez-vous reformuler votre question ?"
+
+def _fallback_answer(user_input: str, prompt_key: Optional[str]) -> Optional[str]:
+    """
+    Réponse de repli lorsque le modèle est indisponible : la réponse en cache
+    à la même question dans le même contexte, ou à défaut posée sans contexte.
+    """
+    if not answer_cache.enabled:
+        return None
+    for key in (prompt_key, make_cache_key(user_input)):
+        cached = answer_cache.get(key) if key else None
+        if cached is not None:
+            UPSTREAM_EVENTS.inc("fallback")
+            return cached
+    return None
+
+def _prompt_key(history: ConversationHistory, user_input: str) -> Optional[str]:
+    """Clé de la question courante (déjà ajoutée à l'historique) dans son contexte."""
+    return make_cache_key(user_input, history.get_context_window()[:-1])
+
+def _prepare(history: ConversationHistory) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Construit le prompt de la dernière question de l'historique, précédée des
+    passages pertinents de l'index BM25 s'il a été construit.
+    """
+    with STAGE_SECONDS.time("prompt"):
+        contents, message = history.prompt.build()
+    if RETRIEVAL_ENABLED:
+        # NumPy n'est chargé qu'à la première question, pas au démarrage
+        from retrieval import ground_question
+        with STAGE_SECONDS.time("retrieval"):
+            message = ground_question(message, history.prompt.count_tokens)
+    PROMPT_TOKENS.observe(history.prompt.total_tokens + history.prompt.count_tokens(message))
+    return contents, message
+
+def _send(chat: Any, contents: List[Dict[str, Any]], message: str, stream: bool = False) -> Any:
+    """
+    Envoie une question au modèle.
+
+    L'historique du chat est remplacé par celui du PromptBuilder (instruction
+    système, résumé et échanges récents) : rien n'est envoyé deux fois, et une
+    tentative de couverture sur le même chat envoie exactement le même prompt.
+    """
+    chat.history = contents
+    start = time.perf_counter()
+    response = chat.send_message(message, generation_config={"temperature": 0.7}, stream=stream)
+    if stream:
+        return _timed_stream(response, start)
+    STAGE_SECONDS.observe(time.perf_counter() - start, "upstream")
+    return response
+
+def _timed_stream(response: Any, start: float) -> Iterator[Any]:
+    """Mesure l'appel amont d'une réponse en flux jusqu'au dernier fragment."""
+    try:
+        yield from response
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, "upstream")
+
+def _route(chat: Any, question: str) -> Tuple[str, Any]:
+    """
+    Choisit le modèle de la question. Le chat de la session sert au modèle
+    principal ; pour un autre modèle, un chat neuf reçoit le même prompt
+    (_send remplace l'historique du chat).
+
+    Returns:
+        Tuple (route, chat à utiliser)
+    """
+    route, _ = router.choose(question)
+    if route == PRIMARY:
+        return route, chat
+    return route, router.model(route).start_chat(history=[])
+
+@contextmanager
+def _observed(route: str) -> Iterator[None]:
+    """Mesure l'appel au modèle de la route ; un dépassement de deadline compte comme une latence."""
+    start = time.perf_counter()
+    try:
+        yield
+    except UpstreamTimeout:
+        router.observe(route, time.perf_counter() - start)
+        raise
+    router.observe(route, time.perf_counter() - start)
+
+def _generate(chat: Any, history: ConversationHistory, prompt_key: Optional[str], question: str) -> str:
+    """
+    Appelle le modèle, en partageant l'appel avec les requêtes identiques en cours.
+
+    Args:
+        chat: Objet chat de la session
+        history: Historique de la session, contenant déjà la question
+        prompt_key: Clé de regroupement (None pour un appel isolé)
+        question: Question posée, pour le choix du modèle
+
+    Returns:
+        Le texte de la réponse
+    """
+    def call() -> str:
+        contents, message = _prepare(history)
+        route, routed = _route(chat, question)
+        with _observed(route):
+            return upstream.call(lambda: _send(routed, contents, message).text)
+
+    if prompt_key is None:
+        return call()
+    return single_flight.do(prompt_key, call)
+
+def _local_answer(user_input: str, history: ConversationHistory,
+                  use_cache: bool) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Ajoute la question à l'historique et y répond sans le modèle si possible
+    (lecture d'un passage, réponse en cache).
+
+    Returns:
+        Tuple (réponse locale ou None, clé du prompt, clé du cache)
+    """
+    # Ajouter l'entrée de l'utilisateur à l'historique
+    history.sync()
+    history.add_message("user", user_input)
+    HISTORY_MESSAGES.observe(len(history.messages))
+
+    # Les simples demandes de lecture sont servies par l'index local
+    passage = answer_reference(user_input)
+    if passage is not None:
+        history.add_message("assistant", passage)
+        RESPONSE_CHARS.observe(len(passage), "verses")
+        return passage, None, None
+
+    prompt_key = _prompt_key(history, user_input)
+    cache_key = prompt_key if use_cache and answer_cache.enabled else None
+    cached = answer_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        history.add_message("assistant", cached)
+        RESPONSE_CHARS.observe(len(cached), "cache")
+        return cached, prompt_key, cache_key
+    return None, prompt_key, cache_key
+
+def _record_fallback(error: UpstreamError, user_input: str, history: ConversationHistory,
+                     prompt_key: Optional[str]) -> str:
+    """Répond avec la réponse de repli (modèle indisponible), ou relève l'erreur."""
+    fallback = _fallback_answer(user_input, prompt_key)
+    if fallback is None:
+        raise error
+    history.add_message("assistant", fallback)
+    RESPONSE_CHARS.observe(len(fallback), "fallback")
+    return fallback
+
+def _record_answer(history: ConversationHistory, response_text: str, cache_key: Optional[str]) -> None:
+    """Enregistre la réponse du modèle dans l'historique et le cache."""
+    RESPONSE_CHARS.observe(len(response_text), "model")
+    history.add_message("assistant", response_text)
+    if cache_key:
+        answer_cache.put(cache_key, response_text)
+
+async def _send_async(chat: Any, contents: List[Dict[str, Any]], message: str) -> Any:
+    """
+    Variante de _send par l'API asynchrone du SDK.
+
+    Un chat sans send_message_async (modèle de test) est appelé dans le
+    groupe de threads borné de la politique amont.
+    """
+    chat.history = contents
+    start = time.perf_counter()
+    send = getattr(chat, "send_message_async", None)
+    if asyncio.iscoroutinefunction(send):
+        response = await send(message, generation_config={"temperature": 0.7})
+    else:
+        response = await asyncio.get_running_loop().run_in_executor(
+            upstream.pool, in_context(lambda: chat.send_message(message, generation_config={"temperature": 0.7}))
+        )
+    STAGE_SECONDS.observe(time.perf_counter() - start, "upstream")
+    return response
+
+async def _generate_async(chat: Any, history: ConversationHistory, prompt_key: Optional[str],
+                          question: str) -> str:
+    """Variante de _generate : appel asynchrone, regroupé avec les requêtes identiques de la boucle."""
+    async def call() -> str:
+        contents, message = _prepare(history)
+        route, routed = _route(chat, question)
+
+        async def attempt() -> str:
+            return (await _send_async(routed, contents, message)).text
+
+        with _observed(route):
+            return await upstream.call_async(attempt)
+
+    if prompt_key is None:
+        return await call()
+    return await single_flight.do_async(prompt_key, call)
+
+def get_bible_response(user_input: str, chat: Optional[any] = None,
+                       history: Optional[ConversationHistory] = None,
+                       use_cache: bool = True, raise_errors: bool = False) -> str:
     """
     Obtient une réponse biblique en utilisant l'historique des conversations
     pour maintenir le contexte
+
+    Args:
+        user_input: Question de l'utilisateur
+        chat: Objet chat de la session
+        history: Historique de la session (par défaut l'historique global)
+        use_cache: Consulter et alimenter le cache des réponses
+        raise_errors: Propager les erreurs de génération au lieu de
+            retourner un message d'excuse
     """
+    if history is None:
+        history = conversation_history
     if not chat:
-        chat = initialize_chat()
+        chat = initialize_chat(history)
         if not chat:
+            if raise_errors:
+                raise RuntimeError("Le système de chat n'est pas initialisé")
             return "Désolé, je ne peux pas initialiser la conversation pour le moment."
     
     try:
-        # Ajouter l'entrée de l'utilisateur à l'historique
-        conversation_history.add_message("user", user_input)
-        
-        # Construire le prompt avec le contexte récent
-        context_window = conversation_history.get_context_window()
-        context_prompt = "\n".join([
-            f"{'Assistant' if msg['role'] == 'system' else msg['role'].capitalize()}: {msg['content']}"
-            for msg in context_window[:-1]  # Exclure le dernier message utilisateur
-        ])
-        
-        # Générer la réponse avec le contexte
-        response = chat.send_message(
-            f"{context_prompt}\n\nUser: {user_input}",
-            generation_config={"temperature": 0.7}
-        )
-        
-        # Sauvegarder la réponse dans l'historique
-        response_text = response.text if not gemini_api.is_mock else response.text
-        conversation_history.add_message("assistant", response_text)
-        
+        answer, prompt_key, cache_key = _local_answer(user_input, history, use_cache)
+        if answer is not None:
+            return answer
+
+        # Générer la réponse avec le contexte récent
+        try:
+            response_text = _generate(chat, history, prompt_key, user_input)
+        except UpstreamError as e:
+            return _record_fallback(e, user_input, history, prompt_key)
+        _record_answer(history, response_text, cache_key)
         return response_text
         
     except Exception as e:
-        error_msg = str(e)
-        print(f"Erreur lors de la génération de la réponse: {error_msg}")
-        if "404" in error_msg:
-            return "Le service n'est pas disponible pour le moment. Veuillez réessayer plus tard."
-        return "Je suis désolé, j'ai rencontré une erreur. Pouvez-vous reformuler votre question ?"
+        ERRORS.inc("generate", type(e).__name__)
+        if raise_errors:
+            raise
+        return _error_message(e)
+
+async def get_bible_response_async(user_input: str, chat: Any, history: ConversationHistory,
+                                   use_cache: bool = True, raise_errors: bool = False) -> str:
+    """
+    Variante de get_bible_response pour les vues asynchrones (ASGI).
+
+    L'appel au modèle passe par l'API asynchrone du SDK (send_message_async) :
+    l'attente de la réponse n'occupe aucun thread. Les étapes locales
+    (historique, index des versets, cache, prompt) restent synchrones.
+
+    Args:
+        user_input: Question de l'utilisateur
+        chat: Objet chat de la session
+        history: Historique de la session
+        use_cache: Consulter et alimenter le cache des réponses
+        raise_errors: Propager les erreurs de génération
+    """
+    if not chat:
+        if raise_errors:
+            raise RuntimeError("Le système de chat n'est pas initialisé")
+        return "Désolé, je ne peux pas initialiser la conversation pour le moment."
+
+    try:
+        answer, prompt_key, cache_key = _local_answer(user_input, history, use_cache)
+        if answer is not None:
+            return answer
+        try:
+            response_text = await _generate_async(chat, history, prompt_key, user_input)
+        except UpstreamError as e:
+            return _record_fallback(e, user_input, history, prompt_key)
+        _record_answer(history, response_text, cache_key)
+        return response_text
+
+    except Exception as e:
+        ERRORS.inc("generate", type(e).__name__)
+        if raise_errors:
+            raise
+        return _error_message(e)
+
+def stream_bible_response(user_input: str, chat: Optional[Any] = None,
+                          history: Optional[ConversationHistory] = None,
+                          use_cache: bool = True) -> Iterator[str]:
+    """
+    Variante de get_bible_response qui produit la réponse par fragments,
+    au fur et à mesure que le modèle les génère.
+
+    La réponse complète est ajoutée à l'historique une fois le flux terminé.
+
+    Args:
+        user_input: Question de l'utilisateur
+        chat: Objet chat de la session
+        history: Historique de la session (par défaut l'historique global)
+        use_cache: Consulter et alimenter le cache des réponses
+
+    Yields:
+        Les fragments de texte de la réponse
+    """
+    if history is None:
+        history = conversation_history
+    if not chat:
+        chat = initialize_chat(history)
+        if not chat:
+            yield "Désolé, je ne peux pas initialiser la conversation pour le moment."
+            return
+
+    parts: List[str] = []
+    cache_key = None
+    try:
+        answer, prompt_key, cache_key = _local_answer(user_input, history, use_cache)
+        if answer is not None:
+            yield answer
+            return
+
+        contents, message = _prepare(history)
+        route, routed = _route(chat, user_input)
+
+        def start() -> Tuple[Any, Iterator[Any]]:
+            # Les nouvelles tentatives ne valent que jusqu'au premier fragment
+            response = iter(_send(routed, contents, message, stream=True))
+            return next(response, None), response
+
+        try:
+            # Comme sans flux, la latence de la route couvre la réponse entière
+            with _observed(route):
+                first, response = upstream.call(start, hedge=False)
+                for chunk in itertools.chain([first] if first is not None else [], response):
+                    text = chunk.text
+                    if text:
+                        parts.append(text)
+                        yield text
+        except UpstreamError as e:
+            if parts:
+                raise
+            yield _record_fallback(e, user_input, history, prompt_key)
+            return
+    except Exception as e:
+        ERRORS.inc("generate", type(e).__name__)
+        if not parts:
+            yield _error_message(e)
+            return
+        logger.error(f"Stream interrupted after {len(parts)} chunks: {str(e)}")
+        cache_key = None  # Ne pas mettre en cache une réponse tronquée
+
+    if parts:
+        _record_answer(history, "".join(parts), cache_key)
@@ -0,0 +1,405 @@
+"""
+Livres de la Bible et analyse des références bibliques.
+
+Reconnaît les noms de livres en français et en anglais, ainsi que leurs
+abréviations usuelles (« Jn 3:16 », « 1 Co 13 », « Psalm 23 »), et les
+formes dictées par la reconnaissance vocale (« Jean chapitre 3 verset 16 »).
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Book(NamedTuple):
+    """Livre biblique (canon protestant, versification Louis Segond)."""
+    index: int
+    osis: str
+    name_fr: str
+    name_en: str
+    chapters: int
+
+
+class Reference(NamedTuple):
+    """
+    Référence biblique.
+
+    verse_start et verse_end valent None pour un chapitre entier.
+    """
+    book: Book
+    chapter: int
+    verse_start: Optional[int] = None
+    verse_end: Optional[int] = None
+
+    def label(self) -> str:
+        """Forme canonique française, par exemple « Jean 3:16-18 »."""
+        name = "Psaume" if self.book.osis == "Ps" else self.book.name_fr
+        text = f"{name} {self.chapter}"
+        if self.verse_start is not None:
+            text += f":{self.verse_start}"
+            if self.verse_end is not None and self.verse_end != self.verse_start:
+                text += f"-{self.verse_end}"
+        return text
+
+
+# (osis, nom français, nom anglais, nombre de chapitres, abréviations)
+# Les abréviations qui sont aussi des mots courants (« le », « la », « de »...) sont exclues.
+_BOOK_DATA: List[Tuple[str, str, str, int, Tuple[str, ...]]] = [
+    ("Gen", "Genèse", "Genesis", 50, ("gn", "ge", "gen")),
+    ("Exod", "Exode", "Exodus", 40, ("ex", "exo", "exod")),
+    ("Lev", "Lévitique", "Leviticus", 27, ("lv", "lev")),
+    ("Num", "Nombres", "Numbers", 36, ("nb", "no", "nom", "num")),
+    ("Deut", "Deutéronome", "Deuteronomy", 34, ("dt", "deut")),
+    ("Josh", "Josué", "Joshua", 24, ("jos", "josh")),
+    ("Judg", "Juges", "Judges", 21, ("jg", "jug", "judg")),
+    ("Ruth", "Ruth", "Ruth", 4, ("rt", "ru")),
+    ("1Sam", "1 Samuel", "1 Samuel", 31, ("1 s", "1 sa", "1 sam")),
+    ("2Sam", "2 Samuel", "2 Samuel", 24, ("2 s", "2 sa", "2 sam")),
+    ("1Kgs", "1 Rois", "1 Kings", 22, ("1 r", "1 ro", "1 kgs", "1 ki")),
+    ("2Kgs", "2 Rois", "2 Kings", 25, ("2 r", "2 ro", "2 kgs", "2 ki")),
+    ("1Chr", "1 Chroniques", "1 Chronicles", 29, ("1 ch", "1 chr", "1 chron")),
+    ("2Chr", "2 Chroniques", "2 Chronicles", 36, ("2 ch", "2 chr", "2 chron")),
+    ("Ezra", "Esdras", "Ezra", 10, ("esd", "ezr")),
+    ("Neh", "Néhémie", "Nehemiah", 13, ("neh",)),
+    ("Esth", "Esther", "Esther", 10, ("est", "esth")),
+    ("Job", "Job", "Job", 42, ("jb",)),
+    ("Ps", "Psaumes", "Psalms", 150, ("ps", "psa", "psaume", "psalm", "pss")),
+    ("Prov", "Proverbes", "Proverbs", 31, ("pr", "pro", "prov", "proverbe")),
+    ("Eccl", "Ecclésiaste", "Ecclesiastes", 12, ("ec", "ecc", "eccl", "qo", "qoh", "qohelet")),
+    ("Song", "Cantique des cantiques", "Song of Songs", 8,
+     ("ct", "cant", "cantique", "song", "song of solomon")),
+    ("Isa", "Ésaïe", "Isaiah", 66, ("es", "esa", "is", "isa", "isaie")),
+    ("Jer", "Jérémie", "Jeremiah", 52, ("jr", "jer")),
+    ("Lam", "Lamentations", "Lamentations", 5, ("lm", "lam")),
+    ("Ezek", "Ézéchiel", "Ezekiel", 48, ("ez", "eze", "ezek")),
+    ("Dan", "Daniel", "Daniel", 12, ("dn", "da", "dan")),
+    ("Hos", "Osée", "Hosea", 14, ("os", "hos")),
+    ("Joel", "Joël", "Joel", 3, ("jl", "joe")),
+    ("Amos", "Amos", "Amos", 9, ("am",)),
+    ("Obad", "Abdias", "Obadiah", 1, ("ab", "abd", "ob", "obad")),
+    ("Jonah", "Jonas", "Jonah", 4, ("jon",)),
+    ("Mic", "Michée", "Micah", 7, ("mi", "mic")),
+    ("Nah", "Nahum", "Nahum", 3, ("na", "nah")),
+    ("Hab", "Habacuc", "Habakkuk", 3, ("ha", "hab")),
+    ("Zeph", "Sophonie", "Zephaniah", 3, ("so", "soph", "zeph")),
+    ("Hag", "Aggée", "Haggai", 2, ("ag", "agg", "hag")),
+    ("Zech", "Zacharie", "Zechariah", 14, ("za", "zac", "zech")),
+    ("Mal", "Malachie", "Malachi", 4, ("ml", "mal")),
+    ("Matt", "Matthieu", "Matthew", 28, ("mt", "mat", "matt")),
+    ("Mark", "Marc", "Mark", 16, ("mc", "mk", "mar")),
+    ("Luke", "Luc", "Luke", 24, ("lc", "lk", "lu")),
+    ("John", "Jean", "John", 21, ("jn", "jean", "joh")),
+    ("Acts", "Actes", "Acts", 28, ("ac", "act", "actes des apotres")),
+    ("Rom", "Romains", "Romans", 16, ("rm", "ro", "rom")),
+    ("1Cor", "1 Corinthiens", "1 Corinthians", 16, ("1 co", "1 cor")),
+    ("2Cor", "2 Corinthiens", "2 Corinthians", 13, ("2 co", "2 cor")),
+    ("Gal", "Galates", "Galatians", 6, ("ga", "gal")),
+    ("Eph", "Éphésiens", "Ephesians", 6, ("ep", "eph")),
+    ("Phil", "Philippiens", "Philippians", 4, ("ph", "php", "phil")),
+    ("Col", "Colossiens", "Colossians", 4, ("col",)),
+    ("1Thess", "1 Thessaloniciens", "1 Thessalonians", 5, ("1 th", "1 thes", "1 thess")),
+    ("2Thess", "2 Thessaloniciens", "2 Thessalonians", 3, ("2 th", "2 thes", "2 thess")),
+    ("1Tim", "1 Timothée", "1 Timothy", 6, ("1 tm", "1 ti", "1 tim")),
+    ("2Tim", "2 Timothée", "2 Timothy", 4, ("2 tm", "2 ti", "2 tim")),
+    ("Titus", "Tite", "Titus", 3, ("tt", "tit")),
+    ("Phlm", "Philémon", "Philemon", 1, ("phm", "phlm", "philem")),
+    ("Heb", "Hébreux", "Hebrews", 13, ("he", "heb")),
+    ("Jas", "Jacques", "James", 5, ("jc", "jq", "jas")),
+    ("1Pet", "1 Pierre", "1 Peter", 5, ("1 p", "1 pi", "1 pe", "1 pet")),
+    ("2Pet", "2 Pierre", "2 Peter", 3, ("2 p", "2 pi", "2 pe", "2 pet")),
+    ("1John", "1 Jean", "1 John", 5, ("1 jn", "1 jean", "1 joh")),
+    ("2John", "2 Jean", "2 John", 1, ("2 jn", "2 joh")),
+    ("3John", "3 Jean", "3 John", 1, ("3 jn", "3 joh")),
+    ("Jude", "Jude", "Jude", 1, ("jud",)),
+    ("Rev", "Apocalypse", "Revelation", 22, ("ap", "apo", "apoc", "rev", "revelations")),
+]
+
+BOOKS: List[Book] = [
+    Book(index, osis, name_fr, name_en, chapters)
+    for index, (osis, name_fr, name_en, chapters, _) in enumerate(_BOOK_DATA)
+]
+
+# Nombre de versets de chaque chapitre, en versification Louis Segond (le titre
+# d'un psaume compte comme verset). Là où la numérotation anglaise (KJV) compte
+# davantage de versets, le plus grand nombre est retenu : une référence valable
+# dans l'une ou l'autre numérotation n'est pas rejetée.
+_VERSE_COUNTS: Dict[str, Tuple[int, ...]] = {
+    "Gen": (
+        31, 25, 24, 26, 32, 22, 24, 22, 29, 32, 32, 20, 18, 24, 21, 16, 27, 33, 38, 18, 34, 24, 20,
+        67, 34, 35, 46, 22, 35, 43, 55, 32, 20, 31, 29, 43, 36, 30, 23, 23, 57, 38, 34, 34, 28, 34,
+        31, 22, 33, 26,
+    ),
+    "Exod": (
+        22, 25, 22, 31, 23, 30, 25, 32, 35, 29, 10, 51, 22, 31, 27, 36, 16, 27, 25, 26, 36, 31, 33,
+        18, 40, 37, 21, 43, 46, 38, 18, 35, 23, 35, 35, 38, 29, 31, 43, 38,
+    ),
+    "Lev": (
+        17, 16, 17, 35, 19, 30, 38, 36, 24, 20, 47, 8, 59, 57, 33, 34, 16, 30, 37, 27, 24, 33, 44,
+        23, 55, 46, 34,
+    ),
+    "Num": (
+        54, 34, 51, 49, 31, 27, 89, 26, 23, 36, 35, 16, 33, 45, 41, 50, 13, 32, 22, 29, 35, 41, 30,
+        25, 18, 65, 23, 31, 40, 16, 54, 42, 56, 29, 34, 13,
+    ),
+    "Deut": (
+        46, 37, 29, 49, 33, 25, 26, 20, 29, 22, 32, 32, 18, 29, 23, 22, 20, 22, 21, 20, 23, 30, 25,
+        22, 19, 19, 26, 68, 29, 20, 30, 52, 29, 12,
+    ),
+    "Josh": (
+        18, 24, 17, 24, 15, 27, 26, 35, 27, 43, 23, 24, 33, 15, 63, 10, 18, 28, 51, 9, 45, 34, 16,
+        33,
+    ),
+    "Judg": (36, 23, 31, 24, 31, 40, 25, 35, 57, 18, 40, 15, 25, 20, 20, 31, 13, 31, 30, 48, 25),
+    "Ruth": (22, 23, 18, 22),
+    "1Sam": (
+        28, 36, 21, 22, 12, 21, 17, 22, 27, 27, 15, 25, 23, 52, 35, 23, 58, 30, 24, 42, 15, 23, 29,
+        22, 44, 25, 12, 25, 11, 31, 13,
+    ),
+    "2Sam": (
+        27, 32, 39, 12, 25, 23, 29, 18, 13, 19, 27, 31, 39, 33, 37, 23, 29, 33, 43, 26, 22, 51, 39,
+        25,
+    ),
+    "1Kgs": (
+        53, 46, 28, 34, 18, 38, 51, 66, 28, 29, 43, 33, 34, 31, 34, 34, 24, 46, 21, 43, 29, 53,
+    ),
+    "2Kgs": (
+        18, 25, 27, 44, 27, 33, 20, 29, 37, 36, 21, 21, 25, 29, 38, 20, 41, 37, 37, 21, 26, 20, 37,
+        20, 30,
+    ),
+    "1Chr": (
+        54, 55, 24, 43, 26, 81, 40, 40, 44, 14, 47, 40, 14, 17, 29, 43, 27, 17, 19, 8, 30, 19, 32,
+        31, 31, 32, 34, 21, 30,
+    ),
+    "2Chr": (
+        17, 18, 17, 22, 14, 42, 22, 18, 31, 19, 23, 16, 22, 15, 19, 14, 19, 34, 11, 37, 20, 12, 21,
+        27, 28, 23, 9, 27, 36, 27, 21, 33, 25, 33, 27, 23,
+    ),
+    "Ezra": (11, 70, 13, 24, 17, 22, 28, 36, 15, 44),
+    "Neh": (11, 20, 32, 23, 19, 19, 73, 18, 38, 39, 36, 47, 31),
+    "Esth": (22, 23, 15, 17, 14, 14, 10, 17, 32, 3),
+    "Job": (
+        22, 13, 26, 21, 27, 30, 21, 22, 35, 22, 20, 25, 28, 22, 35, 22, 16, 21, 29, 29, 34, 30, 17,
+        25, 6, 14, 23, 28, 25, 31, 40, 22, 33, 37, 16, 33, 24, 41, 30, 24, 34, 17,
+    ),
+    "Ps": (
+        6, 12, 9, 9, 13, 11, 18, 10, 21, 18, 7, 9, 6, 7, 5, 11, 15, 51, 15, 10, 14, 32, 6, 10, 22,
+        12, 14, 9, 11, 13, 25, 11, 22, 23, 28, 13, 40, 23, 14, 18, 14, 12, 5, 27, 18, 12, 10, 15,
+        21, 23, 21, 11, 7, 9, 24, 14, 12, 12, 18, 14, 9, 13, 12, 11, 14, 20, 8, 36, 37, 6, 24, 20,
+        28, 23, 11, 13, 21, 72, 13, 20, 17, 8, 19, 13, 14, 17, 7, 19, 53, 17, 16, 16, 5, 23, 11, 13,
+        12, 9, 9, 5, 8, 29, 22, 35, 45, 48, 43, 14, 31, 7, 10, 10, 9, 8, 18, 19, 2, 29, 176, 7, 8,
+        9, 4, 8, 5, 6, 5, 6, 8, 8, 3, 18, 3, 3, 21, 26, 9, 8, 24, 14, 10, 8, 12, 15, 21, 10, 20, 14,
+        9, 6,
+    ),
+    "Prov": (
+        33, 22, 35, 27, 23, 35, 27, 36, 18, 32, 31, 28, 25, 35, 33, 33, 28, 24, 29, 30, 31, 29, 35,
+        34, 28, 28, 27, 28, 27, 33, 31,
+    ),
+    "Eccl": (18, 26, 22, 16, 20, 12, 29, 17, 18, 20, 10, 14),
+    "Song": (17, 17, 11, 16, 16, 13, 13, 14),
+    "Isa": (
+        31, 22, 26, 6, 30, 13, 25, 22, 21, 34, 16, 6, 22, 32, 9, 14, 14, 7, 25, 6, 17, 25, 18, 23,
+        12, 21, 13, 29, 24, 33, 9, 20, 24, 17, 10, 22, 38, 22, 8, 31, 29, 25, 28, 28, 25, 13, 15,
+        22, 26, 11, 23, 15, 12, 17, 13, 12, 21, 14, 21, 22, 11, 12, 19, 12, 25, 24,
+    ),
+    "Jer": (
+        19, 37, 25, 31, 31, 30, 34, 22, 26, 25, 23, 17, 27, 22, 21, 21, 27, 23, 15, 18, 14, 30, 40,
+        10, 38, 24, 22, 17, 32, 24, 40, 44, 26, 22, 19, 32, 21, 28, 18, 16, 18, 22, 13, 30, 5, 28,
+        7, 47, 39, 46, 64, 34,
+    ),
+    "Lam": (22, 22, 66, 22, 22),
+    "Ezek": (
+        28, 10, 27, 17, 17, 14, 27, 18, 11, 22, 25, 28, 23, 23, 8, 63, 24, 32, 14, 49, 32, 31, 49,
+        27, 17, 21, 36, 26, 21, 26, 18, 32, 33, 31, 15, 38, 28, 23, 29, 49, 26, 20, 27, 31, 25, 24,
+        23, 35,
+    ),
+    "Dan": (21, 49, 30, 37, 31, 28, 28, 27, 27, 21, 45, 13),
+    "Hos": (11, 23, 5, 19, 15, 11, 16, 14, 17, 15, 12, 14, 16, 9),
+    "Joel": (20, 32, 21),
+    "Amos": (15, 16, 15, 13, 27, 14, 17, 14, 15),
+    "Obad": (21,),
+    "Jonah": (17, 10, 10, 11),
+    "Mic": (16, 13, 12, 13, 15, 16, 20),
+    "Nah": (15, 13, 19),
+    "Hab": (17, 20, 19),
+    "Zeph": (18, 15, 20),
+    "Hag": (15, 23),
+    "Zech": (21, 13, 10, 14, 11, 15, 14, 23, 17, 12, 17, 14, 9, 21),
+    "Mal": (14, 17, 18, 6),
+    "Matt": (
+        25, 23, 17, 25, 48, 34, 29, 34, 38, 42, 30, 50, 58, 36, 39, 28, 27, 35, 30, 34, 46, 46, 39,
+        51, 46, 75, 66, 20,
+    ),
+    "Mark": (45, 28, 35, 41, 43, 56, 37, 38, 50, 52, 33, 44, 37, 72, 47, 20),
+    "Luke": (
+        80, 52, 38, 44, 39, 49, 50, 56, 62, 42, 54, 59, 35, 35, 32, 31, 37, 43, 48, 47, 38, 71, 56,
+        53,
+    ),
+    "John": (51, 25, 36, 54, 47, 71, 53, 59, 41, 42, 57, 50, 38, 31, 27, 33, 26, 40, 42, 31, 25),
+    "Acts": (
+        26, 47, 26, 37, 42, 15, 60, 40, 43, 48, 30, 25, 52, 28, 41, 40, 34, 28, 41, 38, 40, 30, 35,
+        27, 27, 32, 44, 31,
+    ),
+    "Rom": (32, 29, 31, 25, 21, 23, 25, 39, 33, 21, 36, 21, 14, 23, 33, 27),
+    "1Cor": (31, 16, 23, 21, 13, 20, 40, 13, 27, 33, 34, 31, 13, 40, 58, 24),
+    "2Cor": (24, 17, 18, 18, 21, 18, 16, 24, 15, 18, 33, 21, 14),
+    "Gal": (24, 21, 29, 31, 26, 18),
+    "Eph": (23, 22, 21, 32, 33, 24),
+    "Phil": (30, 30, 21, 23),
+    "Col": (29, 23, 25, 18),
+    "1Thess": (10, 20, 13, 18, 28),
+    "2Thess": (12, 17, 18),
+    "1Tim": (20, 15, 16, 16, 25, 21),
+    "2Tim": (18, 26, 17, 22),
+    "Titus": (16, 15, 15),
+    "Phlm": (25,),
+    "Heb": (14, 18, 19, 16, 14, 20, 28, 13, 28, 39, 40, 29, 25),
+    "Jas": (27, 26, 18, 17, 20),
+    "1Pet": (25, 25, 22, 19, 14),
+    "2Pet": (21, 22, 18),
+    "1John": (10, 29, 24, 21, 21),
+    "2John": (13,),
+    "3John": (15,),
+    "Jude": (25,),
+    "Rev": (20, 29, 22, 11, 14, 17, 17, 13, 21, 11, 19, 18, 18, 20, 8, 21, 18, 24, 21, 15, 27, 21),
+}
+
+
+def verse_count(book: Book, chapter: int) -> int:
+    """Nombre de versets d'un chapitre, ou 0 si le livre n'a pas ce chapitre."""
+    counts = _VERSE_COUNTS[book.osis]
+    return counts[chapter - 1] if 1 <= chapter <= len(counts) else 0
+
+# Ordinaux dictés ou écrits devant les livres numérotés
+_ORDINALS = {
+    "1": "1", "i": "1", "1er": "1", "1re": "1", "1ere": "1", "premier": "1",
+    "premiere": "1", "first": "1", "1st": "1",
+    "2": "2", "ii": "2", "2e": "2", "2eme": "2", "deuxieme": "2", "second": "2",
+    "seconde": "2", "2nd": "2",
+    "3": "3", "iii": "3", "3e": "3", "3eme": "3", "troisieme": "3", "third": "3", "3rd": "3",
+}
+
+_NUMBERED_PREFIX = re.compile(r"^([123])\s*([a-z])")
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalise un nom de livre : minuscules, sans accents ni points,
+    ordinal réduit à un chiffre (« Première Jean » → « 1 jean »).
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"(\d)\s*([:.,\-–])\s*(?=\d)", r"\1\2", text)
+    # Les points et tirets entre chiffres (« 3.16 », « 4-7 ») sont conservés
+    tokens = re.sub(r"[.\-–](?!\d)|(?<!\d)[.\-–]|['’]", " ", text).split()
+    if tokens and tokens[0] in _ORDINALS and len(tokens) > 1:
+        tokens[0] = _ORDINALS[tokens[0]]
+    text = " ".join(tokens)
+    return _NUMBERED_PREFIX.sub(r"\1 \2", text)
+
+
+def _build_aliases() -> Dict[str, Book]:
+    aliases: Dict[str, Book] = {}
+    for book, (osis, name_fr, name_en, _, abbreviations) in zip(BOOKS, _BOOK_DATA):
+        for alias in (osis, name_fr, name_en) + abbreviations:
+            aliases.setdefault(normalize_name(alias), book)
+    return aliases
+
+
+# Tous les noms et abréviations normalisés, vers leur livre
+BOOK_ALIASES: Dict[str, Book] = _build_aliases()
+_MAX_ALIAS_WORDS = max(len(alias.split()) for alias in BOOK_ALIASES)
+
+
+def lookup_book(name: str) -> Optional[Book]:
+    """
+    Retrouve un livre à partir de son nom ou d'une abréviation.
+
+    Args:
+        name: Nom français ou anglais, abréviation, avec ou sans accents
+
+    Returns:
+        Le livre, ou None s'il est inconnu
+    """
+    return BOOK_ALIASES.get(normalize_name(name))
+
+
+# Formes dictées : « chapitre 3 verset 16 à 18 »
+_SPOKEN_FORMS = [
+    (re.compile(r"\b(?:chapitres?|chapters?|chap|ch)\s+(\d+)"), r"\1"),
+    (re.compile(r"(\d+)\s*(?:,\s*)?\b(?:versets?|verses?|vv?)\s+(\d+)"), r"\1:\2"),
+    (re.compile(r"(\d+)\s+(?:a|au|jusqu au|to|through|thru)\s+(\d+)"), r"\1-\2"),
+]
+_CHAPTER_VERSE = re.compile(r"^(\d+)(?:\s*[:.,]\s*(\d+)(?:\s*[-–]\s*(\d+))?)?$")
+
+
+def _parse_location(book: Book, text: str) -> Optional[Reference]:
+    match = _CHAPTER_VERSE.match(text)
+    if not match:
+        return None
+    chapter, verse_start, verse_end = (int(group) if group else None for group in match.groups())
+    if book.chapters == 1 and verse_start is None:
+        # « Jude 3 » désigne le verset 3 du chapitre unique
+        chapter, verse_start = 1, chapter
+    if chapter == 0 or verse_start == 0:
+        return None
+    if verse_start is not None and verse_end is not None and verse_end < verse_start:
+        return None
+    return Reference(book, chapter, verse_start, verse_end)
+
+
+def parse_reference(text: str) -> Optional[Reference]:
+    """
+    Analyse une référence complète (« Jean 3:16 », « Ps 23 », « 1 Co 13:4-7 »).
+
+    Le texte ne doit contenir que la référence. La validité du chapitre et
+    des versets n'est pas vérifiée ici.
+
+    Args:
+        text: Référence écrite ou dictée
+
+    Returns:
+        La référence, ou None si le texte n'en est pas une
+    """
+    normalized = normalize_name(text)
+    for pattern, replacement in _SPOKEN_FORMS:
+        normalized = pattern.sub(replacement, normalized)
+    tokens = normalized.split()
+    for size in range(min(_MAX_ALIAS_WORDS, len(tokens) - 1), 0, -1):
+        book = BOOK_ALIASES.get(" ".join(tokens[:size]))
+        if book is not None:
+            return _parse_location(book, " ".join(tokens[size:]))
+    return None
+
+
+# Formules de demande de lecture, retirées avant l'analyse
+_REQUEST_PREFIX = re.compile(
+    r"^(?:(?:est ce que |pourrais tu |peux tu |pouvez vous |pourriez vous |can you |could you |please )?"
+    r"(?:lis moi|lisez moi|lis|lisez|lire|relis|read me|read|cite moi|cite|citer|"
+    r"recite|affiche|montre moi|donne moi|show me|quote)\s+)?"
+    r"(?:le passage |le verset |les versets |le chapitre |le livre |le |la |les |l |the )?"
+    r"(?:(?:de |du |d |of )(?:la |l )?)?"
+)
+_DIGIT = re.compile(r"\d")
+_REQUEST_SUFFIX = re.compile(
+    r"\s+(?:s il (?:te|vous) plait|stp|svp|please)$"
+)
+
+
+def parse_reference_request(text: str) -> Optional[Reference]:
+    """
+    Reconnaît une demande de lecture pure, comme « lis-moi Jean 3:16 »
+    ou « Psaume 23 ».
+
+    Args:
+        text: Transcription de la demande
+
+    Returns:
+        La référence demandée, ou None si la demande contient autre chose
+        qu'une référence (elle relève alors du modèle)
+    """
+    if not isinstance(text, str) or not _DIGIT.search(text):
+        return None  # une référence contient toujours un numéro de chapitre
+    cleaned = normalize_name(text.strip().rstrip("?!. "))
+    cleaned = _REQUEST_SUFFIX.sub("", cleaned)
+    cleaned = _REQUEST_PREFIX.sub("", cleaned, count=1)
+    return parse_reference(cleaned) if cleaned else None
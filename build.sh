@@ -20,6 +20,14 @@ python -m pip install --upgrade pip
 pip install wheel setuptools
 pip install -r requirements.txt
 
+# Fichiers statiques minifiés, avec empreinte et précompressés (static/build)
+python assets.py build
+
+# Index BM25 des passages, si l'index des versets est présent
+if [ -f data/bible.idx ]; then
+    python retrieval.py build data/bible.idx data/bm25
+fi
+
 # Configuration d'espeak
 ln -s /usr/lib/x86_64-linux-gnu/libespeak.so.1 /usr/lib/x86_64-linux-gnu/libespeak.so
 
@@ -0,0 +1,181 @@
+"""
+Extraction et vérification des références bibliques citées dans les réponses.
+
+Le SYSTEM_CONTEXT exige une référence dans chaque réponse ; ce module les
+retrouve dans le texte produit par le modèle, les normalise sous leur forme
+canonique (« Jean 3:16 ») et vérifie chapitres et versets contre la table de
+bible_refs (ou l'index local des versets, s'il est construit).
+
+L'extraction doit rester sur le chemin critique de chaque requête. Plutôt que
+de tester chaque position du texte, on repère les numéros (rares dans une
+réponse) avec une expression régulière précompilée, puis on remonte vers la
+gauche dans un trie des noms de livres inversés : le coût dépend du nombre de
+numéros, pas de la longueur de la réponse.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from bible_refs import BOOKS, Book, Reference, _BOOK_DATA, normalize_name, verse_count
+
+
+def _build_fold_table() -> Dict[int, str]:
+    """Table de traduction caractère pour caractère : minuscules sans accents."""
+    table = {}
+    for code in range(0x41, 0x250):
+        char = chr(code)
+        folded = unicodedata.normalize("NFKD", char.lower())
+        folded = "".join(c for c in folded if not unicodedata.combining(c))
+        if len(folded) == 1 and folded != char:
+            table[code] = folded
+    table[ord("’")] = "'"
+    return table
+
+
+_FOLD = _build_fold_table()
+
+# Un nom complet peut introduire un chapitre seul (« Psaume 23 ») ; une
+# abréviation courte doit être suivie de chapitre:verset pour éviter les faux
+# positifs (« il est 5 heures »).
+_STRONG_ALIAS_LENGTH = 5
+
+
+class _Node:
+    __slots__ = ("children", "book", "strong")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.book: Optional[Book] = None
+        self.strong = False
+
+
+def _build_reverse_trie() -> _Node:
+    root = _Node()
+    for book, (osis, name_fr, name_en, _, abbreviations) in zip(BOOKS, _BOOK_DATA):
+        full_names = {normalize_name(name_fr), normalize_name(name_en)}
+        for alias in {normalize_name(a) for a in (osis, name_fr, name_en) + abbreviations}:
+            variants = {alias}
+            if alias[:2] in ("1 ", "2 ", "3 "):
+                variants.add(alias.replace(" ", "", 1))  # « 1Jean »
+            for variant in variants:
+                node = root
+                for char in reversed(variant):
+                    node = node.children.setdefault(char, _Node())
+                if node.book is None:
+                    node.book = book
+                node.strong = node.strong or alias in full_names or len(alias) >= _STRONG_ALIAS_LENGTH
+    return root
+
+
+# Construit à la première extraction plutôt qu'à l'import (démarrage à froid)
+_TRIE: Optional[_Node] = None
+
+# Chapitre, puis éventuellement :verset et -verset de fin
+# (motif commençant par une classe de chiffres simple, que le moteur
+# d'expressions régulières parcourt rapidement)
+_LOCATION = re.compile(
+    r"([0-9]{1,3})(?:(?:\s?:\s?|[.,])([0-9]{1,3})(?:\s?[-–]\s?([0-9]{1,3}))?)?(?![0-9\w])"
+)
+
+# Longueur maximale d'un nom de livre et des espaces qui le séparent du chapitre
+_BOOK_WINDOW = 40
+
+
+def _match_book(folded: str, end: int) -> Optional[Tuple[Book, int, bool]]:
+    """
+    Cherche le plus long nom de livre se terminant juste avant `end`.
+
+    Returns:
+        (livre, position de début, nom complet ?) ou None
+    """
+    j = end - 1
+    while j >= 0 and folded[j] in " \t ":
+        j -= 1
+    if j >= 0 and folded[j] == ".":  # abréviation pointée (« Jn. 3:16 »)
+        j -= 1
+    global _TRIE
+    if _TRIE is None:
+        _TRIE = _build_reverse_trie()
+    node = _TRIE
+    best = None
+    k = j
+    while k >= 0:
+        char = folded[k]
+        if char in " \t ":
+            char = " "
+        node = node.children.get(char)
+        if node is None:
+            break
+        k -= 1
+        if node.book is not None and (k < 0 or not folded[k].isalnum()):
+            best = (node.book, k + 1, node.strong)
+    return best
+
+
+def _verse_counts(store: Any, book: Book, chapter: int) -> int:
+    # L'index, quand il contient le livre, fait foi pour le texte qu'il sert
+    if store is None or store.chapter_count(book.index) == 0:
+        return verse_count(book, chapter)
+    return store.verse_count(book.index, chapter)
+
+
+def extract_citations(text: str, store: Any = None) -> List[Dict[str, Any]]:
+    """
+    Extrait, normalise et vérifie les références bibliques d'une réponse.
+
+    Args:
+        text: Réponse du modèle
+        store: Index des versets (verse_store.VerseStore) dont les nombres de
+            versets priment sur ceux de la table intégrée
+
+    Returns:
+        Liste de citations, dans l'ordre d'apparition et sans doublon. Chaque
+        citation contient `reference` (forme canonique), `book` (code OSIS),
+        `chapter`, `verse_start`, `verse_end`, `text` (extrait d'origine),
+        `valid` et `verses_checked`
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    citations: List[Dict[str, Any]] = []
+    seen = set()
+
+    for match in _LOCATION.finditer(text):
+        position = match.start()
+        if position and (text[position - 1].isalnum() or text[position - 1] in ":.,_"):
+            continue
+        # Seule la fenêtre précédant le numéro est normalisée
+        window_start = max(0, position - _BOOK_WINDOW)
+        found = _match_book(text[window_start:position].translate(_FOLD), position - window_start)
+        if found is None:
+            continue
+        book, start, strong = found
+        start += window_start
+        chapter, verse_start, verse_end = (int(g) if g else None for g in match.groups())
+        if verse_start is None and not strong:
+            continue
+        if book.chapters == 1 and verse_start is None:
+            chapter, verse_start = 1, chapter
+        reference = Reference(book, chapter, verse_start, verse_end)
+        label = reference.label()
+        if label in seen:
+            continue
+        seen.add(label)
+
+        valid = 1 <= chapter <= book.chapters and (
+            verse_start is None or verse_start >= 1 and (verse_end is None or verse_end >= verse_start)
+        )
+        verses = _verse_counts(store, book, chapter) if valid else None
+        if verses is not None and verse_start is not None:
+            valid = (verse_end or verse_start) <= verses
+        citations.append({
+            "reference": label,
+            "book": book.osis,
+            "chapter": chapter,
+            "verse_start": verse_start,
+            "verse_end": verse_end,
+            "text": text[start:match.end()],
+            "valid": valid,
+            "verses_checked": verses is not None,
+        })
+    return citations
@@ -0,0 +1,12 @@
+"""
+Environnement commun des tests, fixé avant l'import des modules de l'application.
+
+Aucun test n'appelle l'API Gemini (modèle de substitution ou mocks), et le
+limiteur de débit SQLite, partagé entre processus, ne doit pas refuser des
+requêtes d'un test à l'autre.
+"""
+
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
@@ -0,0 +1,260 @@
+"""
+Modèle Gemini de substitution, local et déterministe.
+
+Reproduit l'interface utilisée par l'application (GenerativeModel.start_chat,
+ChatSession.history, ChatSession.send_message avec ou sans flux,
+ChatSession.send_message_async) sans appel réseau. Chaque requête est
+enregistrée avec sa taille en tokens, ce qui permet de mesurer les prompts
+envoyés et de tester l'application hors ligne.
+
+Pour les tests de charge, le modèle peut simuler la latence du service :
+délai avant le premier fragment et entre fragments tirés de distributions
+configurables, et une proportion d'erreurs. L'application l'utilise à la
+place du SDK lorsque GEMINI_FAKE=1 (voir FakeGenerativeModel.from_env).
+
+Distributions (en secondes) :
+
+    const:0.5           valeur fixe
+    uniform:0.2,1.0     uniforme entre deux bornes
+    normal:0.8,0.2      moyenne, écart type (tronquée à 0)
+    lognormal:0.8,0.5   médiane, sigma
+    exp:0.5             exponentielle de moyenne donnée
+"""
+
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from prompt_builder import estimate_tokens
+
+DEFAULT_ANSWER = (
+    "Dieu a tant aimé le monde qu'il a donné son Fils unique (Jean 3:16). "
+    "Cette parole nous rappelle que l'amour de Dieu précède toute chose. "
+    "Dans la prière, confions-lui nos journées."
+)
+
+
+class LatencyDistribution:
+    """Distribution de délais, décrite par une spécification `nom:paramètres`."""
+
+    _KINDS = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, kind: str = "const", *params: float):
+        if kind not in self._KINDS or len(params) != self._KINDS[kind]:
+            raise ValueError(f"Invalid latency distribution: {kind}{list(params)}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Analyse une spécification (« lognormal:0.8,0.5 », « 0.2 »...).
+
+        Raises:
+            ValueError: Si la spécification est invalide
+        """
+        kind, _, params = spec.strip().partition(":")
+        if not params:
+            kind, params = "const", kind
+        return cls(kind, *(float(p) for p in params.split(",")))
+
+    def sample(self, rng: random.Random) -> float:
+        """Tire un délai, en secondes (jamais négatif)."""
+        a = self.params[0]
+        if self.kind == "const":
+            return max(0.0, a)
+        if self.kind == "uniform":
+            return rng.uniform(a, self.params[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(a, self.params[1]))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(a), self.params[1]) if a > 0 else 0.0
+        return rng.expovariate(1 / a) if a > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+NO_DELAY = LatencyDistribution("const", 0.0)
+
+
+class FakeModelError(RuntimeError):
+    """Erreur simulée du service (message et code calqués sur les erreurs de l'API)."""
+
+    def __init__(self, message: str, code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+def _content_text(content: Any) -> str:
+    """Texte d'un contenu au format de l'API (dict, chaîne ou objet Content)."""
+    if isinstance(content, str):
+        return content
+    parts = content["parts"] if isinstance(content, dict) else getattr(content, "parts", [])
+    return "".join(part if isinstance(part, str) else getattr(part, "text", "") for part in parts)
+
+
+def _content_role(content: Any) -> str:
+    if isinstance(content, dict):
+        return content.get("role", "user")
+    return getattr(content, "role", "user") or "user"
+
+
+class FakeResponse:
+    """Réponse complète ou fragment de réponse en flux."""
+
+    def __init__(self, text: str, chunks: Optional[List[str]] = None,
+                 delays: Optional[List[float]] = None):
+        self.text = text
+        self._chunks = chunks
+        self._delays = delays
+
+    def __iter__(self) -> Iterator["FakeResponse"]:
+        chunks = self._chunks if self._chunks is not None else [self.text]
+        for i, chunk in enumerate(chunks):
+            if self._delays and self._delays[i] > 0:
+                time.sleep(self._delays[i])
+            yield FakeResponse(chunk)
+
+
+class FakeChatSession:
+    """Session de chat compatible avec google.generativeai.ChatSession."""
+
+    def __init__(self, model: "FakeGenerativeModel", history: Optional[List[Any]] = None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content: Any, *, generation_config: Any = None,
+                     stream: bool = False, **kwargs) -> FakeResponse:
+        contents = self.history + [{"role": "user", "parts": [_content_text(content)]}]
+        text = self.model.generate(contents)
+        self.history = contents + [{"role": "model", "parts": [text]}]
+        chunks = self.model.split_chunks(text)
+        delays = self.model.chunk_delays(len(chunks))
+        if stream:
+            return FakeResponse(text, chunks, delays)
+        # Sans flux, l'appel rend la main une fois la réponse entièrement générée
+        if sum(delays) > 0:
+            time.sleep(sum(delays))
+        return FakeResponse(text)
+
+    async def send_message_async(self, content: Any, *, generation_config: Any = None,
+                                 **kwargs) -> FakeResponse:
+        """Variante asynchrone (sans flux) : le délai simulé ne bloque pas la boucle."""
+        contents = self.history + [{"role": "user", "parts": [_content_text(content)]}]
+        text = self.model.generate(contents)
+        self.history = contents + [{"role": "model", "parts": [text]}]
+        delay = sum(self.model.chunk_delays(len(self.model.split_chunks(text))))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return FakeResponse(text)
+
+
+class FakeGenerativeModel:
+    """
+    Modèle de substitution.
+
+    Attributes:
+        requests (List[Dict]): Requêtes reçues (nombre de contenus et de tokens)
+    """
+
+    def __init__(self, answer: Callable[[str], str] = lambda question: DEFAULT_ANSWER,
+                 count_tokens: Callable[[str], int] = estimate_tokens,
+                 chunk_size: int = 40,
+                 first_chunk_latency: LatencyDistribution = NO_DELAY,
+                 chunk_interval: LatencyDistribution = NO_DELAY,
+                 error_rate: float = 0.0,
+                 error_code: int = 503,
+                 seed: Optional[int] = None,
+                 max_records: Optional[int] = None,
+                 answer_chars: Optional[LatencyDistribution] = None):
+        """
+        Args:
+            answer: Fonction produisant la réponse à partir de la question
+            count_tokens: Fonction de comptage des tokens du prompt
+            chunk_size: Taille des fragments en mode flux, en caractères
+            first_chunk_latency: Délai avant le premier fragment
+            chunk_interval: Délai entre deux fragments
+            error_rate: Proportion de requêtes en erreur (entre 0 et 1)
+            error_code: Code HTTP des erreurs simulées (503 : transitoire)
+            seed: Graine du tirage des délais et des erreurs
+            max_records: Nombre de requêtes conservées (toutes par défaut)
+            answer_chars: Longueur des réponses, en caractères (réponse
+                répétée ou tronquée ; telle quelle par défaut)
+        """
+        self.answer = answer
+        self.count_tokens = count_tokens
+        self.chunk_size = chunk_size
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_interval = chunk_interval
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.answer_chars = answer_chars
+        self.requests: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, latency_env: str = "GEMINI_FAKE_LATENCY") -> "FakeGenerativeModel":
+        """
+        Crée un modèle de substitution configuré par les variables GEMINI_FAKE_*.
+
+        Args:
+            latency_env: Variable du délai avant le premier fragment
+                (GEMINI_FAKE_FAST_LATENCY pour le modèle rapide) ; à défaut,
+                GEMINI_FAKE_LATENCY
+        """
+        seed = os.getenv("GEMINI_FAKE_SEED")
+        latency = os.getenv(latency_env) or os.getenv("GEMINI_FAKE_LATENCY", "0")
+        answer_chars = os.getenv("GEMINI_FAKE_ANSWER_CHARS")
+        return cls(
+            chunk_size=int(os.getenv("GEMINI_FAKE_CHUNK_SIZE", "40")),
+            first_chunk_latency=LatencyDistribution.parse(latency),
+            chunk_interval=LatencyDistribution.parse(os.getenv("GEMINI_FAKE_CHUNK_INTERVAL", "0")),
+            error_rate=float(os.getenv("GEMINI_FAKE_ERROR_RATE", "0")),
+            error_code=int(os.getenv("GEMINI_FAKE_ERROR_CODE", "503")),
+            seed=int(seed) if seed else None,
+            max_records=1000,
+            answer_chars=LatencyDistribution.parse(answer_chars) if answer_chars else None,
+        )
+
+    def start_chat(self, history: Optional[List[Any]] = None) -> FakeChatSession:
+        return FakeChatSession(self, history)
+
+    def generate(self, contents: List[Any]) -> str:
+        """Produit la réponse à la dernière question et enregistre la requête."""
+        texts = [_content_text(content) for content in contents]
+        with self._lock:
+            self.requests.append({
+                "contents": len(contents),
+                "roles": [_content_role(content) for content in contents],
+                "prompt_tokens": sum(self.count_tokens(text) for text in texts),
+            })
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            length = round(self.answer_chars.sample(self._rng)) if self.answer_chars is not None else None
+        if failed:
+            raise FakeModelError(f"{self.error_code} Simulated upstream error", self.error_code)
+        answer = self.answer(texts[-1])
+        if length is None or not answer:
+            return answer
+        return " ".join([answer] * (length // (len(answer) + 1) + 1))[:max(1, length)]
+
+    def split_chunks(self, text: str) -> List[str]:
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def chunk_delays(self, count: int) -> List[float]:
+        """Délais simulés avant chacun des `count` fragments d'une réponse."""
+        with self._lock:
+            return [self.first_chunk_latency.sample(self._rng)] + [
+                self.chunk_interval.sample(self._rng) for _ in range(count - 1)
+            ]
+
+    @property
+    def prompt_tokens(self) -> List[int]:
+        """Taille en tokens de chaque prompt reçu."""
+        return [request["prompt_tokens"] for request in self.requests]
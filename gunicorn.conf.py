@@ -0,0 +1,24 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis le dossier courant).
+
+Les workers partagent leurs métriques par des instantanés écrits dans
+METRICS_DIR (voir metrics.py). Le dossier est fixé ici, avant le fork des
+workers, et vidé à chaque démarrage du serveur. Le sel d'anonymisation du
+journal de trafic (traffic.py) est lui aussi tiré avant le fork, pour que
+tous les workers anonymisent une session de la même façon.
+"""
+
+import os
+import secrets
+import tempfile
+
+os.environ.setdefault(
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "assistant-biblique", f"metrics-{os.getpid()}"),
+)
+os.environ.setdefault("TRAFFIC_CAPTURE_SALT", secrets.token_hex(16))
+
+
+def on_starting(server):
+    from metrics import reset_directory
+    reset_directory(os.environ["METRICS_DIR"])
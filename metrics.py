@@ -0,0 +1,377 @@
+"""
+Métriques au format texte Prometheus, agrégées entre les workers.
+
+L'enregistrement doit rester assez bon marché pour être actif sur chaque
+requête :
+
+- chaque thread écrit dans sa propre partition (shard), sans verrou ; le
+  verrou du registre n'est pris qu'à la création d'une partition ;
+- les partitions sont fusionnées au moment de la collecte ;
+- les partitions des threads terminés sont reportées dans une partition
+  « retraitée » pour que leurs valeurs ne soient pas perdues.
+
+Avec plusieurs processus (workers gunicorn), chaque processus écrit
+périodiquement un instantané de ses valeurs dans METRICS_DIR ; la collecte
+fusionne les instantanés de tous les processus. Toutes les métriques sont
+additives (compteurs et histogrammes), ce qui rend la fusion exacte, au délai
+d'écriture près (METRICS_FLUSH_SECONDS). Sans METRICS_DIR, seules les valeurs
+du processus courant sont exposées.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from logging import getLogger
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tracing import current_trace
+
+logger = getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+CHAR_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+MESSAGE_BUCKETS = (1, 2, 4, 6, 8, 10, 15, 20, 50)
+
+# Clé d'une série : (nom de la métrique, valeurs des étiquettes)
+_SeriesKey = Tuple[str, Tuple[str, ...]]
+
+
+class _Shard:
+    """Valeurs écrites par un seul thread."""
+
+    __slots__ = ("values", "thread")
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.values: Dict[_SeriesKey, Any] = {}
+        self.thread = thread
+
+
+def _merge(target: Dict[_SeriesKey, Any], values: Dict[_SeriesKey, Any]) -> None:
+    for key, value in list(values.items()):
+        if isinstance(value, list):
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    current[i] += v
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+class _Metric:
+    """Métrique déclarée (nom, aide, étiquettes)."""
+
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str,
+                 labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+
+class Counter(_Metric):
+    """Compteur monotone."""
+
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Incrémente la série correspondant aux valeurs d'étiquettes données."""
+        values = self.registry._shard().values
+        key = (self.name, label_values)
+        values[key] = values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Histogramme à seaux fixes."""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, documentation: str,
+                 labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS,
+                 spans: bool = False):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Durées reportées aussi comme intervalles de la trace de la requête
+        self.spans = spans
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Enregistre une observation.
+
+        La série est une liste : un compte par seau (non cumulé), le seau +Inf,
+        puis la somme et le nombre d'observations.
+        """
+        values = self.registry._shard().values
+        key = (self.name, label_values)
+        series = values.get(key)
+        if series is None:
+            series = values[key] = [0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+        if self.spans:
+            trace = current_trace.get()
+            if trace is not None:
+                trace.add(label_values[0] if label_values else self.name, value)
+
+    def time(self, *label_values: str) -> "_Timer":
+        """Mesure la durée d'un bloc `with`, en secondes."""
+        return _Timer(self, label_values)
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class Registry:
+    """
+    Ensemble des métriques d'un processus.
+
+    Attributes:
+        directory (str): Dossier des instantanés partagés entre processus (ou None)
+        flush_interval (float): Intervalle d'écriture de l'instantané, en secondes
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self._flusher_pid = 0
+
+    @classmethod
+    def from_env(cls) -> "Registry":
+        """Crée un registre configuré par METRICS_DIR et METRICS_FLUSH_SECONDS."""
+        return cls(os.getenv("METRICS_DIR") or None,
+                   float(os.getenv("METRICS_FLUSH_SECONDS", "1")))
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        """Déclare un compteur."""
+        return self._register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS, spans: bool = False) -> Histogram:
+        """Déclare un histogramme (spans : durées reportées dans les traces, voir tracing.py)."""
+        return self._register(Histogram(self, name, documentation, labels, buckets, spans))
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def snapshot(self) -> Dict[_SeriesKey, Any]:
+        """Fusionne les valeurs de toutes les partitions du processus."""
+        with self._lock:
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    _merge(self._retired.values, shard.values)
+            self._shards = alive
+            merged: Dict[_SeriesKey, Any] = {}
+            _merge(merged, self._retired.values)
+            for shard in alive:
+                _merge(merged, shard.values)
+        return merged
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        """Écrit l'instantané du processus dans le dossier partagé."""
+        if not self.directory:
+            return
+        series = [[name, list(labels), value] for (name, labels), value in self.snapshot().items()]
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(series, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write metrics snapshot: {str(e)}")
+
+    def ensure_flusher(self) -> None:
+        """Démarre, une fois par processus, l'écriture périodique de l'instantané."""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def collect(self) -> Dict[_SeriesKey, Any]:
+        """
+        Valeurs agrégées de tous les processus (ou du seul processus courant).
+        """
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged: Dict[_SeriesKey, Any] = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return self.snapshot()
+        for name in names:
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    series = json.load(f)
+            except (OSError, ValueError):
+                continue  # instantané en cours de remplacement ou illisible
+            _merge(merged, {(metric, tuple(labels)): value for metric, labels, value in series})
+        return merged
+
+    def render(self) -> str:
+        """Expose les métriques au format texte Prometheus (version 0.0.4)."""
+        collected = self.collect()
+        by_metric: Dict[str, List[Tuple[Tuple[str, ...], Any]]] = {}
+        for (name, labels), value in collected.items():
+            by_metric.setdefault(name, []).append((labels, value))
+
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(by_metric.get(name, [])):
+                pairs = list(zip(metric.labels, labels))
+                if isinstance(metric, Histogram):
+                    lines.extend(_render_histogram(name, pairs, metric.buckets, value))
+                else:
+                    lines.append(f"{name}{_label_text(pairs)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Efface les valeurs du processus (tests)."""
+        with self._lock:
+            for shard in self._shards:
+                shard.values.clear()
+            self._retired.values.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(pairs: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs)
+    return f"{{{text}}}" if text else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _render_histogram(name: str, pairs: List[Tuple[str, str]], buckets: Sequence[float],
+                      series: List[float]) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ["+Inf"], series[:-2]):
+        cumulative += count
+        le = bound if bound == "+Inf" else _number(bound)
+        lines.append(f"{name}_bucket{_label_text(pairs + [('le', le)])} {_number(cumulative)}")
+    lines.append(f"{name}_sum{_label_text(pairs)} {_number(series[-2])}")
+    lines.append(f"{name}_count{_label_text(pairs)} {_number(series[-1])}")
+    return lines
+
+
+def reset_directory(directory: str) -> None:
+    """Supprime les instantanés d'une exécution précédente (au démarrage du serveur)."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics-"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# Registre et métriques de l'application
+REGISTRY = Registry.from_env()
+
+REQUESTS = REGISTRY.counter(
+    "bible_requests_total", "Requêtes HTTP traitées", ("endpoint", "method", "status"))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "bible_request_duration_seconds",
+    "Durée des requêtes HTTP (jusqu'à l'envoi des en-têtes pour les flux)", ("endpoint",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "bible_stage_duration_seconds",
+    "Durée de chaque étape du traitement (validation, prompt, upstream, citations, serialization)",
+    ("stage",), spans=True)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "bible_prompt_tokens", "Taille estimée des prompts envoyés au modèle, en tokens",
+    buckets=TOKEN_BUCKETS)
+RESPONSE_CHARS = REGISTRY.histogram(
+    "bible_response_chars", "Taille des réponses, en caractères", ("source",), buckets=CHAR_BUCKETS)
+HISTORY_MESSAGES = REGISTRY.histogram(
+    "bible_session_history_messages", "Messages dans l'historique de la session à chaque question",
+    buckets=MESSAGE_BUCKETS)
+MOCK_FALLBACKS = REGISTRY.counter(
+    "bible_mock_fallback_total", "Activations du modèle de secours (mock) par GeminiAPI.model")
+ERRORS = REGISTRY.counter(
+    "bible_errors_total", "Erreurs par étape et par classe d'exception", ("stage", "error"))
+TTS_SENTENCES = REGISTRY.counter(
+    "bible_tts_sentences_total", "Phrases lues par /api/tts, par résultat du cache audio", ("cache",))
+AUDIO_SECONDS = REGISTRY.histogram(
+    "bible_audio_seconds", "Durée des enregistrements reçus, et de la parole gardée pour l'ASR",
+    ("kind",), buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0))
+BATCH_ITEMS = REGISTRY.counter(
+    "bible_batch_items_total", "Questions traitées par /api/process_batch, par résultat", ("status",))
+UPSTREAM_EVENTS = REGISTRY.counter(
+    "bible_upstream_events_total",
+    "Événements de la politique d'appel du modèle (retry, hedge, hedge_won, timeout, failure, "
+    "rejected, circuit_opened, fallback, model_degraded)", ("event",))
+MODEL_ROUTES = REGISTRY.counter(
+    "bible_model_route_total",
+    "Questions envoyées à chaque modèle (large, fast), par raison du choix", ("route", "reason"))
+MODEL_SECONDS = REGISTRY.histogram(
+    "bible_model_duration_seconds", "Durée des appels à chaque modèle (large, fast)", ("route",))
+ADMISSION = REGISTRY.counter(
+    "bible_admission_total",
+    "Décisions du contrôle d'admission (admitted, queued, rate_limited, rejected_capacity)",
+    ("decision",))
+VOICE_SPECULATIONS = REGISTRY.counter(
+    "bible_voice_speculations_total",
+    "Réponses anticipées des sessions vocales (hit, miss, skipped)", ("outcome",))
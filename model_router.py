@@ -0,0 +1,213 @@
+"""
+Choix du modèle de chaque question : un modèle rapide pour les questions
+courtes et factuelles, le modèle principal pour les autres.
+
+Le classifieur est local (une vingtaine de microsecondes par question) :
+longueur de la question, nombre de questions posées, type de question
+(factuelle : « qui », « quand », « combien »… ; explicative : « pourquoi »,
+« comment », « que signifie »…) et présence d'une référence biblique ou d'un
+nom de livre.
+
+Lorsque le p95 récent du modèle principal dépasse ROUTER_LARGE_P95_SECONDS,
+toutes les questions passent par le modèle rapide pendant
+ROUTER_COOLDOWN_SECONDS, puis le modèle principal est de nouveau essayé avec
+une fenêtre de latences vide.
+
+Sans GEMINI_FAST_MODEL, le routeur est désactivé : toutes les questions vont
+au modèle principal (GEMINI_MODEL).
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from logging import getLogger
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from bible_refs import BOOK_ALIASES
+from citations import extract_citations
+from metrics import MODEL_ROUTES, MODEL_SECONDS, UPSTREAM_EVENTS
+from resilience import LatencyTracker
+
+logger = getLogger(__name__)
+
+PRIMARY = "large"
+FAST = "fast"
+
+_FACTUAL = re.compile(
+    r"^(?:et\s+)?(?:qui|quand|ou|combien|quel|quelle|quels|quelles|lequel|laquelle|"
+    r"dans quel(?:le)? livre|en quelle annee|qu'?est[- ]ce qu'?(?:un|une|le|la|l')|"
+    r"who|when|where|which|how many|what is)\b"
+)
+_EXPLANATORY = re.compile(
+    r"\b(?:pourquoi|comment|explique[rz]?|expliquez|signifie|sens|difference|differences|compare[rz]?|"
+    r"comparaison|interprete[rz]?|interpretation|pense[rz]?|devrais|dois|why|how|explain|meaning|compare)\b"
+)
+_WORD = re.compile(r"[\w'-]+")
+_TOKEN = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents, apostrophes typographiques ramenées à « ' »."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("’", "'"))
+    return "".join(char for char in text if not unicodedata.combining(char)).strip()
+
+
+class QuestionFeatures(NamedTuple):
+    """Caractéristiques d'une question utilisées par le routeur."""
+
+    words: int
+    questions: int
+    kind: str  # factual, explanatory, other
+    reference: bool
+    book: bool
+
+
+def question_features(text: str) -> QuestionFeatures:
+    """Calcule les caractéristiques d'une question."""
+    folded = _fold(text)
+    words = _WORD.findall(folded)
+    if _EXPLANATORY.search(folded):
+        kind = "explanatory"
+    elif _FACTUAL.match(folded):
+        kind = "factual"
+    else:
+        kind = "other"
+    reference = bool(extract_citations(text))
+    # Texte déjà normalisé : les noms d'un mot se cherchent directement parmi les alias
+    book = reference or any(token in BOOK_ALIASES for token in _TOKEN.findall(folded) if len(token) > 2)
+    return QuestionFeatures(len(words), max(1, folded.count("?")), kind, reference, book)
+
+
+class ModelRouter:
+    """
+    Répartit les questions entre le modèle principal et un modèle rapide.
+
+    Attributes:
+        models (Dict[str, str]): Nom du modèle de chaque route
+        fast_max_words (int): Longueur maximale d'une question confiée au modèle rapide
+        large_p95 (float): p95 du modèle principal au-delà duquel tout passe
+            par le modèle rapide, en secondes (0 : jamais)
+        min_samples (int): Latences observées avant de comparer le p95
+        cooldown (float): Durée du repli sur le modèle rapide, en secondes
+        latencies (Dict[str, LatencyTracker]): Latences récentes de chaque route
+        stats (Dict[str, Dict[str, int]]): Questions par route et par raison
+    """
+
+    def __init__(self, models: Dict[str, str], factory: Optional[Callable[[str], Any]] = None,
+                 fast_max_words: int = 12, large_p95: float = 8.0, min_samples: int = 20,
+                 cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.models = models
+        self.factory = factory
+        self.fast_max_words = fast_max_words
+        self.large_p95 = large_p95
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.clock = clock
+        self.latencies: Dict[str, LatencyTracker] = {route: LatencyTracker() for route in models}
+        self.stats: Dict[str, Dict[str, int]] = {route: {} for route in models}
+        self._handles: Dict[str, Any] = {}
+        self._degraded_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, factory: Optional[Callable[[str], Any]] = None) -> "ModelRouter":
+        """Crée le routeur configuré par GEMINI_MODEL, GEMINI_FAST_MODEL et ROUTER_*."""
+        models = {PRIMARY: os.getenv("GEMINI_MODEL", "gemini-pro")}
+        fast = os.getenv("GEMINI_FAST_MODEL", "")
+        if fast:
+            models[FAST] = fast
+        return cls(
+            models,
+            factory,
+            fast_max_words=int(os.getenv("ROUTER_FAST_MAX_WORDS", "12")),
+            large_p95=float(os.getenv("ROUTER_LARGE_P95_SECONDS", "8")),
+            min_samples=int(os.getenv("ROUTER_MIN_SAMPLES", "20")),
+            cooldown=float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return FAST in self.models
+
+    @property
+    def degraded(self) -> bool:
+        """Vrai pendant le repli sur le modèle rapide."""
+        return self.clock() < self._degraded_until
+
+    def model(self, route: str) -> Any:
+        """Modèle de la route, créé par la fabrique à la première utilisation."""
+        handle = self._handles.get(route)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.get(route)
+                if handle is None:
+                    handle = self._handles[route] = self.factory(self.models[route])
+        return handle
+
+    def classify(self, question: str) -> Tuple[str, str]:
+        """
+        Route que mérite la question, indépendamment des latences.
+
+        Returns:
+            Tuple (route, raison) : factual ou reference pour le modèle rapide,
+            complex ou long pour le modèle principal
+        """
+        features = question_features(question)
+        if features.words > self.fast_max_words or features.questions > 1:
+            return PRIMARY, "long"
+        if features.kind == "explanatory":
+            return PRIMARY, "complex"
+        if features.kind == "factual":
+            return FAST, "factual"
+        if features.reference or features.book:
+            return FAST, "reference"
+        return PRIMARY, "complex"
+
+    def choose(self, question: str) -> Tuple[str, str]:
+        """
+        Route de la question, compte tenu des latences récentes ; comptée
+        dans les statistiques.
+        """
+        if not self.enabled:
+            route, reason = PRIMARY, "default"
+        else:
+            route, reason = self.classify(question)
+            if route == PRIMARY and self.degraded:
+                route, reason = FAST, "degraded"
+        MODEL_ROUTES.inc(route, reason)
+        with self._lock:
+            self.stats[route][reason] = self.stats[route].get(reason, 0) + 1
+        return route, reason
+
+    def observe(self, route: str, seconds: float) -> None:
+        """Enregistre la durée d'un appel ; déclenche le repli si le modèle principal ralentit."""
+        MODEL_SECONDS.observe(seconds, route)
+        tracker = self.latencies[route]
+        tracker.observe(seconds)
+        if route != PRIMARY or not self.enabled or self.large_p95 <= 0 or len(tracker) < self.min_samples:
+            return
+        p95 = tracker.percentile(95)
+        if p95 is not None and p95 > self.large_p95:
+            with self._lock:
+                self._degraded_until = self.clock() + self.cooldown
+                # Une fenêtre vide à la reprise : le modèle est jugé sur ses nouvelles latences
+                self.latencies[PRIMARY] = LatencyTracker()
+            UPSTREAM_EVENTS.inc("model_degraded")
+            logger.warning(f"Model {self.models[PRIMARY]} p95 {p95:.2f}s above {self.large_p95:.2f}s: "
+                           f"routing to {self.models[FAST]} for {self.cooldown:.0f}s")
+
+    def summary(self) -> Dict[str, Any]:
+        """État du routeur pour /api/health."""
+        routes = {}
+        for route, name in self.models.items():
+            tracker = self.latencies[route]
+            p50, p95 = tracker.percentile(50), tracker.percentile(95)
+            routes[route] = {
+                "model": name,
+                "requests": dict(self.stats[route]),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+        return {"enabled": self.enabled, "degraded": self.degraded, "routes": routes}
@@ -0,0 +1,197 @@
+"""
+Construction des prompts envoyés à Gemini, dans un budget de tokens.
+
+L'API Gemini est sans état : chaque appel renvoie tout l'historique. Plutôt
+que de recoller à chaque tour une transcription complète (contexte système
+compris) dans un objet chat qui garde déjà sa propre copie de l'historique,
+le PromptBuilder tient à jour, tour après tour :
+
+- l'instruction système, envoyée une seule fois en tête de l'historique ;
+- les échanges récents, conservés mot pour mot ;
+- un résumé glissant des échanges plus anciens, compactés dès que le budget
+  de tokens est dépassé.
+"""
+
+import os
+import re
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Rôles de l'historique de conversation vers les rôles de l'API Gemini
+_API_ROLES = {"user": "user", "assistant": "model"}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte (environ 4 caractères par token).
+
+    Args:
+        text: Texte à mesurer
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    return (len(text) + 3) // 4
+
+
+def summarize_turn(role: str, content: str, max_chars: int = 200) -> str:
+    """
+    Résume un échange ancien par sa première phrase.
+
+    Args:
+        role: Rôle de l'émetteur ('user' ou 'assistant')
+        content: Contenu du message
+        max_chars: Longueur maximale du résumé
+
+    Returns:
+        Ligne de résumé
+    """
+    first = _SENTENCE_END.split(content.strip(), maxsplit=1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rsplit(" ", 1)[0] + "…"
+    label = "L'utilisateur a demandé" if role == "user" else "Tu as répondu"
+    return f"- {label} : {first}"
+
+
+class PromptBuilder:
+    """
+    Maintient de manière incrémentale l'historique envoyé au modèle.
+
+    Attributes:
+        token_budget (int): Budget de tokens de l'historique (hors nouvelle question)
+        recent_messages (int): Nombre minimal de messages récents gardés mot pour mot
+        summary_budget (int): Budget de tokens du résumé glissant
+        total_tokens (int): Taille courante de l'historique, en tokens estimés
+    """
+
+    def __init__(self, system_instruction: str = "", token_budget: int = 3000,
+                 recent_messages: int = 4, summary_budget: int = 400,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        """
+        Initialise le constructeur de prompts.
+
+        Args:
+            system_instruction: Contexte système, envoyé une fois par requête
+            token_budget: Budget total de l'historique envoyé
+            recent_messages: Messages récents jamais compactés
+            summary_budget: Budget du résumé des échanges anciens
+            count_tokens: Fonction de comptage des tokens
+        """
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.summary_budget = summary_budget
+        self.count_tokens = count_tokens
+        self._turns: Deque[Tuple[str, str, int]] = deque()
+        self._summary: Deque[Tuple[str, int]] = deque()
+        self._summary_tokens = 0
+        self._turn_tokens = 0
+        self._preamble: Optional[List[Dict]] = None
+        self.set_system(system_instruction)
+
+    @classmethod
+    def from_env(cls, system_instruction: str = "") -> "PromptBuilder":
+        """Crée un constructeur configuré depuis les variables d'environnement."""
+        return cls(
+            system_instruction,
+            token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "3000")),
+            recent_messages=int(os.getenv("PROMPT_RECENT_MESSAGES", "4")),
+            summary_budget=int(os.getenv("PROMPT_SUMMARY_TOKENS", "400")),
+        )
+
+    @property
+    def total_tokens(self) -> int:
+        return self._system_tokens + self._summary_tokens + self._turn_tokens
+
+    def set_system(self, instruction: str) -> None:
+        """Définit l'instruction système."""
+        self.system_instruction = instruction
+        self._system_tokens = self.count_tokens(instruction) if instruction else 0
+        self._preamble = None
+
+    def add_turn(self, role: str, content: str) -> None:
+        """
+        Ajoute un message et compacte les plus anciens si le budget est dépassé.
+
+        Args:
+            role: 'user' ou 'assistant' ('system' remplace l'instruction système)
+            content: Contenu du message
+        """
+        if role == "system":
+            self.set_system(content)
+            return
+        tokens = self.count_tokens(content)
+        self._turns.append((role, content, tokens))
+        self._turn_tokens += tokens
+        self._compact()
+
+    def _compact(self) -> None:
+        while self.total_tokens > self.token_budget and len(self._turns) > self.recent_messages:
+            role, content, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            line = summarize_turn(role, content)
+            line_tokens = self.count_tokens(line)
+            self._summary.append((line, line_tokens))
+            self._summary_tokens += line_tokens
+            self._preamble = None
+            while self._summary_tokens > self.summary_budget and self._summary:
+                self._drop_summary_line()
+        # Si les messages récents suffisent à dépasser le budget, le résumé est sacrifié
+        while self.total_tokens > self.token_budget and self._summary:
+            self._drop_summary_line()
+
+    def _drop_summary_line(self) -> None:
+        _, dropped = self._summary.popleft()
+        self._summary_tokens -= dropped
+        self._preamble = None
+
+    def clear(self) -> None:
+        """Oublie les échanges et le résumé (l'instruction système est conservée)."""
+        self._turns.clear()
+        self._summary.clear()
+        self._summary_tokens = 0
+        self._turn_tokens = 0
+        self._preamble = None
+
+    @property
+    def summary(self) -> str:
+        """Résumé glissant des échanges compactés."""
+        return "\n".join(line for line, _ in self._summary)
+
+    def _build_preamble(self) -> List[Dict]:
+        if self._preamble is None:
+            text = self.system_instruction
+            if self._summary:
+                text += f"\n\nRésumé des échanges précédents :\n{self.summary}"
+            self._preamble = [
+                {"role": "user", "parts": [text]},
+                {"role": "model", "parts": ["Compris."]},
+            ] if text else []
+        return self._preamble
+
+    def build(self) -> Tuple[List[Dict], str]:
+        """
+        Construit la requête pour la question la plus récente.
+
+        Le dernier message ajouté doit être celui de l'utilisateur.
+
+        Returns:
+            Tuple (historique au format de l'API Gemini, question à envoyer)
+        """
+        turns = list(self._turns)
+        message = ""
+        if turns and turns[-1][0] == "user":
+            message = turns.pop()[1]
+
+        contents = list(self._build_preamble())
+        for role, content, _ in turns:
+            api_role = _API_ROLES.get(role, "user")
+            if contents and contents[-1]["role"] == api_role:
+                # L'API attend des rôles alternés : on fusionne les messages consécutifs
+                contents[-1] = {"role": api_role, "parts": contents[-1]["parts"] + [content]}
+            else:
+                contents.append({"role": api_role, "parts": [content]})
+        if contents and contents[-1]["role"] == "user":
+            contents.append({"role": "model", "parts": ["…"]})
+        return contents, message
@@ -0,0 +1,455 @@
+"""
+Politique d'appel du modèle amont : délai maximal, requêtes de couverture
+(hedging), nouvelles tentatives et disjoncteur.
+
+- Chaque question dispose d'un délai global (deadline) pour obtenir sa réponse.
+- Si une tentative dépasse le p95 des latences récentes, une seconde tentative
+  est lancée en parallèle ; la première réponse obtenue est gardée.
+- Les erreurs transitoires (503, 429, délai dépassé…) sont retentées avec un
+  délai aléatoire croissant (« full jitter »), dans la limite de la deadline.
+- Après plusieurs échecs consécutifs, le disjoncteur s'ouvre : les appels
+  échouent immédiatement jusqu'à ce qu'une tentative de test réussisse.
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from logging import getLogger
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, TypeVar
+
+from metrics import UPSTREAM_EVENTS
+from tracing import in_context
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# Codes HTTP des erreurs qui peuvent réussir si l'on réessaie
+TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exceptions google.api_core / gRPC équivalentes, reconnues par leur nom pour
+# ne pas importer le SDK
+TRANSIENT_NAMES = {
+    "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TooManyRequests",
+    "ResourceExhausted", "GatewayTimeout", "Aborted", "RetryError",
+}
+
+_LEADING_CODE = re.compile(r"^\s*(\d{3})\b")
+
+
+class UpstreamError(RuntimeError):
+    """Le modèle amont n'a pas pu répondre."""
+
+
+class UpstreamTimeout(UpstreamError, TimeoutError):
+    """La deadline de la question est dépassée."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Le disjoncteur est ouvert : le modèle amont est considéré indisponible."""
+
+
+def error_code(error: BaseException) -> Optional[int]:
+    """
+    Code HTTP d'une erreur de l'API, s'il est connu.
+
+    Les exceptions google.api_core exposent `code` ; à défaut, le message
+    commence souvent par le code (« 503 The service is unavailable »).
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    match = _LEADING_CODE.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Indique si une nouvelle tentative a des chances de réussir."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in TRANSIENT_NAMES:
+        return True
+    return error_code(error) in TRANSIENT_CODES
+
+
+class LatencyTracker:
+    """Fenêtre glissante des latences des appels réussis."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Centile q (0-100) des latences de la fenêtre ; None si elle est vide."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états.
+
+    - fermé : les appels passent ; `failure_threshold` échecs consécutifs l'ouvrent ;
+    - ouvert : les appels sont refusés pendant `reset_timeout` secondes ;
+    - semi-ouvert : un seul appel de test passe ; son succès referme le
+      disjoncteur, son échec le rouvre.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Indique si un appel peut être tenté maintenant."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Upstream circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Upstream circuit opened after {self._failures} failures")
+                    UPSTREAM_EVENTS.inc("circuit_opened")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class UpstreamPolicy:
+    """
+    Exécute les appels au modèle amont sous deadline, avec hedging, nouvelles
+    tentatives et disjoncteur.
+
+    Les tentatives s'exécutent dans un groupe de threads dédié : une tentative
+    abandonnée (deadline dépassée, ou devancée par sa couverture) se termine en
+    arrière-plan sans bloquer la requête.
+
+    Attributes:
+        deadline (float): Délai maximal d'une question, en secondes (0 : aucun)
+        max_retries (int): Nouvelles tentatives après une erreur transitoire
+        backoff_base (float): Délai de base entre deux tentatives, en secondes
+        backoff_cap (float): Délai maximal entre deux tentatives
+        hedge_percentile (float): Centile des latences au-delà duquel une
+            tentative est couverte (0 : pas de hedging)
+        hedge_min_samples (int): Latences observées avant d'activer le hedging
+        max_hedges (int): Tentatives de couverture par tentative
+        breaker (CircuitBreaker): Disjoncteur
+        latencies (LatencyTracker): Latences des appels réussis
+        stats (Dict[str, int]): Compteurs
+    """
+
+    def __init__(self, deadline: float = 30.0, max_retries: int = 2,
+                 backoff_base: float = 0.2, backoff_cap: float = 2.0,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20, max_hedges: int = 1,
+                 breaker: Optional[CircuitBreaker] = None, latencies: Optional[LatencyTracker] = None,
+                 max_workers: int = 32, seed: Optional[int] = None):
+        self.deadline = deadline
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedges = max(0, max_hedges)
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = latencies or LatencyTracker()
+        self.max_workers = max_workers
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self.stats: Dict[str, int] = {
+            "calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+            "timeouts": 0, "failures": 0, "rejected": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "UpstreamPolicy":
+        """Crée la politique configurée par les variables UPSTREAM_*."""
+        return cls(
+            deadline=float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "30")),
+            max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.2")),
+            backoff_cap=float(os.getenv("UPSTREAM_BACKOFF_CAP_SECONDS", "2")),
+            hedge_percentile=float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "95")),
+            hedge_min_samples=int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20")),
+            max_hedges=int(os.getenv("UPSTREAM_MAX_HEDGES", "1")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("UPSTREAM_BREAKER_RESET_SECONDS", "30")),
+            ),
+            max_workers=int(os.getenv("UPSTREAM_WORKERS", "32")),
+        )
+
+    def _count(self, key: str, event: Optional[str] = None) -> None:
+        with self._lock:
+            self.stats[key] += 1
+        if event:
+            UPSTREAM_EVENTS.inc(event)
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        # Les threads ne survivent pas à un fork : un groupe par processus
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="upstream")
+                    self._pool_pid = pid
+        return self._pool
+
+    def hedge_delay(self) -> Optional[float]:
+        """Délai après lequel une tentative est couverte ; None si le hedging est inactif."""
+        if self.hedge_percentile <= 0 or not self.max_hedges or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def call(self, fn: Callable[[], T], hedge: bool = True, deadline: Optional[float] = None) -> T:
+        """
+        Exécute fn selon la politique.
+
+        Args:
+            fn: Appel amont, sans argument
+            hedge: Autoriser une tentative de couverture (à désactiver pour
+                les appels qui ne peuvent pas être dupliqués, comme les flux)
+            deadline: Délai maximal, en secondes (celui de la politique par défaut)
+
+        Raises:
+            CircuitOpenError: Si le disjoncteur est ouvert
+            UpstreamTimeout: Si la deadline est dépassée
+            Exception: La dernière erreur de fn, si elle n'est pas transitoire
+                ou si les tentatives sont épuisées
+        """
+        expires = self._admit(deadline)
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, expires, hedge)
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, expires))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]], hedge: bool = True,
+                         deadline: Optional[float] = None) -> T:
+        """
+        Variante de call() pour une coroutine (API asynchrone du SDK) : les
+        tentatives sont des tâches de la boucle d'événements, sans thread, et
+        une tentative abandonnée est annulée.
+
+        Args:
+            fn: Fonction sans argument retournant la coroutine de l'appel amont
+            hedge: Autoriser une tentative de couverture
+            deadline: Délai maximal, en secondes (celui de la politique par défaut)
+
+        Raises:
+            Les mêmes erreurs que call()
+        """
+        expires = self._admit(deadline)
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt_async(fn, expires, hedge)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, expires))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _admit(self, deadline: Optional[float]) -> Optional[float]:
+        """Vérifie le disjoncteur et retourne l'échéance de l'appel (None : aucune)."""
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected", "rejected")
+            raise CircuitOpenError("Le modèle amont est temporairement indisponible")
+        budget = self.deadline if deadline is None else deadline
+        return time.monotonic() + budget if budget > 0 else None
+
+    def _retry_delay(self, error: Exception, attempt: int, expires: Optional[float]) -> float:
+        """
+        Enregistre l'échec d'une tentative et retourne le délai avant la
+        suivante, ou relève l'erreur si elle ne doit pas être retentée.
+        """
+        transient = is_transient(error)
+        if transient:
+            self._count("failures", "failure")
+            self.breaker.record_failure()
+        else:
+            # Erreur propre à la requête : le service, lui, a répondu
+            self.breaker.record_success()
+        if not transient or attempt >= self.max_retries:
+            raise error
+        delay = self._rng.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if expires is not None and time.monotonic() + delay >= expires:
+            raise error
+        if not self.breaker.allow():
+            self._count("rejected", "rejected")
+            raise CircuitOpenError("Le modèle amont est temporairement indisponible") from error
+        self._count("retries", "retry")
+        logger.warning(f"Transient upstream error, retrying in {delay:.2f}s: {str(error)}")
+        return delay
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = fn()
+        self.latencies.observe(time.monotonic() - start)
+        return result
+
+    def _attempt(self, fn: Callable[[], T], expires: Optional[float], hedge: bool) -> T:
+        """Une tentative, éventuellement couverte par une seconde en parallèle."""
+        if expires is not None and time.monotonic() >= expires:
+            self._count("timeouts", "timeout")
+            raise UpstreamTimeout("Délai dépassé avant l'appel au modèle")
+        hedge_after = self.hedge_delay() if hedge else None
+        if expires is None and hedge_after is None:
+            self._count("attempts")
+            return self._timed(fn)
+
+        start = time.monotonic()
+        primary = self.pool.submit(in_context(self._timed), fn)
+        self._count("attempts")
+        running: List[Future] = [primary]
+        hedges = 0
+        first_error: Optional[BaseException] = None
+        while running:
+            can_hedge = hedge_after is not None and hedges < self.max_hedges
+            now = time.monotonic()
+            limits = []
+            if expires is not None:
+                limits.append(expires - now)
+            if can_hedge:
+                limits.append(start + hedge_after - now)
+            done, _ = wait(running, timeout=max(0.0, min(limits)) if limits else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                running.remove(future)
+                error = future.exception()
+                if error is None:
+                    for other in running:
+                        other.cancel()
+                    if future is not primary:
+                        self._count("hedge_wins", "hedge_won")
+                    return future.result()
+                first_error = first_error or error
+            if done and not running:
+                # Échec sans tentative en cours : la décision revient à call()
+                raise first_error
+            now = time.monotonic()
+            if expires is not None and now >= expires:
+                self._count("timeouts", "timeout")
+                raise UpstreamTimeout("Le modèle n'a pas répondu dans le délai imparti")
+            if can_hedge and now >= start + hedge_after:
+                hedges += 1
+                self._count("hedges", "hedge")
+                self._count("attempts")
+                running.append(self.pool.submit(in_context(self._timed), fn))
+        raise first_error
+
+    async def _timed_async(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        result = await fn()
+        self.latencies.observe(time.monotonic() - start)
+        return result
+
+    async def _attempt_async(self, fn: Callable[[], Awaitable[T]], expires: Optional[float], hedge: bool) -> T:
+        """Équivalent de _attempt() : les tentatives perdantes sont annulées."""
+        if expires is not None and time.monotonic() >= expires:
+            self._count("timeouts", "timeout")
+            raise UpstreamTimeout("Délai dépassé avant l'appel au modèle")
+        hedge_after = self.hedge_delay() if hedge else None
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self._timed_async(fn))
+        self._count("attempts")
+        running: Set[asyncio.Future] = {primary}
+        hedges = 0
+        first_error: Optional[BaseException] = None
+        try:
+            while running:
+                can_hedge = hedge_after is not None and hedges < self.max_hedges
+                now = time.monotonic()
+                limits = []
+                if expires is not None:
+                    limits.append(expires - now)
+                if can_hedge:
+                    limits.append(start + hedge_after - now)
+                done, running = await asyncio.wait(running, timeout=max(0.0, min(limits)) if limits else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is not primary:
+                            self._count("hedge_wins", "hedge_won")
+                        return task.result()
+                    first_error = first_error or error
+                if done and not running:
+                    raise first_error
+                now = time.monotonic()
+                if expires is not None and now >= expires:
+                    self._count("timeouts", "timeout")
+                    raise UpstreamTimeout("Le modèle n'a pas répondu dans le délai imparti")
+                if can_hedge and now >= start + hedge_after:
+                    hedges += 1
+                    self._count("hedges", "hedge")
+                    self._count("attempts")
+                    running.add(asyncio.ensure_future(self._timed_async(fn)))
+            raise first_error
+        finally:
+            for task in running:
+                task.cancel()
@@ -0,0 +1,346 @@
+"""
+Recherche locale des passages pertinents (BM25) pour ancrer les réponses.
+
+L'index est construit une fois à partir de l'index des versets (verse_store) :
+chaque verset est un document, analysé en français (minuscules sans accents,
+mots vides retirés, racinisation légère). Les listes de postings sont des
+tableaux NumPy enregistrés dans un dossier et projetés en mémoire à
+l'ouverture :
+
+    meta.json      paramètres (k1, b), nombre de documents et de termes
+    vocab.json     terme -> numéro
+    offsets.npy    début des postings de chaque terme   (nb_termes + 1, uint32)
+    docs.npy       versets des postings, triés par terme (uint32)
+    weights.npy    poids BM25 précalculés, idf compris   (float32)
+    refs.npy       livre, chapitre, verset de chaque document (nb_docs x 3, uint16)
+
+Le score d'une question est la somme des poids de ses termes : une recherche
+se résume à une concaténation de tranches et un np.bincount.
+
+Usage:
+    python retrieval.py build [data/bible.idx] [data/bm25]
+    python retrieval.py search "Que dit la Bible sur le pardon ?"
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import threading
+import unicodedata
+from collections import Counter
+from logging import getLogger
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from bible_refs import BOOKS, Reference
+from prompt_builder import estimate_tokens
+from verse_store import DEFAULT_STORE_PATH, VerseStore, get_default_store
+
+logger = getLogger(__name__)
+
+VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bm25")
+
+STOP_WORDS = frozenset("""
+a afin ai aie aient aies ait alors as au aucun aupres aussi autre aux avaient avais avait avant avec
+avez aviez avions avoir avons ayant c ca car ce ceci cela celle celles celui ces cet cette ceux chaque
+chez comme comment d dans de des deja depuis dit dire doit donc dont du elle elles en encore entre est
+et etaient etais etait etant ete etes etre eu eux fait faire fois furent fut ici il ils j je jusqu l la
+le les leur leurs lui m ma mais me meme memes mes moi mon n ne ni nos notre nous on ont ou par parce
+pas peu peut plus pour pourquoi puis qu quand que quel quelle quelles quels qui quoi s sa sans se sera
+ses si sien soi soit sommes son sont sous suis sur t ta te tes toi ton tous tout toute toutes tres tu
+un une vers voici voila vos votre vous y
+bible biblique dis parle parler
+""".split())
+
+# Suffixes retirés par la racinisation, du plus long au plus court
+_SUFFIXES = ("issements", "issement", "ations", "ation", "atrices", "atrice", "ateurs", "ateur",
+             "ements", "ement", "ments", "ment", "euses", "euse", "ites", "ite", "iques", "ique",
+             "ismes", "isme", "istes", "iste", "ables", "able", "ibles", "ible", "eurs", "eur")
+# Futur, conditionnel et imparfait, vérifiés avant le pluriel (pardonnerons)
+_VERB_ENDINGS = ("eraient", "erions", "erons", "eront", "erait", "erais", "erai", "eras", "erez", "era",
+                 "aient", "ait")
+_MIN_STEM = 3
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ni ligatures."""
+    text = text.lower().replace("œ", "oe").replace("æ", "ae")
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def stem(word: str) -> str:
+    """
+    Racinisation légère du français : pluriel, suffixes dérivationnels
+    courants et terminaisons verbales fréquentes (pardonner, pardonné,
+    pardonnera, pardons -> pardon).
+    """
+    if len(word) > 5 and word.endswith("aux"):
+        return word[:-3] + "al"
+    for ending in _VERB_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return _undouble(word[:-len(ending)])
+    if len(word) > 3 and (word[-1] == "s" or word.endswith("ux")):  # paix garde son x
+        word = word[:-1]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    for ending in ("er", "ez", "ee", "e"):
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    return _undouble(word)
+
+
+def _undouble(word: str) -> str:
+    # pardonn -> pardon, appell -> appel
+    if len(word) > _MIN_STEM + 1 and word[-1] == word[-2] and not word[-1].isdigit():
+        return word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Termes indexés d'un texte, dans l'ordre."""
+    return [stem(word) for word in re.findall(r"[a-z0-9]+", fold(text))
+            if word not in STOP_WORDS and len(word) > 1]
+
+
+class Passage(NamedTuple):
+    """Verset retrouvé par la recherche."""
+    reference: Reference
+    text: str
+    score: float
+
+
+def build_index(store: VerseStore, output_dir: str, k1: float = 1.2, b: float = 0.75) -> Dict[str, int]:
+    """
+    Construit l'index BM25 de tous les versets de store.
+
+    Args:
+        store: Index des versets
+        output_dir: Dossier de l'index (reconstruit entièrement)
+        k1, b: Paramètres de BM25
+
+    Returns:
+        Statistiques de construction (documents, termes, postings, octets)
+    """
+    refs: List[tuple] = []
+    frequencies: List[Counter] = []
+    for book in BOOKS:
+        for chapter in range(1, store.chapter_count(book.index) + 1):
+            for verse, text in store.get_verses(book.index, chapter):
+                terms = Counter(analyze(text))
+                if terms:
+                    refs.append((book.index, chapter, verse))
+                    frequencies.append(terms)
+
+    lengths = np.array([sum(terms.values()) for terms in frequencies], dtype=np.float64)
+    avgdl = float(lengths.mean()) if len(lengths) else 0.0
+    postings: Dict[str, List[int]] = {}
+    for doc, terms in enumerate(frequencies):
+        for term in terms:
+            postings.setdefault(term, []).append(doc)
+
+    vocab = {term: i for i, term in enumerate(sorted(postings))}
+    offsets = np.zeros(len(vocab) + 1, dtype=np.uint32)
+    docs = np.empty(sum(len(p) for p in postings.values()), dtype=np.uint32)
+    weights = np.empty(len(docs), dtype=np.float32)
+    n_docs = len(refs)
+    position = 0
+    for term, i in vocab.items():
+        term_docs = np.array(postings[term], dtype=np.uint32)
+        tf = np.array([frequencies[doc][term] for doc in term_docs], dtype=np.float64)
+        idf = math.log(1 + (n_docs - len(term_docs) + 0.5) / (len(term_docs) + 0.5))
+        norm = k1 * (1 - b + b * lengths[term_docs] / avgdl)
+        docs[position:position + len(term_docs)] = term_docs
+        weights[position:position + len(term_docs)] = idf * tf * (k1 + 1) / (tf + norm)
+        position += len(term_docs)
+        offsets[i + 1] = position
+
+    staging = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "offsets.npy"), offsets)
+    np.save(os.path.join(staging, "docs.npy"), docs)
+    np.save(os.path.join(staging, "weights.npy"), weights)
+    np.save(os.path.join(staging, "refs.npy"), np.array(refs, dtype=np.uint16).reshape(-1, 3))
+    with open(os.path.join(staging, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False, separators=(",", ":"))
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "k1": k1, "b": b, "docs": n_docs, "terms": len(vocab),
+                   "avgdl": avgdl}, f, indent=2)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(staging, output_dir)
+
+    size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+    return {"docs": n_docs, "terms": len(vocab), "postings": len(docs), "bytes": size}
+
+
+class PassageIndex:
+    """
+    Index BM25 en lecture seule, projeté en mémoire.
+
+    Attributes:
+        path (str): Dossier de l'index
+        store (VerseStore): Index des versets, pour le texte des passages
+        doc_count (int): Nombre de versets indexés
+    """
+
+    def __init__(self, path: str, store: VerseStore):
+        """
+        Ouvre un index produit par build_index.
+
+        Raises:
+            ValueError: Si le dossier n'est pas un index valide
+        """
+        self.path = path
+        self.store = store
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+                self._vocab: Dict[str, int] = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Not a passage index: {path} ({e})")
+        if meta.get("version") != VERSION:
+            raise ValueError(f"Unsupported passage index version: {meta.get('version')}")
+        self.doc_count = meta["docs"]
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self._offsets = load("offsets.npy")
+        self._docs = load("docs.npy")
+        self._weights = load("weights.npy")
+        self._refs = load("refs.npy")
+
+    def search(self, question: str, k: int = 5) -> List[Passage]:
+        """
+        Versets les plus pertinents pour question, par score décroissant.
+
+        Args:
+            question: Texte de la question
+            k: Nombre maximal de versets
+        """
+        terms = [self._vocab[term] for term in set(analyze(question)) if term in self._vocab]
+        if not terms or k <= 0:
+            return []
+        spans = [(self._offsets[i], self._offsets[i + 1]) for i in terms]
+        docs = np.concatenate([self._docs[start:end] for start, end in spans])
+        weights = np.concatenate([self._weights[start:end] for start, end in spans])
+        scores = np.bincount(docs, weights, minlength=self.doc_count)
+
+        k = min(k, len(docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        passages = []
+        for doc in top:
+            book_index, chapter, verse = (int(value) for value in self._refs[doc])
+            verses = self.store.get_verses(book_index, chapter, verse)
+            if verses and scores[doc] > 0:
+                reference = Reference(BOOKS[book_index], chapter, verse)
+                passages.append(Passage(reference, verses[0][1], float(scores[doc])))
+        return passages
+
+
+def format_passages(passages: List[Passage], token_budget: int,
+                    count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """
+    Bloc de passages à placer avant la question, dans la limite de token_budget.
+
+    Les passages sont pris par pertinence décroissante ; un passage qui ne
+    tient pas dans le budget restant est ignoré.
+    """
+    header = "Passages bibliques pertinents (à citer s'ils conviennent) :"
+    lines, used = [], count_tokens(header)
+    for passage in passages:
+        line = f"- {passage.reference.label()} : « {passage.text} »"
+        tokens = count_tokens(line)
+        if used + tokens > token_budget:
+            continue
+        lines.append(line)
+        used += tokens
+    return "\n".join([header] + lines) if lines else ""
+
+
+_default_index: Optional[PassageIndex] = None
+_default_index_loaded = False
+_default_index_lock = threading.Lock()
+
+
+def get_default_index() -> Optional[PassageIndex]:
+    """
+    Retourne l'index configuré par RETRIEVAL_INDEX_PATH (ou data/bm25).
+
+    Returns:
+        L'index ouvert, ou None s'il n'a pas été construit ou que l'index des
+        versets est absent
+    """
+    global _default_index, _default_index_loaded
+    if not _default_index_loaded:
+        with _default_index_lock:
+            if not _default_index_loaded:
+                path = os.getenv("RETRIEVAL_INDEX_PATH", DEFAULT_INDEX_PATH)
+                store = get_default_store()
+                if store is not None and os.path.isdir(path):
+                    try:
+                        _default_index = PassageIndex(path, store)
+                        logger.info(f"Passage index loaded from {path}")
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Failed to load passage index: {str(e)}")
+                _default_index_loaded = True
+    return _default_index
+
+
+def ground_question(question: str, count_tokens: Callable[[str], int] = estimate_tokens,
+                    index: Optional[PassageIndex] = None) -> str:
+    """
+    Ajoute à la question les passages pertinents (RETRIEVAL_TOP_K versets,
+    RETRIEVAL_TOKEN_BUDGET tokens au plus).
+
+    Returns:
+        Le message à envoyer au modèle, ou question telle quelle sans index
+        ou sans passage pertinent
+    """
+    index = index if index is not None else get_default_index()
+    if index is None:
+        return question
+    passages = index.search(question, int(os.getenv("RETRIEVAL_TOP_K", "5")))
+    block = format_passages(passages, int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "400")), count_tokens)
+    return f"{block}\n\nQuestion : {question}" if block else question
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recherche BM25 des passages bibliques")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Construit l'index BM25 depuis l'index des versets")
+    build.add_argument("store", nargs="?", default=os.getenv("BIBLE_STORE_PATH", DEFAULT_STORE_PATH))
+    build.add_argument("output", nargs="?", default=os.getenv("RETRIEVAL_INDEX_PATH", DEFAULT_INDEX_PATH))
+    build.add_argument("--k1", type=float, default=1.2)
+    build.add_argument("--b", type=float, default=0.75)
+
+    search = commands.add_parser("search", help="Affiche les passages les plus pertinents")
+    search.add_argument("question")
+    search.add_argument("-k", type=int, default=5)
+    search.add_argument("--store", default=os.getenv("BIBLE_STORE_PATH", DEFAULT_STORE_PATH))
+    search.add_argument("--index", default=os.getenv("RETRIEVAL_INDEX_PATH", DEFAULT_INDEX_PATH))
+
+    args = parser.parse_args(argv)
+    store = VerseStore(args.store)
+    if args.command == "build":
+        stats = build_index(store, args.output, args.k1, args.b)
+        print(f"{stats['docs']} versets, {stats['terms']} termes, {stats['postings']} postings, "
+              f"{stats['bytes']} octets -> {args.output}")
+        return 0
+
+    for passage in PassageIndex(args.index, store).search(args.question, args.k):
+        print(f"{passage.score:6.2f}  {passage.reference.label()} : {passage.text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Adaptateur des événements HTTP serverless vers une application WSGI.
+
+Accepte les deux formats d'événement d'API Gateway / Lambda (v1 : httpMethod,
+path, multiValueHeaders… ; v2 : rawPath, rawQueryString, cookies…), dont
+s'inspire l'événement transmis à api/index.py. L'environ WSGI est construit
+directement (sans contexte de requête de test) ; la chaîne de requête, les
+en-têtes multiples et les corps binaires en base64 sont transmis dans les deux
+sens.
+
+La partie fixe de l'environ est préparée une fois par processus : entre deux
+invocations d'une même instance, seule la requête est reconstruite.
+"""
+
+import base64
+import io
+import sys
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlencode
+
+logger = getLogger(__name__)
+
+# Types de contenu transmis en texte ; les autres corps sont encodés en base64
+TEXT_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+              "application/x-www-form-urlencoded", "image/svg+xml")
+# En-têtes propres à la connexion, sans objet pour une réponse mise en mémoire
+HOP_BY_HOP = frozenset(("connection", "keep-alive", "transfer-encoding"))
+
+
+def is_text(content_type: str, content_encoding: Optional[str]) -> bool:
+    """Vrai si le corps peut être transmis tel quel en texte UTF-8."""
+    if content_encoding:
+        return False
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return content_type.startswith(TEXT_TYPES) or content_type.endswith(("+json", "+xml"))
+
+
+class WSGIAdapter:
+    """
+    Appelle une application WSGI pour chaque événement HTTP serverless.
+
+    Attributes:
+        app: Application WSGI
+        server_name (str): SERVER_NAME des requêtes
+        stats (Dict[str, int]): Invocations traitées et réponses en base64
+    """
+
+    def __init__(self, app: Callable, server_name: str = "serverless"):
+        self.app = app
+        self.server_name = server_name
+        self._base_environ = {
+            "SCRIPT_NAME": "",
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": "443",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.version": (1, 0),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        self.stats = {"invocations": 0, "base64_responses": 0}
+
+    def __call__(self, event: Optional[Dict[str, Any]], context: Any = None) -> Dict[str, Any]:
+        """Traite un événement et retourne la réponse au format de l'événement."""
+        if not event:
+            return {"statusCode": 500, "body": "No event data received"}
+        try:
+            status, headers, chunks = self.stream(event, context)
+            try:
+                # Sans streaming côté plateforme, le corps est assemblé une seule fois
+                body = b"".join(chunks)
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            logger.error(f"Error processing serverless event: {str(e)}", exc_info=True)
+            return {
+                "statusCode": 500,
+                "body": '{"error": "Internal Server Error"}',
+                "headers": {"Content-Type": "application/json"},
+            }
+        return self.format_response(event, status, headers, body)
+
+    def stream(self, event: Dict[str, Any], context: Any = None) -> Tuple[int, List[Tuple[str, str]], Iterator[bytes]]:
+        """
+        Appelle l'application sans attendre la fin du corps, pour les
+        plateformes qui transmettent la réponse au fil de l'eau.
+
+        Returns:
+            Tuple (statut, en-têtes, itérable des fragments du corps, à fermer)
+        """
+        self.stats["invocations"] += 1
+        environ = self.environ(event, context)
+        response: Dict[str, Any] = {}
+        written: List[bytes] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"], response["headers"] = int(status.split(" ", 1)[0]), headers
+            return written.append
+
+        result = _Chained(written, self.app(environ, start_response))
+        try:
+            # start_response peut n'être appelé qu'au premier fragment
+            result.prime()
+        except BaseException:
+            result.close()
+            raise
+        return response["status"], response["headers"], result
+
+    def environ(self, event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+        """Environ WSGI d'un événement v1 ou v2."""
+        environ = dict(self._base_environ)
+        request_context = event.get("requestContext") or {}
+        if event.get("version") == "2.0":
+            http = request_context.get("http") or {}
+            method = http.get("method", "GET")
+            path = event.get("rawPath") or "/"
+            query = event.get("rawQueryString", "")
+            headers = dict(event.get("headers") or {})
+            if event.get("cookies"):
+                headers["cookie"] = "; ".join(event["cookies"])
+            remote = http.get("sourceIp")
+        else:
+            method = event.get("httpMethod", "GET")
+            path = event.get("path") or "/"
+            path, _, query = path.partition("?")
+            multi_query = event.get("multiValueQueryStringParameters")
+            if multi_query:
+                query = urlencode(multi_query, doseq=True)
+            elif event.get("queryStringParameters"):
+                query = urlencode(event["queryStringParameters"])
+            headers = {name: ("; " if name.lower() == "cookie" else ", ").join(values)
+                       for name, values in (event.get("multiValueHeaders") or {}).items()}
+            for name, value in (event.get("headers") or {}).items():
+                headers.setdefault(name, value)
+            remote = (request_context.get("identity") or {}).get("sourceIp")
+
+        body = event.get("body") or b""
+        if isinstance(body, str):
+            body = base64.b64decode(body) if event.get("isBase64Encoded") else body.encode("utf-8")
+
+        # PATH_INFO : octets de l'URL décodée, vus en latin-1 (PEP 3333)
+        environ["REQUEST_METHOD"] = method.upper()
+        environ["PATH_INFO"] = unquote(path).encode("utf-8").decode("latin-1")
+        environ["QUERY_STRING"] = query
+        environ["REMOTE_ADDR"] = remote or "127.0.0.1"
+        environ["CONTENT_LENGTH"] = str(len(body))
+        environ["wsgi.input"] = io.BytesIO(body)
+        environ["wsgi.url_scheme"] = "https"
+        environ["serverless.context"] = context
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif key == "CONTENT_LENGTH":
+                continue  # recalculé d'après le corps décodé
+            elif key == "HOST":
+                environ["HTTP_HOST"] = value
+                environ["SERVER_NAME"] = value.split(":", 1)[0]
+            elif key == "X_FORWARDED_PROTO":
+                environ["HTTP_X_FORWARDED_PROTO"] = value
+                environ["wsgi.url_scheme"] = value.split(",", 1)[0].strip() or "https"
+            else:
+                environ[f"HTTP_{key}"] = value
+        return environ
+
+    def format_response(self, event: Dict[str, Any], status: int,
+                        headers: List[Tuple[str, str]], body: bytes) -> Dict[str, Any]:
+        """Réponse au format de l'événement : en-têtes multiples et base64 si nécessaire."""
+        single: Dict[str, str] = {}
+        multi: Dict[str, List[str]] = {}
+        for name, value in headers:
+            if name.lower() in HOP_BY_HOP:
+                continue
+            multi.setdefault(name, []).append(value)
+            single[name] = value
+
+        content_type = next((values[-1] for name, values in multi.items() if name.lower() == "content-type"), "")
+        encoding = next((values[-1] for name, values in multi.items() if name.lower() == "content-encoding"), None)
+        text = None
+        if is_text(content_type, encoding):
+            try:
+                text = body.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        result: Dict[str, Any] = {"statusCode": status}
+        if text is None:
+            self.stats["base64_responses"] += 1
+            result["body"] = base64.b64encode(body).decode("ascii")
+            result["isBase64Encoded"] = True
+        else:
+            result["body"] = text
+            result["isBase64Encoded"] = False
+
+        if event.get("version") == "2.0":
+            cookies = [value for name, values in multi.items() if name.lower() == "set-cookie" for value in values]
+            result["headers"] = {name: ", ".join(values) for name, values in multi.items()
+                                 if name.lower() != "set-cookie"}
+            if cookies:
+                result["cookies"] = cookies
+        else:
+            result["headers"] = single
+            result["multiValueHeaders"] = multi
+        return result
+
+
+class _Chained:
+    """
+    Fragments passés à write() (WSGI ancien style) puis itérable de
+    l'application, avec son close().
+    """
+
+    def __init__(self, written: List[bytes], result: Any):
+        self._written = written
+        self._result = result
+        self._iterator = iter(result)
+        self._first: Optional[bytes] = None
+
+    def prime(self) -> None:
+        # Lit le premier fragment : les applications paresseuses appellent
+        # start_response à ce moment-là
+        self._first = next(self._iterator, None)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._written
+        if self._first:
+            yield self._first
+        for chunk in self._iterator:
+            if chunk:
+                yield chunk
+
+    def close(self) -> None:
+        close = getattr(self._result, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,405 @@
+"""
+Persistance des conversations, partagée entre les workers.
+
+L'historique d'une session vit en mémoire dans le worker qui la sert
+(session_store) ; ce module en conserve une copie durable pour qu'un
+redémarrage, un redéploiement ou le passage d'une requête à un autre worker
+ne fasse pas perdre le contexte.
+
+Le stockage par défaut est un journal de messages en ajout seul dans SQLite
+(mode WAL) :
+
+- un message n'est jamais réécrit ; effacer une conversation ajoute un
+  marqueur `clear` ;
+- les écritures sont regroupées (group commit) par un thread d'écriture :
+  une transaction par lot plutôt qu'une par message ;
+- à la lecture, seule la fenêtre de contexte nécessaire est chargée, via
+  l'index (session_id, id) ;
+- le thread d'écriture purge périodiquement les sessions inactives depuis
+  plus de `retention` secondes (SESSION_TTL_SECONDS) et les messages
+  antérieurs au dernier effacement d'une conversation.
+
+D'autres stockages peuvent être branchés en implémentant SessionBackend.
+"""
+
+import os
+import queue
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from logging import getLogger
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = getLogger(__name__)
+
+# Rôle du marqueur d'effacement d'une conversation
+CLEAR_ROLE = "clear"
+
+
+class SessionBackend:
+    """
+    Interface d'un stockage durable des messages de session.
+
+    Attributes:
+        origin (str): Identifiant de l'écrivain (un par processus), qui permet
+            à un worker d'ignorer ses propres messages lors d'une resynchronisation
+    """
+
+    def __init__(self):
+        self._origin = ""
+        self._origin_pid = 0
+
+    @property
+    def origin(self) -> str:
+        # Renouvelé après un fork : chaque worker est un écrivain distinct
+        if self._origin_pid != os.getpid():
+            self._origin = secrets.token_hex(8)
+            self._origin_pid = os.getpid()
+        return self._origin
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Ajoute un message au journal de la session."""
+        raise NotImplementedError
+
+    def clear(self, session_id: str) -> None:
+        """Marque la conversation comme effacée."""
+        self.append(session_id, CLEAR_ROLE, "")
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             exclude_origin: Optional[str] = None) -> Tuple[List[Dict[str, str]], int, bool]:
+        """
+        Charge les derniers messages d'une session.
+
+        Args:
+            session_id: Identifiant de la session
+            limit: Nombre maximum de messages (fenêtre de contexte)
+            after: Ne charger que les messages postérieurs à cet identifiant
+            exclude_origin: Ignorer les messages écrits par cet écrivain
+
+        Returns:
+            Tuple (messages dans l'ordre chronologique, dernier identifiant vu,
+            True si ces messages remplacent l'historique au lieu de le prolonger)
+        """
+        raise NotImplementedError
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attend que les écritures en attente soient validées.
+
+        Returns:
+            True si tout a été écrit avant l'expiration du délai
+        """
+        return True
+
+    def close(self) -> None:
+        """Écrit les messages en attente et libère les ressources."""
+
+    def stats(self) -> Dict[str, int]:
+        """Retourne des statistiques sur le stockage."""
+        return {}
+
+
+def _window(rows: List[Tuple[int, str, str]], limit: int,
+            after: int) -> Tuple[List[Dict[str, str]], int, bool]:
+    """Coupe des lignes (id, rôle, contenu), des plus récentes aux plus anciennes, au dernier marqueur."""
+    last_id = rows[0][0] if rows else after
+    messages: List[Dict[str, str]] = []
+    # Une fenêtre pleine remplace l'historique : des messages plus anciens
+    # (ou un marqueur d'effacement) peuvent manquer entre les deux
+    replace = len(rows) >= limit
+    for _, role, content in rows[:limit]:
+        if role == CLEAR_ROLE:
+            replace = True
+            break
+        messages.append({"role": role, "content": content})
+    messages.reverse()
+    return messages, last_id, replace
+
+
+class MemorySessionBackend(SessionBackend):
+    """Journal en mémoire, limité au processus (tests, déploiements mono-worker)."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._rows: Dict[str, List[Tuple[int, str, str, str]]] = {}
+        self._next_id = 1
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            self._rows.setdefault(session_id, []).append((self._next_id, role, content, self.origin))
+            self._next_id += 1
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             exclude_origin: Optional[str] = None) -> Tuple[List[Dict[str, str]], int, bool]:
+        with self._lock:
+            rows = [
+                (row_id, role, content)
+                for row_id, role, content, origin in reversed(self._rows.get(session_id, []))
+                if row_id > after and origin != exclude_origin
+            ]
+        return _window(rows, limit, after)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Journal de messages en ajout seul dans SQLite (mode WAL).
+
+    `append` ne fait que mettre le message en file ; un thread d'écriture
+    valide en une transaction tous les messages arrivés pendant la validation
+    précédente (au plus `batch_size`), en attendant éventuellement jusqu'à
+    `flush_interval` secondes que le lot se remplisse. Un arrêt brutal peut
+    perdre les messages encore en file, jamais un lot partiellement écrit.
+
+    Attributes:
+        path (str): Chemin de la base SQLite
+        batch_size (int): Nombre maximum de messages par transaction
+        flush_interval (float): Attente maximale avant validation d'un lot, en secondes
+        retention (float): Inactivité après laquelle les messages d'une session
+            sont supprimés, en secondes (0 : conservés)
+        purge_interval (float): Intervalle entre deux purges, en secondes
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.0,
+                 retention: float = 0.0, purge_interval: float = 60.0):
+        super().__init__()
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, str, str, float]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._pid = 0
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+        self._next_purge = 0.0
+        # Sessions effacées depuis la dernière purge (messages antérieurs à compacter)
+        self._cleared: Set[str] = set()
+        self._stats: Dict[str, int] = {
+            "appends": 0,
+            "batches": 0,
+            "rows_written": 0,
+            "bytes_written": 0,
+            "rows_purged": 0,
+            "errors": 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages(session_id, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_created ON messages(created_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_writer(self) -> None:
+        # Le thread d'écriture ne survit pas à un fork (gunicorn --preload) :
+        # chaque processus démarre le sien au premier message
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._pending = 0
+                    self._writer = threading.Thread(target=self._write_loop, name="session-writer",
+                                                    daemon=True)
+                    self._pid = os.getpid()
+                    self._writer.start()
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        self._ensure_writer()
+        with self._lock:
+            self._pending += 1
+            self._stats["appends"] += 1
+        self._queue.put((session_id, role, content, time.time()))
+
+    def _write_loop(self) -> None:
+        write_queue = self._queue
+        wait = self.purge_interval if self.purge_interval > 0 else None
+        while True:
+            try:
+                item = write_queue.get(timeout=wait)
+            except queue.Empty:
+                self._maybe_purge()
+                continue
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = write_queue.get(timeout=remaining) if remaining > 0 else write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            self._maybe_purge()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, str, str, float]]) -> None:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, origin, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(sid, role, content, self.origin, at) for sid, role, content, at in batch],
+                )
+            written = sum(len(content.encode("utf-8")) for _, _, content, _ in batch)
+            with self._lock:
+                self._cleared.update(sid for sid, role, _, _ in batch if role == CLEAR_ROLE)
+                self._stats["batches"] += 1
+                self._stats["rows_written"] += len(batch)
+                self._stats["bytes_written"] += written
+        except sqlite3.Error as e:
+            logger.error(f"Failed to persist {len(batch)} session messages: {str(e)}")
+            with self._lock:
+                self._stats["errors"] += 1
+        finally:
+            with self._lock:
+                self._pending -= len(batch)
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def _maybe_purge(self) -> None:
+        if self.purge_interval > 0 and time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            self.purge()
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Supprime les messages des sessions inactives depuis plus de `retention`
+        secondes, et ceux qui précèdent le dernier effacement des sessions
+        effacées depuis la purge précédente.
+
+        Args:
+            now: Horodatage de référence (time.time() par défaut)
+
+        Returns:
+            Nombre de messages supprimés
+        """
+        with self._lock:
+            cleared, self._cleared = self._cleared, set()
+        deleted = 0
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if self.retention > 0:
+                    cutoff = (time.time() if now is None else now) - self.retention
+                    # Deux parcours de l'index messages_created : sessions ayant
+                    # des messages anciens, moins celles qui en ont de récents
+                    deleted += conn.execute(
+                        "DELETE FROM messages WHERE session_id IN ("
+                        "SELECT session_id FROM messages WHERE created_at < ? "
+                        "EXCEPT SELECT session_id FROM messages WHERE created_at >= ?)",
+                        (cutoff, cutoff),
+                    ).rowcount
+                for session_id in cleared:
+                    # Le dernier marqueur reste : les autres workers y voient l'effacement
+                    deleted += conn.execute(
+                        "DELETE FROM messages WHERE session_id = ? AND id < "
+                        "(SELECT MAX(id) FROM messages WHERE session_id = ? AND role = ?)",
+                        (session_id, session_id, CLEAR_ROLE),
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Failed to purge session messages: {str(e)}")
+            with self._lock:
+                self._cleared |= cleared
+                self._stats["errors"] += 1
+            return 0
+        with self._lock:
+            self._stats["rows_purged"] += deleted
+        return deleted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._pid != os.getpid():
+                return True
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def load(self, session_id: str, limit: int, after: int = 0,
+             exclude_origin: Optional[str] = None) -> Tuple[List[Dict[str, str]], int, bool]:
+        if self._pending and exclude_origin != self.origin:
+            # Nos propres messages encore en file doivent être visibles
+            self.flush(timeout=1.0)
+        rows = self._connection().execute(
+            "SELECT id, role, content FROM messages "
+            "WHERE session_id = ? AND id > ? AND origin != ? "
+            "ORDER BY id DESC LIMIT ?",
+            (session_id, after, exclude_origin or "", limit),
+        ).fetchall()
+        return _window(rows, limit, after)
+
+    def close(self) -> None:
+        if self._pid == os.getpid() and self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+            self._writer = None
+            self._pid = 0
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+        return stats
+
+
+def backend_from_env() -> Optional[SessionBackend]:
+    """
+    Crée le stockage des sessions configuré par SESSION_BACKEND.
+
+    Valeurs reconnues : `sqlite` (par défaut), `memory` et `none`.
+
+    Returns:
+        Le stockage, ou None si la persistance est désactivée
+    """
+    kind = os.getenv("SESSION_BACKEND", "sqlite").lower()
+    if kind in ("none", "off", "0"):
+        return None
+    if kind == "memory":
+        return MemorySessionBackend()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown session backend: {kind}")
+    return SQLiteSessionBackend(
+        os.getenv("SESSION_DB_PATH",
+                  os.path.join(tempfile.gettempdir(), "assistant-biblique", "sessions.sqlite3")),
+        batch_size=int(os.getenv("SESSION_WRITE_BATCH", "256")),
+        flush_interval=float(os.getenv("SESSION_FLUSH_MS", "0")) / 1000,
+        retention=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+        purge_interval=float(os.getenv("SESSION_PURGE_SECONDS", "60")),
+    )
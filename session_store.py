@@ -0,0 +1,323 @@
+"""
+Stockage des sessions de conversation.
+
+Chaque session (identifiée par un cookie ou un identifiant fourni par le client)
+possède son propre historique et son propre objet chat. Le stockage est borné
+en mémoire (nombre de sessions et octets estimés), applique une éviction LRU
+et une expiration après inactivité, et répartit les sessions sur plusieurs
+verrous (lock striping) pour que les workers multi-threads ne se bloquent pas
+sur un verrou global.
+"""
+
+import asyncio
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from logging import getLogger
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+logger = getLogger(__name__)
+
+# Coût fixe estimé d'une session (objets Python, objet chat, entrée du dictionnaire)
+SESSION_OVERHEAD_BYTES = 768
+
+SESSION_COOKIE_NAME = "session_id"
+SESSION_HEADER_NAME = "X-Session-Id"
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+
+
+def is_valid_session_id(session_id: Any) -> bool:
+    """Vérifie qu'un identifiant de session fourni par le client est acceptable."""
+    return isinstance(session_id, str) and bool(_SESSION_ID_PATTERN.match(session_id))
+
+
+def new_session_id() -> str:
+    """Génère un nouvel identifiant de session aléatoire."""
+    return secrets.token_urlsafe(16)
+
+
+class Session:
+    """
+    État d'une conversation pour un utilisateur.
+
+    Attributes:
+        session_id (str): Identifiant de la session
+        history: Historique de la conversation (ConversationHistory)
+        chat: Objet chat associé à la session
+        lock (threading.Lock): Sérialise les requêtes d'une même session
+        last_access (float): Horodatage du dernier accès
+        size (int): Taille mémoire estimée en octets
+    """
+
+    __slots__ = ("session_id", "history", "chat", "lock", "last_access", "size")
+
+    def __init__(self, session_id: str, history: Any, chat: Any, now: float):
+        self.session_id = session_id
+        self.history = history
+        self.chat = chat
+        self.lock = threading.Lock()
+        self.last_access = now
+        self.size = 0
+
+
+def estimate_session_size(session: Session) -> int:
+    """
+    Estime la mémoire occupée par une session.
+
+    Args:
+        session: La session à mesurer
+
+    Returns:
+        Taille estimée en octets
+    """
+    messages = getattr(session.history, "messages", None) or []
+    prompt = getattr(session.history, "prompt", None)
+    message_bytes = sum(len(msg["content"]) + 64 for msg in messages)
+    # Le PromptBuilder partage les mêmes chaînes, mais peut en retenir davantage
+    prompt_bytes = 4 * prompt.total_tokens if prompt is not None else 0
+    return SESSION_OVERHEAD_BYTES + max(message_bytes, prompt_bytes)
+
+
+class _Stripe:
+    """Partition du stockage protégée par son propre verrou."""
+
+    __slots__ = ("lock", "sessions", "bytes")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.bytes = 0
+
+
+class SessionStore:
+    """
+    Stockage des sessions avec plafond mémoire, éviction LRU et expiration.
+
+    Les sessions sont réparties sur `stripes` partitions selon le hachage de
+    leur identifiant ; les plafonds sont appliqués par partition.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Tuple[Any, Any]],
+        max_sessions: int = 10000,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        stripes: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialise le stockage des sessions.
+
+        Args:
+            factory: Fonction créant le couple (historique, chat) d'une nouvelle session
+            max_sessions: Nombre maximum de sessions vivantes
+            max_memory_bytes: Plafond de mémoire estimée pour l'ensemble des sessions
+            ttl_seconds: Durée d'inactivité après laquelle une session expire
+            stripes: Nombre de partitions (et de verrous)
+            clock: Horloge monotone, remplaçable pour les tests
+        """
+        if stripes < 1:
+            raise ValueError("stripes must be >= 1")
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._max_per_stripe = max(1, max_sessions // stripes)
+        self._bytes_per_stripe = max(SESSION_OVERHEAD_BYTES, max_memory_bytes // stripes)
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls, factory: Callable[[str], Tuple[Any, Any]]) -> "SessionStore":
+        """Crée un stockage configuré depuis les variables d'environnement."""
+        return cls(
+            factory,
+            max_sessions=int(os.getenv("SESSION_MAX_COUNT", "10000")),
+            max_memory_bytes=int(float(os.getenv("SESSION_MAX_MEMORY_MB", "256")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+            stripes=int(os.getenv("SESSION_LOCK_STRIPES", "16")),
+        )
+
+    def _stripe(self, session_id: str) -> _Stripe:
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    def get(self, session_id: str) -> Session:
+        """
+        Retourne la session correspondante, en la créant si nécessaire.
+
+        Args:
+            session_id: Identifiant de la session
+
+        Returns:
+            La session, marquée comme la plus récemment utilisée
+        """
+        stripe = self._stripe(session_id)
+        now = self.clock()
+        with stripe.lock:
+            session = stripe.sessions.get(session_id)
+            if session is not None and now - session.last_access <= self.ttl_seconds:
+                session.last_access = now
+                stripe.sessions.move_to_end(session_id)
+                return session
+            if session is not None:
+                self._remove(stripe, session_id)
+                self.expirations += 1
+
+        # La création (qui peut ouvrir un chat) se fait hors du verrou de partition
+        history, chat = self.factory(session_id)
+        created = Session(session_id, history, chat, now)
+        created.size = estimate_session_size(created)
+
+        with stripe.lock:
+            session = stripe.sessions.get(session_id)
+            if session is not None:
+                # Une autre requête a créé la session entre-temps
+                session.last_access = now
+                stripe.sessions.move_to_end(session_id)
+                return session
+            stripe.sessions[session_id] = created
+            stripe.bytes += created.size
+            self._enforce_limits(stripe, now)
+            return created
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        """
+        Donne un accès exclusif à une session pendant le traitement d'une requête.
+
+        La taille de la session est réévaluée à la sortie et les plafonds sont
+        appliqués de nouveau.
+        """
+        session = self.get(session_id)
+        with session.lock:
+            try:
+                yield session
+            finally:
+                self._resize(session)
+
+    @asynccontextmanager
+    async def session_async(self, session_id: str, poll_interval: float = 0.005) -> AsyncIterator[Session]:
+        """
+        Variante de session() pour les vues asynchrones : le verrou, partagé
+        avec les requêtes servies par des threads, est attendu par sondage
+        sans bloquer la boucle d'événements.
+        """
+        session = self.get(session_id)
+        while not session.lock.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+        try:
+            yield session
+        finally:
+            try:
+                self._resize(session)
+            finally:
+                session.lock.release()
+
+    def _resize(self, session: Session) -> None:
+        stripe = self._stripe(session.session_id)
+        new_size = estimate_session_size(session)
+        with stripe.lock:
+            if stripe.sessions.get(session.session_id) is session:
+                stripe.bytes += new_size - session.size
+                session.size = new_size
+                self._enforce_limits(stripe, self.clock())
+            else:
+                session.size = new_size
+
+    def _remove(self, stripe: _Stripe, session_id: str) -> None:
+        session = stripe.sessions.pop(session_id)
+        stripe.bytes -= session.size
+
+    def _enforce_limits(self, stripe: _Stripe, now: float) -> None:
+        """Expire puis évince les sessions les moins récemment utilisées (verrou tenu)."""
+        sessions = stripe.sessions
+        while sessions:
+            oldest_id, oldest = next(iter(sessions.items()))
+            if now - oldest.last_access > self.ttl_seconds:
+                self._remove(stripe, oldest_id)
+                self.expirations += 1
+            elif len(sessions) > self._max_per_stripe or (
+                stripe.bytes > self._bytes_per_stripe and len(sessions) > 1
+            ):
+                self._remove(stripe, oldest_id)
+                self.evictions += 1
+            else:
+                break
+
+    def discard(self, session_id: str) -> bool:
+        """
+        Supprime une session.
+
+        Returns:
+            True si la session existait
+        """
+        stripe = self._stripe(session_id)
+        with stripe.lock:
+            if session_id not in stripe.sessions:
+                return False
+            self._remove(stripe, session_id)
+            return True
+
+    def purge_expired(self) -> int:
+        """
+        Supprime toutes les sessions inactives depuis plus de ttl_seconds.
+
+        Returns:
+            Nombre de sessions supprimées
+        """
+        now = self.clock()
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                expired = [
+                    sid for sid, session in stripe.sessions.items()
+                    if now - session.last_access > self.ttl_seconds
+                ]
+                for sid in expired:
+                    self._remove(stripe, sid)
+                removed += len(expired)
+        self.expirations += removed
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(stripe.sessions) for stripe in self._stripes)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._stripe(session_id).sessions
+
+    def memory_usage(self) -> int:
+        """Retourne la mémoire estimée de toutes les sessions, en octets."""
+        return sum(stripe.bytes for stripe in self._stripes)
+
+    def stats(self) -> Dict[str, int]:
+        """Retourne des statistiques sur le stockage."""
+        return {
+            "sessions": len(self),
+            "memory_bytes": self.memory_usage(),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def resolve_session_id(header_value: Optional[str], body_value: Any,
+                       cookie_value: Optional[str]) -> Tuple[str, bool]:
+    """
+    Détermine l'identifiant de session d'une requête.
+
+    L'en-tête X-Session-Id est prioritaire, puis le champ `session_id` du corps
+    JSON, puis le cookie. Un nouvel identifiant est généré si aucun n'est valide.
+
+    Returns:
+        Tuple (identifiant, True si l'identifiant vient d'être généré)
+    """
+    for candidate in (header_value, body_value, cookie_value):
+        if is_valid_session_id(candidate):
+            return candidate, False
+    return new_session_id(), True
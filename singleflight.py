@@ -0,0 +1,185 @@
+"""
+Regroupement des requêtes identiques en cours (single-flight).
+
+Lorsque plusieurs appelants demandent simultanément la même clé, un seul
+(le « meneur ») exécute l'appel amont ; les autres attendent son résultat
+et le partagent.
+
+do_async() offre le même regroupement aux coroutines : les attendants
+patientent sans bloquer la boucle d'événements.
+"""
+
+import asyncio
+import threading
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = getLogger(__name__)
+
+
+class _Call:
+    """Appel amont en cours, partagé par les appelants d'une même clé."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce les appels concurrents portant sur la même clé.
+
+    Si l'appel du meneur échoue, ses attendants ne reçoivent pas son erreur :
+    ils relancent une (seule) fois un nouvel appel, lui-même coalescé, afin
+    qu'une défaillance ponctuelle ne se propage pas à tous.
+
+    Attributes:
+        timeout (float): Attente maximale d'un appelant, en secondes
+        stats (Dict[str, int]): Compteurs d'appels
+    """
+
+    def __init__(self, timeout: float = 60.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        # Appels des coroutines : futures de la boucle d'événements, (résultat, erreur)
+        self._async_calls: Dict[str, "asyncio.Future[Tuple[Any, Optional[BaseException]]]"] = {}
+        self.stats: Dict[str, int] = {
+            "calls": 0,      # appels reçus
+            "upstream": 0,   # appels réellement exécutés
+            "shared": 0,     # appels servis par le résultat d'un autre (appels amont économisés)
+            "retries": 0,    # attendants relancés après l'échec du meneur
+            "errors": 0,     # appels amont en erreur
+            "timeouts": 0,   # attendants ayant abandonné
+        }
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Exécute fn une seule fois pour tous les appelants concurrents de key.
+
+        Args:
+            key: Clé identifiant l'appel
+            fn: Appel amont à exécuter
+            timeout: Attente maximale (par défaut self.timeout)
+
+        Returns:
+            Le résultat de fn
+
+        Raises:
+            TimeoutError: Si le résultat n'arrive pas à temps
+            Exception: L'erreur de fn, pour le meneur ou après la relance
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+        return self._do(key, fn, self.timeout if timeout is None else timeout, retry=True)
+
+    def _do(self, key: str, fn: Callable[[], Any], timeout: float, retry: bool) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["upstream"] += 1
+            else:
+                call.waiters += 1
+
+        if leader:
+            return self._run(key, call, fn)
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise TimeoutError(f"Timed out after {timeout:.1f}s waiting for in-flight request")
+
+        if call.error is None:
+            with self._lock:
+                self.stats["shared"] += 1
+            return call.result
+
+        if not retry:
+            raise call.error
+        with self._lock:
+            self.stats["retries"] += 1
+        logger.info(f"In-flight request failed, retrying for waiter: {str(call.error)}")
+        return self._do(key, fn, timeout, retry=False)
+
+    def _run(self, key: str, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Variante de do() pour les coroutines, dans une même boucle d'événements.
+
+        Args:
+            key: Clé identifiant l'appel
+            fn: Fonction sans argument retournant la coroutine de l'appel amont
+            timeout: Attente maximale (par défaut self.timeout)
+
+        Raises:
+            Les mêmes erreurs que do()
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+        return await self._do_async(key, fn, self.timeout if timeout is None else timeout, retry=True)
+
+    async def _do_async(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: float, retry: bool) -> Any:
+        # Pas de verrou : le dictionnaire n'est lu et modifié que depuis la boucle
+        call = self._async_calls.get(key)
+        if call is None:
+            call = self._async_calls[key] = asyncio.get_running_loop().create_future()
+            with self._lock:
+                self.stats["upstream"] += 1
+            try:
+                result = await fn()
+            except BaseException as e:
+                # L'erreur est transmise comme valeur : sans attendant, la
+                # future n'a pas d'exception « jamais récupérée »
+                call.set_result((None, e))
+                with self._lock:
+                    self.stats["errors"] += 1
+                raise
+            else:
+                call.set_result((result, None))
+                return result
+            finally:
+                del self._async_calls[key]
+
+        try:
+            # shield : l'abandon d'un attendant n'annule pas la future partagée
+            result, error = await asyncio.wait_for(asyncio.shield(call), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise TimeoutError(f"Timed out after {timeout:.1f}s waiting for in-flight request")
+
+        if error is None:
+            with self._lock:
+                self.stats["shared"] += 1
+            return result
+
+        if not retry:
+            raise error
+        with self._lock:
+            self.stats["retries"] += 1
+        logger.info(f"In-flight request failed, retrying for waiter: {str(error)}")
+        return await self._do_async(key, fn, timeout, retry=False)
+
+    def in_flight(self) -> int:
+        """Retourne le nombre d'appels amont en cours."""
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
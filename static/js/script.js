@@ -8,6 +8,27 @@ class VoiceAssistant {
         this.initializeElements();
         this.initializeSpeechRecognition();
         this.setupEventListeners();
+        this.audioQueue = [];
+        this.currentAudio = null;
+        this.serverSpeech = false;
+        this.voiceSocket = null;
+        this.voiceSocketFailed = false;
+        this.voiceQuestions = 0;
+        this.detectServerSpeech();
+    }
+
+    /**
+     * Active la synthèse vocale du serveur si elle est disponible
+     * @private
+     */
+    async detectServerSpeech() {
+        try {
+            const response = await fetch('/api/health');
+            const data = await response.json();
+            this.serverSpeech = Boolean(data.tts && data.tts.available);
+        } catch (error) {
+            this.serverSpeech = false;
+        }
     }
 
     /**
@@ -42,6 +63,11 @@ class VoiceAssistant {
      */
     initializeSpeechRecognition() {
         if (!('webkitSpeechRecognition' in window) && !('SpeechRecognition' in window)) {
+            // Sans reconnaissance locale : l'enregistrement est transcrit par le serveur
+            if (window.MediaRecorder && navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
+                this.useRecorder = true;
+                return;
+            }
             this.handleError('La reconnaissance vocale n\'est pas supportée par votre navigateur.');
             this.elements.speakButton.disabled = true;
             return;
@@ -59,7 +85,8 @@ class VoiceAssistant {
     configureRecognition() {
         this.recognition.lang = 'fr-FR';
         this.recognition.continuous = false;
-        this.recognition.interimResults = false;
+        // Les transcriptions provisoires permettent au serveur d'anticiper la réponse
+        this.recognition.interimResults = true;
 
         this.recognition.onstart = () => this.handleRecognitionStart();
         this.recognition.onend = () => this.handleRecognitionEnd();
@@ -80,6 +107,9 @@ class VoiceAssistant {
      * @private
      */
     toggleRecognition() {
+        if (this.useRecorder) {
+            return this.toggleRecording();
+        }
         if (this.elements.speakButton.classList.contains('listening')) {
             this.recognition.stop();
         } else {
@@ -88,6 +118,87 @@ class VoiceAssistant {
         }
     }
 
+    /**
+     * Démarre ou arrête l'enregistrement envoyé au serveur
+     * @private
+     */
+    async toggleRecording() {
+        if (this.recorder && this.recorder.state === 'recording') {
+            this.recorder.stop();
+            return;
+        }
+
+        try {
+            const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+            const chunks = [];
+            this.clearMessages();
+            this.recorder = new MediaRecorder(stream);
+            this.recorder.ondataavailable = (event) => chunks.push(event.data);
+            this.recorder.onstop = () => {
+                stream.getTracks().forEach(track => track.stop());
+                this.elements.speakButton.classList.remove('active', 'listening');
+                this.sendRecording(new Blob(chunks, { type: this.recorder.mimeType }));
+            };
+            this.recorder.start();
+            this.updateStatus('listening', 'fas fa-microphone-alt', 'Enregistrement... (cliquez pour terminer)');
+            this.elements.speakButton.classList.add('active', 'listening');
+        } catch (error) {
+            this.handleError(`Microphone indisponible : ${error.message}`);
+        }
+    }
+
+    /**
+     * Envoie une requête et, si le serveur est saturé (429/503), patiente le
+     * délai indiqué par Retry-After avant un nouvel essai
+     * @private
+     * @param {string} url 
+     * @param {Object} options 
+     * @param {number} retries 
+     * @returns {Promise<Response>}
+     */
+    async fetchWithRetry(url, options, retries = 1) {
+        const response = await fetch(url, options);
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+        if ((response.status === 429 || response.status === 503) && retries > 0
+                && retryAfter > 0 && retryAfter <= 10) {
+            this.updateStatus('processing', 'fas fa-hourglass-half',
+                `Serveur occupé, nouvel essai dans ${retryAfter} s...`);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            return this.fetchWithRetry(url, options, retries - 1);
+        }
+        return response;
+    }
+
+    /**
+     * Envoie un enregistrement à transcrire et affiche la réponse
+     * @private
+     * @param {Blob} recording 
+     */
+    async sendRecording(recording) {
+        this.updateStatus('processing', 'fas fa-cog fa-spin', 'Traitement en cours...');
+        try {
+            const response = await this.fetchWithRetry('/api/process_audio/upload', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': recording.type || 'audio/webm'
+                },
+                body: recording
+            });
+
+            const data = await response.json();
+
+            if (!response.ok) {
+                throw new Error(data.message || data.error || 'Erreur serveur');
+            }
+
+            this.elements.userCommandElement.textContent = data.transcript;
+            this.handleAPIResponse(data);
+            this.speak(data.response);
+        } catch (error) {
+            this.handleError(`Erreur de communication : ${error.message}`);
+        }
+    }
+
     /**
      * Gère le début de la reconnaissance
      * @private
@@ -96,6 +207,7 @@ class VoiceAssistant {
         this.updateStatus('listening', 'fas fa-microphone-alt', 'Écoute en cours...');
         this.elements.speakButton.classList.add('active', 'listening');
         this.elements.speakButton.disabled = true;
+        this.openVoiceSocket();
     }
 
     /**
@@ -125,20 +237,117 @@ class VoiceAssistant {
      * @param {SpeechRecognitionEvent} event 
      */
     handleRecognitionResult(event) {
-        const transcript = event.results[0][0].transcript;
+        const results = Array.from(event.results);
+        const transcript = results.map(result => result[0].transcript).join('');
         this.elements.userCommandElement.textContent = transcript;
+        if (!results.every(result => result.isFinal)) {
+            // L'utilisateur parle : la lecture de la réponse précédente s'arrête
+            this.cancelSpeech();
+            this.sendVoiceMessage({ type: 'interim', text: transcript });
+            return;
+        }
+
         this.updateStatus('processing', 'fas fa-cog fa-spin', 'Traitement en cours...');
-        this.sendToAPI(transcript);
+        if (this.sendVoiceMessage({ type: 'final', text: transcript })) {
+            this.voiceQuestions += 1;
+            this.startStreamingResponse();
+        } else {
+            this.sendToAPI(transcript);
+        }
     }
 
     /**
-     * Envoie la transcription à l'API
+     * Ouvre la session vocale WebSocket, si le serveur la propose
+     * (sinon les questions passent par les routes HTTP)
+     * @private
+     */
+    openVoiceSocket() {
+        if (!window.WebSocket || this.voiceSocketFailed || this.voiceSocket) return;
+
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/api/voice`);
+        let opened = false;
+        this.voiceSocket = socket;
+        socket.onopen = () => {
+            opened = true;
+            // Les réponses sont numérotées à partir de 1 dans chaque session
+            this.voiceQuestions = 0;
+        };
+        socket.onmessage = (event) => this.handleVoiceMessage(JSON.parse(event.data));
+        socket.onclose = () => {
+            if (this.voiceSocket === socket) this.voiceSocket = null;
+            // Pas de WebSocket côté serveur (Vercel…) : inutile de réessayer
+            if (!opened) this.voiceSocketFailed = true;
+        };
+    }
+
+    /**
+     * Envoie un message sur la session vocale
+     * @private
+     * @param {Object} message 
+     * @returns {boolean} false si la session n'est pas ouverte
+     */
+    sendVoiceMessage(message) {
+        if (!this.voiceSocket || this.voiceSocket.readyState !== WebSocket.OPEN) return false;
+        this.voiceSocket.send(JSON.stringify(message));
+        return true;
+    }
+
+    /**
+     * Gère un message de la session vocale
+     * @private
+     * @param {Object} data 
+     */
+    handleVoiceMessage(data) {
+        // Fin d'une réponse interrompue, arrivée après la question suivante
+        if (data.id !== undefined && data.id !== this.voiceQuestions) return;
+        if (data.type === 'delta' || data.type === 'done' || data.type === 'error') {
+            this.handleStreamEvent(data.type, data);
+        }
+    }
+
+    /**
+     * Envoie la transcription à l'API en flux (Server-Sent Events)
+     * et lit chaque phrase dès qu'elle est complète
      * @private
      * @param {string} text 
      */
     async sendToAPI(text) {
+        if (!window.ReadableStream || !window.TextDecoder) {
+            return this.sendToAPIWithoutStreaming(text);
+        }
+
         try {
-            const response = await fetch('/api/process_audio', {
+            const response = await this.fetchWithRetry('/api/process_audio/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
+                },
+                body: JSON.stringify({ text })
+            });
+
+            if (!response.ok || !response.body) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.message || data.error || 'Erreur serveur');
+            }
+
+            this.startStreamingResponse();
+            await this.readEventStream(response.body, (event, data) => this.handleStreamEvent(event, data));
+        } catch (error) {
+            this.handleError(`Erreur de communication : ${error.message}`);
+        }
+    }
+
+    /**
+     * Envoie la transcription à l'API et attend la réponse complète
+     * (navigateurs sans support des flux)
+     * @private
+     * @param {string} text 
+     */
+    async sendToAPIWithoutStreaming(text) {
+        try {
+            const response = await this.fetchWithRetry('/api/process_audio', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -149,10 +358,11 @@ class VoiceAssistant {
             const data = await response.json();
 
             if (!response.ok) {
-                throw new Error(data.error || 'Erreur serveur');
+                throw new Error(data.message || data.error || 'Erreur serveur');
             }
 
             this.handleAPIResponse(data);
+            this.speak(data.response);
         } catch (error) {
             this.handleError(`Erreur de communication : ${error.message}`);
         }
@@ -161,7 +371,7 @@ class VoiceAssistant {
     /**
      * Gère la réponse de l'API
      * @private
-     * @param {Object} data 
+     * @param {Object} data
      */
     handleAPIResponse(data) {
         if (data.error) {
@@ -177,6 +387,153 @@ class VoiceAssistant {
         }
     }
 
+    /**
+     * Lit un flux Server-Sent Events et appelle onEvent pour chaque événement
+     * @private
+     * @param {ReadableStream} body 
+     * @param {function(string, Object)} onEvent 
+     */
+    async readEventStream(body, onEvent) {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let separator;
+            while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separator);
+                buffer = buffer.slice(separator + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
+    /**
+     * Prépare l'affichage d'une réponse en flux
+     * @private
+     */
+    startStreamingResponse() {
+        this.streamedText = '';
+        this.pendingSpeech = '';
+        this.elements.assistantResponseElement.textContent = '';
+        this.cancelSpeech();
+    }
+
+    /**
+     * Gère un événement du flux de réponse
+     * @private
+     * @param {string} event 
+     * @param {Object} data 
+     */
+    handleStreamEvent(event, data) {
+        if (event === 'delta') {
+            this.streamedText += data.text;
+            this.elements.assistantResponseElement.textContent = this.streamedText;
+            this.updateStatus('processing', 'fas fa-comment-dots', 'Réponse en cours...');
+            this.speakCompleteSentences(data.text);
+        } else if (event === 'done') {
+            this.speak(this.pendingSpeech);
+            this.pendingSpeech = '';
+            this.handleAPIResponse(data);
+        } else if (event === 'error') {
+            this.handleError(data.message || data.error);
+        }
+    }
+
+    /**
+     * Lit les phrases complètes accumulées et garde la fin incomplète
+     * @private
+     * @param {string} fragment 
+     */
+    speakCompleteSentences(fragment) {
+        this.pendingSpeech += fragment;
+        const match = this.pendingSpeech.match(/^[\s\S]*[.!?;»)](\s|$)/);
+        if (!match) return;
+
+        this.speak(match[0]);
+        this.pendingSpeech = this.pendingSpeech.slice(match[0].length);
+    }
+
+    /**
+     * Ajoute un texte à la file de synthèse vocale
+     * @private
+     * @param {string} text 
+     */
+    speak(text) {
+        if (!text || !text.trim()) return;
+
+        if (this.serverSpeech) {
+            this.audioQueue.push(text.trim());
+            if (!this.currentAudio) this.playNextAudio();
+            return;
+        }
+        this.speakInBrowser(text);
+    }
+
+    /**
+     * Lit le prochain texte de la file avec l'audio du serveur
+     * @private
+     */
+    playNextAudio() {
+        const text = this.audioQueue.shift();
+        if (text === undefined) {
+            this.currentAudio = null;
+            return;
+        }
+
+        const audio = new Audio(`/api/tts?text=${encodeURIComponent(text)}`);
+        this.currentAudio = audio;
+        audio.onended = () => this.playNextAudio();
+        audio.onerror = () => {
+            // Serveur indisponible : retour à la synthèse du navigateur
+            if (this.currentAudio !== audio) return;
+            this.serverSpeech = false;
+            this.speakInBrowser(text);
+            this.audioQueue.splice(0).forEach(pending => this.speakInBrowser(pending));
+            this.currentAudio = null;
+        };
+        audio.play().catch(() => audio.onerror());
+    }
+
+    /**
+     * Ajoute un texte à la file de synthèse vocale du navigateur
+     * @private
+     * @param {string} text 
+     */
+    speakInBrowser(text) {
+        if (!window.speechSynthesis) return;
+
+        const utterance = new SpeechSynthesisUtterance(text.trim());
+        utterance.lang = 'fr-FR';
+        window.speechSynthesis.speak(utterance);
+    }
+
+    /**
+     * Interrompt la lecture en cours et vide les files
+     * @private
+     */
+    cancelSpeech() {
+        this.audioQueue = [];
+        if (this.currentAudio) {
+            const audio = this.currentAudio;
+            this.currentAudio = null;
+            audio.pause();
+            audio.removeAttribute('src');
+        }
+        if (window.speechSynthesis) window.speechSynthesis.cancel();
+    }
+
     /**
      * Met à jour l'indicateur de statut
      * @private
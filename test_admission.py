@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from admission import ConcurrencyLimiter, MemoryRateLimiter, Saturated, SQLiteRateLimiter
+from bible_chat import ConversationHistory
+from fake_gemini import FakeGenerativeModel, LatencyDistribution
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestAdmission(unittest.TestCase):
+    """Tests de la limitation du débit et du plafond des requêtes en cours."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_token_bucket_shared_between_workers(self):
+        """Deux workers partagent le seau d'un client ; le refus indique le délai avant le prochain jeton."""
+        path = os.path.join(self.tmpdir.name, "ratelimit.sqlite3")
+        first, second = SQLiteRateLimiter(path, rate=0.5, burst=3), SQLiteRateLimiter(path, rate=0.5, burst=3)
+        self.assertTrue(first.acquire("ip:1.2.3.4")[0])
+        self.assertTrue(second.acquire("ip:1.2.3.4")[0])
+        self.assertTrue(first.acquire("ip:1.2.3.4")[0])
+        allowed, retry_after = second.acquire("ip:1.2.3.4")
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 2.0, delta=0.1)
+        self.assertTrue(second.acquire("ip:5.6.7.8")[0])
+
+        memory = MemoryRateLimiter(rate=100, burst=1)
+        self.assertTrue(memory.acquire("a")[0])
+        self.assertFalse(memory.acquire("a")[0])
+        time.sleep(0.02)
+        self.assertTrue(memory.acquire("a")[0])
+
+    def test_in_flight_cap_shared_between_processes(self):
+        """Une place tenue par un processus n'est pas disponible pour un autre."""
+        path = os.path.join(self.tmpdir.name, "inflight.lock")
+        limiter = ConcurrencyLimiter(1, path, queue_timeout=0)
+        slot = limiter.acquire()
+        code = (
+            "import sys\n"
+            "from admission import ConcurrencyLimiter, Saturated\n"
+            f"limiter = ConcurrencyLimiter(1, {path!r}, queue_timeout=0)\n"
+            "print(limiter.in_flight(), end=' ')\n"
+            "try:\n"
+            "    limiter.acquire()\n"
+            "    print('admitted')\n"
+            "except Saturated:\n"
+            "    print('rejected')\n"
+        )
+        run = lambda: subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,  # noqa: E731
+                                     text=True, check=True).stdout.split()
+        self.assertEqual(run(), ["1", "rejected"])
+        limiter.release(slot)
+        limiter.release(slot)
+        self.assertEqual(run(), ["0", "admitted"])
+
+    def test_bounded_wait_queue(self):
+        """Une requête attend qu'une place se libère, dans la limite de la file et du délai."""
+        limiter = ConcurrencyLimiter(1, os.path.join(self.tmpdir.name, "inflight.lock"),
+                                     queue_size=1, queue_timeout=1.0)
+        slot = limiter.acquire()
+        threading.Timer(0.05, limiter.release, (slot,)).start()
+        start = time.perf_counter()
+        slot = limiter.acquire()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(limiter.stats["queued"], 1)
+
+        limiter.queue_timeout = 0.05
+        with self.assertRaises(Saturated):
+            limiter.acquire()
+        self.assertTrue(limiter.saturated())
+
+    def test_routes_reject_fast_with_retry_after(self):
+        """429 quand le client a épuisé son débit, 503 quand le modèle est saturé ; la santé passe à degraded."""
+        model = FakeGenerativeModel(answer=lambda q: "La foi (Hébreux 11:1).",
+                                    first_chunk_latency=LatencyDistribution("const", 0.0))
+        limiter = ConcurrencyLimiter(1, os.path.join(self.tmpdir.name, "inflight.lock"), queue_timeout=0)
+        client = app_module.app.test_client()
+        body = {"text": "Qu'est-ce que la foi ?", "cache": False}
+        with patch.object(app_module, "chat", model.start_chat()), \
+                patch.object(app_module.session_store, "factory",
+                             lambda sid: (ConversationHistory(), model.start_chat())), \
+                patch.object(app_module, "inflight", limiter), \
+                patch.object(app_module, "rate_limiter", MemoryRateLimiter(rate=0.5, burst=2)):
+            self.assertEqual(client.post("/api/process_audio", json=body).status_code, 200)
+            response = client.post("/api/process_audio/stream", json=body)
+            self.assertIn("event: done", response.get_data(as_text=True))
+            response.close()
+            self.assertEqual(limiter.in_flight(), 0)
+
+            response = client.post("/api/process_audio", json=body)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers["Retry-After"], "2")
+
+            app_module.rate_limiter = None
+            slot = limiter.acquire()
+            start = time.perf_counter()
+            response = client.post("/api/process_audio", json=body)
+            self.assertEqual(response.status_code, 503)
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+            health = client.get("/api/health").json
+            self.assertEqual(health["status"], "degraded")
+            self.assertTrue(health["admission"]["saturated"])
+            limiter.release(slot)
+
+
+if __name__ == "__main__":
+    unittest.main()
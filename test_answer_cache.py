@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bible_chat
+from answer_cache import (
+    AnswerCache, DiskCache, MemoryCache, make_cache_key, normalize_question
+)
+from bible_chat import ConversationHistory, SYSTEM_CONTEXT, get_bible_response
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Tests du cache des réponses."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "answers.sqlite3")
+
+    def make_cache(self, **kwargs):
+        return AnswerCache(MemoryCache(), DiskCache(self.path, **kwargs))
+
+    def test_normalize_question(self):
+        """Casse, accents, ponctuation et hésitations sont ignorés."""
+        self.assertEqual(normalize_question("Euh... Que dit la Bible sur le PARDON ?"),
+                         "que dit la bible sur le pardon")
+        self.assertEqual(normalize_question("Qu'est-ce que la grâce"),
+                         normalize_question("qu est ce que la grace ?"))
+        # Des mots porteurs de sens ne sont pas des hésitations
+        self.assertNotEqual(make_cache_key("Qui est le bon berger ?"), make_cache_key("Qui est le berger ?"))
+        self.assertEqual(normalize_question("À quoi sert la prière"), "a quoi sert la priere")
+        self.assertNotEqual(normalize_question("Is it well with my soul?"),
+                            normalize_question("Is it with my soul?"))
+
+    def test_first_turn_key_ignores_system_context(self):
+        """Une première question a la même clé quel que soit le contexte système."""
+        system = [{"role": "system", "content": SYSTEM_CONTEXT}]
+        self.assertEqual(make_cache_key("La prière ?", system), make_cache_key("la priere"))
+        follow_up = system + [{"role": "user", "content": "Qui est Pierre ?"},
+                              {"role": "assistant", "content": "Un apôtre."}]
+        self.assertNotEqual(make_cache_key("La prière ?", follow_up), make_cache_key("la priere"))
+        self.assertIsNone(make_cache_key("?!..."))
+
+    def test_disk_tier_survives_restart(self):
+        """Le niveau disque est relu par une nouvelle instance (autre worker)."""
+        self.make_cache().put("k", "Réponse (Luc 15:11)")
+
+        cache = self.make_cache()
+        self.assertEqual(cache.get("k"), "Réponse (Luc 15:11)")
+        self.assertEqual(cache.get("k"), "Réponse (Luc 15:11)")
+        self.assertEqual(cache.stats["disk_hits"], 1)
+        self.assertEqual(cache.stats["memory_hits"], 1)
+
+    def test_ttl_and_size_bounds(self):
+        """Les entrées expirées et excédentaires sont évincées."""
+        memory = MemoryCache(max_entries=2, ttl_seconds=10)
+        memory.put("a", "1", 0)
+        memory.put("b", "2", 0)
+        memory.put("c", "3", 0)
+        self.assertIsNone(memory.get("a", 1))
+        self.assertIsNone(memory.get("b", 11))
+
+        disk = DiskCache(self.path, max_entries=3, ttl_seconds=100)
+        for i in range(5):
+            disk.put(f"k{i}", str(i), float(i))
+        disk.evict(5.0)
+        self.assertEqual(len(disk), 3)
+        self.assertIsNone(disk.get("k0", 5.0))
+
+    def test_bypass(self):
+        """Le cache désactivé n'est ni lu ni alimenté."""
+        cache = self.make_cache()
+        cache.enabled = False
+        cache.put("k", "v")
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats["misses"], 0)
+
+    def test_get_bible_response_uses_cache(self):
+        """Une question récurrente n'appelle le modèle qu'une fois."""
+        chat = MagicMock()
+        chat.send_message.return_value = MagicMock(text="Le pardon... (Matthieu 6:14)")
+
+        with patch.object(bible_chat, "answer_cache", self.make_cache()):
+            for question in ("Que dit la Bible sur le pardon ?", "euh que dit la bible sur le pardon"):
+                history = ConversationHistory()
+                history.add_message("system", SYSTEM_CONTEXT)
+                response = get_bible_response(question, chat, history)
+                self.assertEqual(response, "Le pardon... (Matthieu 6:14)")
+                self.assertEqual(history.messages[-1]["content"], response)
+
+            get_bible_response("Que dit la Bible sur le pardon ?", chat,
+                               ConversationHistory(), use_cache=False)
+
+        self.assertEqual(chat.send_message.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
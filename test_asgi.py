@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+import bible_chat
+from asgi import app
+from fake_gemini import FakeGenerativeModel, LatencyDistribution
+from testutils import AppTestCase
+
+
+async def call(method, path, body=None, headers=()):
+    """Appelle l'application ASGI ; retourne (statut, en-têtes, corps)."""
+    scope = {
+        "type": "http", "method": method, "path": path, "root_path": "", "query_string": b"",
+        "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    messages = [{"type": "http.request", "body": body or b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def question(text, session_id):
+    body = json.dumps({"text": text, "session_id": session_id, "cache": False}).encode()
+    return call("POST", "/api/process_audio", body, [("Content-Type", "application/json")])
+
+
+class TestAsgi(AppTestCase):
+    """Tests du mode de service ASGI."""
+
+    def setUp(self):
+        self.use_model(FakeGenerativeModel(answer=lambda q: f"Réponse à « {q[-20:]} » (Jean 3:16).",
+                                           first_chunk_latency=LatencyDistribution("const", 0.3)))
+        self.patch(app_module, "rate_limiter", None)
+        self.patch(bible_chat.upstream, "hedge_percentile", 0)
+
+    def test_concurrent_upstream_calls_hold_no_thread(self):
+        """200 questions simultanées attendent le modèle ensemble, sans thread par requête."""
+        threads = threading.active_count()
+
+        async def burst():
+            return await asyncio.gather(*(question(f"Question numéro {i} ?", f"asgi-session-{i:04d}")
+                                          for i in range(200)))
+
+        start = time.perf_counter()
+        responses = asyncio.run(burst())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([status for status, _, _ in responses], [200] * 200)
+        self.assertLess(elapsed, 2.0)  # 60 s en série, 0,3 s d'attente partagée
+        self.assertLessEqual(threading.active_count(), threads + 1)
+        self.assertEqual(len(self.model.requests), 200)
+        payload = json.loads(responses[7][2])
+        self.assertEqual(payload["session_id"], "asgi-session-0007")
+        self.assertIn("Question numéro 7", payload["response"])
+        self.assertEqual(payload["citations"][0]["reference"], "Jean 3:16")
+
+    def test_rate_limiter_runs_off_the_event_loop(self):
+        """Un limiteur de débit lent (verrou SQLite disputé) ne bloque pas la boucle d'événements."""
+        class SlowLimiter:
+            def acquire(self, key):
+                time.sleep(0.2)
+                return True, 0.0
+
+        async def burst():
+            return await asyncio.gather(*(question(f"Question {i} ?", f"asgi-limited-{i:04d}") for i in range(8)))
+
+        with patch.object(app_module, "rate_limiter", SlowLimiter()):
+            start = time.perf_counter()
+            responses = asyncio.run(burst())
+            elapsed = time.perf_counter() - start
+        self.assertEqual([status for status, _, _ in responses], [200] * 8)
+        self.assertLess(elapsed, 1.2)  # 8 × 0,2 s + 0,3 s si les attentes bloquaient la boucle
+
+    def test_same_responses_as_flask_views(self):
+        """Erreurs de validation, santé et routes déléguées identiques au déploiement WSGI."""
+        async def requests():
+            return await asyncio.gather(
+                call("POST", "/api/process_audio", b"texte", [("Content-Type", "text/plain")]),
+                call("POST", "/api/process_audio", b'{"text": " "}', [("Content-Type", "application/json")]),
+                call("GET", "/api/health"),
+                call("GET", "/api/absent"),
+                call("GET", "/api/process_audio"),
+            )
+
+        unsupported, empty, health, missing, method = asyncio.run(requests())
+        self.assertEqual(unsupported[0], 415)
+        self.assertEqual(empty[0], 400)
+        self.assertEqual(json.loads(empty[2])["error"], "Invalid input")
+        self.assertEqual(health[0], 200)
+        self.assertEqual(json.loads(health[2])["service"], "assistant-biblique")
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(method[0], 405)
+
+        client = app_module.app.test_client()
+        expected = client.post("/api/process_audio", data="texte", content_type="text/plain")
+        self.assertEqual(json.loads(unsupported[2]), expected.json)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from assets import STATIC_DIR, build_assets, minify_css, minify_js
+
+
+class TestAssets(unittest.TestCase):
+    """Tests des fichiers statiques avec empreinte et de la compression."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.static_dir = os.path.join(tmpdir.name, "static")
+        shutil.copytree(STATIC_DIR, self.static_dir, ignore=shutil.ignore_patterns("build"))
+
+    def test_minifiers_keep_strings_and_regexes(self):
+        """Commentaires et espaces disparaissent, chaînes, gabarits et expressions régulières restent."""
+        css = minify_css('a > b , c { color: red ; /* x */ }\n.d::after { content: "a  /* b */"; }')
+        self.assertEqual(css, 'a>b,c{color:red}.d::after{content:"a  /* b */"}')
+
+        js = minify_js(
+            "// commentaire\n"
+            "const url = 'http://example.com';   /* bloc */\n\n"
+            "    const re = /[/\"]+\\/*/g;\n"
+            "const t = `ligne 1\n    ligne ${'2'}`;\n"
+            "return x / 2;\n"
+        )
+        self.assertEqual(js, "const url = 'http://example.com';\n"
+                             "const re = /[/\"]+\\/*/g;\n"
+                             "const t = `ligne 1\n    ligne ${'2'}`;\n"
+                             "return x / 2;\n")
+
+    @unittest.skipUnless(shutil.which("node"), "node absent")
+    def test_built_scripts_still_parse(self):
+        """Les scripts minifiés du projet restent du JavaScript valide."""
+        build_assets(self.static_dir)
+        build_js = os.path.join(self.static_dir, "build", "js")
+        for name in os.listdir(build_js):
+            if name.endswith(".js"):
+                subprocess.run(["node", "--check", os.path.join(build_js, name)], check=True)
+
+    def test_build_is_fingerprinted_and_reproducible(self):
+        """Chaque fichier porte l'empreinte de son contenu ; deux builds identiques donnent les mêmes octets."""
+        sizes = build_assets(self.static_dir)
+        with open(os.path.join(self.static_dir, "build", "manifest.json")) as f:
+            manifest = json.load(f)
+        self.assertEqual(set(manifest), {"css/styles.css", "js/script.js", "js/uiux.js"})
+        self.assertRegex(manifest["css/styles.css"], r"^build/css/styles\.[0-9a-f]{12}\.css$")
+        self.assertLess(sizes["js/script.js"]["gzip"], sizes["js/script.js"]["minified"])
+
+        path = os.path.join(self.static_dir, manifest["css/styles.css"])
+        with open(path, "rb") as f, open(path + ".gz", "rb") as gz:
+            minified, compressed = f.read(), gz.read()
+        self.assertEqual(gzip.decompress(compressed), minified)
+        self.assertIn(b"viewBox='0 0 100 100'", minified)
+
+        build_assets(self.static_dir)
+        with open(path + ".gz", "rb") as gz:
+            self.assertEqual(gz.read(), compressed)
+
+    def test_serves_precompressed_immutable_assets(self):
+        """La page référence les noms avec empreinte, servis précompressés, en cache immutable et avec 304."""
+        build_assets(self.static_dir)
+        client = app_module.app.test_client()
+        static_folder = app_module.app.static_folder
+        app_module.app.static_folder = self.static_dir
+        self.addCleanup(setattr, app_module.app, "static_folder", static_folder)
+        with patch.object(app_module.asset_manifest, "static_dir", self.static_dir):
+            html = client.get("/").get_data(as_text=True)
+            url = re.search(r'href="(/static/build/css/styles\.[0-9a-f]+\.css)"', html).group(1)
+
+            response = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertEqual(response.mimetype, "text/css")
+            self.assertIn("immutable", response.headers["Cache-Control"])
+            self.assertIn("Accept-Encoding", response.headers["Vary"])
+            body = gzip.decompress(response.data)
+
+            etag = response.headers["ETag"]
+            response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+
+            response = client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertEqual(response.data, body)
+            self.assertNotEqual(response.headers["ETag"], etag)
+
+            self.assertEqual(client.get("/static/build/css/absent.css").status_code, 404)
+            self.assertEqual(client.get("/static/css/styles.css").status_code, 200)
+
+    def test_json_responses_compressed_on_request(self):
+        """Les réponses JSON sont compressées si le client l'accepte."""
+        client = app_module.app.test_client()
+        with patch.object(app_module, "COMPRESS_MIN_BYTES", 0):
+            response = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertEqual(json.loads(gzip.decompress(response.data))["service"], "assistant-biblique")
+            response = client.get("/api/health")
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertEqual(response.json["service"], "assistant-biblique")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import unittest
+import wave
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+import bible_chat
+from app import app, session_store
+from audio_input import (
+    EnergyVAD, FakeASR, Resampler, UnsupportedAudioError, UnavailableASR, decoder_for, transcribe_upload
+)
+from bible_chat import ConversationHistory
+
+
+def tone(seconds, rate, amplitude=0.5):
+    return amplitude * np.sin(2 * np.pi * 440 * np.arange(int(seconds * rate)) / rate)
+
+
+def wav_bytes(samples, rate, channels=1):
+    interleaved = np.repeat(samples, channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((interleaved * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestAudioInput(unittest.TestCase):
+    """Tests de la réception des questions enregistrées."""
+
+    def test_resampler_is_independent_of_chunking(self):
+        """Le rééchantillonnage par morceaux donne le même signal qu'en une fois, à la bonne fréquence."""
+        for rate in (48000, 44100, 8000):
+            signal = tone(1.0, rate).astype(np.float32)
+            whole = Resampler(rate).process(signal)
+            resampler = Resampler(rate)
+            parts = np.concatenate([resampler.process(signal[i:i + 1013])
+                                    for i in range(0, len(signal), 1013)])
+            # Le dernier échantillon d'un suréchantillonnage attend le morceau suivant
+            self.assertAlmostEqual(len(whole), 16000, delta=1, msg=rate)
+            np.testing.assert_allclose(parts, whole, atol=1e-5)
+            spectrum = np.abs(np.fft.rfft(whole))
+            self.assertAlmostEqual(np.argmax(spectrum) * 16000 / len(whole), 440, delta=2)
+
+    def test_vad_trims_silence(self):
+        """Les silences de début, de fin et les longues pauses sont retirés, avec une marge."""
+        silence = np.zeros(16000 * 2, dtype=np.float32)
+        speech = tone(1.0, 16000).astype(np.float32)
+        signal = np.concatenate((silence, speech, silence, speech, silence))
+        vad = EnergyVAD(padding_ms=300)
+        kept = sum(len(vad.process(signal[i:i + 4000])) for i in range(0, len(signal), 4000))
+        self.assertGreaterEqual(kept, 2 * 16000)
+        # Marge de 300 ms de chaque côté, plus une trame d'alignement
+        self.assertLessEqual(kept, 2 * 16000 + 4 * (0.3 * 16000 + 480))
+
+    def test_transcribe_wav_upload_in_chunks(self):
+        """Un WAV stéréo 44,1 kHz reçu par petits morceaux n'envoie à l'ASR que la parole."""
+        signal = np.concatenate((np.zeros(44100 * 3), tone(2.0, 44100), np.zeros(44100 * 3)))
+        asr = FakeASR("Qui est Moïse ?")
+        result = transcribe_upload(chunked(wav_bytes(signal, 44100, channels=2), 777), "audio/wav", asr)
+        self.assertEqual(result.text, "Qui est Moïse ?")
+        self.assertAlmostEqual(result.received_seconds, 8.0, places=2)
+        self.assertTrue(2.0 <= result.voiced_seconds <= 2.7, result.voiced_seconds)
+        self.assertEqual(asr.last_seconds, result.voiced_seconds)
+
+        pcm = (tone(1.0, 16000) * 32767).astype(">i2").tobytes()
+        result = transcribe_upload(chunked(pcm, 1001), "audio/L16; rate=16000; channels=1", asr)
+        self.assertAlmostEqual(result.received_seconds, 1.0, places=2)
+        with self.assertRaises(UnsupportedAudioError):
+            decoder_for("audio/mpeg")
+
+    def test_upload_endpoint(self):
+        """La route transcrit l'enregistrement puis répond comme process_audio."""
+        chat = MagicMock()
+        chat.send_message.return_value = MagicMock(text="La foi (Hébreux 11:1).")
+        client = app.test_client()
+        recording = wav_bytes(np.concatenate((np.zeros(16000), tone(1.0, 16000))), 16000)
+        with patch.object(bible_chat.answer_cache, "enabled", False), \
+                patch("app.chat", chat), \
+                patch("app.asr", FakeASR()), \
+                patch.object(session_store, "factory", lambda sid: (ConversationHistory(), chat)):
+            response = client.post("/api/process_audio/upload?session_id=upload-test-1",
+                                   data=recording, content_type="audio/wav")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["transcript"], "Que dit la Bible sur la foi ?")
+            self.assertEqual(response.json["response"], "La foi (Hébreux 11:1).")
+
+            silent = wav_bytes(np.zeros(16000), 16000)
+            response = client.post("/api/process_audio/upload", data=silent, content_type="audio/wav")
+            self.assertEqual(response.status_code, 400)
+            response = client.post("/api/process_audio/upload", data=b"ID3", content_type="audio/mpeg")
+            self.assertEqual(response.status_code, 415)
+            response = client.post("/api/process_audio/upload", data=b"not a wav file",
+                                   content_type="audio/wav")
+            self.assertEqual(response.status_code, 400)
+
+        with patch("app.asr", UnavailableASR()):
+            response = client.post("/api/process_audio/upload", data=recording, content_type="audio/wav")
+        self.assertEqual(response.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
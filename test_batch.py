@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bible_chat
+from app import app
+from batch import BatchRunner
+from bible_chat import ConversationHistory
+
+
+class TestBatch(unittest.TestCase):
+    """Tests du traitement des lots de questions."""
+
+    def test_runner_bounds_concurrency_and_yields_in_completion_order(self):
+        """La concurrence globale est respectée et les résultats arrivent dans l'ordre de fin."""
+        runner = BatchRunner(max_concurrency=3)
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def work(delay):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(delay)
+            with lock:
+                active[0] -= 1
+            if delay == 0.03:
+                raise RuntimeError("quota")
+            return {"delay": delay}
+
+        delays = [0.12, 0.01, 0.05, 0.03, 0.02, 0.08]
+        ordered = [r["index"] for r in BatchRunner(max_concurrency=6).run(delays, work)]
+        self.assertEqual(ordered, [1, 4, 3, 2, 5, 0])
+
+        # Deux lots simultanés partagent le même plafond
+        peak[0] = 0
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(runner.run(delays, work, concurrency=3)))
+        thread.start()
+        other = list(runner.run(delays, work, concurrency=10))
+        thread.join()
+
+        self.assertLessEqual(peak[0], 3)
+        self.assertEqual(len(results), 6)
+        failed = [r for r in other if not r["success"]]
+        self.assertEqual([(r["index"], r["error"]) for r in failed], [(3, "RuntimeError")])
+        self.assertEqual(runner.stats["items"], 12)
+        with self.assertRaises(ValueError):
+            runner.validate([], None)
+
+    def test_endpoint_streams_ndjson_and_isolates_failures(self):
+        """Une question invalide ou en erreur n'empêche pas les autres d'aboutir."""
+        chats = []
+
+        def conversation(session_id=None):
+            chat = MagicMock()
+
+            def send_message(message, **kwargs):
+                if "erreur" in message:
+                    raise RuntimeError("upstream")
+                return MagicMock(text=f"Réponse {len(chats)} (Jean 3:16).")
+
+            chat.send_message.side_effect = send_message
+            chats.append(chat)
+            return ConversationHistory(), chat
+
+        questions = [
+            "Qui est Moïse ?",
+            "   ",
+            {"id": "q3", "text": "Qu'est-ce que la grâce ?",
+             "context": [{"role": "user", "content": "Nous étudions Éphésiens 2."}]},
+            {"id": "q4", "text": "Provoque une erreur"},
+            42,
+        ]
+        client = app.test_client()
+        with patch.object(bible_chat.answer_cache, "enabled", False), \
+                patch("app.chat", MagicMock()), \
+                patch("app.new_conversation", conversation):
+            response = client.post("/api/process_batch", json={"questions": questions, "concurrency": 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "application/x-ndjson")
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+            self.assertEqual(client.post("/api/process_batch", json={"questions": "Qui ?"}).status_code, 400)
+
+        summary = lines.pop()["summary"]
+        self.assertEqual((summary["total"], summary["succeeded"], summary["failed"]), (5, 2, 3))
+        by_index = {line["index"]: line for line in lines}
+        self.assertTrue(by_index[0]["success"])
+        self.assertEqual(by_index[0]["citations"][0]["reference"], "Jean 3:16")
+        self.assertEqual(by_index[1]["error"], "ValueError")
+        self.assertEqual(by_index[2]["id"], "q3")
+        self.assertIn("duration_ms", by_index[2])
+        self.assertEqual((by_index[3]["id"], by_index[3]["error"]), ("q4", "RuntimeError"))
+        self.assertFalse(by_index[4]["success"])
+        # La question de q3 est précédée de son contexte dans le prompt
+        contents = [chat.history for chat in chats if chat.send_message.called]
+        self.assertTrue(any("Éphésiens 2" in str(history) for history in contents))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import app
+from bible_refs import BOOKS, parse_reference, verse_count
+from citations import extract_citations
+from verse_store import VerseStore, build_index
+
+
+class TestCitations(unittest.TestCase):
+    """Tests de l'extraction des références citées par le modèle."""
+
+    def test_extracts_and_normalizes(self):
+        """Les références abrégées, anglaises ou dictées sont normalisées."""
+        answer = ("Dieu a tant aimé le monde (Jn 3.16). Voir aussi 1Co 13:4-7, "
+                  "le Psaume 23 et Romans 8 : 28. Jean 3:16 résume l'Évangile.")
+        labels = [c["reference"] for c in extract_citations(answer)]
+        self.assertEqual(labels, ["Jean 3:16", "1 Corinthiens 13:4-7", "Psaume 23", "Romains 8:28"])
+        self.assertEqual(extract_citations(answer)[0]["text"], "Jn 3.16")
+
+    def test_ignores_numbers_that_are_not_references(self):
+        """Les nombres ordinaires ne sont pas pris pour des références."""
+        answer = "Il est 5 heures, les 12 apôtres et les 10 commandements (Exode 20)."
+        self.assertEqual([c["reference"] for c in extract_citations(answer)], ["Exode 20"])
+
+    def test_validation_against_chapter_and_verse_counts(self):
+        """Chapitres et versets vérifiés par la table intégrée, ou par l'index local s'il existe."""
+        self.assertFalse(extract_citations("Jean 22:1")[0]["valid"])
+        checks = {"Jean 3:16": True, "Jean 3:36": True, "Jean 3:99": False, "Jean 0:1": False,
+                  "Psaume 119:176": True, "Psaume 51:21": True, "Genèse 50:27": False, "3 Jean 15": True}
+        for reference, valid in checks.items():
+            self.assertEqual(extract_citations(reference)[0]["valid"], valid, reference)
+        self.assertIsNone(parse_reference("Jean 0"))
+        self.assertEqual(sum(verse_count(book, c) for book in BOOKS for c in range(1, book.chapters + 1)),
+                         31170)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "sample.tsv")
+            with open(source, "w", encoding="utf-8") as f:
+                f.writelines(f"Jean\t3\t{v}\tVerset {v}\n" for v in range(1, 37))
+            build_index(source, os.path.join(tmpdir, "bible.idx"))
+            store = VerseStore(os.path.join(tmpdir, "bible.idx"))
+            citations = extract_citations("Jean 3:36 et Jean 3:37", store)
+            store.close()
+
+        self.assertEqual([c["valid"] for c in citations], [True, False])
+        self.assertTrue(all(c["verses_checked"] for c in citations))
+
+    def test_api_returns_citations(self):
+        """La réponse JSON de l'API contient les citations structurées."""
+        client = app.test_client()
+        with patch("app.get_bible_response", return_value="Le pardon (Matthieu 6:14)."):
+            response = client.post("/api/process_audio", json={"text": "Le pardon ?"})
+        self.assertEqual(response.json["citations"][0]["reference"], "Matthieu 6:14")
+
+
+if __name__ == '__main__':
+    unittest.main()
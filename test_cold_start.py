@@ -0,0 +1,52 @@
+import os
+import statistics
+import subprocess
+import sys
+import unittest
+
+from benchmarks.bench_cold_start import HEAVY_MODULES, ROOT, import_times
+
+# Budget d'import des modules du projet (hors Flask et bibliothèques), en ms
+PROJECT_IMPORT_BUDGET_MS = 200
+
+PROJECT_MODULES = {path.stem for path in ROOT.glob("*.py")} | {"index"}
+
+NO_KEY = {"GEMINI_API_KEY": "", "SESSION_BACKEND": "none"}
+
+
+class TestColdStart(unittest.TestCase):
+    """Tests du démarrage à froid du point d'entrée Vercel."""
+
+    def test_entry_point_does_not_load_sdk(self):
+        """L'import réussit sans clé d'API et sans charger le SDK Gemini."""
+        times = import_times(env=NO_KEY)
+        self.assertIn("app", times)
+        heavy = [name for name in times if name.startswith(HEAVY_MODULES)]
+        self.assertEqual(heavy, [])
+
+    def test_import_time_budget(self):
+        """Le coût d'import des modules du projet reste dans le budget."""
+        runs = []
+        for _ in range(3):
+            times = import_times(env=NO_KEY)
+            runs.append(sum(self_us for name, (self_us, _) in times.items()
+                            if name in PROJECT_MODULES) / 1000)
+        self.assertLessEqual(statistics.median(runs), PROJECT_IMPORT_BUDGET_MS)
+
+    def test_index_and_health_without_sdk(self):
+        """/ et /api/health répondent sans initialiser le chat."""
+        code = (
+            "import sys, app\n"
+            "client = app.app.test_client()\n"
+            "print(client.get('/').status_code, client.get('/api/health').json['status'],\n"
+            "      any(m.startswith('google.generativeai') for m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=str(ROOT), capture_output=True, text=True,
+            env={**os.environ, **NO_KEY}, check=True,
+        )
+        self.assertEqual(result.stdout.split(), ["200", "degraded", "False"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import random
+import time
+import unittest
+from unittest.mock import patch
+
+import bible_chat
+from fake_gemini import FakeGenerativeModel, FakeModelError, LatencyDistribution
+from resilience import UpstreamPolicy
+
+
+class TestFakeGemini(unittest.TestCase):
+    """Tests du modèle de substitution utilisé par les tests de charge."""
+
+    def test_latency_distributions(self):
+        """Les spécifications sont analysées et les délais jamais négatifs."""
+        rng = random.Random(1)
+        self.assertEqual(LatencyDistribution.parse("0.25").sample(rng), 0.25)
+        for spec in ("uniform:0.1,0.2", "normal:0.05,0.5", "lognormal:0.1,0.5", "exp:0.1"):
+            samples = [LatencyDistribution.parse(spec).sample(rng) for _ in range(200)]
+            self.assertTrue(all(s >= 0 for s in samples), spec)
+        self.assertTrue(all(0.1 <= s <= 0.2 for s in
+                            (LatencyDistribution.parse("uniform:0.1,0.2").sample(rng) for _ in range(50))))
+        with self.assertRaises(ValueError):
+            LatencyDistribution.parse("gamma:1,2")
+
+    def test_streaming_chunk_timings(self):
+        """Le premier fragment arrive après la latence, les suivants à intervalle régulier."""
+        model = FakeGenerativeModel(answer=lambda q: "x" * 40, chunk_size=10,
+                                    first_chunk_latency=LatencyDistribution("const", 0.05),
+                                    chunk_interval=LatencyDistribution("const", 0.01))
+        start = time.perf_counter()
+        arrivals = [time.perf_counter() - start
+                    for _ in model.start_chat().send_message("Bonjour", stream=True)]
+        self.assertEqual(len(arrivals), 4)
+        self.assertGreaterEqual(arrivals[0], 0.05)
+        self.assertGreaterEqual(arrivals[-1] - arrivals[0], 0.03)
+
+    def test_error_rate_and_env_switch(self):
+        """GEMINI_FAKE=1 remplace le SDK ; les erreurs simulées persistantes deviennent des excuses."""
+        with patch.dict(os.environ, {"GEMINI_FAKE": "1", "GEMINI_FAKE_ERROR_RATE": "1"}):
+            api = bible_chat.GeminiAPI()
+        self.assertTrue(api.is_fake)
+        self.assertIsInstance(api.model, FakeGenerativeModel)
+        with self.assertRaises(FakeModelError):
+            api.model.start_chat().send_message("Bonjour")
+
+        history = bible_chat.ConversationHistory()
+        with patch.object(bible_chat.answer_cache, "enabled", False), \
+                patch.object(bible_chat, "upstream", UpstreamPolicy(backoff_base=0)):
+            answer = bible_chat.get_bible_response("Qui est Moïse ?", api.model.start_chat(), history)
+        self.assertTrue(answer.startswith("Le service n'est pas disponible"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import multiprocessing
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bible_chat
+from app import app, session_store
+from bible_chat import ConversationHistory
+from metrics import Registry
+
+
+def _record_in_child(directory):
+    registry = Registry(directory)
+    requests = registry.counter("t_requests_total", "Requêtes", ("status",))
+    latency = registry.histogram("t_latency_seconds", "Latence", buckets=(0.1, 1.0))
+    for _ in range(5):
+        requests.inc("200")
+        latency.observe(0.5)
+    registry.flush()
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests des métriques Prometheus."""
+
+    def test_render_counter_and_histogram(self):
+        """Les histogrammes sont cumulés par seau, les étiquettes échappées."""
+        registry = Registry()
+        errors = registry.counter("t_errors_total", "Erreurs", ("error",))
+        latency = registry.histogram("t_latency_seconds", "Latence", ("stage",), buckets=(0.1, 1.0))
+        errors.inc('Value"Error')
+        for value in (0.05, 0.5, 0.7, 3.0):
+            latency.observe(value, "upstream")
+
+        text = registry.render()
+        self.assertIn("# TYPE t_latency_seconds histogram", text)
+        self.assertIn('t_errors_total{error="Value\\"Error"} 1', text)
+        self.assertIn('t_latency_seconds_bucket{stage="upstream",le="0.1"} 1', text)
+        self.assertIn('t_latency_seconds_bucket{stage="upstream",le="1"} 3', text)
+        self.assertIn('t_latency_seconds_bucket{stage="upstream",le="+Inf"} 4', text)
+        self.assertIn('t_latency_seconds_count{stage="upstream"} 4', text)
+        self.assertIn('t_latency_seconds_sum{stage="upstream"} 4.25', text)
+
+    def test_threads_record_without_losing_counts(self):
+        """Les partitions par thread sont fusionnées, y compris après la fin des threads."""
+        registry = Registry()
+        requests = registry.counter("t_requests_total", "Requêtes")
+
+        def work():
+            for _ in range(10000):
+                requests.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.snapshot()[("t_requests_total", ())], 80000)
+        requests.inc()
+        self.assertEqual(registry.snapshot()[("t_requests_total", ())], 80001)
+
+    def test_aggregates_across_processes(self):
+        """Les instantanés des workers sont additionnés à la collecte."""
+        with tempfile.TemporaryDirectory() as directory:
+            context = multiprocessing.get_context("fork")
+            children = [context.Process(target=_record_in_child, args=(directory,)) for _ in range(3)]
+            for child in children:
+                child.start()
+            for child in children:
+                child.join()
+
+            registry = Registry(directory)
+            registry.counter("t_requests_total", "Requêtes", ("status",)).inc("200")
+            registry.histogram("t_latency_seconds", "Latence", buckets=(0.1, 1.0))
+            text = registry.render()
+        self.assertIn('t_requests_total{status="200"} 16', text)
+        self.assertIn('t_latency_seconds_bucket{le="1"} 15', text)
+
+    def test_metrics_endpoint_reports_pipeline_stages(self):
+        """/api/metrics expose les étapes du traitement d'une question."""
+        chat = MagicMock()
+        chat.send_message.return_value = MagicMock(text="La foi (Hébreux 11:1).")
+        client = app.test_client()
+        with patch.object(bible_chat.answer_cache, "enabled", False), \
+                patch("app.chat", chat), \
+                patch.object(session_store, "factory", lambda sid: (ConversationHistory(), chat)):
+            response = client.post("/api/process_audio",
+                                   json={"text": "Qu'est-ce que la foi ?", "session_id": "metrics-test-1"})
+        self.assertEqual(response.status_code, 200)
+
+        text = client.get("/api/metrics").get_data(as_text=True)
+        for stage in ("validation", "prompt", "upstream", "citations", "serialization"):
+            self.assertIn(f'bible_stage_duration_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('bible_requests_total{endpoint="/api/process_audio",method="POST",status="200"}', text)
+        self.assertIn("bible_prompt_tokens_count", text)
+        self.assertIn('bible_response_chars_count{source="model"}', text)
+        self.assertIn("bible_session_history_messages_count", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+import bible_chat
+from fake_gemini import FakeGenerativeModel, LatencyDistribution
+from model_router import ModelRouter
+from testutils import AppTestCase
+
+FACTUAL = "Qui a écrit l'épître aux Romains ?"
+COMPLEX = "Pourquoi Dieu permet-il la souffrance des innocents ?"
+
+
+class TestModelRouter(AppTestCase):
+    """Tests du choix entre le modèle principal et le modèle rapide."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.large = FakeGenerativeModel(answer=lambda q: "Réponse développée (Jean 3:16).",
+                                         first_chunk_latency=LatencyDistribution("const", 0.2))
+        self.fast = FakeGenerativeModel(answer=lambda q: "Réponse brève (Romains 1:1).",
+                                        first_chunk_latency=LatencyDistribution("const", 0.01))
+        self.router = ModelRouter({"large": "gemini-pro", "fast": "gemini-flash"},
+                                  factory=lambda name: self.fast, large_p95=0.1, min_samples=3,
+                                  cooldown=60, clock=lambda: self.now)
+        self.use_model(self.large)
+        self.patch(bible_chat, "router", self.router)
+        self.patch(app_module, "router", self.router)
+        self.patch(bible_chat.upstream, "hedge_percentile", 0)
+
+    def answer(self, text, session_id="router-session-0001"):
+        """Réponse à la question et durée de la requête."""
+        start = time.perf_counter()
+        response = self.ask(text, session_id)
+        return response.json["response"], time.perf_counter() - start
+
+    def test_classification(self):
+        """Questions courtes factuelles ou sur un passage : modèle rapide ; les autres : modèle principal."""
+        cases = {
+            FACTUAL: ("fast", "factual"),
+            "Combien de livres compte la Bible ?": ("fast", "factual"),
+            "Que dit Romains 8:28 sur l'épreuve ?": ("fast", "reference"),
+            COMPLEX: ("large", "complex"),
+            "Que signifie la grâce ?": ("large", "complex"),
+            "Parle-moi de la foi.": ("large", "complex"),
+            "Qui était Paul et pourquoi a-t-il écrit autant de lettres aux églises de son temps ?":
+                ("large", "long"),
+            "Qui était Pierre ? Et Jacques ?": ("large", "long"),
+        }
+        for question, expected in cases.items():
+            self.assertEqual(self.router.classify(question), expected, question)
+        self.assertEqual(ModelRouter({"large": "gemini-pro"}).choose(FACTUAL), ("large", "default"))
+
+    def test_routes_and_falls_back_on_slow_large_model(self):
+        """Chaque question va au modèle choisi ; un p95 trop lent du modèle principal bascule tout sur le rapide."""
+        answer, elapsed = self.answer(FACTUAL)
+        self.assertEqual(answer, "Réponse brève (Romains 1:1).")
+        self.assertLess(elapsed, 0.15)
+
+        for i in range(3):
+            answer, elapsed = self.answer(COMPLEX, f"router-session-{i:04d}")
+            self.assertEqual(answer, "Réponse développée (Jean 3:16).")
+            self.assertGreaterEqual(elapsed, 0.2)
+        self.assertEqual((len(self.large.requests), len(self.fast.requests)), (3, 1))
+        self.assertTrue(self.router.degraded)
+
+        # Repli : la question complexe passe par le modèle rapide, en flux comme sans flux
+        self.assertEqual(self.answer(COMPLEX, "router-session-0100")[0], "Réponse brève (Romains 1:1).")
+        response = self.client.post("/api/process_audio/stream",
+                                    json={"text": COMPLEX, "session_id": "router-session-0101", "cache": False})
+        self.assertIn("Réponse brève", response.get_data(as_text=True))
+
+        self.now += 61
+        self.assertEqual(self.answer(COMPLEX, "router-session-0102")[0], "Réponse développée (Jean 3:16).")
+        self.assertEqual(self.router.stats, {"large": {"complex": 4}, "fast": {"factual": 1, "degraded": 2}})
+
+        health = self.client.get("/api/health").json["router"]
+        self.assertFalse(health["degraded"])
+        self.assertEqual(health["routes"]["fast"]["model"], "gemini-flash")
+        self.assertLess(health["routes"]["fast"]["p95_ms"], 100)
+        metrics = self.client.get("/api/metrics").get_data(as_text=True)
+        self.assertIn('bible_model_route_total{route="fast",reason="degraded"}', metrics)
+        self.assertIn('bible_model_duration_seconds_count{route="fast"}', metrics)
+
+    def test_stream_timeouts_count_toward_large_model_latency(self):
+        """Une deadline dépassée en flux compte, comme sans flux, dans la latence du modèle principal."""
+        with patch.object(bible_chat.upstream, "deadline", 0.15), \
+                patch.object(bible_chat.upstream, "max_retries", 0):
+            for i in range(3):
+                response = self.client.post("/api/process_audio/stream",
+                                            json={"text": COMPLEX, "session_id": f"router-stream-{i:04d}",
+                                                  "cache": False})
+                response.get_data()
+        self.assertEqual(len(self.router.latencies["fast"]), 0)
+        self.assertTrue(self.router.degraded)
+
+
+if __name__ == "__main__":
+    unittest.main()
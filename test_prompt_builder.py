@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+import bible_chat
+from bible_chat import ConversationHistory, SYSTEM_CONTEXT, get_bible_response
+from fake_gemini import FakeGenerativeModel
+from prompt_builder import PromptBuilder
+
+
+class TestPromptBuilder(unittest.TestCase):
+    """Tests de la construction des prompts dans un budget de tokens."""
+
+    def test_system_instruction_sent_once(self):
+        """L'instruction système ouvre l'historique et n'apparaît qu'une fois."""
+        builder = PromptBuilder("Tu es un théologien.")
+        builder.add_turn("user", "Qui est Moïse ?")
+        builder.add_turn("assistant", "Le libérateur d'Israël (Exode 3).")
+        builder.add_turn("user", "Et Aaron ?")
+
+        contents, message = builder.build()
+
+        self.assertEqual(message, "Et Aaron ?")
+        self.assertEqual([c["role"] for c in contents], ["user", "model", "user", "model"])
+        flattened = " ".join(part for c in contents for part in c["parts"])
+        self.assertEqual(flattened.count("Tu es un théologien."), 1)
+
+    def test_budget_compacts_old_turns_into_summary(self):
+        """Au-delà du budget, les anciens échanges sont résumés."""
+        builder = PromptBuilder("Système.", token_budget=200, recent_messages=2)
+        for i in range(10):
+            builder.add_turn("user", f"Question {i}. " + "détail " * 20)
+            builder.add_turn("assistant", f"Réponse {i}. " + "explication " * 20)
+
+        self.assertLessEqual(builder.total_tokens, 200)
+        self.assertIn("L'utilisateur a demandé : Question", builder.summary)
+        contents, _ = builder.build()
+        self.assertIn("Résumé des échanges précédents", contents[0]["parts"][0])
+        self.assertIn("Réponse 9.", contents[-1]["parts"][0])
+
+    def test_consecutive_roles_are_merged(self):
+        """Les messages consécutifs d'un même rôle restent en alternance."""
+        builder = PromptBuilder("Système.")
+        builder.add_turn("user", "Première question sans réponse")
+        builder.add_turn("user", "Deuxième question")
+        contents, message = builder.build()
+        self.assertEqual(message, "Deuxième question")
+        self.assertEqual([c["role"] for c in contents], ["user", "model", "user", "model"])
+
+    def test_get_bible_response_does_not_resend_history(self):
+        """Chaque requête n'envoie qu'une copie de l'historique."""
+        model = FakeGenerativeModel()
+        chat = model.start_chat()
+        history = ConversationHistory()
+        history.add_message("system", SYSTEM_CONTEXT)
+
+        with patch.object(bible_chat.answer_cache, "enabled", False):
+            for question in ("Qui est Pierre ?", "Et Paul ?", "Et Jean ?"):
+                get_bible_response(question, chat, history)
+
+        self.assertEqual([r["contents"] for r in model.requests], [3, 5, 7])
+        self.assertEqual(model.requests[-1]["roles"][-1], "user")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import bible_chat
+from answer_cache import make_cache_key
+from fake_gemini import FakeGenerativeModel, FakeModelError, LatencyDistribution
+from resilience import (
+    CircuitBreaker, CircuitOpenError, UpstreamPolicy, UpstreamTimeout, is_transient
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResilience(unittest.TestCase):
+    """Tests de la politique d'appel du modèle amont."""
+
+    def test_transient_errors_are_retried(self):
+        """Les erreurs transitoires sont retentées, les autres remontées immédiatement."""
+        self.assertTrue(is_transient(FakeModelError("503 unavailable")))
+        self.assertTrue(is_transient(type("ResourceExhausted", (Exception,), {})("quota")))
+        self.assertFalse(is_transient(FakeModelError("400 bad request", 400)))
+
+        policy = UpstreamPolicy(backoff_base=0.001, max_retries=2, hedge_percentile=0)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise FakeModelError("503 unavailable")
+            return "ok"
+
+        self.assertEqual(policy.call(flaky), "ok")
+        self.assertEqual(policy.stats["retries"], 2)
+
+        def invalid():
+            calls.append(1)
+            raise FakeModelError("400 bad request", 400)
+
+        calls.clear()
+        with self.assertRaises(FakeModelError):
+            policy.call(invalid)
+        self.assertEqual(len(calls), 1)
+
+    def test_deadline(self):
+        """Un appel trop lent est abandonné à la deadline."""
+        policy = UpstreamPolicy(deadline=0.05, hedge_percentile=0, max_retries=0)
+        start = time.perf_counter()
+        with self.assertRaises(UpstreamTimeout):
+            policy.call(lambda: time.sleep(0.5))
+        self.assertLess(time.perf_counter() - start, 0.3)
+
+    def test_hedged_request_beats_slow_attempt(self):
+        """Au-delà du p95 observé, une seconde tentative est lancée et la plus rapide gagne."""
+        policy = UpstreamPolicy(hedge_min_samples=5, max_retries=0)
+        for _ in range(5):
+            policy.latencies.observe(0.02)
+        calls = []
+        lock = threading.Lock()
+
+        def sometimes_slow():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(1.0 if first else 0.01)
+            return "slow" if first else "fast"
+
+        start = time.perf_counter()
+        self.assertEqual(policy.call(sometimes_slow), "fast")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual((policy.stats["hedges"], policy.stats["hedge_wins"]), (1, 1))
+
+    def test_async_call(self):
+        """call_async : même politique, la tentative perdante ou hors délai est annulée."""
+        policy = UpstreamPolicy(hedge_min_samples=5, max_retries=2, backoff_base=0.001)
+        for _ in range(5):
+            policy.latencies.observe(0.02)
+        calls, cancelled = [], []
+
+        async def sometimes_slow():
+            calls.append(1)
+            if len(calls) == 1:
+                raise FakeModelError("503 unavailable")
+            try:
+                await asyncio.sleep(1.0 if len(calls) == 2 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return f"tentative {len(calls)}"
+
+        start = time.perf_counter()
+        self.assertEqual(asyncio.run(policy.call_async(sometimes_slow)), "tentative 3")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(cancelled, [1])
+        self.assertEqual((policy.stats["retries"], policy.stats["hedge_wins"]), (1, 1))
+
+        policy = UpstreamPolicy(deadline=0.05, hedge_percentile=0, max_retries=0)
+        with self.assertRaises(UpstreamTimeout):
+            asyncio.run(policy.call_async(lambda: asyncio.sleep(0.5)))
+
+    def test_circuit_breaker(self):
+        """Le disjoncteur s'ouvre après des échecs consécutifs et se referme après un test réussi."""
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        policy = UpstreamPolicy(breaker=breaker, max_retries=0, hedge_percentile=0, deadline=0)
+
+        def failing():
+            raise FakeModelError("503 unavailable")
+
+        for _ in range(3):
+            with self.assertRaises(FakeModelError):
+                policy.call(failing)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            policy.call(lambda: "ok")
+
+        clock.now = 11
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(FakeModelError):
+            policy.call(failing)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        clock.now = 22
+        self.assertEqual(policy.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_circuit_serves_cached_answer(self):
+        """Disjoncteur ouvert : une réponse déjà en cache est servie, sinon un message d'indisponibilité."""
+        model = FakeGenerativeModel(answer=lambda q: "La foi (Hébreux 11:1).",
+                                    first_chunk_latency=LatencyDistribution("const", 0.0))
+        policy = UpstreamPolicy(breaker=CircuitBreaker(failure_threshold=1), max_retries=0,
+                                hedge_percentile=0)
+        policy.breaker.record_failure()
+        question = "Qu'est-ce que la foi ?"
+        with patch.object(bible_chat, "upstream", policy), \
+                patch.object(bible_chat.answer_cache, "enabled", True), \
+                patch.object(bible_chat.answer_cache, "get",
+                             lambda key: "Réponse en cache." if key == make_cache_key(question) else None):
+            history = bible_chat.ConversationHistory()
+            history.add_message("user", "Bonjour")
+            history.add_message("assistant", "Bonjour !")
+            answer = bible_chat.get_bible_response(question, model.start_chat(), history, use_cache=False)
+            self.assertEqual(answer, "Réponse en cache.")
+            streamed = "".join(bible_chat.stream_bible_response(
+                question, model.start_chat(), bible_chat.ConversationHistory(), use_cache=False))
+            self.assertEqual(streamed, "Réponse en cache.")
+            answer = bible_chat.get_bible_response("Qui est Moïse ?", model.start_chat(),
+                                                   bible_chat.ConversationHistory())
+        self.assertTrue(answer.startswith("Le service n'est pas disponible"))
+        self.assertEqual(len(model.requests), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bible_chat import ConversationHistory, get_bible_response
+from fake_gemini import FakeGenerativeModel
+from retrieval import PassageIndex, analyze, build_index, format_passages, ground_question
+from verse_store import VerseStore
+from verse_store import build_index as build_store
+
+SAMPLE_TSV = """Matt\t6\t14\tSi vous pardonnez aux hommes leurs offenses, votre Père céleste vous pardonnera aussi.
+Matt\t18\t21\tSeigneur, combien de fois pardonnerai-je à mon frère, lorsqu'il péchera contre moi ?
+Jean\t3\t16\tCar Dieu a tant aimé le monde qu'il a donné son Fils unique.
+Ps\t23\t1\tL'Éternel est mon berger: je ne manquerai de rien.
+Heb\t11\t1\tOr la foi est une ferme assurance des choses qu'on espère.
+Gen\t1\t1\tAu commencement, Dieu créa les cieux et la terre.
+"""
+
+
+class TestRetrieval(unittest.TestCase):
+    """Tests de la recherche BM25 des passages."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        source = os.path.join(tmpdir.name, "sample.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TSV)
+        build_store(source, os.path.join(tmpdir.name, "bible.idx"))
+        self.store = VerseStore(os.path.join(tmpdir.name, "bible.idx"))
+        self.addCleanup(self.store.close)
+        self.stats = build_index(self.store, os.path.join(tmpdir.name, "bm25"))
+        self.index = PassageIndex(os.path.join(tmpdir.name, "bm25"), self.store)
+
+    def test_analyzer(self):
+        """Accents, mots vides et flexions sont ramenés à un même terme."""
+        self.assertEqual(analyze("Que dit la Bible sur le pardon ?"), ["pardon"])
+        self.assertEqual(analyze("pardonner pardonné pardons"), ["pardon"] * 3)
+        self.assertEqual(analyze("L'Éternel"), analyze("l eternel"))
+
+    def test_search_ranks_relevant_verses(self):
+        """Les versets qui partagent les termes rares de la question arrivent en tête."""
+        self.assertEqual(self.stats["docs"], 6)
+        passages = self.index.search("Pourquoi faut-il pardonner à son frère ?", k=3)
+        self.assertEqual(passages[0].reference.label(), "Matthieu 18:21")
+        self.assertEqual(passages[1].reference.label(), "Matthieu 6:14")
+        self.assertEqual(len(passages), 2)
+        self.assertGreater(passages[0].score, passages[1].score)
+        self.assertEqual(self.index.search("le la les"), [])
+
+    def test_prompt_budget(self):
+        """Les passages ajoutés à la question tiennent dans le budget de tokens."""
+        passages = self.index.search("Dieu pardon foi monde", k=5)
+        block = format_passages(passages, token_budget=40, count_tokens=lambda text: len(text.split()))
+        self.assertLessEqual(len(block.split()), 40)
+        self.assertIn("- ", block)
+        self.assertEqual(format_passages(passages, token_budget=5), "")
+
+    def test_question_grounded_before_model_call(self):
+        """Le modèle reçoit la question précédée des passages retrouvés."""
+        prompts = []
+        model = FakeGenerativeModel(answer=lambda q: prompts.append(q) or "Pardonnez (Matthieu 6:14).")
+        with patch("retrieval.get_default_index", return_value=self.index):
+            get_bible_response("Que dit Jésus sur le pardon ?", model.start_chat(), ConversationHistory(),
+                               use_cache=False)
+            self.assertEqual(ground_question("Question sans rapport ?"), "Question sans rapport ?")
+        prompt = prompts[-1]
+        self.assertIn("Matthieu 6:14 : « Si vous pardonnez", prompt)
+        self.assertTrue(prompt.endswith("Question : Que dit Jésus sur le pardon ?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
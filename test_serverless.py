@@ -0,0 +1,127 @@
+import base64
+import gzip
+import json
+import os
+import sys
+import unittest
+
+from flask import Flask, Response, jsonify, request
+
+from serverless import WSGIAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+
+
+def echo_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/echo/<path:name>", methods=["GET", "POST"])
+    def echo(name):
+        response = jsonify({
+            "name": name,
+            "method": request.method,
+            "args": request.args.to_dict(flat=False),
+            "accept": request.headers.get("Accept"),
+            "cookies": request.cookies.to_dict(),
+            "body": base64.b64encode(request.get_data()).decode("ascii"),
+            "remote": request.remote_addr,
+            "scheme": request.scheme,
+        })
+        response.set_cookie("a", "1")
+        response.set_cookie("b", "2")
+        return response
+
+    @app.route("/binary")
+    def binary():
+        return Response(bytes(range(256)), mimetype="application/octet-stream")
+
+    @app.route("/stream")
+    def stream():
+        return Response((f"event: delta\ndata: {i}\n\n" for i in range(3)), mimetype="text/event-stream")
+
+    return app
+
+
+class TestServerless(unittest.TestCase):
+    """Tests de l'adaptateur des événements serverless vers WSGI."""
+
+    def setUp(self):
+        self.handler = WSGIAdapter(echo_app())
+
+    def test_v1_event(self):
+        """Chaîne de requête, en-têtes multiples, corps base64 et plusieurs Set-Cookie."""
+        payload = bytes([0, 255, 1, 128])
+        response = self.handler({
+            "httpMethod": "POST",
+            "path": "/echo/f%C3%A9e",
+            "multiValueQueryStringParameters": {"q": ["1", "2"], "r": ["é"]},
+            "multiValueHeaders": {"Accept": ["text/html", "application/json"], "Cookie": ["x=1", "y=2"]},
+            "headers": {"Content-Type": "application/octet-stream"},
+            "body": base64.b64encode(payload).decode("ascii"),
+            "isBase64Encoded": True,
+            "requestContext": {"identity": {"sourceIp": "203.0.113.7"}},
+        }, None)
+        self.assertEqual(response["statusCode"], 200)
+        self.assertFalse(response["isBase64Encoded"])
+        data = json.loads(response["body"])
+        self.assertEqual(data["name"], "fée")
+        self.assertEqual(data["args"], {"q": ["1", "2"], "r": ["é"]})
+        self.assertEqual(data["accept"], "text/html, application/json")
+        self.assertEqual(data["cookies"], {"x": "1", "y": "2"})
+        self.assertEqual(base64.b64decode(data["body"]), payload)
+        self.assertEqual(data["remote"], "203.0.113.7")
+        self.assertEqual(data["scheme"], "https")
+        self.assertEqual(len(response["multiValueHeaders"]["Set-Cookie"]), 2)
+
+    def test_v2_event(self):
+        """Format v2 : rawQueryString, cookies en liste dans les deux sens."""
+        response = self.handler({
+            "version": "2.0",
+            "rawPath": "/echo/v2",
+            "rawQueryString": "q=1&q=2",
+            "cookies": ["x=1", "y=2"],
+            "headers": {"accept": "application/json", "x-forwarded-proto": "http"},
+            "body": "texte",
+            "isBase64Encoded": False,
+            "requestContext": {"http": {"method": "POST", "sourceIp": "198.51.100.1"}},
+        })
+        data = json.loads(response["body"])
+        self.assertEqual(data["args"], {"q": ["1", "2"]})
+        self.assertEqual(data["cookies"], {"x": "1", "y": "2"})
+        self.assertEqual(base64.b64decode(data["body"]), b"texte")
+        self.assertEqual(data["scheme"], "http")
+        self.assertEqual(len(response["cookies"]), 2)
+        self.assertNotIn("Set-Cookie", response["headers"])
+
+    def test_binary_and_streamed_responses(self):
+        """Corps binaire en base64 ; réponse en flux assemblée sans Transfer-Encoding."""
+        response = self.handler({"httpMethod": "GET", "path": "/binary"})
+        self.assertTrue(response["isBase64Encoded"])
+        self.assertEqual(base64.b64decode(response["body"]), bytes(range(256)))
+
+        response = self.handler({"httpMethod": "GET", "path": "/stream"})
+        self.assertEqual(response["body"].count("event: delta"), 3)
+
+        status, headers, chunks = self.handler.stream({"httpMethod": "GET", "path": "/stream"})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(list(chunks)), 3)
+        chunks.close()
+        self.assertEqual(self.handler({"httpMethod": "GET", "path": "/absent"})["statusCode"], 404)
+
+    def test_entry_point(self):
+        """Le handler de api/index.py sert l'application, réponses compressées en base64."""
+        import index
+
+        response = index.handler({"httpMethod": "GET", "path": "/api/health",
+                                  "headers": {"Accept-Encoding": "gzip"}}, None)
+        self.assertEqual(response["statusCode"], 200)
+        if response["isBase64Encoded"]:
+            body = gzip.decompress(base64.b64decode(response["body"]))
+        else:
+            body = response["body"]
+        self.assertEqual(json.loads(body)["service"], "assistant-biblique")
+        self.assertEqual(index.handler({}, None)["statusCode"], 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
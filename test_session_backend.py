@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from bible_chat import ConversationHistory, SYSTEM_CONTEXT
+from session_backend import MemorySessionBackend, SQLiteSessionBackend
+
+
+class TestSessionBackend(unittest.TestCase):
+    """Tests de la persistance des sessions."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "sessions.sqlite3")
+
+    def make_backend(self, **kwargs):
+        backend = SQLiteSessionBackend(self.path, **kwargs)
+        self.addCleanup(backend.close)
+        return backend
+
+    def new_history(self, backend, session_id="session-aaaa", max_history=10):
+        history = ConversationHistory(max_history=max_history)
+        history.add_message("system", SYSTEM_CONTEXT)
+        history.attach(backend, session_id)
+        return history
+
+    def test_history_survives_restart(self):
+        """Un nouveau processus recharge la conversation (sans le contexte système)."""
+        backend = self.make_backend()
+        history = self.new_history(backend)
+        history.add_message("user", "Que dit la Bible sur le pardon ?")
+        history.add_message("assistant", "Matthieu 6:14.")
+        backend.close()
+
+        restarted = self.new_history(self.make_backend())
+        self.assertEqual([m["role"] for m in restarted.messages], ["system", "user", "assistant"])
+        self.assertEqual(restarted.messages[-1]["content"], "Matthieu 6:14.")
+        self.assertIn("Matthieu 6:14.", [c["parts"][-1] for c in restarted.prompt.build()[0]])
+
+    def test_writes_are_group_committed(self):
+        """Les messages en file sont validés par lots, pas un par un."""
+        backend = self.make_backend(batch_size=64, flush_interval=0.05)
+        for i in range(100):
+            backend.append(f"session-{i % 5:04d}", "user", f"question {i}")
+        self.assertTrue(backend.flush(timeout=5))
+
+        stats = backend.stats()
+        self.assertEqual(stats["rows_written"], 100)
+        self.assertLessEqual(stats["batches"], 4)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_only_context_window_is_loaded(self):
+        """Seuls les derniers messages, après le dernier effacement, sont chargés."""
+        backend = self.make_backend()
+        history = self.new_history(backend, max_history=4)
+        history.add_message("user", "avant effacement")
+        history.clear()
+        for i in range(10):
+            history.add_message("user", f"message {i}")
+
+        messages, _, _ = backend.load("session-aaaa", 4)
+        self.assertEqual([m["content"] for m in messages],
+                         ["message 6", "message 7", "message 8", "message 9"])
+        backend.clear("session-aaaa")
+        self.assertEqual(backend.load("session-aaaa", 4)[0], [])
+
+    def test_sync_picks_up_other_workers_messages(self):
+        """Un worker récupère les échanges servis par un autre pour la même session."""
+        first = self.new_history(self.make_backend())
+        first.add_message("user", "Qui est Moïse ?")
+
+        other_worker = self.make_backend()  # même base, autre écrivain
+        second = self.new_history(other_worker)
+        second.add_message("assistant", "Le libérateur d'Israël (Exode 3).")
+        second.add_message("user", "Et Aaron ?")
+        other_worker.flush()
+
+        first.sync()
+        self.assertEqual([m["content"] for m in first.messages[1:]],
+                         ["Qui est Moïse ?", "Le libérateur d'Israël (Exode 3).", "Et Aaron ?"])
+        first.sync()
+        self.assertEqual(len(first.messages), 4)
+
+    def test_expired_sessions_are_purged(self):
+        """Les sessions inactives au-delà de la rétention et les messages effacés sont supprimés."""
+        backend = self.make_backend(retention=60, purge_interval=0)
+        for session_id in ("session-old", "session-new"):
+            backend.append(session_id, "user", "Qui est Moïse ?")
+        backend.clear("session-new")
+        backend.append("session-new", "user", "Et Aaron ?")
+        self.assertTrue(backend.flush(timeout=5))
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("UPDATE messages SET created_at = created_at - 120 WHERE session_id = 'session-old'")
+
+        self.assertEqual(backend.purge(), 2)
+        self.assertEqual(backend.load("session-old", 10)[0], [])
+        messages, _, replace = backend.load("session-new", 10)
+        self.assertEqual(([m["content"] for m in messages], replace), (["Et Aaron ?"], True))
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0], 2)
+        self.assertEqual(backend.stats()["rows_purged"], 2)
+        self.assertEqual(backend.purge(now=time.time() + 120), 2)
+
+    def test_memory_backend(self):
+        """Le stockage en mémoire offre la même interface."""
+        backend = MemorySessionBackend()
+        history = self.new_history(backend)
+        history.add_message("user", "Bonjour")
+        self.assertEqual(self.new_history(backend).messages[-1]["content"], "Bonjour")
+
+
+if __name__ == "__main__":
+    unittest.main()
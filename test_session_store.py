@@ -0,0 +1,119 @@
+import unittest
+import threading
+from session_store import SessionStore, resolve_session_id, is_valid_session_id
+
+
+class FakeHistory:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_factory():
+    created = []
+
+    def factory(session_id):
+        created.append(session_id)
+        return FakeHistory(), object()
+    return factory, created
+
+
+class TestSessionStore(unittest.TestCase):
+    """Tests du stockage des sessions de conversation."""
+
+    def test_sessions_are_isolated(self):
+        """Chaque session possède son propre historique et son propre chat."""
+        factory, created = make_factory()
+        store = SessionStore(factory, stripes=4)
+
+        with store.session("session-aaaa") as first:
+            first.history.add_message("user", "Qui est Moïse ?")
+        with store.session("session-bbbb") as second:
+            second.history.add_message("user", "Que dit la Bible sur le pardon ?")
+
+        self.assertEqual(len(store.get("session-aaaa").history.messages), 1)
+        self.assertIsNot(store.get("session-aaaa").chat, store.get("session-bbbb").chat)
+        self.assertEqual(created, ["session-aaaa", "session-bbbb"])
+
+    def test_lru_eviction_by_count(self):
+        """La session la moins récemment utilisée est évincée au-delà du plafond."""
+        factory, _ = make_factory()
+        store = SessionStore(factory, max_sessions=2, stripes=1)
+
+        store.get("session-1111")
+        store.get("session-2222")
+        store.get("session-1111")  # devient la plus récente
+        store.get("session-3333")
+
+        self.assertIn("session-1111", store)
+        self.assertNotIn("session-2222", store)
+        self.assertEqual(store.evictions, 1)
+
+    def test_idle_ttl_expiration(self):
+        """Une session inactive trop longtemps est recréée."""
+        factory, created = make_factory()
+        clock = FakeClock()
+        store = SessionStore(factory, ttl_seconds=10, stripes=2, clock=clock)
+
+        store.get("session-aaaa").history.add_message("user", "Bonjour")
+        clock.now = 11
+        self.assertEqual(store.get("session-aaaa").history.messages, [])
+        self.assertEqual(created.count("session-aaaa"), 2)
+
+        clock.now = 30
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertEqual(len(store), 0)
+
+    def test_memory_ceiling(self):
+        """Le plafond mémoire est appliqué quand un historique grossit."""
+        factory, _ = make_factory()
+        store = SessionStore(factory, max_memory_bytes=10000, stripes=1)
+
+        with store.session("session-aaaa") as session:
+            session.history.add_message("user", "x" * 6000)
+        with store.session("session-bbbb") as session:
+            session.history.add_message("user", "y" * 6000)
+
+        self.assertNotIn("session-aaaa", store)
+        self.assertLessEqual(store.memory_usage(), 10000)
+
+    def test_concurrent_creation_returns_same_session(self):
+        """Des requêtes concurrentes sur une même session partagent son état."""
+        factory, _ = make_factory()
+        store = SessionStore(factory)
+        results = []
+
+        def worker():
+            results.append(store.get("session-shared"))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(session) for session in results}), 1)
+
+    def test_resolve_session_id(self):
+        """L'en-tête est prioritaire et les identifiants invalides sont ignorés."""
+        self.assertEqual(resolve_session_id("header-id-123", "body-id-123", None),
+                         ("header-id-123", False))
+        self.assertEqual(resolve_session_id(None, None, "cookie-id-123"),
+                         ("cookie-id-123", False))
+        session_id, created = resolve_session_id("bad id!", 42, None)
+        self.assertTrue(created)
+        self.assertTrue(is_valid_session_id(session_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
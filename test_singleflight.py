@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests du regroupement des requêtes identiques."""
+
+    def test_concurrent_callers_share_one_call(self):
+        """Les appelants concurrents d'une même clé partagent un seul appel amont."""
+        flight = SingleFlight()
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            time.sleep(0.1)
+            return "Le pardon (Matthieu 6:14)"
+
+        results, errors = run_concurrently(10, lambda: flight.do("pardon", upstream))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, ["Le pardon (Matthieu 6:14)"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats["upstream"], 1)
+        self.assertEqual(flight.stats["shared"], 9)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_leader_failure_does_not_poison_waiters(self):
+        """Après l'échec du meneur, les attendants relancent un seul nouvel appel."""
+        flight = SingleFlight()
+        attempts = []
+        lock = threading.Lock()
+
+        def upstream():
+            with lock:
+                attempts.append(1)
+                first = len(attempts) == 1
+            time.sleep(0.1)
+            if first:
+                raise RuntimeError("503 upstream")
+            return "ok"
+
+        results, errors = run_concurrently(5, lambda: flight.do("k", upstream))
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(results, ["ok"] * 4)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(flight.stats["retries"], 4)
+
+    def test_waiter_timeout(self):
+        """Un attendant abandonne après le délai sans interrompre le meneur."""
+        flight = SingleFlight(timeout=0.05)
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.3)
+            return "lent"
+
+        leader = threading.Thread(target=lambda: flight.do("k", slow))
+        leader.start()
+        started.wait()
+        with self.assertRaises(TimeoutError):
+            flight.do("k", slow)
+        leader.join()
+        self.assertEqual(flight.stats["timeouts"], 1)
+        self.assertEqual(flight.stats["upstream"], 1)
+
+    def test_async_callers_share_one_call(self):
+        """do_async : les coroutines concurrentes partagent l'appel, relancé une fois après un échec."""
+        flight = SingleFlight()
+        attempts = []
+
+        async def upstream():
+            attempts.append(1)
+            await asyncio.sleep(0.05)
+            if len(attempts) == 2:
+                raise RuntimeError("503 upstream")
+            return f"appel {len(attempts)}"
+
+        async def burst():
+            first = await asyncio.gather(*(flight.do_async("k", upstream) for _ in range(10)))
+            second = await asyncio.gather(*(flight.do_async("k", upstream) for _ in range(5)),
+                                          return_exceptions=True)
+            return first, second
+
+        first, second = asyncio.run(burst())
+        self.assertEqual(first, ["appel 1"] * 10)
+        self.assertIsInstance(second[0], RuntimeError)
+        self.assertEqual(second[1:], ["appel 3"] * 4)
+        self.assertEqual(flight.stats["shared"], 9 + 3)
+        self.assertEqual(flight.stats["retries"], 4)
+        self.assertEqual(flight.in_flight(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bible_chat
+from bible_chat import ConversationHistory, stream_bible_response
+from app import app, session_store
+
+
+def make_streaming_chat(chunks):
+    chat = MagicMock()
+    chat.send_message.side_effect = lambda *args, **kwargs: iter(
+        [MagicMock(text=chunk) for chunk in chunks]
+    )
+    return chat
+
+
+class TestStreamingResponse(unittest.TestCase):
+    """Tests de la génération de réponses en flux."""
+
+    def setUp(self):
+        patcher = patch.object(bible_chat.answer_cache, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_are_forwarded_and_history_completed(self):
+        """Les fragments sont transmis un à un puis assemblés dans l'historique."""
+        chunks = ["Dieu a tant aimé le monde. ", "(Jean 3:16)"]
+        chat = make_streaming_chat(chunks)
+        history = ConversationHistory()
+
+        received = list(stream_bible_response("Parle-moi de l'amour", chat, history))
+
+        self.assertEqual(received, chunks)
+        self.assertTrue(chat.send_message.call_args.kwargs["stream"])
+        self.assertEqual(history.messages[-1],
+                         {"role": "assistant", "content": "".join(chunks)})
+
+    def test_error_before_first_chunk_yields_apology(self):
+        """Une erreur avant le premier fragment produit le message d'excuse."""
+        chat = MagicMock()
+        chat.send_message.side_effect = RuntimeError("boom")
+        history = ConversationHistory()
+
+        received = list(stream_bible_response("Question", chat, history))
+
+        self.assertEqual(len(received), 1)
+        self.assertIn("désolé", received[0].lower())
+        self.assertEqual(history.messages[-1]["role"], "user")
+
+
+class TestStreamingEndpoint(unittest.TestCase):
+    """Tests de la route /api/process_audio/stream."""
+
+    def setUp(self):
+        self.client = app.test_client()
+        patcher = patch.object(bible_chat.answer_cache, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_sent_events(self):
+        """La route émet des événements delta puis un événement done."""
+        chat = make_streaming_chat(["Heureux les ", "artisans de paix."])
+        with patch("app.chat", chat), \
+                patch.object(session_store, "factory", lambda sid: (ConversationHistory(), chat)):
+            response = self.client.post("/api/process_audio/stream",
+                                        json={"text": "Béatitudes", "session_id": "stream-test-1"})
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = [block.split("\n") for block in body.strip().split("\n\n")]
+        names = [lines[0][len("event: "):] for lines in events]
+        self.assertEqual(names, ["delta", "delta", "done"])
+        done = json.loads(events[-1][1][len("data: "):])
+        self.assertEqual(done["response"], "Heureux les artisans de paix.")
+
+    def test_validation_error(self):
+        """Une question vide est rejetée avant l'ouverture du flux."""
+        with patch("app.chat", MagicMock()):
+            response = self.client.post("/api/process_audio/stream", json={"text": " "})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestClientScript(unittest.TestCase):
+    """Vérifications statiques du client qui consomme le flux."""
+
+    def test_called_methods_are_defined(self):
+        """Chaque méthode appelée via `this` est définie dans la classe du client."""
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "js", "script.js")
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        called = set(re.findall(r"\bthis\.(\w+)\(", source))
+        defined = set(re.findall(r"^    (?:async )?(\w+)\([^)]*\) \{$", source, re.MULTILINE))
+        self.assertTrue(called)
+        self.assertEqual(called - defined, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
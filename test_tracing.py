@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from fake_gemini import FakeGenerativeModel
+from testutils import AppTestCase
+from tracing import profiler, tracer
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def busy_answer(question):
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:
+        pass
+    return "La foi (Hébreux 11:1)."
+
+
+def idle_spin(stop):
+    while not stop.is_set():
+        pass
+
+
+class TestTracing(AppTestCase):
+    """Tests des traces par requête et du profileur."""
+
+    def setUp(self):
+        self.use_model(FakeGenerativeModel(answer=busy_answer))
+        self.patch(app_module, "ADMIN_TOKEN", "secret")
+        self.addCleanup(tracer.clear)
+        self.addCleanup(tracer.configure, sample_rate=0, min_duration=0)
+        self.addCleanup(profiler.stop)
+
+    def ask(self):
+        return super().ask("Qu'est-ce que la foi ?")
+
+    def test_request_spans(self):
+        """Chaque étape d'une requête tracée devient un intervalle de sa trace."""
+        self.ask()
+        self.assertEqual(self.client.get("/api/admin/traces", headers=ADMIN).json["traces"], [])
+
+        response = self.client.post("/api/admin/traces", json={"sample_rate": 1, "min_duration_ms": 100},
+                                    headers=ADMIN)
+        self.assertEqual(response.json["sample_rate"], 1)
+        self.ask()
+        self.client.get("/api/health")  # plus court que min_duration_ms : non gardée
+
+        traces = self.client.get("/api/admin/traces?limit=10", headers=ADMIN).json["traces"]
+        self.assertEqual(len(traces), 1)
+        trace = traces[0]
+        self.assertEqual((trace["name"], trace["status"]), ("POST /api/process_audio", 200))
+        spans = {span["name"]: span for span in trace["spans"]}
+        for stage in ("validation", "prompt", "upstream", "citations", "serialization"):
+            self.assertIn(stage, spans)
+        # L'appel amont, dans un thread du groupe, est rattaché à la trace
+        self.assertGreaterEqual(spans["upstream"]["duration_ms"], 300)
+        self.assertLessEqual(spans["upstream"]["start_ms"] + spans["upstream"]["duration_ms"],
+                             trace["duration_ms"])
+
+    def test_admin_routes_require_token(self):
+        """Sans jeton configuré les routes n'existent pas ; un mauvais jeton est refusé."""
+        self.assertEqual(self.client.get("/api/admin/traces").status_code, 403)
+        self.assertEqual(self.client.get("/api/admin/traces", headers={"X-Admin-Token": "x"}).status_code, 403)
+        response = self.client.post("/api/admin/traces", json={"sample_rate": 2}, headers=ADMIN)
+        self.assertEqual(response.status_code, 400)
+        with patch.object(app_module, "ADMIN_TOKEN", ""):
+            self.assertEqual(self.client.get("/api/admin/profile", headers=ADMIN).status_code, 404)
+
+    def test_profiler_samples_profiled_requests(self):
+        """Le profileur relève les piles des requêtes profilées, appel amont compris, et rien d'autre."""
+        stop = threading.Event()
+        background = threading.Thread(target=idle_spin, args=(stop,))
+        background.start()
+        self.addCleanup(background.join)
+        self.addCleanup(stop.set)
+
+        response = self.client.post("/api/admin/profile", json={"seconds": 5, "interval_ms": 5}, headers=ADMIN)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.post("/api/admin/profile", json={}, headers=ADMIN).status_code, 409)
+        self.ask()
+        self.assertEqual(self.client.delete("/api/admin/profile", headers=ADMIN).status_code, 200)
+
+        response = self.client.get("/api/admin/profile", headers=ADMIN)
+        self.assertEqual(response.headers["X-Profile-Running"], "0")
+        lines = response.get_data(as_text=True).splitlines()
+        busy = [line for line in lines if line.split(" ")[0].endswith("busy_answer")]
+        self.assertTrue(busy)
+        self.assertGreater(sum(int(line.rsplit(" ", 1)[1]) for line in busy), 20)
+        self.assertIn("resilience.py:_timed", busy[0])
+        self.assertFalse(any("idle_spin" in line for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
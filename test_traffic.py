@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from benchmarks.replay import Schedule, fit_lognormal, group_sessions, question_text
+from fake_gemini import FakeGenerativeModel
+from testutils import AppTestCase
+from traffic import TrafficRecorder, read_capture
+
+
+class TestTraffic(AppTestCase):
+    """Tests de l'enregistrement du trafic et de sa relecture pour le rejeu."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "trafic", "capture.jsonl")
+        self.use_model(FakeGenerativeModel())
+
+    def test_capture_is_anonymized(self):
+        """Chaque question répondue devient une ligne, session anonymisée et données personnelles masquées."""
+        recorder = TrafficRecorder(self.path, salt="sel")
+        self.addCleanup(recorder.close)
+        with patch.object(app_module, "traffic", recorder):
+            self.ask("Je suis marie@example.org, rappelez le 06 12 34 56 78 : que dit Jean 3:16 ?",
+                     "session-alice-0001")
+            self.ask("Et Romains 8:28 ?", "session-alice-0001")
+            self.ask("Qui était Moïse ?", "session-bob-00002")
+            self.client.post("/api/process_audio", json={"text": " "})  # refusée : non enregistrée
+
+        entries = read_capture(self.path)
+        self.assertEqual(len(entries), 3)
+        first, second, other = entries
+        self.assertEqual(first["text"], "Je suis <email>, rappelez le <numéro> : que dit Jean 3:16 ?")
+        self.assertEqual((first["session"], first["turn"], second["turn"]),
+                         (second["session"], 0, 1))
+        self.assertNotEqual(other["session"], first["session"])
+        with open(self.path, encoding="utf-8") as f:
+            self.assertNotIn("alice", f.read())
+        self.assertEqual((second["status"], second["endpoint"]), (200, "/api/process_audio"))
+        self.assertGreater(first["bytes"], 100)
+        self.assertLessEqual(first["t"], second["t"])
+
+        # Échantillonnage par session (les conversations restent entières), sans texte
+        sampled = TrafficRecorder(self.path + ".sample", salt="sel", rate=0.5, keep_text=False)
+        for i in range(200):
+            for turn in range(2):
+                sampled.record("Une question ?", f"session-{i:04d}", turn, started=float(i), duration=0.1,
+                               response_bytes=10, cache=True, endpoint="/api/process_audio")
+        sampled.close()
+        kept = group_sessions(read_capture(self.path + ".sample"))
+        self.assertTrue(50 < len(kept) < 150)
+        self.assertTrue(all(len(turns) == 2 and "text" not in turns[0] for turns in kept.values()))
+
+    def test_capture_replays_on_schedule(self):
+        """Le journal se relit dans l'ordre des arrivées, au calendrier d'origine accéléré."""
+        recorder = TrafficRecorder(self.path, salt="sel", keep_text=False, max_bytes=1000)
+        for t, session in ((10.0, "session-b-0001"), (0.0, "session-a-0001"), (4.0, "session-a-0001")):
+            recorder.record("Que dit la Bible sur la foi ?", session, 0, started=1000 + t, duration=0.5,
+                            response_bytes=400, cache=False, endpoint="/api/process_audio")
+        # Au-delà de max_bytes, l'enregistrement s'arrête, quel que soit le worker qui écrit
+        other_worker = TrafficRecorder(self.path, salt="sel", keep_text=False, max_bytes=1000)
+        for i in range(20):
+            (recorder, other_worker)[i % 2].record("x", "session-c-0001", 0, started=2000, duration=0.5,
+                                                  response_bytes=1, cache=False, endpoint="/api/process_audio")
+        recorder.close()
+        other_worker.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"t": 1005, "sess')  # ligne tronquée
+
+        entries = read_capture(self.path)
+        self.assertLessEqual(os.path.getsize(self.path), 1000 + len('{"t": 1005, "sess'))
+        self.assertEqual([entry["t"] for entry in entries[:3]], [1000, 1004, 1010])
+        self.assertEqual(len(question_text(entries[0])), len("Que dit la Bible sur la foi ?"))
+        self.assertEqual(fit_lognormal([entry["ms"] / 1000 for entry in entries]), "lognormal:0.5,0")
+
+        schedule = Schedule(entries[0]["t"], speed=4)
+        self.assertAlmostEqual(schedule.due(entries[2]["t"]) - schedule.origin, 2.5)
+        unpaced = Schedule(entries[0]["t"], speed=0)
+        self.assertEqual(unpaced.due(entries[2]["t"]), unpaced.origin)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import io
+import tempfile
+import unittest
+import wave
+from unittest.mock import patch
+
+from admission import ConcurrencyLimiter, MemoryRateLimiter
+from app import app
+from tts import AudioCache, SpeechSynthesizer, TTSEngine, TTSError, parse_wav, split_sentences
+
+
+class CountingEngine(TTSEngine):
+    """Moteur de test : un WAV dont la longueur dépend du texte."""
+
+    name = "counting"
+
+    def __init__(self, available=True, fail_on=None):
+        self._available = available
+        self.fail_on = fail_on
+        self.calls = []
+
+    @property
+    def available(self):
+        return self._available
+
+    def synthesize(self, text, voice, rate):
+        self.calls.append((text, voice, rate))
+        if self.fail_on and self.fail_on in text:
+            raise TTSError("boom")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b"\x01\x00" * len(text))
+        return buffer.getvalue()
+
+
+class TestTTS(unittest.TestCase):
+    """Tests de la synthèse vocale serveur."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = CountingEngine()
+        self.speech = SpeechSynthesizer(self.engine, AudioCache(self.directory.name))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_split_sentences(self):
+        """Découpe aux fins de phrase, rattache les fragments courts, redécoupe les longues."""
+        self.assertEqual(
+            split_sentences("Au commencement était la Parole. Amen. Et la Parole était Dieu !"),
+            ["Au commencement était la Parole. Amen.", "Et la Parole était Dieu !"])
+        long_sentence = ", ".join(["la grâce et la paix vous soient données"] * 20) + "."
+        pieces = split_sentences(long_sentence, max_chars=100)
+        self.assertGreater(len(pieces), 1)
+        self.assertTrue(all(len(piece) <= 100 for piece in pieces))
+
+    def test_stream_is_one_wav_of_concatenated_sentences(self):
+        """Le flux est un WAV unique dont le PCM est la suite des phrases."""
+        text = "Heureux les pauvres en esprit. Heureux les affligés, car ils seront consolés."
+        chunks = list(self.speech.stream(text))
+        self.assertEqual(len(chunks), 2)
+        audio_format, pcm = parse_wav(b"".join(chunks))
+        self.assertEqual((audio_format.channels, audio_format.sample_rate), (1, 16000))
+        self.assertEqual(len(pcm), 2 * sum(len(s) for s in split_sentences(text)))
+
+    def test_cache_is_keyed_by_content_voice_and_rate(self):
+        """Une phrase déjà lue n'est pas resynthétisée, sauf avec une autre voix ou un autre débit."""
+        text = "Que la lumière soit. Et la lumière fut."
+        first = b"".join(self.speech.stream(text))
+        self.assertEqual(len(self.engine.calls), 2)
+        self.assertEqual(b"".join(self.speech.stream(text)), first)
+        self.assertEqual(len(self.engine.calls), 2)
+        self.assertEqual(self.speech.stats["cache_hits"], 2)
+
+        list(self.speech.stream(text, rate=200))
+        list(self.speech.stream(text, voice="fr-fr"))
+        self.assertEqual(len(self.engine.calls), 6)
+
+    def test_endpoint(self):
+        """/api/tts renvoie un flux WAV, 400 sur un texte vide, 503 si la synthèse est indisponible."""
+        client = app.test_client()
+        with patch("app.speech", self.speech):
+            response = client.get("/api/tts", query_string={"text": "Dieu est amour."})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "audio/wav")
+            self.assertEqual(response.data[:4], b"RIFF")
+
+            response = client.post("/api/tts", json={"text": "  "})
+            self.assertEqual(response.status_code, 400)
+            response = client.post("/api/tts", json={"text": "Dieu est amour.", "rate": 1000})
+            self.assertEqual(response.status_code, 400)
+
+        failing = SpeechSynthesizer(CountingEngine(fail_on="amour"))
+        with patch("app.speech", failing):
+            self.assertEqual(client.get("/api/tts?text=Dieu+est+amour.").status_code, 503)
+        with patch("app.speech", SpeechSynthesizer(CountingEngine(available=False))):
+            self.assertEqual(client.get("/api/tts?text=Dieu+est+amour.").status_code, 503)
+
+    def test_endpoint_admission(self):
+        """/api/tts passe par le débit par client et refuse en 503 quand toutes les lectures sont prises."""
+        client = app.test_client()
+        limiter = ConcurrencyLimiter(1, queue_size=0)
+        with patch("app.speech", self.speech), patch("app.tts_inflight", limiter):
+            slot = limiter.acquire()
+            response = client.get("/api/tts", query_string={"text": "Dieu est amour."})
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response.headers)
+            limiter.release(slot)
+
+            response = client.get("/api/tts", query_string={"text": "Dieu est amour."})
+            self.assertEqual(response.status_code, 200)
+            response.close()  # la place est rendue à la fin du flux
+            self.assertIsNotNone(limiter.try_acquire())
+
+        with patch("app.speech", self.speech), patch("app.rate_limiter", MemoryRateLimiter(rate=0.01, burst=1)):
+            self.assertEqual(client.get("/api/tts?text=Amen.").status_code, 200)
+            self.assertEqual(client.get("/api/tts?text=Amen.").status_code, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bible_chat import ConversationHistory, get_bible_response
+from bible_refs import BOOKS, lookup_book, parse_reference, parse_reference_request
+from verse_store import VerseStore, answer_reference, build_index
+
+SAMPLE_TSV = """livre\tchapitre\tverset\ttexte
+Jean\t3\t16\tCar Dieu a tant aimé le monde qu'il a donné son Fils unique.
+Jean\t3\t17\tDieu, en effet, n'a pas envoyé son Fils dans le monde pour qu'il juge le monde.
+Psaumes\t23\t1\tL'Éternel est mon berger: je ne manquerai de rien.
+Psaumes\t23\t2\tIl me fait reposer dans de verts pâturages.
+Gen\t1\t1\tAu commencement, Dieu créa les cieux et la terre.
+"""
+
+
+class TestBibleReferences(unittest.TestCase):
+    """Tests de l'analyse des références bibliques."""
+
+    def test_book_table(self):
+        """Le canon compte 66 livres et 1189 chapitres."""
+        self.assertEqual(len(BOOKS), 66)
+        self.assertEqual(sum(book.chapters for book in BOOKS), 1189)
+        self.assertEqual(lookup_book("1 Co").osis, "1Cor")
+        self.assertEqual(lookup_book("Psalm").osis, "Ps")
+        self.assertEqual(lookup_book("Ésaïe"), lookup_book("Isaiah"))
+
+    def test_parse_reference_forms(self):
+        """Formes écrites, abrégées, anglaises et dictées."""
+        cases = {
+            "Jean 3:16": "Jean 3:16",
+            "Jn 3.16": "Jean 3:16",
+            "1 Co 13:4-7": "1 Corinthiens 13:4-7",
+            "John 3:16": "Jean 3:16",
+            "Jean chapitre 3 verset 16 à 17": "Jean 3:16-17",
+            "première Jean 4 verset 8": "1 Jean 4:8",
+            "Psaume 23": "Psaume 23",
+            "Jude 3": "Jude 1:3",
+        }
+        for text, label in cases.items():
+            self.assertEqual(parse_reference(text).label(), label, text)
+        self.assertIsNone(parse_reference("Jean"))
+
+    def test_pure_reference_requests(self):
+        """Seules les demandes de lecture pures sont reconnues."""
+        self.assertEqual(parse_reference_request("lis-moi Jean 3:16").label(), "Jean 3:16")
+        self.assertEqual(parse_reference_request("Peux-tu lire le Psaume 23 s'il te plaît ?").label(),
+                         "Psaume 23")
+        self.assertIsNone(parse_reference_request("Que veut dire Jean 3:16 ?"))
+        self.assertIsNone(parse_reference_request("Que dit la Bible sur le pardon ?"))
+
+
+class TestVerseStore(unittest.TestCase):
+    """Tests de l'index local des versets."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        source = os.path.join(tmpdir.name, "sample.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TSV)
+        self.index_path = os.path.join(tmpdir.name, "bible.idx")
+        build_index(source, self.index_path)
+        self.store = VerseStore(self.index_path)
+        self.addCleanup(self.store.close)
+
+    def test_lookup(self):
+        """Les versets sont retrouvés par livre, chapitre et plage."""
+        john = lookup_book("Jean").index
+        self.assertEqual(self.store.verse_count(john, 3), 17)
+        self.assertEqual(self.store.get_verses(john, 3, 16)[0][1][:24], "Car Dieu a tant aimé le ")
+        self.assertEqual([v for v, _ in self.store.get_verses(john, 3, 16, 40)], [16, 17])
+        self.assertEqual(len(self.store.get_verses(lookup_book("Ps").index, 23)), 2)
+        self.assertEqual(self.store.get_verses(john, 4, 1), [])
+
+    def test_answer_reference(self):
+        """Réponses locales et messages de référence invalide."""
+        self.assertIn("L'Éternel est mon berger", answer_reference("Psaume 23", self.store))
+        self.assertIn("ne compte que 17 versets", answer_reference("Jean 3:40", self.store))
+        self.assertIn("ne compte que 3 chapitres", answer_reference("Jean 5:1", self.store))
+        self.assertIsNone(answer_reference("Romains 8:28", self.store))
+        self.assertIsNone(answer_reference("Pourquoi Jean 3:16 ?", self.store))
+
+    def test_get_bible_response_short_circuits_model(self):
+        """Une demande de lecture pure n'appelle pas le modèle."""
+        chat = MagicMock()
+        history = ConversationHistory()
+        with patch("verse_store.get_default_store", return_value=self.store):
+            response = get_bible_response("lis-moi Jean 3:16", chat, history)
+
+        self.assertTrue(response.startswith("Jean 3:16 : « Car Dieu"))
+        chat.send_message.assert_not_called()
+        self.assertEqual(history.messages[-1]["content"], response)
+
+
+if __name__ == '__main__':
+    unittest.main()
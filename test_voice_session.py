@@ -0,0 +1,172 @@
+import json
+import os
+import queue
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from bible_chat import ConversationHistory
+from fake_gemini import FakeGenerativeModel, LatencyDistribution
+from voice_session import VoiceRejected, VoiceSession
+
+QUESTION = "Que dit la Bible sur le pardon"
+
+
+class TestVoiceSession(unittest.TestCase):
+    """Tests de la session vocale : anticipation, reprise, interruption."""
+
+    def start(self, answer=None, admit=lambda: None):
+        """Lance une session dans un thread ; retourne (envoyer, attendre un message)."""
+        self.speculated, self.answered, self.committed = [], [], []
+        self.closed = threading.Event()
+        incoming, outgoing = queue.Queue(), queue.Queue()
+
+        def speculate(text):
+            self.speculated.append(text)
+            return self.chunks(text)
+
+        def default_answer(text):
+            self.answered.append(text)
+            return iter(["Réponse ", "directe."])
+
+        def receive(timeout):
+            try:
+                message = incoming.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if message is None:
+                raise EOFError
+            return json.dumps(message)
+
+        session = VoiceSession(outgoing.put, speculate, answer or default_answer,
+                               lambda text, response: self.committed.append((text, response)),
+                               admit=admit, stable_ms=50, min_chars=8)
+        thread = threading.Thread(target=session.run, args=(receive,), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 2)
+        self.addCleanup(incoming.put, None)
+
+        def expect(kind):
+            while True:
+                message = outgoing.get(timeout=2)
+                if message["type"] == kind:
+                    return message
+        return incoming.put, expect, session
+
+    def chunks(self, text):
+        try:
+            yield "Réponse "
+            yield "anticipée."
+        finally:
+            self.closed.set()
+
+    def test_stable_interim_answer_reused(self):
+        """La réponse préparée sur la transcription stable est reprise et enregistrée."""
+        send, expect, session = self.start()
+        send({"type": "interim", "text": "Que dit la"})
+        send({"type": "interim", "text": QUESTION})
+        time.sleep(0.2)
+        send({"type": "final", "text": QUESTION + " ?"})
+        self.assertEqual(expect("delta")["text"], "Réponse ")
+        done = expect("done")
+        self.assertEqual(done["response"], "Réponse anticipée.")
+        self.assertTrue(done["speculative"])
+        self.assertEqual(done["id"], 1)
+        self.assertEqual(self.speculated, [QUESTION])
+        self.assertEqual(self.answered, [])
+        self.assertEqual(self.committed, [(QUESTION + " ?", "Réponse anticipée.")])
+        self.assertEqual(session.stats["hits"], 1)
+
+    def test_changed_question_answered_fresh(self):
+        """Si la transcription finale diffère, l'anticipation est abandonnée."""
+        send, expect, session = self.start()
+        send({"type": "interim", "text": QUESTION})
+        time.sleep(0.2)
+        send({"type": "final", "text": QUESTION + " et la colère ?"})
+        done = expect("done")
+        self.assertEqual(done["response"], "Réponse directe.")
+        self.assertFalse(done["speculative"])
+        self.assertTrue(self.closed.wait(1))
+        self.assertEqual(self.committed, [])
+        self.assertEqual(session.stats["misses"], 1)
+
+    def test_barge_in_cancels_answer(self):
+        """Une nouvelle prise de parole interrompt la réponse ; la question suivante a son propre id."""
+        release = threading.Event()
+
+        def slow_answer(text):
+            yield "Début."
+            release.wait(2)
+            yield " Suite."
+
+        send, expect, _ = self.start(answer=slow_answer)
+        send({"type": "final", "text": "Question courte"})
+        self.assertEqual(expect("delta")["id"], 1)
+        send({"type": "interim", "text": "Attends"})
+        time.sleep(0.1)  # interim traité avant la suite de la réponse
+        release.set()
+        self.assertEqual(expect("cancelled")["id"], 1)
+        send({"type": "final", "text": "Autre question"})
+        self.assertEqual(expect("done")["id"], 2)
+
+    def test_rejected_question(self):
+        """Un refus du contrôle d'admission est renvoyé avec son délai."""
+        def admit():
+            raise VoiceRejected("Trop de requêtes", 2.5)
+
+        send, expect, _ = self.start(admit=admit)
+        send({"type": "final", "text": QUESTION})
+        error = expect("error")
+        self.assertEqual(error["retry_after"], 2.5)
+        send({"type": "inconnu"})
+        self.assertIn("inconnu", expect("error")["message"])
+
+    def test_websocket_route(self):
+        """Sur /api/voice, la réponse anticipée est enregistrée dans l'historique de la session."""
+        simple_websocket = __import__("simple_websocket")
+        from werkzeug.serving import make_server
+
+        model = FakeGenerativeModel(answer=lambda q: "Pardonnez (Matthieu 6:14).",
+                                    first_chunk_latency=LatencyDistribution("const", 0.0))
+        histories = {}
+
+        def factory(session_id):
+            histories[session_id] = ConversationHistory()
+            return histories[session_id], model.start_chat()
+
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        with patch.object(app_module, "chat", model.start_chat()), \
+                patch.object(app_module.session_store, "factory", factory), \
+                patch.object(app_module, "new_conversation", lambda: (None, model.start_chat())), \
+                patch.dict(os.environ, {"VOICE_STABLE_MS": "20"}):
+            ws = simple_websocket.Client.connect(
+                f"ws://127.0.0.1:{server.port}/api/voice?session_id=voix-test&cache=false")
+            self.addCleanup(ws.close)
+            self.assertEqual(json.loads(ws.receive(2))["session_id"], "voix-test")
+            ws.send(json.dumps({"type": "interim", "text": QUESTION}))
+            time.sleep(0.3)
+            ws.send(json.dumps({"type": "final", "text": QUESTION}))
+            while True:
+                message = json.loads(ws.receive(2))
+                if message["type"] == "done":
+                    break
+            self.assertTrue(message["speculative"])
+            self.assertEqual(message["citations"][0]["reference"], "Matthieu 6:14")
+            self.assertEqual([m["content"] for m in histories["voix-test"].messages],
+                             [QUESTION, "Pardonnez (Matthieu 6:14)."])
+
+    def test_serverless_entry_point_skips_websocket(self):
+        """api/index.py n'enregistre pas /api/voice et n'importe pas flask-sock."""
+        from benchmarks.bench_cold_start import import_times
+
+        times = import_times(env={"GEMINI_API_KEY": "", "SESSION_BACKEND": "none"})
+        self.assertIn("app", times)
+        self.assertEqual([name for name in times if name.startswith(("flask_sock", "simple_websocket"))], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Outils communs des tests de l'application (module non collecté par pytest).
+"""
+
+import unittest
+from typing import Any, Optional
+from unittest.mock import patch
+
+import app as app_module
+from bible_chat import ConversationHistory
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Tests de l'application servie par un modèle local (fake_gemini).
+
+    `use_model` branche le chat global et les nouvelles sessions sur le
+    modèle et lève le plafond des appels au modèle ; `ask` pose une question
+    à /api/process_audio.
+    """
+
+    def patch(self, target: Any, attribute: str, value: Any) -> None:
+        """Remplace un attribut pour la durée du test."""
+        patcher = patch.object(target, attribute, value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_model(self, model: Any) -> None:
+        """Sert l'application avec `model` (FakeGenerativeModel)."""
+        self.model = model
+        self.patch(app_module, "chat", model.start_chat())
+        self.patch(app_module.session_store, "factory", lambda sid: (ConversationHistory(), model.start_chat()))
+        self.patch(app_module, "inflight", None)
+        self.client = app_module.app.test_client()
+
+    def ask(self, text: str, session_id: Optional[str] = None, cache: bool = False) -> Any:
+        """Pose une question (sans cache par défaut) ; la réponse doit être un succès."""
+        body = {"text": text, "cache": cache}
+        if session_id is not None:
+            body["session_id"] = session_id
+        response = self.client.post("/api/process_audio", json=body)
+        self.assertEqual(response.status_code, 200)
+        return response
@@ -0,0 +1,337 @@
+"""
+Traces par requête et profileur par échantillonnage, activables à chaud.
+
+Traces : une fraction des requêtes (TRACE_SAMPLE_RATE) est suivie ; chaque
+étape mesurée par STAGE_SECONDS (validation, prompt, retrieval, upstream,
+citations, serialization…) y ajoute un intervalle (span). Les traces
+terminées d'au moins TRACE_MIN_DURATION_MS sont gardées dans un tampon
+circulaire de TRACE_BUFFER_SIZE entrées, lu par /api/admin/traces.
+
+Profileur : pendant une durée fixe, un thread relève toutes les `interval`
+secondes la pile des threads qui servent une requête profilée (toutes les
+requêtes, ou une fraction d'entre elles), ou de tous les threads. Le résultat
+est exporté en piles repliées (« collapsed stacks »), le format d'entrée de
+flamegraph.pl et de speedscope.
+
+La trace et le marquage « profilé » suivent la requête par des variables de
+contexte : ils passent aux tâches asyncio, et aux threads des groupes de
+threads par in_context().
+
+Désactivés, ils coûtent une comparaison par requête et une lecture de
+variable de contexte par étape mesurée.
+"""
+
+import contextvars
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from logging import getLogger
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# Trace de la requête en cours et marquage des requêtes profilées
+current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_profiled: contextvars.ContextVar[bool] = contextvars.ContextVar("profiled", default=False)
+
+
+class Trace:
+    """
+    Trace d'une requête : intervalles (nom, début, durée), en secondes depuis
+    le début de la requête.
+    """
+
+    __slots__ = ("trace_id", "name", "started_at", "start", "spans", "attributes")
+
+    def __init__(self, name: str):
+        self.trace_id = secrets.token_hex(8)
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.attributes: Dict[str, Any] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        """Ajoute un intervalle qui vient de se terminer."""
+        end = time.perf_counter() - self.start
+        # list.append est atomique : les tentatives parallèles peuvent écrire
+        self.spans.append((name, end - duration, duration))
+
+
+def annotate(**attributes: Any) -> None:
+    """Ajoute des attributs (statut HTTP…) à la trace en cours, s'il y en a une."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+class Tracer:
+    """
+    Échantillonne les requêtes tracées et garde les traces terminées.
+
+    Attributes:
+        sample_rate (float): Fraction des requêtes tracées (0 : désactivé)
+        min_duration (float): Durée minimale d'une trace gardée, en secondes
+        stats (Dict[str, int]): Requêtes tracées et traces gardées
+    """
+
+    def __init__(self, sample_rate: float = 0.0, min_duration: float = 0.0, capacity: int = 256):
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration
+        self._buffer: Deque[Tuple[str, str, float, float, Tuple[Tuple[str, float, float], ...], Dict[str, Any]]] = \
+            deque(maxlen=max(1, capacity))
+        self.stats: Dict[str, int] = {"traced": 0, "kept": 0}
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """Crée le traceur configuré par les variables TRACE_*."""
+        return cls(
+            sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+            min_duration=float(os.getenv("TRACE_MIN_DURATION_MS", "0")) / 1000,
+            capacity=int(os.getenv("TRACE_BUFFER_SIZE", "256")),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.maxlen
+
+    def configure(self, sample_rate: Optional[float] = None, min_duration: Optional[float] = None) -> None:
+        """
+        Modifie l'échantillonnage à chaud.
+
+        Raises:
+            ValueError: Si une valeur est hors limites
+        """
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate doit être compris entre 0 et 1")
+        if min_duration is not None and min_duration < 0:
+            raise ValueError("min_duration_ms ne peut pas être négatif")
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if min_duration is not None:
+            self.min_duration = min_duration
+
+    def start(self, name: str) -> Optional[Tuple[Trace, contextvars.Token]]:
+        """
+        Commence la trace d'une requête si elle est échantillonnée.
+
+        Returns:
+            Le jeton à passer à finish(), ou None si la requête n'est pas tracée
+        """
+        rate = self.sample_rate
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        trace = Trace(name)
+        return trace, current_trace.set(trace)
+
+    def finish(self, handle: Optional[Tuple[Trace, contextvars.Token]]) -> None:
+        """Termine une trace commencée par start() et la garde si elle est assez longue."""
+        if handle is None:
+            return
+        trace, token = handle
+        try:
+            current_trace.reset(token)
+        except ValueError:
+            # Terminée dans un autre contexte (fermeture d'un flux)
+            current_trace.set(None)
+        duration = time.perf_counter() - trace.start
+        self.stats["traced"] += 1
+        if duration >= self.min_duration:
+            self.stats["kept"] += 1
+            self._buffer.append((trace.trace_id, trace.name, trace.started_at, duration,
+                                 tuple(trace.spans), trace.attributes))
+
+    def recent(self, limit: int = 50, min_duration: float = 0.0) -> List[Dict[str, Any]]:
+        """Dernières traces gardées, de la plus récente à la plus ancienne."""
+        traces = []
+        for trace_id, name, started_at, duration, spans, attributes in reversed(list(self._buffer)):
+            if duration < min_duration:
+                continue
+            traces.append({
+                "id": trace_id,
+                "name": name,
+                "start": round(started_at, 3),
+                "duration_ms": round(duration * 1000, 3),
+                **attributes,
+                "spans": [{"name": span, "start_ms": round(start * 1000, 3), "duration_ms": round(length * 1000, 3)}
+                          for span, start, length in sorted(spans, key=lambda s: s[1])],
+            })
+            if len(traces) >= limit:
+                break
+        return traces
+
+    def clear(self) -> None:
+        self._buffer.clear()
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage des piles (sys._current_frames).
+
+    Attributes:
+        max_depth (int): Profondeur maximale d'une pile relevée
+        stats (Dict[str, Any]): Échantillons et paramètres de la dernière exécution
+    """
+
+    def __init__(self, max_depth: int = 64):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._threads: Dict[int, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._fraction = 0.0
+        self._all_threads = False
+        self.stats: Dict[str, Any] = {"samples": 0, "stacks": 0, "started_at": None,
+                                      "duration": None, "interval": None, "fraction": None}
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self, duration: float, interval: float = 0.01, fraction: float = 1.0,
+              all_threads: bool = False) -> bool:
+        """
+        Démarre une fenêtre de profilage ; les piles de la fenêtre précédente
+        sont effacées.
+
+        Args:
+            duration: Durée de la fenêtre, en secondes
+            interval: Délai entre deux relevés, en secondes
+            fraction: Fraction des requêtes profilées
+            all_threads: Relever tous les threads, pas seulement ceux des requêtes
+
+        Returns:
+            False si une fenêtre est déjà en cours
+
+        Raises:
+            ValueError: Si un paramètre est hors limites
+        """
+        if not 0 < duration <= 3600:
+            raise ValueError("La durée doit être comprise entre 0 et 3600 secondes")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("L'intervalle doit être compris entre 1 et 1000 ms")
+        if not 0 < fraction <= 1:
+            raise ValueError("La fraction doit être comprise entre 0 et 1")
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = Counter()
+            self._fraction = fraction
+            self._all_threads = all_threads
+            self._stop.clear()
+            self.stats = {"samples": 0, "stacks": 0, "started_at": round(time.time(), 3),
+                          "duration": duration, "interval": interval, "fraction": fraction,
+                          "all_threads": all_threads}
+            self._thread = threading.Thread(target=self._run, args=(duration, interval),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started for {duration:.0f}s every {interval * 1000:.0f}ms")
+        return True
+
+    def stop(self) -> None:
+        """Arrête la fenêtre en cours ; les piles relevées restent lisibles."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def enter_request(self) -> bool:
+        """
+        Tire au sort la requête courante ; si elle est profilée, son thread
+        l'est jusqu'à leave_request().
+
+        Returns:
+            True si la requête est profilée
+        """
+        if not self.running or self._all_threads:
+            return False
+        if self._fraction < 1 and random.random() >= self._fraction:
+            return False
+        _profiled.set(True)
+        self._enter()
+        return True
+
+    def leave_request(self) -> None:
+        _profiled.set(False)
+        self._leave()
+
+    def _enter(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def _leave(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            count = self._threads.get(ident, 0) - 1
+            if count > 0:
+                self._threads[ident] = count
+            else:
+                self._threads.pop(ident, None)
+
+    def _run(self, duration: float, interval: float) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            with self._lock:
+                targets = None if self._all_threads else set(self._threads)
+            for ident, frame in frames.items():
+                if ident == own or (targets is not None and ident not in targets):
+                    continue
+                self._counts[self._fold(frame)] += 1
+                self.stats["samples"] += 1
+            del frames
+            self._stop.wait(interval)
+        self.stats["stacks"] = len(self._counts)
+
+    def _fold(self, frame: Any) -> str:
+        """Pile repliée, de la racine à la feuille : module:fonction;…"""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> str:
+        """Piles relevées, une par ligne suivie de son nombre d'échantillons."""
+        counts = dict(self._counts)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def in_context(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Prépare fn pour un autre thread (groupe de threads) : elle y voit la trace
+    de la requête courante, et son thread est profilé si la requête l'est.
+    """
+    if current_trace.get() is None and not _profiled.get():
+        return fn
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        return context.run(_run_marked, fn, args, kwargs)
+
+    return run
+
+
+def _run_marked(fn: Callable[..., T], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> T:
+    if not _profiled.get():
+        return fn(*args, **kwargs)
+    profiler._enter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler._leave()
+
+
+tracer = Tracer.from_env()
+profiler = SamplingProfiler()
@@ -0,0 +1,165 @@
+"""
+Enregistrement anonymisé du trafic réel, pour le rejouer en test de charge
+(benchmarks/replay.py).
+
+Chaque question répondue ajoute une ligne JSON au journal TRAFFIC_CAPTURE_PATH,
+ouvert en ajout seul : les workers gunicorn y écrivent ensemble, une écriture
+par ligne. Une ligne contient l'heure d'arrivée, la session anonymisée, le rang
+de la question dans la conversation, le texte expurgé (ou sa seule longueur),
+l'usage du cache, la durée, le statut et la taille de la réponse :
+
+    {"t":1718000000.123,"session":"3f9a0c1b2d4e","turn":2,"text":"…","chars":42,
+     "cache":1,"ms":812.4,"status":200,"bytes":530,"endpoint":"/api/process_audio"}
+
+Anonymisation : l'identifiant de session est remplacé par un HMAC salé
+(TRAFFIC_CAPTURE_SALT, commun à tous les workers) ; les adresses e-mail, les
+URL et les numéros de téléphone sont masqués ; avec TRAFFIC_CAPTURE_TEXT=length
+le texte n'est pas gardé. L'échantillonnage (TRAFFIC_CAPTURE_RATE) se fait par
+session, pour garder des conversations entières.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+from logging import getLogger
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = getLogger(__name__)
+
+_REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE), "<url>"),
+    # Numéros de téléphone et autres longues suites de chiffres (pas « Jean 3:16 »)
+    (re.compile(r"\+?\d(?:[\s.-]?\d){6,}"), "<numéro>"),
+]
+
+
+def redact(text: str) -> str:
+    """Masque les données personnelles reconnaissables d'une question."""
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class TrafficRecorder:
+    """
+    Journal en ajout seul des questions répondues.
+
+    Attributes:
+        path (str): Fichier du journal
+        rate (float): Fraction des sessions enregistrées
+        keep_text (bool): Garder le texte expurgé (sinon sa longueur seulement)
+        max_bytes (int): Taille au-delà de laquelle l'enregistrement s'arrête
+    """
+
+    def __init__(self, path: str, salt: str, rate: float = 1.0, keep_text: bool = True,
+                 max_bytes: int = 256 * 2**20):
+        if not 0 < rate <= 1:
+            raise ValueError("TRAFFIC_CAPTURE_RATE doit être compris entre 0 et 1")
+        self.path = path
+        self.rate = rate
+        self.keep_text = keep_text
+        self.max_bytes = max_bytes
+        self._salt = salt.encode("utf-8")
+        self._fd: Optional[int] = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def anonymize_session(self, session_id: str) -> str:
+        return hmac.new(self._salt, session_id.encode("utf-8"), hashlib.sha256).hexdigest()[:12]
+
+    def sampled(self, session: str) -> bool:
+        """Tirage déterministe par session anonymisée : même décision dans tous les workers."""
+        return self.rate >= 1 or int(session[:8], 16) < self.rate * 2**32
+
+    def record(self, text: str, session_id: str, turn: int, started: float, duration: float,
+               response_bytes: int, cache: bool, endpoint: str, status: int = 200) -> None:
+        """
+        Ajoute une question au journal.
+
+        Args:
+            text: Question posée
+            session_id: Identifiant de session, anonymisé avant écriture
+            turn: Nombre de questions déjà posées dans la conversation
+            started: Heure d'arrivée (time.time())
+            duration: Durée du traitement, en secondes
+            response_bytes: Taille de la réponse en UTF-8
+        """
+        if self._stopped:
+            return
+        session = self.anonymize_session(session_id)
+        if not self.sampled(session):
+            return
+        entry: Dict[str, Any] = {"t": round(started, 3), "session": session, "turn": turn}
+        if self.keep_text:
+            entry["text"] = redact(text)
+        entry.update({
+            "chars": len(text), "cache": int(cache), "ms": round(duration * 1000, 1),
+            "status": status, "bytes": response_bytes, "endpoint": endpoint,
+        })
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._stopped:
+                return
+            try:
+                if self._fd is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                # Taille du fichier, écrit par tous les workers (et non ce que ce
+                # processus y a ajouté) : la limite vaut pour le journal entier
+                if os.fstat(self._fd).st_size + len(line) > self.max_bytes:
+                    logger.warning(f"Traffic capture stopped: {self.path} reached {self.max_bytes} bytes")
+                    self._stopped = True
+                    return
+                # Une seule écriture en mode ajout : les lignes des workers ne s'entremêlent pas
+                os.write(self._fd, line)
+            except OSError as e:
+                logger.error(f"Traffic capture disabled: {str(e)}")
+                self._stopped = True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def recorder_from_env() -> Optional[TrafficRecorder]:
+    """Crée l'enregistreur configuré par TRAFFIC_CAPTURE_* (None si désactivé)."""
+    path = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+    if not path:
+        return None
+    mode = os.getenv("TRAFFIC_CAPTURE_TEXT", "redact").lower()
+    if mode not in ("redact", "length"):
+        raise ValueError(f"Unknown traffic capture text mode: {mode}")
+    return TrafficRecorder(
+        path,
+        # Sous gunicorn, le sel est fixé avant le fork des workers (gunicorn.conf.py)
+        salt=os.getenv("TRAFFIC_CAPTURE_SALT") or secrets.token_hex(16),
+        rate=float(os.getenv("TRAFFIC_CAPTURE_RATE", "1")),
+        keep_text=mode == "redact",
+        max_bytes=int(float(os.getenv("TRAFFIC_CAPTURE_MAX_MB", "256")) * 2**20),
+    )
+
+
+def read_capture(path: str) -> List[Dict[str, Any]]:
+    """
+    Relit un journal, trié par heure d'arrivée ; les lignes illisibles (écriture
+    interrompue) sont ignorées.
+    """
+    return sorted(_entries(path), key=lambda entry: entry["t"])
+
+
+def _entries(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and "t" in entry and "session" in entry:
+                yield entry
@@ -0,0 +1,415 @@
+"""
+Synthèse vocale côté serveur, phrase par phrase, avec cache audio.
+
+Une réponse est découpée en phrases, synthétisées par un moteur interchangeable
+(espeak par défaut). L'audio est diffusé comme un unique flux WAV : l'en-tête,
+puis les échantillons PCM de chaque phrase dès qu'elle est prête. Les phrases
+suivantes sont synthétisées en avance pendant la diffusion de la courante.
+
+Chaque phrase synthétisée est conservée sur disque sous une clé dérivée de son
+contenu (moteur, voix, débit, texte) : un verset ou une réponse déjà lus sont
+rejoués sans nouvelle synthèse.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from metrics import ERRORS, STAGE_SECONDS, TTS_SENTENCES
+
+logger = getLogger(__name__)
+
+_VOICE_PATTERN = re.compile(r"^[A-Za-z0-9_+-]{1,32}$")
+
+# Fin de phrase : ponctuation finale suivie d'un espace (même règle que le client)
+_SENTENCE_END = re.compile(r"(?<=[.!?;»)])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,:])\s+")
+
+
+class TTSError(RuntimeError):
+    """Échec de la synthèse vocale (moteur absent ou en erreur)."""
+
+
+class AudioFormat(NamedTuple):
+    channels: int
+    sample_rate: int
+    sample_width: int
+
+
+def split_sentences(text: str, max_chars: int = 300) -> List[str]:
+    """
+    Découpe un texte en phrases à synthétiser.
+
+    Les phrases trop longues sont redécoupées aux virgules ; les fragments très
+    courts sont rattachés à la phrase précédente.
+
+    Args:
+        text: Texte à lire
+        max_chars: Longueur au-delà de laquelle une phrase est redécoupée
+
+    Returns:
+        Liste des phrases, dans l'ordre
+    """
+    sentences: List[str] = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pieces = [sentence]
+        if len(sentence) > max_chars:
+            pieces, current = [], ""
+            for clause in _CLAUSE_END.split(sentence):
+                if current and len(current) + len(clause) + 1 > max_chars:
+                    pieces.append(current)
+                    current = clause
+                else:
+                    current = f"{current} {clause}" if current else clause
+            pieces.append(current)
+        for piece in pieces:
+            if sentences and len(piece) < 12:
+                sentences[-1] = f"{sentences[-1]} {piece}"
+            else:
+                sentences.append(piece)
+    return sentences
+
+
+def parse_wav(data: bytes) -> Tuple[AudioFormat, bytes]:
+    """
+    Extrait le format et les échantillons PCM d'un fichier WAV.
+
+    Les tailles déclarées dans l'en-tête sont ignorées lorsqu'elles sont
+    invalides (cas des WAV écrits sur un tube, comme `espeak --stdout`).
+
+    Raises:
+        TTSError: Si les données ne sont pas un WAV PCM
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise TTSError("Engine output is not a WAV file")
+    audio_format = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag != 1:
+                raise TTSError("Only PCM WAV is supported")
+            audio_format = AudioFormat(channels, sample_rate, bits // 8)
+        elif chunk_id == b"data":
+            if audio_format is None:
+                raise TTSError("WAV data chunk before format chunk")
+            end = min(len(data), body + size)
+            pcm = data[body:end]
+            return audio_format, pcm[:len(pcm) - len(pcm) % (audio_format.channels * audio_format.sample_width)]
+        offset = body + size + (size & 1)
+    raise TTSError("WAV file has no data chunk")
+
+
+def wav_header(audio_format: AudioFormat, data_size: Optional[int] = None) -> bytes:
+    """
+    En-tête WAV PCM.
+
+    Args:
+        audio_format: Format des échantillons
+        data_size: Taille des données ; None pour un flux de longueur inconnue
+    """
+    block_align = audio_format.channels * audio_format.sample_width
+    size = 0xFFFFFFFF if data_size is None else data_size
+    riff_size = 0xFFFFFFFF if data_size is None else 36 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE", b"fmt ", 16, 1, audio_format.channels,
+        audio_format.sample_rate, audio_format.sample_rate * block_align, block_align,
+        audio_format.sample_width * 8, b"data", size,
+    )
+
+
+class TTSEngine:
+    """
+    Moteur de synthèse vocale.
+
+    Un moteur produit un WAV PCM par appel ; le format doit être le même pour
+    toutes les phrases d'une voix donnée.
+    """
+
+    name = "engine"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str, voice: str, rate: int) -> bytes:
+        """
+        Synthétise un texte.
+
+        Args:
+            text: Texte à lire
+            voice: Identifiant de voix propre au moteur
+            rate: Débit, en mots par minute
+
+        Returns:
+            Le fichier WAV produit
+
+        Raises:
+            TTSError: Si la synthèse échoue
+        """
+        raise NotImplementedError
+
+
+class EspeakEngine(TTSEngine):
+    """Synthèse par espeak-ng ou espeak (installé par build.sh)."""
+
+    name = "espeak"
+
+    def __init__(self, binary: Optional[str] = None, timeout: float = 30.0):
+        self._binary = binary
+        self.timeout = timeout
+
+    @property
+    def binary(self) -> Optional[str]:
+        if self._binary is None:
+            self._binary = shutil.which("espeak-ng") or shutil.which("espeak") or ""
+        return self._binary or None
+
+    @property
+    def available(self) -> bool:
+        return self.binary is not None
+
+    def synthesize(self, text: str, voice: str, rate: int) -> bytes:
+        if self.binary is None:
+            raise TTSError("espeak is not installed")
+        try:
+            result = subprocess.run(
+                [self.binary, "--stdout", "-v", voice, "-s", str(rate), "--", text],
+                capture_output=True, timeout=self.timeout, check=True,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            raise TTSError(f"espeak failed: {str(e)}")
+        return result.stdout
+
+
+class AudioCache:
+    """
+    Cache disque des phrases synthétisées, adressé par le contenu.
+
+    Les fichiers sont répartis dans des sous-dossiers selon le début de leur
+    clé. Au-delà de `max_bytes`, les fichiers les moins récemment lus sont
+    supprimés (vérification amortie, une écriture sur 32).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(engine: str, voice: str, rate: int, text: str) -> str:
+        """Clé de cache d'une phrase."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{engine}\0{voice}\0{rate}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to cache synthesized audio: {str(e)}")
+            return
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % 32 == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Supprime les fichiers les moins récemment lus au-delà du plafond."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".wav"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class SpeechSynthesizer:
+    """
+    Synthèse d'une réponse complète en flux WAV.
+
+    Attributes:
+        engine (TTSEngine): Moteur de synthèse
+        cache (AudioCache): Cache des phrases (None pour le désactiver)
+        default_voice (str): Voix par défaut
+        default_rate (int): Débit par défaut, en mots par minute
+        lookahead (int): Nombre de phrases d'une réponse synthétisées en avance
+        stats (Dict[str, int]): Compteurs de synthèse et de cache
+    """
+
+    def __init__(self, engine: TTSEngine, cache: Optional[AudioCache] = None,
+                 default_voice: str = "fr", default_rate: int = 160, lookahead: int = 2,
+                 workers: int = 4):
+        self.engine = engine
+        self.cache = cache
+        self.default_voice = default_voice
+        self.default_rate = default_rate
+        self.lookahead = max(1, lookahead)
+        # Partagé par toutes les requêtes : borne le nombre de synthèses simultanées
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tts")
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"sentences": 0, "cache_hits": 0, "errors": 0}
+
+    @property
+    def available(self) -> bool:
+        return self.engine.available
+
+    def validate(self, voice: Optional[str], rate: Optional[int]) -> Tuple[str, int]:
+        """
+        Vérifie la voix et le débit demandés.
+
+        Raises:
+            ValueError: Si la voix ou le débit sont invalides
+        """
+        voice = voice or self.default_voice
+        if not _VOICE_PATTERN.match(voice):
+            raise ValueError("Voix invalide")
+        rate = self.default_rate if rate is None else int(rate)
+        if not 80 <= rate <= 450:
+            raise ValueError("Le débit doit être compris entre 80 et 450 mots par minute")
+        return voice, rate
+
+    def synthesize_sentence(self, sentence: str, voice: str, rate: int) -> Tuple[AudioFormat, bytes]:
+        """
+        Synthétise une phrase, ou la relit depuis le cache.
+
+        Returns:
+            Tuple (format, échantillons PCM)
+        """
+        key = AudioCache.key(self.engine.name, voice, rate, sentence)
+        data = self.cache.get(key) if self.cache is not None else None
+        with self._lock:
+            self.stats["sentences"] += 1
+            if data is not None:
+                self.stats["cache_hits"] += 1
+        if data is not None:
+            TTS_SENTENCES.inc("hit")
+            return parse_wav(data)
+        TTS_SENTENCES.inc("miss")
+        try:
+            with STAGE_SECONDS.time("tts_synthesis"):
+                audio_format, pcm = parse_wav(self.engine.synthesize(sentence, voice, rate))
+        except TTSError as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            ERRORS.inc("tts", type(e).__name__)
+            raise
+        if self.cache is not None:
+            # WAV normalisé (tailles exactes), lisible tel quel
+            self.cache.put(key, wav_header(audio_format, len(pcm)) + pcm)
+        return audio_format, pcm
+
+    def stream(self, text: str, voice: Optional[str] = None,
+               rate: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Produit un flux WAV : l'en-tête avec la première phrase, puis une
+        phrase par fragment.
+
+        Raises:
+            ValueError: Si le texte, la voix ou le débit sont invalides
+            TTSError: Si une phrase ne peut être synthétisée
+        """
+        voice, rate = self.validate(voice, rate)
+        sentences = split_sentences(text)
+        if not sentences:
+            raise ValueError("Le texte à lire est vide")
+
+        pending: List[Future] = []
+        submit: Callable[[str], Future] = lambda s: self._executor.submit(
+            self.synthesize_sentence, s, voice, rate)
+        upcoming = iter(sentences)
+        for sentence in upcoming:
+            pending.append(submit(sentence))
+            if len(pending) >= self.lookahead:
+                break
+
+        stream_format = None
+        try:
+            while pending:
+                audio_format, pcm = pending.pop(0).result()
+                next_sentence = next(upcoming, None)
+                if next_sentence is not None:
+                    pending.append(submit(next_sentence))
+                if stream_format is None:
+                    stream_format = audio_format
+                    yield wav_header(audio_format) + pcm
+                elif audio_format != stream_format:
+                    raise TTSError(f"Engine changed audio format mid-stream: {audio_format}")
+                else:
+                    yield pcm
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+_ENGINES: Dict[str, Callable[[], TTSEngine]] = {"espeak": EspeakEngine}
+
+
+def register_engine(name: str, factory: Callable[[], TTSEngine]) -> None:
+    """Déclare un moteur utilisable via TTS_ENGINE."""
+    _ENGINES[name] = factory
+
+
+def synthesizer_from_env() -> SpeechSynthesizer:
+    """Crée le synthétiseur configuré par les variables TTS_*."""
+    engine_name = os.getenv("TTS_ENGINE", "espeak")
+    if engine_name not in _ENGINES:
+        raise ValueError(f"Unknown TTS engine: {engine_name}")
+    cache_dir = os.getenv(
+        "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "assistant-biblique", "tts"))
+    cache = AudioCache(cache_dir, int(float(os.getenv("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024)) \
+        if cache_dir else None
+    return SpeechSynthesizer(
+        _ENGINES[engine_name](),
+        cache,
+        default_voice=os.getenv("TTS_VOICE", "fr"),
+        default_rate=int(os.getenv("TTS_RATE", "160")),
+        lookahead=int(os.getenv("TTS_LOOKAHEAD", "2")),
+        workers=int(os.getenv("TTS_WORKERS", "4")),
+    )
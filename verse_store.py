@@ -0,0 +1,308 @@
+"""
+Stockage local des versets, indexé et projeté en mémoire (mmap).
+
+Le fichier d'index est produit une fois à partir d'un texte biblique du
+domaine public (par exemple Louis Segond 1910 ou King James) au format TSV :
+
+    livre<TAB>chapitre<TAB>verset<TAB>texte
+
+où `livre` est un nom ou une abréviation reconnus par bible_refs.
+
+Format du fichier d'index (entiers non signés 32 bits, petit-boutiste) :
+
+    en-tête      MAGIC, version, nb_livres, nb_chapitres, nb_versets
+    livres       premier chapitre de chaque livre     (nb_livres + 1)
+    chapitres    premier verset de chaque chapitre    (nb_chapitres + 1)
+    versets      décalage en octets de chaque verset  (nb_versets + 1)
+    texte        textes UTF-8 concaténés
+
+Une recherche se résume à trois lectures de tableaux et une tranche du texte.
+
+Usage:
+    python verse_store.py build segond.tsv data/bible.idx
+    python verse_store.py lookup "Jean 3:16"
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+from bible_refs import BOOKS, Reference, lookup_book, parse_reference, parse_reference_request
+
+logger = getLogger(__name__)
+
+MAGIC = b"BIBLEIDX"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIII")
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bible.idx")
+
+
+class VerseStore:
+    """
+    Accès en lecture seule à un fichier d'index de versets.
+
+    Les tableaux d'index sont des vues sur le fichier projeté en mémoire :
+    l'ouverture ne lit rien et les pages sont chargées à la demande.
+    """
+
+    def __init__(self, path: str):
+        """
+        Ouvre un fichier d'index.
+
+        Args:
+            path: Chemin du fichier produit par build_index
+
+        Raises:
+            ValueError: Si le fichier n'est pas un index valide
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_books, n_chapters, n_verses = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a verse index: {path}")
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._books = view[offset:offset + 4 * (n_books + 1)].cast("I")
+        offset += 4 * (n_books + 1)
+        self._chapters = view[offset:offset + 4 * (n_chapters + 1)].cast("I")
+        offset += 4 * (n_chapters + 1)
+        self._verses = view[offset:offset + 4 * (n_verses + 1)].cast("I")
+        offset += 4 * (n_verses + 1)
+        self._text_offset = offset
+        self.verse_total = n_verses
+
+    def chapter_count(self, book_index: int) -> int:
+        """Nombre de chapitres présents dans l'index pour un livre."""
+        return self._books[book_index + 1] - self._books[book_index]
+
+    def verse_count(self, book_index: int, chapter: int) -> int:
+        """
+        Nombre de versets d'un chapitre.
+
+        Returns:
+            Le nombre de versets, ou 0 si le chapitre n'existe pas
+        """
+        if not 1 <= chapter <= self.chapter_count(book_index):
+            return 0
+        chapter_id = self._books[book_index] + chapter - 1
+        return self._chapters[chapter_id + 1] - self._chapters[chapter_id]
+
+    def get_verses(self, book_index: int, chapter: int,
+                   start: Optional[int] = None, end: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Retourne les versets demandés.
+
+        Args:
+            book_index: Indice du livre (Book.index)
+            chapter: Numéro de chapitre
+            start: Premier verset (par défaut le chapitre entier)
+            end: Dernier verset inclus (par défaut start)
+
+        Returns:
+            Liste de (numéro de verset, texte) ; vide si hors limites
+        """
+        count = self.verse_count(book_index, chapter)
+        if count == 0:
+            return []
+        if start is None:
+            start, end = 1, count
+        elif end is None:
+            end = start
+        if not 1 <= start <= end or start > count:
+            return []
+        end = min(end, count)
+
+        first = self._chapters[self._books[book_index] + chapter - 1]
+        base = self._text_offset
+        return [
+            (verse, self._mmap[base + self._verses[first + verse - 1]:
+                               base + self._verses[first + verse]].decode("utf-8"))
+            for verse in range(start, end + 1)
+        ]
+
+    def lookup(self, reference: Reference) -> List[Tuple[int, str]]:
+        """Retourne les versets d'une référence."""
+        return self.get_verses(reference.book.index, reference.chapter,
+                               reference.verse_start, reference.verse_end)
+
+    def close(self) -> None:
+        """Libère la projection mémoire."""
+        self._books.release()
+        self._chapters.release()
+        self._verses.release()
+        self._mmap.close()
+
+
+def build_index(source_path: str, output_path: str) -> Dict[str, int]:
+    """
+    Construit le fichier d'index à partir d'un texte biblique au format TSV.
+
+    Les versets absents de la source sont enregistrés vides pour que la
+    numérotation reste continue.
+
+    Args:
+        source_path: Fichier TSV livre/chapitre/verset/texte
+        output_path: Fichier d'index à écrire
+
+    Returns:
+        Statistiques de construction (versets, chapitres, octets)
+
+    Raises:
+        ValueError: Si un livre de la source est inconnu
+    """
+    verses: Dict[Tuple[int, int], Dict[int, str]] = {}
+    with open(source_path, encoding="utf-8", newline="") as f:
+        for line_number, row in enumerate(csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE), 1):
+            if len(row) < 4 or not row[1].strip().isdigit():
+                continue  # en-tête ou ligne vide
+            book = lookup_book(row[0])
+            if book is None:
+                raise ValueError(f"Unknown book '{row[0]}' on line {line_number}")
+            verses.setdefault((book.index, int(row[1])), {})[int(row[2])] = row[3].strip()
+
+    book_starts = [0]
+    chapter_starts = [0]
+    offsets = [0]
+    blob = bytearray()
+    for book in BOOKS:
+        chapters = sorted(chapter for index, chapter in verses if index == book.index)
+        last_chapter = chapters[-1] if chapters else 0
+        for chapter in range(1, last_chapter + 1):
+            chapter_verses = verses.get((book.index, chapter), {})
+            for verse in range(1, max(chapter_verses, default=0) + 1):
+                blob += chapter_verses.get(verse, "").encode("utf-8")
+                offsets.append(len(blob))
+            chapter_starts.append(len(offsets) - 1)
+        book_starts.append(len(chapter_starts) - 1)
+
+    n_chapters = len(chapter_starts) - 1
+    n_verses = len(offsets) - 1
+    tmp_path = output_path + ".tmp"
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, len(BOOKS), n_chapters, n_verses))
+        for table in (book_starts, chapter_starts, offsets):
+            out.write(struct.pack(f"<{len(table)}I", *table))
+        out.write(blob)
+    os.replace(tmp_path, output_path)
+
+    return {"verses": n_verses, "chapters": n_chapters, "bytes": os.path.getsize(output_path)}
+
+
+_default_store: Optional[VerseStore] = None
+_default_store_loaded = False
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> Optional[VerseStore]:
+    """
+    Retourne l'index configuré par BIBLE_STORE_PATH (ou data/bible.idx).
+
+    Returns:
+        L'index ouvert, ou None s'il n'a pas été construit
+    """
+    global _default_store, _default_store_loaded
+    if not _default_store_loaded:
+        with _default_store_lock:
+            if not _default_store_loaded:
+                path = os.getenv("BIBLE_STORE_PATH", DEFAULT_STORE_PATH)
+                if os.path.exists(path):
+                    try:
+                        _default_store = VerseStore(path)
+                        logger.info(f"Verse store loaded from {path}")
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Failed to load verse store: {str(e)}")
+                _default_store_loaded = True
+    return _default_store
+
+
+def format_passage(reference: Reference, verses: List[Tuple[int, str]]) -> str:
+    """
+    Formate un passage pour la lecture à voix haute.
+
+    Args:
+        reference: Référence demandée
+        verses: Versets retournés par VerseStore.lookup
+
+    Returns:
+        Le texte du passage précédé de sa référence
+    """
+    if len(verses) == 1:
+        return f"{reference.label()} : « {verses[0][1]} »"
+    body = " ".join(f"{number}. {text}" for number, text in verses)
+    return f"{reference.label()} : {body}"
+
+
+def answer_reference(text: str, store: Optional[VerseStore] = None) -> Optional[str]:
+    """
+    Répond localement à une demande de lecture pure (« lis-moi Jean 3:16 »).
+
+    Args:
+        text: Demande de l'utilisateur
+        store: Index à utiliser (par défaut l'index configuré)
+
+    Returns:
+        Le passage ou un message de référence invalide, ou None si la demande
+        n'est pas une simple référence ou si aucun index n'est disponible
+    """
+    reference = parse_reference_request(text)
+    if reference is None:
+        return None
+    store = store if store is not None else get_default_store()
+    if store is None:
+        return None
+
+    book = reference.book
+    if store.chapter_count(book.index) == 0:
+        return None  # livre absent de l'index (texte partiel)
+    if reference.chapter > store.chapter_count(book.index):
+        return f"Le livre {book.name_fr} ne compte que {store.chapter_count(book.index)} chapitres."
+    verses = store.lookup(reference)
+    if not verses:
+        count = store.verse_count(book.index, reference.chapter)
+        return f"{reference._replace(verse_start=None, verse_end=None).label()} ne compte que {count} versets."
+    return format_passage(reference, verses)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Index local des versets bibliques")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Construit le fichier d'index depuis un TSV")
+    build.add_argument("source", help="Texte biblique : livre<TAB>chapitre<TAB>verset<TAB>texte")
+    build.add_argument("output", nargs="?", default=DEFAULT_STORE_PATH, help="Fichier d'index")
+
+    lookup = commands.add_parser("lookup", help="Affiche un passage")
+    lookup.add_argument("reference", help="Référence, par exemple 'Jean 3:16'")
+    lookup.add_argument("--index", default=os.getenv("BIBLE_STORE_PATH", DEFAULT_STORE_PATH))
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        stats = build_index(args.source, args.output)
+        print(f"{stats['verses']} versets, {stats['chapters']} chapitres, "
+              f"{stats['bytes']} octets -> {args.output}")
+        return 0
+
+    reference = parse_reference(args.reference)
+    if reference is None:
+        print(f"Référence invalide : {args.reference}", file=sys.stderr)
+        return 1
+    store = VerseStore(args.index)
+    print(format_passage(reference, store.lookup(reference)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""
+Session vocale en duplex intégral (WebSocket).
+
+Le client envoie les transcriptions provisoires de la reconnaissance vocale
+au fil de la parole, puis la transcription finale. Dès que la transcription
+provisoire ne change plus pendant `stable_ms`, la réponse est préparée par
+anticipation (index des versets, cache ou modèle) sur une copie de
+l'historique. À l'arrivée de la transcription finale :
+
+- si elle correspond à la question anticipée, la réponse en cours est reprise
+  (fragments déjà reçus puis suite du flux) et enregistrée dans la session ;
+- sinon l'anticipation est abandonnée et la question posée normalement.
+
+La réponse est envoyée sur la même connexion, pendant que la session continue
+d'écouter : une nouvelle prise de parole interrompt la réponse en cours.
+
+Messages du client (JSON) :
+    {"type": "interim", "text": ...}  transcription provisoire
+    {"type": "final", "text": ...}    transcription finale (la question)
+    {"type": "cancel"}                interrompt la réponse en cours
+
+Messages du serveur :
+    {"type": "delta", "id": n, "text": ...}
+    {"type": "done", "id": n, "response": ..., "speculative": bool, ...}
+    {"type": "cancelled", "id": n}
+    {"type": "error", "id": n, "message": ..., "retry_after": ...}
+
+`id` numérote les questions de la session : les messages d'une réponse
+interrompue qui arrivent encore après la question suivante sont ignorés.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from logging import getLogger
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from metrics import ERRORS, STAGE_SECONDS, VOICE_SPECULATIONS
+
+logger = getLogger(__name__)
+
+
+class VoiceRejected(Exception):
+    """Question refusée par le contrôle d'admission (débit ou saturation)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def normalize_transcript(text: str) -> str:
+    """Forme comparable d'une transcription : casse, ponctuation et espaces ignorés."""
+    return " ".join(re.sub(r"[\W_]+", " ", text.lower()).split())
+
+
+class Speculation:
+    """
+    Réponse préparée par anticipation dans un thread ; les fragments sont
+    gardés pour être rejoués si la question est confirmée.
+
+    Attributes:
+        text (str): Transcription provisoire à l'origine de l'anticipation
+        key (str): Sa forme normalisée
+        parts (List[str]): Fragments reçus jusqu'ici
+    """
+
+    def __init__(self, text: str, chunks: Iterator[str]):
+        self.text = text
+        self.key = normalize_transcript(text)
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._cancelled = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(chunks,), daemon=True,
+                                        name="voice-speculation")
+        self._thread.start()
+
+    def _run(self, chunks: Iterator[str]) -> None:
+        try:
+            for chunk in chunks:
+                with self._changed:
+                    if self._cancelled:
+                        break
+                    self.parts.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            logger.error(f"Speculative answer failed: {str(e)}")
+            self.error = e
+        finally:
+            # Arrête la lecture du flux amont si l'anticipation est abandonnée
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def cancel(self) -> None:
+        with self._changed:
+            self._cancelled = True
+            self._changed.notify_all()
+
+    def follow(self, cancelled: threading.Event) -> Iterator[str]:
+        """
+        Fragments déjà reçus puis suivants, jusqu'à la fin de la réponse.
+
+        Raises:
+            L'erreur de la génération anticipée, si elle a échoué
+        """
+        sent = 0
+        while not cancelled.is_set():
+            with self._changed:
+                while sent == len(self.parts) and not self.done and not cancelled.is_set():
+                    self._changed.wait(0.1)
+                pending, done = self.parts[sent:], self.done
+            for chunk in pending:
+                yield chunk
+            sent += len(pending)
+            if done and sent == len(self.parts):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class VoiceSession:
+    """
+    Protocole d'une session vocale, indépendant du transport.
+
+    Les opérations sur la conversation sont fournies par l'appelant :
+
+    - speculate(text) : flux de la réponse à text sur une copie de
+      l'historique, ou None si l'anticipation n'est pas possible
+    - answer(text) : flux de la réponse à text, enregistrée dans la session
+    - commit(text, response) : enregistre dans la session un échange anticipé
+    - describe(response) : champs ajoutés au message done (citations…)
+    - admit() : lève VoiceRejected si la question doit être refusée
+
+    Attributes:
+        stable_ms (float): Durée sans changement au-delà de laquelle une
+            transcription provisoire est considérée comme stable
+        min_chars (int): Longueur minimale d'une question anticipée
+        max_speculations (int): Anticipations au plus par question
+        idle_timeout (float): Fermeture après ce délai sans message, en secondes
+        stats (Dict[str, int]): Questions, anticipations, réussies et manquées
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], None],
+                 speculate: Callable[[str], Optional[Iterator[str]]],
+                 answer: Callable[[str], Iterator[str]],
+                 commit: Callable[[str, str], None],
+                 describe: Callable[[str], Dict[str, Any]] = lambda response: {},
+                 admit: Callable[[], None] = lambda: None,
+                 stable_ms: float = 350, min_chars: int = 8, max_speculations: int = 2,
+                 idle_timeout: float = 300.0):
+        self._send = send
+        self._send_lock = threading.Lock()
+        self.speculate = speculate
+        self.answer = answer
+        self.commit = commit
+        self.describe = describe
+        self.admit = admit
+        self.stable_ms = stable_ms
+        self.min_chars = min_chars
+        self.max_speculations = max_speculations
+        self.idle_timeout = idle_timeout
+        self._interim = ""
+        self._interim_at = 0.0
+        self._speculation: Optional[Speculation] = None
+        self._speculations = 0
+        self._answering: Optional[threading.Thread] = None
+        self._answer_id = 0
+        self._cancel_answer = threading.Event()
+        self.stats: Dict[str, int] = {"questions": 0, "speculations": 0, "hits": 0, "misses": 0}
+
+    @classmethod
+    def from_env(cls, send: Callable[[Dict[str, Any]], None], **callbacks: Any) -> "VoiceSession":
+        """Crée une session configurée par VOICE_*."""
+        return cls(
+            send,
+            stable_ms=float(os.getenv("VOICE_STABLE_MS", "350")),
+            min_chars=int(os.getenv("VOICE_MIN_CHARS", "8")),
+            max_speculations=int(os.getenv("VOICE_MAX_SPECULATIONS", "2")),
+            idle_timeout=float(os.getenv("VOICE_IDLE_TIMEOUT_SECONDS", "300")),
+            **callbacks,
+        )
+
+    def send(self, message: Dict[str, Any]) -> None:
+        with self._send_lock:
+            self._send(message)
+
+    def run(self, receive: Callable[[Optional[float]], Optional[str]]) -> None:
+        """
+        Traite les messages jusqu'à la fermeture de la connexion.
+
+        Args:
+            receive: Attend un message au plus timeout secondes ; retourne None
+                si le délai expire et lève EOFError si la connexion est fermée
+        """
+        last_message = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = self.idle_timeout - (now - last_message)
+                stable_at = self._stable_deadline()
+                if stable_at is not None:
+                    timeout = min(timeout, max(0.0, stable_at - now))
+                if timeout <= 0 and stable_at is None:
+                    logger.info("Closing idle voice session")
+                    return
+                raw = receive(timeout)
+                if raw is None:
+                    self._maybe_speculate()
+                    continue
+                last_message = time.monotonic()
+                self.handle(raw)
+        except EOFError:
+            pass
+        finally:
+            self.close()
+
+    def handle(self, raw: str) -> None:
+        """Traite un message du client."""
+        try:
+            message = json.loads(raw)
+            kind = message.get("type")
+            text = message.get("text", "")
+            if not isinstance(text, str):
+                raise ValueError("Le champ 'text' doit être une chaîne de caractères")
+        except (ValueError, AttributeError) as e:
+            self.send({"type": "error", "message": f"Message invalide : {e}"})
+            return
+
+        if kind == "interim":
+            self._on_interim(text)
+        elif kind == "final":
+            self._on_final(text)
+        elif kind == "cancel":
+            self._stop_answer()
+        else:
+            self.send({"type": "error", "message": f"Type de message inconnu : {kind}"})
+
+    def _on_interim(self, text: str) -> None:
+        # L'utilisateur reparle : la réponse précédente est interrompue
+        self._stop_answer()
+        if normalize_transcript(text) == normalize_transcript(self._interim):
+            return
+        self._interim, self._interim_at = text, time.monotonic()
+        if self._speculation is not None and self._speculation.key != normalize_transcript(text):
+            # La question a changé depuis l'anticipation : inutile de la poursuivre
+            self._drop_speculation(self._speculation)
+            self._speculation = None
+
+    def _stable_deadline(self) -> Optional[float]:
+        """Instant où la transcription provisoire deviendra stable, s'il faut l'attendre."""
+        if (not self._interim or self._speculation is not None
+                or self._speculations >= self.max_speculations
+                or len(normalize_transcript(self._interim)) < self.min_chars):
+            return None
+        return self._interim_at + self.stable_ms / 1000
+
+    def _maybe_speculate(self) -> None:
+        stable_at = self._stable_deadline()
+        if stable_at is None or time.monotonic() < stable_at:
+            return
+        self._speculations += 1
+        try:
+            chunks = self.speculate(self._interim)
+        except Exception as e:
+            logger.error(f"Failed to start speculative answer: {str(e)}")
+            chunks = None
+        if chunks is None:
+            VOICE_SPECULATIONS.inc("skipped")
+            return
+        self.stats["speculations"] += 1
+        self._speculation = Speculation(self._interim, chunks)
+
+    def _drop_speculation(self, speculation: Optional[Speculation]) -> None:
+        if speculation is not None:
+            speculation.cancel()
+            self.stats["misses"] += 1
+            VOICE_SPECULATIONS.inc("miss")
+
+    def _on_final(self, text: str) -> None:
+        self._stop_answer()
+        speculation, self._speculation = self._speculation, None
+        self._interim, self._speculations = "", 0
+        self._answer_id += 1
+        try:
+            if not text.strip():
+                raise ValueError("Le champ 'text' ne peut pas être vide")
+            self.admit()
+        except ValueError as e:
+            self._drop_speculation(speculation)
+            self.send({"type": "error", "id": self._answer_id, "message": str(e)})
+            return
+        except VoiceRejected as e:
+            self._drop_speculation(speculation)
+            self.send({"type": "error", "id": self._answer_id, "message": str(e),
+                       "retry_after": e.retry_after})
+            return
+
+        self.stats["questions"] += 1
+        if speculation is not None and speculation.key == normalize_transcript(text):
+            self.stats["hits"] += 1
+            VOICE_SPECULATIONS.inc("hit")
+        else:
+            self._drop_speculation(speculation)
+            speculation = None
+
+        self._cancel_answer = threading.Event()
+        self._answering = threading.Thread(
+            target=self._stream_answer,
+            args=(self._answer_id, text, speculation, self._cancel_answer, time.monotonic()),
+            daemon=True, name="voice-answer",
+        )
+        self._answering.start()
+
+    def _stream_answer(self, answer_id: int, text: str, speculation: Optional[Speculation],
+                       cancelled: threading.Event, final_at: float) -> None:
+        parts: List[str] = []
+        try:
+            chunks = speculation.follow(cancelled) if speculation is not None else self.answer(text)
+            try:
+                for chunk in chunks:
+                    if cancelled.is_set():
+                        break
+                    if not parts:
+                        STAGE_SECONDS.observe(time.monotonic() - final_at, "voice_first_delta")
+                    parts.append(chunk)
+                    self.send({"type": "delta", "id": answer_id, "text": chunk})
+            except Exception:
+                if speculation is None or parts:
+                    raise
+                # L'anticipation a échoué avant tout envoi : question posée normalement
+                speculation = None
+                for chunk in self.answer(text):
+                    if cancelled.is_set():
+                        break
+                    parts.append(chunk)
+                    self.send({"type": "delta", "id": answer_id, "text": chunk})
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+            if cancelled.is_set():
+                if speculation is not None:
+                    speculation.cancel()
+                self.send({"type": "cancelled", "id": answer_id})
+                return
+            response = "".join(parts)
+            if speculation is not None:
+                self.commit(text, response)
+            self.send({"type": "done", "id": answer_id, "response": response,
+                       "speculative": speculation is not None, "success": True, **self.describe(response)})
+        except VoiceRejected as e:
+            self.send({"type": "error", "id": answer_id, "message": str(e), "retry_after": e.retry_after})
+        except EOFError:
+            pass
+        except Exception as e:
+            logger.error(f"Voice session error: {str(e)}", exc_info=True)
+            ERRORS.inc("voice", type(e).__name__)
+            try:
+                self.send({"type": "error", "id": answer_id,
+                           "message": "Une erreur est survenue lors du traitement de votre demande"})
+            except Exception:
+                pass
+
+    def _stop_answer(self) -> None:
+        # Sans attendre : le thread s'arrête au prochain fragment et annonce
+        # « cancelled » avec l'identifiant de sa réponse
+        if self._answering is not None and self._answering.is_alive():
+            self._cancel_answer.set()
+        self._answering = None
+
+    def close(self) -> None:
+        """Interrompt la réponse et l'anticipation en cours."""
+        self._stop_answer()
+        if self._speculation is not None:
+            self._speculation.cancel()
+            self._speculation = None